@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks
+@file benchmarks/__init__.py
+@author Christopher Wingard
+@brief Offline benchmarks for the cgsn_processing processors (not installed with the package)
+"""
@@ -0,0 +1,735 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.generators
+@file benchmarks/generators.py
+@author Christopher Wingard
+@brief Synthetic parsed JSON data and calibration coefficients for benchmarking the processors
+
+Each generator returns a JSON serializable object laid out the same way as the
+output from the cgsn_parsers (a dictionary of lists, with 2D data as lists of
+lists), using the same keys the processors read. Values are random but kept
+within realistic ranges for the instruments so the calculations follow the
+same code paths they would with real data. The coefficient functions return
+the serialized calibration coefficients the processors look for next to the
+data file, so everything runs without access to GitHub.
+"""
+import numpy as np
+import re
+
+# all of the synthetic data starts at 2024-01-15 00:00:00 UTC
+START = 1705276800.0
+
+# seconds between the 1904-01-01 epoch used by the SAMI instruments and the Unix epoch
+MAC_EPOCH = 2082844800
+
+# status log variables reported as measured (floating point) values rather than states, flags or counters
+MEASURED = re.compile(r'voltage|current|temperature|humidity|pressure|charge|ground_fault_|seawater_ground_')
+
+
+def _rng(seed):
+    return np.random.default_rng(seed)
+
+
+def _times(n, interval, start=START):
+    """
+    Evenly spaced epoch time stamps.
+
+    :param n: number of records
+    :param interval: seconds between records
+    :param start: first time stamp (epoch seconds)
+    :return: array of epoch time stamps
+    """
+    return start + np.arange(n) * interval
+
+
+def _dcl_strings(times):
+    """
+    DCL date/time strings (YYYY/MM/DD HH:MM:SS.sss) for the time stamps.
+    """
+    stamps = np.array(times * 1000, dtype='datetime64[ms]')
+    return [str(t).replace('-', '/').replace('T', ' ') for t in stamps]
+
+
+def _counts(rng, n, low, high):
+    return rng.integers(low, high, n).tolist()
+
+
+def _uniform(rng, n, low, high, decimals=3):
+    return np.round(rng.uniform(low, high, n), decimals).tolist()
+
+
+def _normal(rng, n, mean, std, decimals=4):
+    return np.round(rng.normal(mean, std, n), decimals).tolist()
+
+
+def ctdbp(n, ctd_type='solo', interval=10.0, seed=0):
+    """
+    SBE 16plusV2 CTD (CTDBP) with an optional Aanderaa optode (dosta) or WET
+    Labs ECO triplet (flort) attached.
+
+    :param n: number of samples
+    :param ctd_type: solo, dosta or flort
+    :param interval: seconds between samples
+    :param seed: random number generator seed
+    :return: parsed CTDBP data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    data = {
+        'time': time.tolist(),
+        'dcl_date_time_string': _dcl_strings(time),
+        'ctd_date_time_string': ['15 Jan 2024 00:00:00'] * n,
+        'temperature': _normal(rng, n, 12.0, 0.5),
+        'conductivity': _normal(rng, n, 3.9, 0.05, 5),
+        'pressure': _normal(rng, n, 7.0, 0.3, 3),
+    }
+    if ctd_type == 'dosta':
+        data['oxygen_concentration'] = _normal(rng, n, 250.0, 5.0)
+    if ctd_type == 'flort':
+        data['raw_chlorophyll'] = _counts(rng, n, 60, 400)
+        data['raw_cdom'] = _counts(rng, n, 50, 120)
+        data['raw_backscatter'] = _counts(rng, n, 80, 600)
+
+    return data
+
+
+def flort_coeffs():
+    """
+    Serialized ECO triplet calibration coefficients (flort.cal_coeffs.json).
+    """
+    return {
+        'dark_chla': 48, 'scale_chla': 0.0073,
+        'dark_cdom': 50, 'scale_cdom': 0.0907,
+        'dark_beta': 47, 'scale_beta': 1.693e-06,
+        'chi_factor': 1.076, 'wavelength': 700, 'scatter_angle': 124,
+        'dark_turbd': 47, 'scale_turbd': 0.0012
+    }
+
+
+def optaa(n, num_wavelengths=86, burst=960, interval=0.25, serial_number=253, seed=0):
+    """
+    WET Labs ac-s spectrophotometer (OPTAA), sampling at 4 Hz in bursts that
+    repeat every 15 minutes.
+
+    :param n: number of packets
+    :param num_wavelengths: number of wavelengths per packet
+    :param burst: number of packets per burst
+    :param interval: seconds between packets in a burst
+    :param serial_number: instrument serial number (must match the coefficients)
+    :param seed: random number generator seed
+    :return: parsed OPTAA data
+    """
+    rng = _rng(seed)
+    idx = np.arange(n)
+    time = START + (idx // burst) * 900.0 + (idx % burst) * interval
+    shape = (n, num_wavelengths)
+    return {
+        'time': time.tolist(),
+        'serial_number': [serial_number] * n,
+        'num_wavelengths': [num_wavelengths] * n,
+        'elapsed_run_time': ((idx % burst) * interval * 1000).astype(int).tolist(),
+        'internal_temp_raw': _counts(rng, n, 48000, 49000),
+        'external_temp_raw': _counts(rng, n, 41500, 42500),
+        'a_signal_dark': _counts(rng, n, 80, 120),
+        'a_reference_dark': _counts(rng, n, 80, 120),
+        'c_signal_dark': _counts(rng, n, 80, 120),
+        'c_reference_dark': _counts(rng, n, 80, 120),
+        'a_signal_raw': rng.integers(700, 1100, shape).tolist(),
+        'a_reference_raw': rng.integers(800, 1200, shape).tolist(),
+        'c_signal_raw': rng.integers(700, 1100, shape).tolist(),
+        'c_reference_raw': rng.integers(800, 1200, shape).tolist(),
+    }
+
+
+def optaa_coeffs(num_wavelengths=86, num_temp_bins=35, serial_number=253, seed=0):
+    """
+    Serialized ac-s device file coefficients (optaa.cal_coeffs.json).
+    """
+    rng = _rng(seed)
+    wavelengths = np.linspace(400.0, 750.0, num_wavelengths).round(1)
+    temp_bins = np.linspace(0.5, 34.5, num_temp_bins).round(2)
+    return {
+        'serial_number': serial_number,
+        'temp_calibration': 20.1,
+        'pressure_coeff': [0.0, 0.0],
+        'pathlength': 0.25,
+        'num_wavelengths': num_wavelengths,
+        'num_temp_bins': num_temp_bins,
+        'temp_bins': temp_bins.tolist(),
+        'a_wavelengths': wavelengths.tolist(),
+        'c_wavelengths': (wavelengths + 1.5).tolist(),
+        'a_offsets': _uniform(rng, num_wavelengths, 0.3, 0.7, 5),
+        'c_offsets': _uniform(rng, num_wavelengths, 0.3, 0.7, 5),
+        'ta_array': rng.uniform(-0.01, 0.01, (num_wavelengths, num_temp_bins)).round(6).tolist(),
+        'tc_array': rng.uniform(-0.01, 0.01, (num_wavelengths, num_temp_bins)).round(6).tolist(),
+    }
+
+
+def adcp_pd0(n, bins=25, interval=900.0, seed=0):
+    """
+    Teledyne RDI Workhorse ADCP ensembles recorded in the PD0 binary format,
+    with the fixed and variable leaders, velocity, correlation, echo intensity
+    and percent good data.
+
+    :param n: number of ensembles
+    :param bins: number of depth bins per ensemble
+    :param interval: seconds between ensembles
+    :param seed: random number generator seed
+    :return: parsed PD0 data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    shape = (n, bins)
+    stamps = np.array(time * 1000, dtype='datetime64[ms]').astype(object)
+    rtc2 = [[t.year // 100, t.year % 100, t.month, t.day, t.hour, t.minute, t.second, t.microsecond // 10000]
+            for t in stamps]
+    return {
+        'time': time.tolist(),
+        'fixed': {
+            'firmware_version': [50] * n,
+            'firmware_revision': [40] * n,
+            'sysconfig_frequency': [300] * n,
+            'sysconfig_beam_pattern': [1] * n,
+            'sysconfig_sensor_config': [1] * n,
+            'sysconfig_head_attached': [1] * n,
+            'sysconfig_vertical_orientation': [1] * n,
+            'num_beams': [4] * n,
+            # the processors use num_cells - 1 bins
+            'num_cells': [bins + 1] * n,
+            'pings_per_ensemble': [60] * n,
+            'depth_cell_length': [400] * n,
+            'blank_after_transmit': [176] * n,
+            'time_per_ping_minutes': [0] * n,
+            'time_per_ping_seconds': [2] * n,
+            'bin_1_distance': [632] * n,
+            'transmit_pulse_length': [477] * n,
+            'serial_number': [20345] * n,
+        },
+        'variable': {
+            'ensemble_number': (np.arange(n) % 65535 + 1).tolist(),
+            'ensemble_number_increment': (np.arange(n) // 65535).tolist(),
+            'real_time_clock1': [r[1:7] for r in rtc2],
+            'real_time_clock2': rtc2,
+            'speed_of_sound': _counts(rng, n, 1490, 1500),
+            'transducer_depth': _counts(rng, n, 240, 260),
+            'heading': _counts(rng, n, 0, 36000),
+            'pitch': _counts(rng, n, -300, 300),
+            'roll': _counts(rng, n, -300, 300),
+            'salinity': [35] * n,
+            'temperature': _counts(rng, n, 1100, 1300),
+            'pressure': _counts(rng, n, 24500, 25500),
+            'pressure_variance': _counts(rng, n, 0, 20),
+        },
+        'velocity': {
+            'eastward': rng.integers(-500, 500, shape).tolist(),
+            'northward': rng.integers(-500, 500, shape).tolist(),
+            'vertical': rng.integers(-50, 50, shape).tolist(),
+            'error': rng.integers(-30, 30, shape).tolist(),
+        },
+        'correlation': {
+            'magnitude_beam{}'.format(i): rng.integers(60, 128, shape).tolist() for i in range(1, 5)
+        },
+        'echo': {
+            'intensity_beam{}'.format(i): rng.integers(40, 160, shape).tolist() for i in range(1, 5)
+        },
+        'percent': {
+            'good_3beam': rng.integers(0, 10, shape).tolist(),
+            'transforms_reject': rng.integers(0, 5, shape).tolist(),
+            'bad_beams': rng.integers(0, 5, shape).tolist(),
+            'good_4beam': rng.integers(85, 101, shape).tolist(),
+        },
+    }
+
+
+def adcp_pd8(n, bins=25, interval=900.0, seed=0):
+    """
+    Teledyne RDI Workhorse ADCP ensembles recorded in the PD8 ASCII format.
+
+    :param n: number of ensembles
+    :param bins: number of depth bins per ensemble
+    :param interval: seconds between ensembles
+    :param seed: random number generator seed
+    :return: parsed PD8 data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    shape = (n, bins)
+    east = rng.integers(-500, 500, shape)
+    north = rng.integers(-500, 500, shape)
+    return {
+        'time': time.tolist(),
+        'variable': {
+            'ensemble_number': (np.arange(n) + 1).tolist(),
+            'bit_result': [0] * n,
+            'speed_of_sound': _counts(rng, n, 1490, 1500),
+            'heading': _uniform(rng, n, 0, 360, 2),
+            'pitch': _uniform(rng, n, -3, 3, 2),
+            'roll': _uniform(rng, n, -3, 3, 2),
+            'temperature': _uniform(rng, n, 11, 13, 2),
+        },
+        'velocity': {
+            'bin_number': np.tile(np.arange(1, bins + 1), (n, 1)).tolist(),
+            'direction': np.round(np.degrees(np.arctan2(east, north)) % 360, 1).tolist(),
+            'magnitude': np.round(np.hypot(east, north), 1).tolist(),
+            'eastward': east.tolist(),
+            'northward': north.tolist(),
+            'vertical': rng.integers(-50, 50, shape).tolist(),
+            'error': rng.integers(-30, 30, shape).tolist(),
+        },
+        'echo': {
+            'intensity_beam{}'.format(i): rng.integers(40, 160, shape).tolist() for i in range(1, 5)
+        },
+    }
+
+
+def _sami_record_time(time):
+    # SAMI instruments record the time as seconds since 1904-01-01
+    return (np.asarray(time) + MAC_EPOCH).astype(np.int64).tolist()
+
+
+def phsen(n, interval=3600.0, seed=0):
+    """
+    Sunburst Sensors SAMI-pH (PHSEN) measurement records, each with 16 blank
+    and 92 light measurements.
+
+    :param n: number of records
+    :param interval: seconds between records
+    :param seed: random number generator seed
+    :return: parsed PHSEN data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+
+    # 4 sets of 4 blank measurements, and 23 sets of 4 light measurements (reference and signal at 434 and 578 nm)
+    blanks = rng.integers(2600, 2800, (n, 4, 4))
+    light = np.empty((n, 23, 4), dtype=int)
+    light[:, :, 0] = rng.integers(2600, 2800, (n, 23))
+    light[:, :, 2] = rng.integers(2600, 2800, (n, 23))
+    dip = np.exp(-0.5 * ((np.arange(23) - 11) / 4.0) ** 2)
+    light[:, :, 1] = (light[:, :, 0] * (1 - 0.5 * dip)).astype(int)
+    light[:, :, 3] = (light[:, :, 2] * (1 - 0.3 * dip)).astype(int)
+    return {
+        'time': time.tolist(),
+        'dcl_date_time_string': _dcl_strings(time),
+        'unique_id': [208] * n,
+        'record_length': [231] * n,
+        'record_type': [10] * n,
+        'record_time': _sami_record_time(time),
+        'thermistor_start': _counts(rng, n, 2100, 2300),
+        'reference_measurements': blanks.reshape(n, 16).tolist(),
+        'light_measurements': light.reshape(n, 92).tolist(),
+        'voltage_battery': _counts(rng, n, 2800, 3000),
+        'thermistor_end': _counts(rng, n, 2100, 2300),
+    }
+
+
+def phsen_coeffs():
+    """
+    Serialized SAMI-pH calibration coefficients (phsen.calibration_coeffs.json).
+    """
+    return {
+        'ea434': 17533.0, 'ea578': 101.0, 'eb434': 2229.0, 'eb578': 38502.0,
+        'ind_off': 0.0, 'ind_slp': 1.0, 'psal': 35.0, 'sami_bits': 12.0,
+        'serial_number': 'P0208'
+    }
+
+
+def pco2w(n, interval=3600.0, blank_every=24, seed=0):
+    """
+    Sunburst Sensors SAMI-pCO2 (PCO2W) records, with a pure water blank
+    (record type 5) every blank_every records and seawater measurements
+    (record type 4) in between.
+
+    :param n: number of records
+    :param interval: seconds between records
+    :param blank_every: number of records between blank measurements
+    :param seed: random number generator seed
+    :return: parsed PCO2W data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    record_type = np.where(np.arange(n) % blank_every == 0, 5, 4)
+    return {
+        'time': time.tolist(),
+        'unique_id': [4] * n,
+        'record_length': [39] * n,
+        'record_type': record_type.tolist(),
+        'record_time': _sami_record_time(time),
+        'dark_reference_a': _counts(rng, n, 60, 80),
+        'dark_signal_a': _counts(rng, n, 60, 80),
+        'reference_434_a': _counts(rng, n, 2500, 2700),
+        'signal_434_a': _counts(rng, n, 1800, 2000),
+        'reference_620_a': _counts(rng, n, 2400, 2600),
+        'signal_620_a': _counts(rng, n, 2200, 2400),
+        'ratio_434': np.where(record_type == 5, rng.integers(3800, 4000, n), rng.integers(3300, 3500, n)).tolist(),
+        'ratio_620': np.where(record_type == 5, rng.integers(3800, 4000, n), rng.integers(3600, 3800, n)).tolist(),
+        'dark_reference_b': _counts(rng, n, 60, 80),
+        'dark_signal_b': _counts(rng, n, 60, 80),
+        'reference_434_b': _counts(rng, n, 2500, 2700),
+        'signal_434_b': _counts(rng, n, 1800, 2000),
+        'reference_620_b': _counts(rng, n, 2400, 2600),
+        'signal_620_b': _counts(rng, n, 2200, 2400),
+        'voltage_raw': _counts(rng, n, 2800, 3000),
+        'thermistor_raw': _counts(rng, n, 2100, 2300),
+    }
+
+
+def pco2w_coeffs():
+    """
+    Serialized SAMI-pCO2 calibration coefficients (pco2w.calibration_coeffs.json).
+    """
+    return {
+        'cala': 0.0459, 'calb': 0.6783, 'calc': -1.5286, 'calt': 16.5,
+        'sami_bits': 12.0, 'cal_range': [200, 1000], 'serial_number': 'C0104'
+    }
+
+
+def nutnr(n, channels=256, interval=1.0, dark_every=10, seed=0):
+    """
+    Sea-Bird SUNA V2 nitrate sensor (NUTNR) full frames, with a dark frame
+    every dark_every records.
+
+    :param n: number of frames
+    :param channels: number of spectral channels per frame
+    :param interval: seconds between frames
+    :param dark_every: number of frames between dark frames
+    :param seed: random number generator seed
+    :return: parsed NUTNR data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    hours = (time - START) / 3600.0
+    dark = np.arange(n) % dark_every == 0
+    spectra = rng.integers(20000, 30000, (n, channels))
+    spectra[dark, :] = rng.integers(500, 700, (dark.sum(), channels))
+    return {
+        'time': time.tolist(),
+        'date_time_string': _dcl_strings(time),
+        'measurement_type': np.where(dark, 'SDF', 'SLF').tolist(),
+        'serial_number': [1234] * n,
+        'date_string': ['2024015'] * n,
+        'decimal_hours': np.round(hours, 6).tolist(),
+        'nitrate_concentration': _normal(rng, n, 15.0, 1.0),
+        'nitrogen_in_nitrate': _normal(rng, n, 0.21, 0.01),
+        'absorbance_254': _normal(rng, n, 0.3, 0.01),
+        'absorbance_350': _normal(rng, n, 0.05, 0.005),
+        'bromide_trace': _normal(rng, n, 0.0, 0.1),
+        'spectral_average': _counts(rng, n, 20000, 30000),
+        'dark_value': _counts(rng, n, 500, 700),
+        'integration_factor': [1] * n,
+        'channel_measurements': spectra.tolist(),
+        'temperature_internal': _normal(rng, n, 12.0, 0.1),
+        'temperature_spectrometer': _normal(rng, n, 12.0, 0.1),
+        'temperature_lamp': _normal(rng, n, 14.0, 0.5),
+        'lamp_on_time': (np.arange(n) + 10000).tolist(),
+        'humidity': _normal(rng, n, 5.0, 0.1),
+        'voltage_main': _normal(rng, n, 12.0, 0.05),
+        'voltage_lamp': _normal(rng, n, 11.0, 0.05),
+        'voltage_internal': _normal(rng, n, 5.0, 0.01),
+        'main_current': _counts(rng, n, 300, 400),
+        'fit_auxiliary_1': _normal(rng, n, 0.0, 0.01),
+        'fit_auxiliary_2': _normal(rng, n, 0.0, 0.01),
+        'fit_base_1': _normal(rng, n, 0.0, 0.01),
+        'fit_base_2': _normal(rng, n, 0.0, 0.001),
+        'fit_rmse': _normal(rng, n, 0.0005, 0.0001, 6),
+    }
+
+
+def nutnr_coeffs(channels=256, seed=0):
+    """
+    Serialized SUNA pure water calibration coefficients (nutnr.cal_coeffs.json).
+    """
+    rng = _rng(seed)
+    wl = np.linspace(189.5, 394.5, channels).round(2)
+    eno3 = np.clip(0.2 * np.exp(-(wl - 200.0) / 12.0), 0, None).round(6)
+    eswa = np.clip(0.005 * np.exp(-(wl - 200.0) / 10.0), 0, None).round(6)
+    di = rng.integers(24000, 30000, channels)
+    return {
+        'cal_temp': 20.0,
+        'wl': wl.tolist(),
+        'eno3': eno3.tolist(),
+        'eswa': eswa.tolist(),
+        'di': di.tolist(),
+        'wllower': 217,
+        'wlupper': 240,
+    }
+
+
+def zplsc(n, bins=100, interval=900.0, seed=0):
+    """
+    ASL AZFP bioacoustic sensor (ZPLSC) condensed 4-frequency profiles.
+
+    :param n: number of bursts
+    :param bins: number of range bins per frequency
+    :param interval: seconds between bursts
+    :param seed: random number generator seed
+    :return: parsed ZPLSC data
+    """
+    rng = _rng(seed)
+    time = START + 300.0 + np.arange(n) * interval  # bursts at 5, 20, 35 and 50 minutes past the hour
+    stamps = np.array(time * 1000, dtype='datetime64[ms]').astype(object)
+    data = {
+        'time': time.tolist(),
+        'dcl_date_time_string': _dcl_strings(time),
+        'transmission_date_string': [t.strftime('%Y-%m-%dT%H:%M:%S') for t in stamps],
+        'burst_date_string': [t.strftime('%y%m%d%H%M%S') + '00' for t in stamps],
+        'serial_number': [55075] * n,
+        'phase': [1] * n,
+        'burst_number': (np.arange(n) + 1).tolist(),
+        'tilts': np.round(rng.uniform(-1, 1, (n, 2)), 1).tolist(),
+        'temperature': _normal(rng, n, 10.0, 0.2, 2),
+        'battery_voltage': _normal(rng, n, 12.0, 0.1, 2),
+        'frequencies': [[38, 125, 200, 455]] * n,
+        'number_bins': [[bins] * 4] * n,
+        'minimum_values': rng.integers(10000, 12000, (n, 4)).tolist(),
+    }
+    for i in range(1, 5):
+        data['profiles_freq{}'.format(i)] = rng.integers(0, 30000, (n, bins)).tolist()
+
+    return data
+
+
+def vel3d(n, rate=8, seed=0):
+    """
+    Nortek Vector velocimeter (VEL3D) burst with 8 Hz velocity data and 1 Hz
+    system data.
+
+    :param n: number of velocity records
+    :param rate: velocity sampling rate in Hz
+    :param seed: random number generator seed
+    :return: parsed VEL3D data
+    """
+    rng = _rng(seed)
+    nsys = max(n // rate, 1)
+    vtime = _times(n, 1.0 / rate)
+    stime = _times(nsys, 1.0)
+    stamps = np.array(stime * 1000, dtype='datetime64[ms]').astype(object)
+    return {
+        'header': {
+            'noise_amplitudes': [rng.integers(10, 30, 3).tolist()],
+            'noise_correlations': [rng.integers(0, 10, 3).tolist()],
+        },
+        'system': {
+            'time': stime.tolist(),
+            'date_time_array': [[t.minute, t.second, t.day, t.hour, t.year % 100, t.month] for t in stamps],
+            'battery_voltage': _normal(rng, nsys, 12.0, 0.05, 2),
+            'speed_of_sound': _normal(rng, nsys, 1495.0, 0.5, 1),
+            'heading': _uniform(rng, nsys, 0, 360, 1),
+            'pitch': _uniform(rng, nsys, -2, 2, 1),
+            'roll': _uniform(rng, nsys, -2, 2, 1),
+            'temperature': _normal(rng, nsys, 8.0, 0.1, 2),
+            'error_code': [0] * nsys,
+            # codes with the same bit length (proc_vel3d splits them into equal length bit arrays), bit 1 sets
+            # the velocity scaling
+            'status_code': rng.choice([8, 10], nsys).tolist(),
+        },
+        'velocity': {
+            'time': vtime.tolist(),
+            'ensemble_counter': (np.arange(n) % 256).tolist(),
+            'pressure': _normal(rng, n, 25.0, 0.2, 3),
+            'velocity_east': rng.integers(-300, 300, n).tolist(),
+            'velocity_north': rng.integers(-300, 300, n).tolist(),
+            'velocity_vertical': rng.integers(-30, 30, n).tolist(),
+            'amplitudes': rng.integers(100, 180, (n, 3)).tolist(),
+            'correlations': rng.integers(70, 100, (n, 3)).tolist(),
+        },
+    }
+
+
+def mmp_coastal(n, profile_id=1, seed=0):
+    """
+    McLane Moored Profiler (MMP) profile with the engineering, FLORT and PARAD
+    ("E"), CTD and DOFST ("C") and VEL3D ("A") data merged into a single file.
+
+    :param n: number of records in each of the E, C and A data sets
+    :param profile_id: profile number
+    :param seed: random number generator seed
+    :return: parsed MMP data
+    """
+    rng = _rng(seed)
+    etime = _times(n, 1.0)
+    ctime = _times(n, 1.0, START + 0.5)
+    atime = _times(n, 1.0, START + 0.25)
+    pressure = np.linspace(80.0, 20.0, n)  # profiling up from 80 m to 20 m
+    return {
+        'profile': {
+            'profile_id': profile_id,
+            'ramp_status': 0,
+            'profile_status': 1,
+            'start_depth': 80.0,
+            'end_depth': 20.0,
+        },
+        'edata': {
+            'time': etime.tolist(),
+            'date_time_string': _dcl_strings(etime),
+            'pressure': np.round(pressure + rng.normal(0, 0.05, n), 2).tolist(),
+            'motor_current': _counts(rng, n, 100, 300),
+            'battery_voltage': _normal(rng, n, 10.5, 0.05, 2),
+            'raw_chlorophyll': _counts(rng, n, 60, 400),
+            'raw_cdom': _counts(rng, n, 50, 120),
+            'raw_backscatter': _counts(rng, n, 80, 600),
+            'raw_par': _counts(rng, n, 2000, 40000),
+        },
+        'cdata': {
+            'time': ctime.tolist(),
+            'conductivity': _normal(rng, n, 35.0, 0.2, 4),
+            'temperature': _normal(rng, n, 9.0, 0.3, 4),
+            'pressure': np.round(pressure + 0.1, 3).tolist(),
+            'raw_oxygen': _counts(rng, n, 3000, 4000),
+        },
+        'adata': {
+            'time': atime.tolist(),
+            'date_time_string': _dcl_strings(atime),
+            'heading': _uniform(rng, n, 0, 360, 1),
+            'pitch': _uniform(rng, n, -5, 5, 1),
+            'roll': _uniform(rng, n, -5, 5, 1),
+            'beams': [[3, 1, 2, 4, 0]] * n,
+            'beam_0_velocity': rng.integers(-300, 300, n).tolist(),
+            'beam_1_velocity': rng.integers(-300, 300, n).tolist(),
+            'beam_2_velocity': rng.integers(-300, 300, n).tolist(),
+            'amplitude_0': _counts(rng, n, 100, 180),
+            'amplitude_1': _counts(rng, n, 100, 180),
+            'amplitude_2': _counts(rng, n, 100, 180),
+            'temperature': _normal(rng, n, 9.0, 0.3, 2),
+        },
+    }
+
+
+def parad_coeffs():
+    """
+    Serialized Biospherical PAR sensor calibration coefficients (parad.cal_coeffs.json).
+    """
+    return {'dark_offset': 2026.0, 'scale_wet': 2.3e-4}
+
+
+def dofst_coeffs():
+    """
+    Serialized SBE 43F oxygen sensor calibration coefficients (dofst.cal_coeffs.json).
+    """
+    return {'offset': -839.0, 'slope': 2.5e-4, 'A': -3.1e-3, 'B': 1.2e-4, 'C': -2.5e-6, 'E': 0.036}
+
+
+def prawler(n, profile_length=200, seed=0):
+    """
+    McLane Prawler (MMP) science profiles with an attached ECO triplet.
+
+    :param n: number of science records
+    :param profile_length: number of records per profile
+    :param seed: random number generator seed
+    :return: parsed Prawler data
+    """
+    rng = _rng(seed)
+    time = _times(n, 1.0)
+    pressure = np.abs((np.arange(n) % (2 * profile_length)) - profile_length) * 0.4 + 2.0
+    return {
+        'summarydata': {
+            'ID': ['PRAWLER'],
+            'serial_number': ['18'],
+        },
+        'scidata': {
+            'epoch_time': time.tolist(),
+            'pressure': np.round(pressure, 2).tolist(),
+            'temperature': _normal(rng, n, 9.0, 0.3),
+            'conductivity': _normal(rng, n, 3.5, 0.05, 5),
+            'optode_temperature': _normal(rng, n, 9.0, 0.3),
+            'optode_dissolved_oxygen': _normal(rng, n, 250.0, 5.0),
+            'flu_chl_count': _counts(rng, n, 60, 400),
+            'flu_beta_count': _counts(rng, n, 80, 600),
+            'flu_cdom_count': _counts(rng, n, 50, 120),
+        },
+    }
+
+
+def _status(rng, names, n):
+    """
+    Fill a set of status log variables, using floating point values for the
+    measured quantities and integer values for the states, flags and counters.
+    """
+    data = {}
+    for name in names:
+        if MEASURED.search(name) and not name.endswith(('_state', '_flag', '_enable')):
+            data[name] = _uniform(rng, n, 0, 30, 2)
+        else:
+            data[name] = _counts(rng, n, 0, 4)
+
+    return data
+
+
+def superv(n, superv_type='cpm', interval=60.0, seed=0):
+    """
+    Supervisor status logs from a CPM, DCL or STC.
+
+    :param n: number of status records
+    :param superv_type: cpm, dcl or stc
+    :param interval: seconds between records
+    :param seed: random number generator seed
+    :return: parsed supervisor data
+    """
+    from cgsn_processing.process.configs import load_attrs
+
+    rng = _rng(seed)
+    time = _times(n, interval)
+    attrs = load_attrs('SUPERV')
+    names = [k for k in list(attrs['common']) + list(attrs[superv_type]) if k != 'global']
+    data = {
+        'time': time.tolist(),
+        superv_type + '_date_time_string': _dcl_strings(time),
+    }
+    data.update(_status(rng, names, n))
+    return data
+
+
+def psc(n, interval=60.0, seed=0):
+    """
+    Power system controller (PSC) status logs, including the fuel cell
+    variables the parser still reports.
+
+    :param n: number of status records
+    :param interval: seconds between records
+    :param seed: random number generator seed
+    :return: parsed PSC data
+    """
+    from cgsn_processing.process.configs import load_attrs
+
+    rng = _rng(seed)
+    time = _times(n, interval)
+    names = [k for k in load_attrs('PSC') if k != 'global']
+    names += ['fuel_cell1_state', 'fuel_cell1_voltage', 'fuel_cell1_current',
+              'fuel_cell2_state', 'fuel_cell2_voltage', 'fuel_cell2_current', 'fuel_cell_volume']
+    data = {
+        'time': time.tolist(),
+        'dcl_date_time_string': _dcl_strings(time),
+    }
+    data.update(_status(rng, names, n))
+    return data
+
+
+def swnd(n, interval=5.0, seed=0):
+    """
+    ASIMET sonic wind module (SWND) with a Gill WindMaster reporting 5-second
+    averages of the wind components, sonic temperature and the compass and
+    tilt data.
+
+    :param n: number of records (17,280 per day)
+    :param interval: seconds between records
+    :param seed: random number generator seed
+    :return: parsed SWND data
+    """
+    rng = _rng(seed)
+    time = _times(n, interval)
+    # a slowly veering wind with gusts, so the bins have some spread in speed and direction
+    direction = np.cumsum(rng.normal(0, 0.02, n))
+    speed = np.abs(8.0 + np.cumsum(rng.normal(0, 0.05, n)) + rng.normal(0, 1.0, n))
+    heading = np.mod(180.0 + np.cumsum(rng.normal(0, 0.5, n)), 360.0)
+    return {
+        'time': time.tolist(),
+        'dcl_date_time_string': _dcl_strings(time),
+        'u_axis_wind_speed': np.round(speed * np.cos(direction), 2).tolist(),
+        'v_axis_wind_speed': np.round(speed * np.sin(direction), 2).tolist(),
+        'sonic_temperature': _normal(rng, n, 12.0, 0.2, 2),
+        'speed_of_sound': _normal(rng, n, 338.0, 0.2, 2),
+        'heading': np.round(heading, 1).tolist(),
+        'pitch': _uniform(rng, n, -5, 5, 1),
+        'roll': _uniform(rng, n, -5, 5, 1),
+    }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.memory
+@file benchmarks/memory.py
+@author Christopher Wingard
+@brief Measures the peak memory used by update_dataset and write_dataset for large 2D data sets
+
+Builds synthetic processed data sets shaped like the larger 2D instruments
+(OPTAA spectra, ADCP velocity profiles and ZPLSC backscatter profiles) and
+runs them through update_dataset and write_dataset, once with the dtype
+conversions done in memory (the default) and once with them applied as
+encodings when the file is written (low_memory). Each measurement runs in a
+fresh interpreter, since the peak resident set size (RSS) is a process
+high-water mark, and reports the growth of the peak RSS over the size of the
+data set. Runs entirely offline, but requires the resource module (so not on
+Windows).
+
+Usage:
+    python -m benchmarks.memory [-c optaa adcp zplsc] [-n 15360]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from collections import defaultdict
+
+# data set shapes: the number of records, the size of the second dimension, and the number of 2D float64 and int64
+# variables, roughly matching a day of each instrument
+SHAPES = {
+    'optaa': {'records': 15360, 'dim': ('wavelength_number', 100), 'floats': 8, 'ints': 4},
+    'adcp': {'records': 1440, 'dim': ('bin_number', 100), 'floats': 12, 'ints': 8},
+    'zplsc': {'records': 384, 'dim': ('bins', 2000), 'floats': 4, 'ints': 0},
+}
+
+
+def build(name, records=None):
+    """
+    Build a synthetic processed data set (before update_dataset).
+
+    :param name: name of the data set shape (see SHAPES)
+    :param records: number of records to use instead of the default
+    :return: the data set and the matching attribute dictionary
+    """
+    import numpy as np
+    import pandas as pd
+    import xarray as xr
+
+    shape = SHAPES[name]
+    n = records or shape['records']
+    dim, size = shape['dim']
+    rng = np.random.default_rng(0)
+
+    data_vars = {
+        'serial_number': ('time', np.full(n, 123, dtype=np.int64)),
+        'temperature': ('time', rng.random(n)),
+        'pressure': ('time', rng.random(n)),
+    }
+    for i in range(shape['floats']):
+        data_vars['float_{:02d}'.format(i)] = (('time', dim), rng.random((n, size)))
+    for i in range(shape['ints']):
+        data_vars['int_{:02d}'.format(i)] = (('time', dim), rng.integers(0, 65535, (n, size), dtype=np.int64))
+
+    time = pd.Timestamp('2024-01-15').value + np.arange(n, dtype=np.int64) * (86400 * 10 ** 9 // n)
+    ds = xr.Dataset(data_vars, coords={'time': pd.to_datetime(time), dim: np.arange(size)})
+    ds['deploy_id'] = ('time', np.repeat('D00001', n).astype(str))
+
+    attrs = defaultdict(dict)
+    attrs['global'] = {'title': 'Synthetic {} data'.format(name)}
+    return ds, attrs
+
+
+def measure(name, low_memory, records=None):
+    """
+    Run update_dataset and write_dataset on a synthetic data set in this
+    process and report the peak RSS growth. Called in a fresh interpreter.
+
+    :param name: name of the data set shape
+    :param low_memory: use the low_memory mode of update_dataset
+    :param records: number of records to use instead of the default
+    :return: dictionary with the results
+    """
+    import gc
+    from cgsn_processing.process.common import update_dataset, write_dataset, max_rss
+
+    # load the NetCDF libraries first, so the one-off cost of the imports is not counted as part of the write
+    import h5netcdf  # noqa: F401
+
+    ds, attrs = build(name, records)
+    nbytes = ds.nbytes
+    gc.collect()
+    baseline = max_rss()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ds = update_dataset(ds, 'bench', 'D00001', 44.6, -124.3, [25.0, 25.0, 25.0], attrs, low_memory=low_memory)
+        updated = max_rss()
+        write_dataset(ds, os.path.join(tmp, 'bench.nc'))
+        written = max_rss()
+        size = os.path.getsize(os.path.join(tmp, 'bench.nc'))
+
+    return {'case': name, 'low_memory': low_memory, 'data_bytes': nbytes, 'file_bytes': size,
+            'update_growth': updated - baseline, 'write_growth': written - baseline}
+
+
+def run(name, low_memory, records=None):
+    """
+    Measure a case in a fresh interpreter.
+    """
+    cmd = [sys.executable, '-m', 'benchmarks.memory', '--child', name, '-n', str(records or 0)]
+    if low_memory:
+        cmd.append('--low-memory')
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'case': name, 'low_memory': low_memory, 'error': proc.stderr.strip().splitlines()[-1]}
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the peak memory used to update and write data sets')
+    parser.add_argument('-c', '--cases', dest='cases', nargs='+', choices=sorted(SHAPES), default=None,
+                        help='Data set shapes to run (default is all of them)')
+    parser.add_argument('-n', '--records', dest='records', type=int, default=0,
+                        help='Number of records to use instead of the defaults for each shape')
+    parser.add_argument('--child', dest='child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--low-memory', dest='low_memory', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.low_memory, args.records or None)))
+        return 0
+
+    print('{:<8s} {:>10s} {:>10s} {:>10s} {:>14s} {:>14s}'.format('case', 'mode', 'data MB', 'file MB',
+                                                               'update +MB', 'write +MB'))
+    for name in args.cases or sorted(SHAPES):
+        for low_memory in (False, True):
+            r = run(name, low_memory, args.records)
+            mode = 'low_memory' if low_memory else 'default'
+            if 'error' in r:
+                print('{:<8s} {:>10s} error: {}'.format(name, mode, r['error']))
+                continue
+
+            print('{:<8s} {:>10s} {:>10.1f} {:>10.1f} {:>14.1f} {:>14.1f}'.format(
+                name, mode, r['data_bytes'] / 2 ** 20, r['file_bytes'] / 2 ** 20, r['update_growth'] / 2 ** 20,
+                r['write_growth'] / 2 ** 20))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.mmp
+@file benchmarks/mmp.py
+@author Christopher Wingard
+@brief Benchmarks the coastal MMP profile loading, cleanup and alignment steps at deployment scale
+
+Generates a set of synthetic coastal McLane Moored Profiler (MMP) profiles
+(see benchmarks.generators, 1,000 profiles of 300 records by default) and
+times the steps applied to every profile before the sensor calibrations:
+loading the E, C and A data into data frames, cleaning up the profiler
+pressure record, interpolating the CTD data onto the E and A records, and
+reordering the VEL3D-K beam mapping. The original versions of these steps
+(list comprehensions, one np.interp call per variable and data set, and
+np.insert/np.delete) are kept here as the baseline, and the results are
+checked against them. The current alignment steps live in proc_mmp_coastal,
+which requires pyseas, so only the loading is compared without it. Runs
+entirely offline.
+
+Usage:
+    python -m benchmarks.mmp [-p 1000] [-r 300] [-n 3]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import generators
+from cgsn_processing.process.common import json_obj2df, FILL_INT
+
+
+def legacy_obj2df(data, sub):
+    """
+    The original json_obj2df, converting the long integer columns one at a time.
+    """
+    df = pd.DataFrame(data[sub])
+    if df.empty:
+        return df
+
+    if 'time' in df.keys():
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+    else:
+        df['time'] = pd.to_datetime(data['time'], unit='s')
+    df.set_index('time', drop=True, inplace=True)
+
+    for col in df.columns:
+        if df[col].dtype == np.int64:
+            df[col] = df[col].astype(np.int32)
+
+    return df
+
+
+def load(obj2df, profiles):
+    """
+    Load the E, C and A data from each of the profiles.
+    """
+    return [(obj2df(data, 'edata'), obj2df(data, 'cdata'), obj2df(data, 'adata')) for data in profiles]
+
+
+def legacy_align(edata, cdata, adata):
+    """
+    The original pressure cleanup, CTD interpolation and beam mapping steps,
+    converting the time axes for every np.interp call.
+    """
+    edata['pressure'] = [m if m > 1 else np.nan for m in edata['pressure']]
+    etime = edata.index.values.astype(float)
+    ctime = cdata.index.values.astype(float)
+    edata['profiler_depth'] = np.interp(etime, ctime, cdata['profiler_depth'])
+    edata['ctd_temperature'] = np.interp(edata.index.values.astype(float), ctime, cdata['temperature'])
+    edata['ctd_salinity'] = np.interp(edata.index.values.astype(float), ctime, cdata['salinity'])
+    adata['profiler_depth'] = np.interp(adata.index.values.astype(float), cdata.index.values.astype(float),
+                                        cdata['profiler_depth'])
+    beams = np.atleast_2d(adata['beams'].tolist())
+    return np.insert(np.delete(beams, 0, 1), 4, FILL_INT, 1)
+
+
+def current_align(edata, cdata, adata):
+    """
+    The current versions of the same steps (see proc_mmp_coastal).
+    """
+    from cgsn_processing.process.proc_mmp_coastal import align_records, beam_mapping
+
+    pressure = edata['pressure'].values
+    edata['pressure'] = np.where(pressure > 1, pressure, np.nan)
+    align_records(edata, cdata, adata)
+    return beam_mapping(np.array(adata['beams'].tolist()))
+
+
+def add_ctd(frames):
+    """
+    Add the derived CTD variables the alignment needs (normally calculated with the GSW toolbox).
+    """
+    for _, cdata, _ in frames:
+        cdata['profiler_depth'] = cdata['pressure'] * 0.99
+        cdata['salinity'] = cdata['conductivity'] - 1.5
+
+
+def align(func, frames):
+    """
+    Run the alignment steps on copies of the loaded profiles, returning the results and the elapsed time.
+    """
+    frames = [(e.copy(), c, a.copy()) for e, c, a in frames]
+    start = time.perf_counter()
+    beams = [func(e, c, a) for e, c, a in frames]
+    return time.perf_counter() - start, frames, beams
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the coastal MMP profile processing steps')
+    parser.add_argument('-p', '--profiles', dest='profiles', type=int, default=1000, help='Number of profiles')
+    parser.add_argument('-r', '--records', dest='records', type=int, default=300, help='Records per profile')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=3, help='Number of timed runs')
+    args = parser.parse_args(argv)
+
+    profiles = [generators.mmp_coastal(args.records, profile_id=i + 1, seed=i) for i in range(args.profiles)]
+    print('{:,d} profiles of {:,d} records, median of {:d} runs'.format(args.profiles, args.records, args.repeats))
+    print('{:<24s} {:>10s} {:>10s} {:>8s}'.format('step', 'original', 'current', 'speedup'))
+
+    results = {}
+    for name, func in [('original', legacy_obj2df), ('current', json_obj2df)]:
+        elapsed = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            results[name] = load(func, profiles)
+            elapsed.append(time.perf_counter() - start)
+        results[name + '_seconds'] = statistics.median(elapsed)
+
+    for old, new in zip(results['original'], results['current']):
+        if not all(a.equals(b) for a, b in zip(old, new)):
+            print('json_obj2df does not match the original implementation')
+            return 1
+    print('{:<24s} {:>10.3f} {:>10.3f} {:>7.1f}x'.format('load E, C and A data', results['original_seconds'],
+                                                         results['current_seconds'],
+                                                         results['original_seconds'] / results['current_seconds']))
+
+    frames = results['current']
+    add_ctd(frames)
+    try:
+        align(current_align, frames[:1])
+    except ImportError as e:
+        print('Skipping the alignment steps, the MMP processor could not be loaded ({})'.format(e))
+        return 0
+
+    legacy = [align(legacy_align, frames) for _ in range(args.repeats)]
+    current = [align(current_align, frames) for _ in range(args.repeats)]
+    # the time axes are now converted to seconds rather than nanoseconds, so allow for rounding differences
+    (_, old, old_beams), (_, new, new_beams) = legacy[0], current[0]
+    for (e0, _, a0), (e1, _, a1), b0, b1 in zip(old, new, old_beams, new_beams):
+        try:
+            pd.testing.assert_frame_equal(e0, e1, check_exact=False)
+            pd.testing.assert_frame_equal(a0, a1, check_exact=False)
+        except AssertionError:
+            print('The alignment steps do not match the original implementation')
+            return 1
+        if not np.array_equal(b0, b1):
+            print('beam_mapping does not match the original beam mapping')
+            return 1
+
+    legacy = statistics.median(r[0] for r in legacy)
+    current = statistics.median(r[0] for r in current)
+    print('{:<24s} {:>10.3f} {:>10.3f} {:>7.1f}x'.format('cleanup and alignment', legacy, current, legacy / current))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.nitrate
+@file benchmarks/nitrate.py
+@author Christopher Wingard
+@brief Compares the batched nitrate fit against the per-spectrum fit
+
+Synthetic SUNA spectra (10,000 by default, with a dark frame every 10 frames)
+and pure water calibration coefficients are generated (see
+benchmarks.generators) and the temperature and salinity corrected nitrate is
+calculated with proc_nutnr.batch_corrected_nitrate and with a per-spectrum
+loop following the OOI data product specification (the approach used by
+pyseas.data.nit_functions.ts_corrected_nitrate). If pyseas is installed, its
+function is timed and compared as well. Runs entirely offline.
+
+Usage:
+    python -m benchmarks.nitrate [-s 10000] [-n 3]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks import generators
+from cgsn_processing.process.proc_nutnr import batch_corrected_nitrate, TCSS_A, TCSS_B, TCSS_C, TCSS_D
+
+
+def loop_corrected_nitrate(cal_temp, wl, eno3, eswa, di, dark_value, ctd_t, ctd_sp, data_in, frame_type,
+                           wllower=217, wlupper=240):
+    """
+    Per-spectrum temperature and salinity corrected nitrate fit, kept here as
+    the baseline for the benchmark.
+    """
+    no3 = np.ones(data_in.shape[0]) * np.nan
+    for i in range(data_in.shape[0]):
+        if frame_type[i][1] == 'D':
+            continue
+
+        use = np.logical_and(wllower <= wl, wl <= wlupper)
+        WL = wl[use]
+        ENO3 = eno3[use]
+        ESWA = eswa[use]
+        DI = np.array(di[use], dtype='float64')
+        SW = np.array(data_in[i, use], dtype='float64')
+
+        absorbance = np.log10(DI / (SW - dark_value[i]))
+        esw_in_situ = ESWA * ((TCSS_A + TCSS_B * ctd_t[i]) * np.exp((TCSS_C + TCSS_D * ctd_t[i]) * (WL - 210.0)) /
+                              ((TCSS_A + TCSS_B * cal_temp) * np.exp((TCSS_C + TCSS_D * cal_temp) * (WL - 210.0))))
+        acomp = np.array(absorbance - esw_in_situ * ctd_sp[i], ndmin=2).T
+        M = np.array([ENO3, np.ones(ENO3.shape[0]), WL], ndmin=2).T
+        no3[i] = np.dot(np.linalg.pinv(M), acomp)[0, 0]
+
+    return no3
+
+
+def build(size, seed=0):
+    """
+    Create the inputs for the nitrate fit from the synthetic parsed data and calibration coefficients.
+    """
+    data = generators.nutnr(size, seed=seed)
+    cal = generators.nutnr_coeffs(seed=seed)
+    rng = np.random.default_rng(seed)
+    return (cal['cal_temp'], np.array(cal['wl']), np.array(cal['eno3']), np.array(cal['eswa']), np.array(cal['di']),
+            np.array(data['dark_value'], dtype=float), rng.normal(12.0, 1.0, size), rng.normal(33.5, 0.2, size),
+            np.array(data['channel_measurements']), np.array(data['measurement_type']),
+            cal['wllower'], cal['wlupper'])
+
+
+def timeit(func, args, repeats):
+    """
+    Return the median time of repeated calls and the result of the last call.
+    """
+    elapsed = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed.append(time.perf_counter() - start)
+
+    return statistics.median(elapsed), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the batched nitrate fit')
+    parser.add_argument('-s', '--spectra', dest='spectra', type=int, default=10000, help='Number of spectra')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=3, help='Number of timed runs')
+    args = parser.parse_args(argv)
+
+    inputs = build(args.spectra)
+    methods = [('per-spectrum loop', loop_corrected_nitrate), ('batched', batch_corrected_nitrate)]
+    try:
+        from pyseas.data.nit_functions import ts_corrected_nitrate
+        methods.insert(0, ('pyseas', ts_corrected_nitrate))
+    except ImportError:
+        print('pyseas is not installed, comparing against the per-spectrum loop only')
+
+    results = [(name,) + timeit(func, inputs, args.repeats) for name, func in methods]
+    _, reference, expected = results[0]
+    print('{:,d} spectra, median of {:d} runs'.format(args.spectra, args.repeats))
+    print('{:<20s} {:>10s} {:>8s} {:>14s}'.format('method', 'seconds', 'speedup', 'max abs diff'))
+    for name, seconds, result in results:
+        if not np.array_equal(np.isnan(result), np.isnan(expected)):
+            print('{}: the NaN values do not match {}'.format(name, results[0][0]))
+            return 1
+        diff = np.nanmax(np.abs(result - expected))
+        print('{:<20s} {:>10.4f} {:>7.1f}x {:>14.3g}'.format(name, seconds, reference / seconds, diff))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.phsen
+@file benchmarks/phsen.py
+@author Christopher Wingard
+@brief Benchmarks the PHSEN processing of a year-long recovered instrument file
+
+Generates a year of hourly SAMI-pH (PHSEN) records (see benchmarks.generators),
+the size of a file recovered from the instrument at the end of a deployment,
+and times the steps reworked to operate on all of the records at once: the
+conversion of the record times from the SAMI epoch, and the split of the
+reference (blank) and light measurement arrays into the named variables. The
+original record-by-record and concatenation based versions are kept here as
+the baselines, and the results are checked against them. The full processor
+is then timed on the same file (requires pyseas). Runs entirely offline.
+
+Usage:
+    python -m benchmarks.phsen [-r 8760] [-n 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks import generators, suite
+from cgsn_processing.process.common import sami_epoch
+
+
+def legacy_sensor_time(record_time):
+    """
+    The original record-by-record conversion of the SAMI record times.
+    """
+    rct = np.asarray(record_time).astype(np.uint32) * 1.0
+    mac = datetime.strptime("01-01-1904", "%m-%d-%Y")
+    ept = datetime.strptime("01-01-1970", "%m-%d-%Y")
+    sensor_time = []
+    for i in range(len(rct)):
+        rec = mac + timedelta(seconds=rct[i])
+        sensor_time.append((rec - ept).total_seconds())
+
+    return np.array(sensor_time)
+
+
+def legacy_arrays(refnc, light):
+    """
+    The original split of the blank and light measurements, padding the blanks by concatenation.
+    """
+    nrec = refnc.shape[0]
+    refnc = np.reshape(np.atleast_3d(refnc), (nrec, 4, 4))
+    fill = np.ones((nrec, 19)) * -9999999
+    arrays = {}
+    for i, name in enumerate(['blank_refrnc_434', 'blank_signal_434', 'blank_refrnc_578', 'blank_signal_578']):
+        arrays[name] = np.concatenate((refnc[:, :, i], fill), axis=1).astype('int32')
+
+    light = np.reshape(np.atleast_3d(light), (nrec, 23, 4))
+    for i, name in enumerate(['reference_434', 'signal_434', 'reference_578', 'signal_578']):
+        arrays[name] = light[:, :, i].astype('int32')
+
+    return arrays
+
+
+def timeit(func, args, repeats):
+    """
+    Return the median time of repeated calls and the result of the last call.
+    """
+    elapsed = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed.append(time.perf_counter() - start)
+
+    return statistics.median(elapsed), result
+
+
+def report(name, legacy, current):
+    print('{:<28s} {:>10.4f} {:>10.4f} {:>7.1f}x'.format(name, legacy, current, legacy / current))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the PHSEN processing of a year-long file')
+    parser.add_argument('-r', '--records', dest='records', type=int, default=8760,
+                        help='Number of records (default is a year of hourly samples)')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=5, help='Number of timed runs')
+    args = parser.parse_args(argv)
+
+    data = generators.phsen(args.records)
+    record_time = np.array(data['record_time'])
+    refnc = np.array(data['reference_measurements'], dtype='int32')
+    light = np.array(data['light_measurements'], dtype='int32')
+
+    print('{:,d} PHSEN records, median of {:d} runs'.format(args.records, args.repeats))
+    print('{:<28s} {:>10s} {:>10s} {:>8s}'.format('step', 'original', 'current', 'speedup'))
+    legacy, expected = timeit(legacy_sensor_time, (record_time,), args.repeats)
+    current, result = timeit(sami_epoch, (record_time,), args.repeats)
+    if not np.array_equal(expected, result):
+        print('sami_epoch does not match the original conversion')
+        return 1
+    report('sensor time', legacy, current)
+
+    try:
+        from cgsn_processing.process.proc_phsen import phsen_arrays
+    except ImportError as e:
+        print('Skipping the rest of the benchmark, the PHSEN processor could not be loaded ({})'.format(e))
+        return 0
+
+    legacy, expected = timeit(legacy_arrays, (refnc, light), args.repeats)
+    current, result = timeit(phsen_arrays, (refnc, light), args.repeats)
+    if any(not np.array_equal(expected[k], result[k]) for k in expected):
+        print('phsen_arrays does not match the original arrays')
+        return 1
+    report('blank and light arrays', legacy, current)
+
+    # the full processor, from the parsed JSON file to the final data set
+    r = suite.run_case('phsen', args.records, repeats=args.repeats)
+    if r['status'] != 'ok':
+        print('proc_phsen {}: {}'.format(r['status'], r.get('error')))
+        return 1
+    print('proc_phsen: {:.3f} s median, {:.1f} MB peak'.format(r['median_seconds'], r['peak_bytes'] / 2 ** 20))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
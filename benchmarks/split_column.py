@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.split_column
+@file benchmarks/split_column.py
+@author Christopher Wingard
+@brief Compares the stacked split_column against the earlier per-column list comprehension
+
+A data frame with a column of nested lists (100,000 rows of 10 values by
+default) is split into individual columns with the original implementation,
+which iterated over the whole column once for every new column, and with
+common.split_column, which stacks the column once into a 2D array. The option
+to return the 2D array directly is timed as well. Runs entirely offline.
+
+Usage:
+    python -m benchmarks.split_column [-r 100000] [-c 10] [-n 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from cgsn_processing.process.common import split_column
+
+
+def legacy_split_column(df, colname, n=None, singular=None, names=None):
+    """
+    The original split_column, kept here as the baseline for the benchmark.
+    """
+    if names is None:
+        if singular is None:
+            singular = colname
+        names = ['{}{}'.format(singular, i+1) for i in range(n)]
+    else:
+        n = len(names)
+    for i, name in zip(range(n), names):
+        df[name] = [v[i] for v in df[colname]]
+    df.pop(colname)
+    return df
+
+
+def build(rows, cols, seed=0):
+    """
+    Create a data frame with a column of nested lists, as loaded from the parsed JSON files.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'time': np.arange(rows, dtype=float),
+        'values': rng.random((rows, cols)).round(4).tolist(),
+    })
+
+
+def timeit(func, rows, cols, repeats):
+    """
+    Return the median time of repeated calls, building a new data frame (untimed) for every call.
+    """
+    elapsed = []
+    for _ in range(repeats):
+        df = build(rows, cols)
+        start = time.perf_counter()
+        func(df)
+        elapsed.append(time.perf_counter() - start)
+
+    return statistics.median(elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark splitting a column of nested lists')
+    parser.add_argument('-r', '--rows', dest='rows', type=int, default=100000, help='Number of rows')
+    parser.add_argument('-c', '--columns', dest='cols', type=int, default=10, help='Number of values per row')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=5, help='Number of timed runs')
+    args = parser.parse_args(argv)
+
+    # make sure both versions give the same answer before timing them
+    expected = legacy_split_column(build(1000, args.cols), 'values', args.cols)
+    result = split_column(build(1000, args.cols), 'values', args.cols)
+    if not expected.equals(result):
+        print('split_column does not match the original implementation')
+        return 1
+
+    legacy = timeit(lambda df: legacy_split_column(df, 'values', args.cols), args.rows, args.cols, args.repeats)
+    stacked = timeit(lambda df: split_column(df, 'values', args.cols), args.rows, args.cols, args.repeats)
+    block = timeit(lambda df: split_column(df, 'values', args.cols, as_array=True), args.rows, args.cols, args.repeats)
+
+    print('{:,d} rows x {:d} values, median of {:d} runs'.format(args.rows, args.cols, args.repeats))
+    print('{:<24s} {:>10s} {:>8s}'.format('method', 'seconds', 'speedup'))
+    for name, seconds in [('list comprehension', legacy), ('split_column', stacked),
+                          ('split_column as_array', block)]:
+        print('{:<24s} {:>10.4f} {:>7.1f}x'.format(name, seconds, legacy / seconds))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
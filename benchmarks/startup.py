@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.startup
+@file benchmarks/startup.py
+@author Christopher Wingard
+@brief Measures the import and early-exit start-up cost of the processor entry points
+
+Each processor is imported in a fresh interpreter using `python -X importtime`
+to report the total import time and the most expensive packages pulled in. The
+processor is then run from the command line against an empty JSON file, the
+path taken by the cron jobs for the many hours with no data, to time the full
+early exit. Runs entirely offline.
+
+Usage:
+    python -m benchmarks.startup [-m proc_superv proc_ctdbp ...] [-n 5] [-b 1.0]
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import cgsn_processing.process as process
+
+# processors without the standard command line interface from common.inputs
+SKIP = ['proc_vemco']
+
+# processors that require the switch option to select the instrument or file type
+SWITCHES = {
+    'proc_adcp': 'PD0',
+    'proc_ctdbp': 'solo',
+    'proc_ifcb': 'hdr',
+    'proc_pwrsys': 'psc',
+    'proc_sbd': 'cpm',
+    'proc_superv': 'cpm',
+}
+
+# regex for the lines written by -X importtime: self time, cumulative time and the (indented) module name
+IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def processors():
+    """
+    List the processor modules in the cgsn_processing.process package.
+
+    :return: sorted list of the processor module names
+    """
+    path = os.path.dirname(process.__file__)
+    names = [os.path.basename(f)[:-3] for f in glob.glob(os.path.join(path, 'proc_*.py'))]
+    return sorted(n for n in names if n not in SKIP)
+
+
+def import_time(module):
+    """
+    Import a processor module in a new interpreter with -X importtime and
+    parse the timing report written to stderr.
+
+    :param module: name of the processor module
+    :return: total import time in seconds (or None if the import failed), a
+        list of (seconds, package) with the import time attributed to each
+        top level package sorted from most to least expensive, and the error
+        message if the import failed
+    """
+    cmd = [sys.executable, '-X', 'importtime', '-c', 'import cgsn_processing.process.{}'.format(module)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, [], proc.stderr.strip().splitlines()[-1]
+
+    total = 0.0
+    packages = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+
+        # only the top level imports (a single space of indentation) sum to the total
+        if len(match.group(3)) == 1:
+            total += int(match.group(2)) * 1e-6
+
+        # attribute the self time of every module to its top level package (e.g. pandas.core.api -> pandas)
+        package = match.group(4).split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(match.group(1)) * 1e-6
+
+    return total, sorted(((t, p) for p, t in packages.items()), reverse=True), None
+
+
+def early_exit(module, infile, outfile, repeats):
+    """
+    Time the command line entry point of a processor run against an empty
+    JSON data file.
+
+    :param module: name of the processor module
+    :param infile: path to the empty JSON data file
+    :param outfile: path for the (never created) NetCDF file
+    :param repeats: number of times to run the processor
+    :return: median wall clock time in seconds, or None if the processor
+        failed
+    """
+    cmd = [sys.executable, '-m', 'cgsn_processing.process.{}'.format(module), '-i', infile, '-o', outfile,
+           '-p', 'bench', '-d', 'D00001', '-lt', '0.0', '-lg', '0.0', '-dp', '0.0']
+    if module in SWITCHES:
+        cmd += ['-s', SWITCHES[module]]
+
+    elapsed = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        elapsed.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            return None
+
+    return statistics.median(elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the processor start-up times')
+    parser.add_argument('-m', '--modules', dest='modules', nargs='+', default=None,
+                        help='Processor modules to benchmark (default is all of them)')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=3,
+                        help='Number of early-exit runs per processor, the median is reported')
+    parser.add_argument('-t', '--top', dest='top', type=int, default=3,
+                        help='Number of the most expensive packages to list')
+    parser.add_argument('-b', '--budget', dest='budget', type=float, default=1.0,
+                        help='Early-exit budget in seconds, processors over budget are flagged')
+    args = parser.parse_args(argv)
+
+    modules = args.modules or processors()
+    over = []
+    with tempfile.TemporaryDirectory() as tmp:
+        infile = os.path.join(tmp, 'empty.json')
+        with open(infile, 'w') as f:
+            f.write('[]')
+        outfile = os.path.join(tmp, 'empty.nc')
+
+        print('{:<22s} {:>10s} {:>10s}  {}'.format('processor', 'import (s)', 'exit (s)', 'heaviest packages (s)'))
+        for module in modules:
+            total, top, error = import_time(module)
+            if total is None:
+                print('{:<22s} {:>10s} {:>10s}  {}'.format(module, 'failed', '-', error))
+                continue
+
+            exit_time = early_exit(module, infile, outfile, args.repeats)
+            heaviest = ', '.join('{} {:.3f}'.format(name, t) for t, name in top[:args.top])
+            flag = ''
+            if exit_time is None:
+                exit_str = 'failed'
+            else:
+                exit_str = '{:.3f}'.format(exit_time)
+                if exit_time > args.budget:
+                    flag = ' *'
+                    over.append(module)
+
+            print('{:<22s} {:>10.3f} {:>10s}  {}{}'.format(module, total, exit_str, heaviest, flag))
+
+    if over:
+        print('\n{} processor(s) exceeded the {:.2f} s early-exit budget: {}'.format(len(over), args.budget,
+                                                                                   ', '.join(over)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
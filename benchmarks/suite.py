@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package benchmarks.suite
+@file benchmarks/suite.py
+@author Christopher Wingard
+@brief Times the processors, and records their peak memory use, against the size of the input data
+
+Each case writes a synthetic parsed JSON file (see benchmarks.generators) and
+the serialized calibration coefficients the processor expects into a
+temporary deployment directory, and then calls the processing function
+directly. The wall clock time is the median of several runs and the peak
+memory is the largest amount allocated (tracked by tracemalloc, which includes
+the numpy arrays) during one additional run. Processors whose dependencies are
+not installed are reported as skipped. Runs entirely offline.
+
+Usage:
+    python -m benchmarks.suite [-c optaa adcp_pd0 ...] [-s 100 1000] [-n 3] [-o results.json] [--compare old.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from collections import namedtuple
+
+from benchmarks import generators
+
+# a benchmark case: the processor module and function, the generator (and its keyword arguments) used to create the
+# input data, the keyword arguments passed to the processor, the calibration coefficient files written next to the
+# data file, the default input sizes, and the names of processor keyword arguments that are file names in the data
+# directory
+Case = namedtuple('Case', ['module', 'function', 'generator', 'gen_kwargs', 'kwargs', 'fixtures', 'sizes', 'paths'])
+
+CASES = {
+    'ctdbp': Case('proc_ctdbp', 'proc_ctdbp', generators.ctdbp, {'ctd_type': 'solo'}, {'ctd_type': 'solo'},
+                  {}, (1000, 10000, 100000), ()),
+    'ctdbp_flort': Case('proc_ctdbp', 'proc_ctdbp', generators.ctdbp, {'ctd_type': 'flort'}, {'ctd_type': 'flort'},
+                        {'flort.cal_coeffs.json': generators.flort_coeffs}, (1000, 10000, 100000), ()),
+    'optaa': Case('proc_optaa', 'proc_optaa', generators.optaa, {}, {},
+                  {'optaa.cal_coeffs.json': generators.optaa_coeffs}, (960, 3840, 15360), ()),
+    'adcp_pd0': Case('proc_adcp', 'proc_adcp', generators.adcp_pd0, {}, {'adcp_type': 'PD0'},
+                     {}, (96, 960, 9600), ()),
+    'adcp_pd8': Case('proc_adcp', 'proc_adcp', generators.adcp_pd8, {},
+                     {'adcp_type': 'PD8', 'bin_size': 4.0, 'blanking_distance': 6.32}, {}, (96, 960, 9600), ()),
+    'phsen': Case('proc_phsen', 'proc_phsen', generators.phsen, {}, {},
+                  {'phsen.calibration_coeffs.json': generators.phsen_coeffs}, (24, 240, 2400), ()),
+    'pco2w': Case('proc_pco2w', 'proc_pco2w', generators.pco2w, {}, {},
+                  {'pco2w.calibration_coeffs.json': generators.pco2w_coeffs}, (24, 240, 2400), ()),
+    'nutnr': Case('proc_nutnr', 'proc_nutnr', generators.nutnr, {}, {},
+                  {'nutnr.cal_coeffs.json': generators.nutnr_coeffs}, (100, 1000, 10000), ()),
+    'zplsc': Case('proc_zplsc', 'proc_zplsc', generators.zplsc, {}, {'bin_size': 1.0},
+                  {}, (96, 960, 9600), ()),
+    'vel3d': Case('proc_vel3d', 'proc_vel3d', generators.vel3d, {}, {},
+                  {}, (960, 9600, 96000), ()),
+    'mmp_coastal': Case('proc_mmp_coastal', 'proc_mmp_coastal', generators.mmp_coastal, {}, {},
+                        {'flort.cal_coeffs.json': generators.flort_coeffs,
+                         'parad.cal_coeffs.json': generators.parad_coeffs,
+                         'dofst.cal_coeffs.json': generators.dofst_coeffs}, (100, 1000, 10000), ()),
+    'prawler': Case('proc_mmp_prawler', 'proc_mmp_prawler', generators.prawler, {},
+                    {'coeff_file': 'flort.cal_coeffs.json', 'serial': '18'},
+                    {'flort.cal_coeffs.json': generators.flort_coeffs}, (1000, 10000, 100000), ('coeff_file',)),
+    'swnd': Case('proc_swnd', 'proc_swnd', generators.swnd, {}, {},
+                 {}, (1728, 17280, 172800), ()),
+    'superv': Case('proc_superv', 'proc_superv', generators.superv, {'superv_type': 'cpm'}, {'superv_type': 'cpm'},
+                   {}, (1440, 14400, 144000), ()),
+    'psc': Case('proc_pwrsys', 'proc_pwrsys', generators.psc, {}, {'pwrsys_type': 'psc'},
+                {}, (1440, 14400, 144000), ()),
+}
+
+# deployment settings passed to every processor
+PLATFORM = 'bench'
+DEPLOYMENT = 'D00001'
+LAT = 44.6393
+LON = -124.304
+DEPTH = 25.0
+
+
+def load_processor(case):
+    """
+    Import the processing function for a case.
+
+    :param case: benchmark case
+    :return: the processing function, or None and the reason it could not be
+        imported
+    """
+    try:
+        module = importlib.import_module('cgsn_processing.process.{}'.format(case.module))
+    except ImportError as e:
+        return None, str(e)
+
+    return getattr(module, case.function), None
+
+
+def setup_data(case, name, size, path):
+    """
+    Write the synthetic data file and the calibration coefficients for a case
+    into a clean deployment directory.
+
+    :param case: benchmark case
+    :param name: name of the case, used for the instrument directory and file
+    :param size: size of the input data (number of records)
+    :param path: base directory for the data
+    :return: the input file name and the processor keyword arguments
+    """
+    data_dir = os.path.join(path, PLATFORM, DEPLOYMENT, name)
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+
+    infile = os.path.join(data_dir, '20240115.{}.json'.format(name))
+    with open(infile, 'w') as f:
+        json.dump(case.generator(size, **case.gen_kwargs), f)
+
+    for fname, coeffs in case.fixtures.items():
+        with open(os.path.join(data_dir, fname), 'w') as f:
+            json.dump(coeffs(), f)
+
+    kwargs = dict(case.kwargs)
+    for key in case.paths:
+        kwargs[key] = os.path.join(data_dir, kwargs[key])
+
+    return infile, kwargs
+
+
+def run_case(name, size, repeats=3, path=None):
+    """
+    Benchmark a single case at a single input size.
+
+    :param name: name of the case (see CASES)
+    :param size: size of the input data (number of records)
+    :param repeats: number of timed runs, the median is reported
+    :param path: base directory for the data (defaults to a temporary directory)
+    :return: dictionary with the results
+    """
+    case = CASES[name]
+    result = {'case': name, 'processor': case.function, 'size': size}
+    func, error = load_processor(case)
+    if func is None:
+        result['status'] = 'skipped'
+        result['error'] = error
+        return result
+
+    tmp = None
+    if path is None:
+        tmp = tempfile.mkdtemp(prefix='cgsn_bench_')
+        path = tmp
+
+    try:
+        elapsed = []
+        for _ in range(repeats):
+            # rewrite the inputs every time, some processors update files in the data directory (e.g. PCO2W blanks)
+            infile, kwargs = setup_data(case, name, size, path)
+            result['input_bytes'] = os.path.getsize(infile)
+            start = time.perf_counter()
+            func(infile, PLATFORM, DEPLOYMENT, LAT, LON, DEPTH, **kwargs)
+            elapsed.append(time.perf_counter() - start)
+
+        # one more run to measure the peak memory (tracemalloc adds too much overhead to time the same run)
+        infile, kwargs = setup_data(case, name, size, path)
+        tracemalloc.start()
+        func(infile, PLATFORM, DEPLOYMENT, LAT, LON, DEPTH, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        result['status'] = 'error'
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        return result
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    result.update({
+        'status': 'ok',
+        'median_seconds': statistics.median(elapsed),
+        'min_seconds': min(elapsed),
+        'peak_bytes': peak,
+        'records_per_second': size / statistics.median(elapsed),
+    })
+    return result
+
+
+def report(results, baseline=None):
+    """
+    Print a table of the results, with the ratio of the median time to that
+    of a baseline set of results if provided.
+    """
+    lookup = {}
+    if baseline:
+        lookup = {(r['case'], r['size']): r for r in baseline if r.get('status') == 'ok'}
+
+    header = '{:<12s} {:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>12s}'.format(
+        'case', 'size', 'input MB', 'median s', 'min s', 'peak MB', 'records/s')
+    if lookup:
+        header += ' {:>9s}'.format('vs base')
+    print(header)
+
+    for r in results:
+        if r['status'] != 'ok':
+            print('{:<12s} {:>8d} {}: {}'.format(r['case'], r['size'], r['status'], r['error']))
+            continue
+
+        line = '{:<12s} {:>8d} {:>10.2f} {:>10.4f} {:>10.4f} {:>10.1f} {:>12.0f}'.format(
+            r['case'], r['size'], r['input_bytes'] / 2 ** 20, r['median_seconds'], r['min_seconds'],
+            r['peak_bytes'] / 2 ** 20, r['records_per_second'])
+        base = lookup.get((r['case'], r['size']))
+        if base:
+            line += ' {:>8.2f}x'.format(r['median_seconds'] / base['median_seconds'])
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the processors against the size of the input data')
+    parser.add_argument('-c', '--cases', dest='cases', nargs='+', choices=sorted(CASES), default=None,
+                        help='Cases to run (default is all of them)')
+    parser.add_argument('-s', '--sizes', dest='sizes', nargs='+', type=int, default=None,
+                        help='Input sizes (number of records) to use instead of the defaults for each case')
+    parser.add_argument('-n', '--repeats', dest='repeats', type=int, default=3,
+                        help='Number of timed runs for each case and size, the median is reported')
+    parser.add_argument('-o', '--outfile', dest='outfile', type=str, default=None,
+                        help='Save the results to a JSON file')
+    parser.add_argument('--compare', dest='compare', type=str, default=None,
+                        help='JSON file with previous results to compare against')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    with warnings.catch_warnings():
+        # the processors are chatty about the synthetic data, keep the report readable
+        warnings.simplefilter('ignore')
+        for name in args.cases or sorted(CASES):
+            for size in args.sizes or CASES[name].sizes:
+                results.append(run_case(name, size, args.repeats))
+                if results[-1]['status'] == 'skipped':
+                    break   # no point in trying the other sizes
+
+    report(results, baseline)
+    if args.outfile:
+        with open(args.outfile, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
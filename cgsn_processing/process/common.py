@@ -1,19 +1,42 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import argparse
+import atexit
 import datetime
+import functools
 import glob
 import json
+import netCDF4
 import numpy as np
 import os
 import pandas as pd
 import re
+import shutil
 import sys
+import tempfile
+import time
 import xarray as xr
 
 from collections.abc import Mapping
+from contextlib import contextmanager
 from dateutil import rrule
 from pathlib import Path
+from types import MappingProxyType
+
+try:
+    import resource  # used to track the peak memory use, not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    import fcntl  # used to lock the deployment and monthly files while they are updated, not available on Windows
+except ImportError:
+    fcntl = None
+
+try:
+    import bottleneck  # used by xarray for the NaN-aware averages when installed, burst_average follows suit
+except ImportError:
+    bottleneck = None
 
 # Create a Global dictionary with Basic Information about the moorings
 BUOYS = {
@@ -39,13 +62,38 @@ ENCODING = {
 FILL_INT = -9999999
 FILL_NAN = np.nan
 
+# Seconds between the SAMI (1904-01-01) and Unix (1970-01-01) epochs
+SAMI_EPOCH = 2082844800.0
+
+# Cache of the compiled attribute mappings (see merge_attrs)
+_MERGED_ATTRS = {}
+
+# Co-located CTD variables interpolated onto the instrument time stamps, and the names used for them in the
+# instrument datasets (see interp_colocated)
+CTD_COLUMNS = {
+    'pressure': 'ctd_pressure',
+    'temperature': 'ctd_temperature',
+    'salinity': 'ctd_salinity'
+}
+
+# Target number of values per chunk for Zarr stores (~512 KiB of float32 values)
+ZARR_CHUNK_SIZE = 2 ** 17
+
+# Environment variable used to enable the per-stage profiling of the processors (see StageProfiler). Set it to the
+# name of the JSON-lines file the records are appended to, or to 1 to use the default file name.
+PROFILE_ENV = 'CGSN_PROFILE'
+PROFILE_FILE = 'cgsn_profile.jsonl'
+
+# Environment variable used to run the processors under cProfile (see start_cprofile), set it to the directory the
+# pstats files are written to
+PROFILE_OUT_ENV = 'CGSN_PROFILE_OUT'
+
 
 class NumpyEncoder(json.JSONEncoder):
     """
     Special json encoder for numpy types, where we have nested numpy arrays in
     a dictionary. Allows saving the data to a json file. Used by the
-    Coefficients and Blanks class to save instrument calibration coefficients
-    to disk
+    Coefficients class to save instrument calibration coefficients to disk
 
     From our trusty friends at StackOverflow: https://stackoverflow.com/a/49677241
     """
@@ -53,13 +101,188 @@ class NumpyEncoder(json.JSONEncoder):
         if isinstance(obj, (np.int_, np.intc, np.intp, np.int8, np.int16, np.int32,
                             np.int64, np.uint8, np.uint16, np.uint32, np.uint64)):
             return int(obj)
-        elif isinstance(obj, (np.float_, np.float16, np.float32, np.float64)):
+        elif isinstance(obj, (np.float16, np.float32, np.float64)):
             return float(obj)
         elif isinstance(obj,(np.ndarray,)):
             return obj.tolist()
         return json.JSONEncoder.default(self, obj)
 
 
+def max_rss():
+    """
+    Peak resident set size (high-water mark) of the current process in bytes,
+    or None if it cannot be determined on this platform.
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss      # reported in bytes on macOS
+    return rss * 1024   # and in kilobytes everywhere else
+
+
+class StageProfiler(object):
+    """
+    Records the wall time, CPU time and peak memory use of the named
+    processing stages (loading the JSON data, finding the calibration
+    coefficients, loading the co-located CTD data, updating the dataset
+    attributes and writing the results) of a processor. Time not spent in one
+    of the named stages is reported as the "processing" stage. Nothing is
+    recorded unless profiling has been started, which inputs() does when
+    either the --profile option or the CGSN_PROFILE environment variable is
+    set. When the processor exits, a single record for the input file is
+    appended to a JSON-lines file (see summarize_profiles for working with the
+    results).
+    """
+    def __init__(self):
+        self.outfile = None
+        self.record = None
+        self._depth = 0
+        self._wall = None
+        self._cpu = None
+
+    @property
+    def enabled(self):
+        return self.record is not None
+
+    def start(self, outfile, processor, infile):
+        """
+        Start profiling a processor run.
+
+        :param outfile: JSON-lines file the record is appended to
+        :param processor: name of the processor
+        :param infile: input file being processed
+        """
+        self.outfile = outfile
+        self.record = {
+            'processor': processor,
+            'infile': infile,
+            'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'stages': {}
+        }
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        atexit.register(self.finish)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager recording the time and memory used by a named stage.
+        Stages called from within another stage are counted as part of the
+        outer stage.
+
+        :param name: name of the stage
+        """
+        if not self.enabled or self._depth:
+            yield
+            return
+
+        self._depth += 1
+        rss = max_rss()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            stats = self.record['stages'].setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0,
+                                                            'peak_rss': None, 'rss_growth': None})
+            stats['calls'] += 1
+            stats['wall'] += time.perf_counter() - wall
+            stats['cpu'] += time.process_time() - cpu
+            if rss is not None:
+                peak = max_rss()
+                stats['peak_rss'] = peak
+                stats['rss_growth'] = (stats['rss_growth'] or 0) + peak - rss
+
+    def finish(self):
+        """
+        Stop profiling and append the record for this run to the JSON-lines
+        file.
+        """
+        if not self.enabled:
+            return
+
+        record, self.record = self.record, None
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        stages = record['stages']
+        stages['processing'] = {
+            'calls': 1,
+            'wall': wall - sum(s['wall'] for s in stages.values()),
+            'cpu': cpu - sum(s['cpu'] for s in stages.values()),
+            'peak_rss': None,
+            'rss_growth': None
+        }
+        record.update({'wall': wall, 'cpu': cpu, 'peak_rss': max_rss()})
+
+        with open(self.outfile, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+# Profiler shared by the processors and the common functions they use
+PROFILER = StageProfiler()
+
+
+def stage(name):
+    """
+    Context manager for recording the time and memory use of a named stage in
+    a processor, e.g. `with stage('scatter_correction'):`. Does nothing
+    unless profiling is enabled.
+
+    :param name: name of the stage
+    """
+    return PROFILER.stage(name)
+
+
+def timed(name):
+    """
+    Decorator recording every call of a function as a named stage (see stage).
+
+    :param name: name of the stage
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILER.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_cprofile(path, processor, infile):
+    """
+    Run the rest of the processor under cProfile, writing the statistics to a
+    pstats file named for the processor and the input file (e.g.
+    proc_optaa.20240115.optaa.prof) in the directory set by path when the
+    processor exits. The pstats files can be explored with the standard
+    library pstats module, or converted to call graphs and flame graphs with
+    tools such as snakeviz, gprof2dot or flameprof. Use merge_profiles to
+    combine the results from many files.
+
+    :param path: directory for the pstats files, created if needed
+    :param processor: name of the processor
+    :param infile: input file being processed
+    :return: name of the pstats file that will be written
+    """
+    import cProfile
+
+    os.makedirs(path, exist_ok=True)
+    name = os.path.splitext(os.path.basename(infile))[0]
+    outfile = os.path.join(path, '{}.{}.prof'.format(processor, name))
+
+    profiler = cProfile.Profile()
+
+    def finish():
+        profiler.disable()
+        profiler.dump_stats(outfile)
+
+    atexit.register(finish)
+    profiler.enable()
+    return outfile
+
+
 class Coefficients(object):
     """
     A Coefficients class with two methods to load/save the serialized calibration coefficients for an instrument.
@@ -73,6 +296,7 @@ class Coefficients(object):
         self.coeff_file = coeff_file
         self.coeffs = {}
 
+    @timed('calibration')
     def load_coeffs(self):
         """
         Obtain the calibration data for this instrument from a JSON data file.
@@ -122,37 +346,103 @@ def hex2int(hstr):
     return int(hstr, 16)
 
 
-def join_df(df1, df2):
+def join_df(df1, df2, how='outer'):
     """
-    Join two data frames, padding missing values with the appropriate fill
-    value. Recasting data types in the joined data frames back to their
-    original settings from prior to the join.
+    Join two data frames on their time indices, padding missing values with
+    the appropriate fill value and keeping the data types from prior to the
+    join. Integers are padded with FILL_INT, strings are padded with 'unknown'
+    (and converted to byte strings) and floats are padded with NaNs.
+
+    Rather than joining with pandas (which converts the integers and strings
+    to floats to hold the NaNs) and then filling and converting the columns
+    back, the time indices are aligned with searchsorted and each column is
+    written directly into an array of its original data type.
+
+    With unique times, the outer join returns the same rows as
+    df1.join(df2, how='outer') (or pandas.concat along the columns), and the
+    asof join the same rows as pandas.merge_asof. Duplicate times are handled
+    differently. Pandas returns every pairing of the primary and secondary
+    records sharing a time. Here each primary record is kept once, and a
+    secondary record fills at most one row. It is merged into the first
+    primary record with the same time, or inserted as a row of its own if
+    there is none. If several secondary records match the same primary
+    record, the last of them is used.
 
     :param df1: primary dataframe to merge the secondary dataframe into
     :param df2: secondary dataframe
+    :param how: either outer (default), keeping the times from both data
+        frames, or asof, keeping the times of the primary data frame and using
+        the most recent secondary record at or before each of those times
     :return joined: combined primary and secondary dataframes
     """
-    # capture the data types in the original data frames
-    orig = df1.dtypes.to_dict()
-    orig.update(df2.dtypes.to_dict())
-
-    # join the data frames
-    joined = df1.join(df2, how='outer')
-
-    # data types are converted to a float in the above operation, need to convert integers and strings back to their
-    # original data types and reset the fill values to appropriate values instead of NaN.
-    for col in joined:
-        if orig[col] == 'int32':
-            joined[col].fillna(-9999999, inplace=True)
-            joined[col] = joined[col].astype(orig[col])
-
-        if orig[col] == 'object':
-            joined[col].fillna('unknown', inplace=True)
-            joined[col] = joined[col].astype('|S')
-
-    return joined
-
+    overlap = df1.columns.intersection(df2.columns)
+    if len(overlap) > 0:
+        raise ValueError('columns overlap between the data frames: {}'.format(list(overlap)))
+
+    # sort the data frames by time, if needed
+    if not df1.index.is_monotonic_increasing:
+        df1 = df1.sort_index(kind='stable')
+    if not df2.index.is_monotonic_increasing:
+        df2 = df2.sort_index(kind='stable')
+
+    t1 = df1.index.values
+    t2 = df2.index.values
+    rows1 = np.arange(t1.size)
+    if how == 'outer':
+        # secondary records with a time matching a primary record are merged into that row, the rest are inserted
+        pos = np.searchsorted(t1, t2)
+        match = pos < t1.size
+        match[match] = t1[pos[match]] == t2[match]
+        times = np.concatenate([t1, t2[~match]])
+        order = np.argsort(times, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(order.size)
+        times = times[order]
+        rows1 = rank[:t1.size]
+        rows2 = np.empty(t2.size, dtype=rows1.dtype)
+        rows2[match] = rows1[pos[match]]
+        rows2[~match] = rank[t1.size:]
+        src2 = np.arange(t2.size)
+    elif how == 'asof':
+        # use the most recent secondary record at or before each of the primary times
+        times = t1
+        prior = np.searchsorted(t2, t1, side='right') - 1
+        rows2 = np.flatnonzero(prior >= 0)
+        src2 = prior[rows2]
+    else:
+        raise ValueError('unknown join type {}, must be outer or asof'.format(how))
 
+    # preallocate the combined columns using the original data types, filled where there is no data
+    n = times.size
+    columns = {}
+    for df, rows, src in [(df1, rows1, None), (df2, rows2, src2)]:
+        for col in df.columns:
+            values = df[col].values
+            if src is not None:
+                values = values[src]
+            dtype = values.dtype
+            if np.issubdtype(dtype, np.integer) and np.iinfo(dtype).min <= FILL_INT:
+                out = np.full(n, FILL_INT, dtype=dtype)
+            elif np.issubdtype(dtype, np.floating):
+                out = np.full(n, np.nan, dtype=dtype)
+            elif np.issubdtype(dtype, np.datetime64) or np.issubdtype(dtype, np.timedelta64):
+                out = np.full(n, 'NaT', dtype=dtype)
+            elif dtype == object:
+                out = np.full(n, 'unknown', dtype=object)
+            else:
+                # any other data types (e.g. booleans or short integers) cannot hold a fill value
+                out = np.full(n, np.nan, dtype=object if dtype == bool else np.float64)
+            out[rows] = values
+            if dtype == object:
+                out = out.astype('|S')
+            columns[col] = out
+
+    index = pd.DatetimeIndex(times, name=df1.index.name) if times.dtype.kind == 'M' else \
+        pd.Index(times, name=df1.index.name)
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+@timed('load_json')
 def json2obj(infile):
     """
     Read in a JSON formatted data file and return the results as a json formatted data object.
@@ -173,35 +463,68 @@ def json2obj(infile):
         return data
 
 
-def json2df(infile):
+@timed('load_json')
+def json2df(infile, schema=None):
     """
     Read in a JSON formatted data file and return the results as a panda dataframe.
+
+    A schema can be used to set the data types of the parsed data as the data
+    frame is created, rather than converting the columns afterwards. The
+    schema is a dictionary with the data types of the scalar columns (under
+    'columns'), and the data types of the 2D arrays (under 'arrays', e.g. the
+    spectra or profiles). The 2D arrays are returned separately as contiguous
+    numpy arrays instead of data frame columns of nested lists. Any columns
+    not in the schema are handled the same as without one. For example:
+
+        SCHEMA = {'columns': {'serial_number': 'str'}, 'arrays': {'raw_channels': 'uint32'}}
+        df, arrays = json2df(infile, SCHEMA)
+
+    :param infile: JSON formatted data file
+    :param schema: optional dictionary with the data types for the columns
+        and 2D arrays in the data file
+    :return df: data frame with the parsed data, and if a schema was used, the
+        dictionary of 2D arrays
     """
     jf = Path(infile)
     if not jf.is_file():
         # if not, return an empty data frame
         print("JSON data file {0} was not found, returning empty data frame".format(infile))
-        return pd.DataFrame()
+        return pd.DataFrame() if schema is None else (pd.DataFrame(), {})
     else:
         # otherwise, read in the data file
         with open(infile) as jf:
-            df = pd.DataFrame(json.load(jf))
+            data = json.load(jf)
+
+        arrays = {}
+        if schema is None:
+            df = pd.DataFrame(data)
+        else:
+            # create the 2D arrays and the typed columns directly from the lists, setting the types of the rest
+            # from their values (as in json_obj2df)
+            for name, dtype in schema.get('arrays', {}).items():
+                if data.get(name):
+                    arrays[name] = np.array(data.pop(name), dtype=dtype)
+            typed = schema.get('columns', {})
+            untyped = _typed_columns({col: values for col, values in data.items() if col not in typed})
+            df = pd.DataFrame({col: np.asarray(values, dtype=typed[col]) if col in typed else untyped[col]
+                               for col, values in data.items()}, copy=False)
 
         # some of the data files are empty, exit early if so.
         if df.empty:
             print("JSON data file {0} was empty, returning empty data frame".format(infile))
-            return df
+            return df if schema is None else (df, {})
 
         # set up time and the index
         df['time'] = pd.to_datetime(df.time, unit='s')
         df.index = df['time']
 
         # convert all long integers (int64) to ones acceptable for further processing
-        for col in df.columns:
-            if df[col].dtype == np.int64:
-                df[col] = df[col].astype(np.int32)
+        if schema is None:
+            for col in df.columns:
+                if df[col].dtype == np.int64:
+                    df[col] = df[col].astype(np.int32)
 
-        return df
+        return df if schema is None else (df, arrays)
 
 
 def json_obj2df(data, sub):
@@ -209,7 +532,7 @@ def json_obj2df(data, sub):
     Take a JSON formatted data object, read it in as a dict, pull out the subarray of interest, and return the results
     as a panda data frame.
     """
-    df = pd.DataFrame(data[sub])
+    df = pd.DataFrame(_typed_columns(data[sub]), copy=False)
     if df.empty:
         # though rare, sub-arrays may be empty
         print("The sub-array {0} was empty, returning empty data frame".format(sub))
@@ -218,19 +541,48 @@ def json_obj2df(data, sub):
     # Depending on the json data, time may or may not be present in the subarray. In those cases, it will be at the
     # root level of the json data.
     if 'time' in df.keys():
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        df.set_index('time', drop=True, inplace=True)
+        time = df.pop('time').values
     else:
-        df['time'] = pd.to_datetime(data['time'], unit='s')
-        df.set_index('time', drop=True, inplace=True)
-
-    for col in df.columns:
-        if df[col].dtype == np.int64:
-            df[col] = df[col].astype(np.int32)
+        time = np.asarray(data['time'])
+    df.index = pd.DatetimeIndex(pd.to_datetime(time, unit='s'), name='time')
 
     return df
 
 
+def _typed_columns(values):
+    """
+    Convert the lists in a parsed (sub-)array to numpy arrays before creating
+    a data frame, setting any long integers (int64) to int32 as we go, which
+    is much faster than letting pandas infer the column types from the lists
+    and then converting the long integer columns one at a time. Lists of
+    lists (e.g. the VEL3D-K beam mapping), and non-numeric or incomplete
+    columns, are left for pandas to handle.
+
+    :param values: dictionary of lists (records are returned unchanged)
+    :return: dictionary of numpy arrays and lists
+    """
+    if not isinstance(values, Mapping):
+        return values
+
+    columns = {}
+    for name, column in values.items():
+        try:
+            array = np.asarray(column)
+        except ValueError:
+            # ragged lists of lists
+            array = None
+
+        if array is None or array.ndim != 1 or array.dtype.kind not in 'biuf':
+            columns[name] = column
+        elif array.dtype == np.int64 and name != 'time':
+            columns[name] = array.astype(np.int32)
+        else:
+            columns[name] = array
+
+    return columns
+
+
+@timed('colocated_ctd')
 def colocated_ctd(infile, ctd_name):
     """
     Using the instrument name and datetime information from the instrument file name, find the co-located CTD data
@@ -274,13 +626,290 @@ def colocated_ctd(infile, ctd_name):
     return ctd
 
 
-def update_dataset(ds, platform, deployment, lat, lon, depth, attrs):
+def cspp_profile_id(infile):
+    """
+    Pull the uCSPP profile ID out of the name of a parsed data file. The
+    digits in the file name are the profile number, which is formatted as a
+    dotted profile ID (e.g. ucspp_11222333_PPB_CTD.json is profile 1.122.2333).
+    All the files recorded by the different sensors during a profile share
+    the same profile number.
+
+    :param infile: parsed uCSPP data file name, with or without the path
+    :return profile_id: the dotted profile ID
+    """
+    digits = re.sub(r'\D+', '', os.path.basename(infile))
+    return "{}.{}.{}".format(digits[0], digits[1:4], digits[4:])
+
+
+def epoch_seconds(times):
+    """
+    Convert an array of times (datetime64 values in a numpy array, pandas
+    series or index, or xarray data array, or times already in seconds) to
+    a float array of seconds since 1970-01-01. Missing times (NaT) are set to
+    NaN.
+
+    :param times: array of times
+    :return: array of epoch times in seconds
+    """
+    values = np.asarray(times)
+    if np.issubdtype(values.dtype, np.datetime64):
+        seconds = values.astype('datetime64[ns]').astype(np.int64) / 10.0 ** 9
+        return np.where(np.isnat(values), np.nan, seconds)
+
+    return values.astype(np.float64)
+
+
+def interp_colocated(target_times, source_df, columns, max_gap='1h', margin='1h'):
+    """
+    Interpolate data from a co-located instrument (usually a CTD or the
+    METBK, see colocated_ctd) onto the time stamps of the instrument being
+    processed. The time axes are converted once, and all the columns are
+    interpolated together in a single pass over the (sorted) source data
+    using the same linear interpolation as np.interp. Target points falling
+    in a gap in the source data longer than max_gap are set to NaN rather
+    than being interpolated across the gap.
+
+    The source data must cover the target time period, give or take the
+    margin, otherwise nothing is returned. Target points just outside the
+    source data (within the margin) are set to the first or last source
+    values.
+
+    :param target_times: times to interpolate onto (datetime64 values or
+        epoch seconds)
+    :param source_df: data frame with the co-located data, including a time
+        column
+    :param columns: list of the source columns to interpolate, or a dictionary
+        mapping the source column names to the names to use in the results
+    :param max_gap: longest gap in the source data to interpolate across, as a
+        pandas time delta string (None to interpolate across all gaps)
+    :param margin: allowed difference between the start and end times of the
+        source and target data, as a pandas time delta string (None to skip
+        the coverage test)
+    :return block: data frame of float64 columns with one row per target
+        time, or None if the source data does not cover the target times
+    """
+    if not isinstance(columns, Mapping):
+        columns = {c: c for c in columns}
+
+    if source_df is None or source_df.empty or not len(target_times):
+        return None
+
+    x = epoch_seconds(target_times)
+    xp = epoch_seconds(source_df['time'])
+    fp = source_df[list(columns)].to_numpy(dtype=np.float64)
+
+    # sort the source data by time, dropping any records without a time stamp
+    keep = ~np.isnan(xp)
+    order = np.argsort(xp[keep], kind='stable')
+    xp = xp[keep][order]
+    fp = fp[keep][order]
+    if not len(xp):
+        return None
+
+    # test to see if the source data covers the time period of interest
+    if margin is not None:
+        td = pd.Timedelta(margin).total_seconds()
+        if xp[0] - td > np.nanmin(x) or xp[-1] + td < np.nanmax(x):
+            return None
+
+    if len(xp) == 1:
+        values = np.repeat(fp, len(x), axis=0)
+    else:
+        # find the source samples bracketing each target time, and interpolate all the columns at once
+        j = np.clip(np.searchsorted(xp, x, side='right') - 1, 0, len(xp) - 2)
+        x0 = xp[j]
+        x1 = xp[j + 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slope = (fp[j + 1] - fp[j]) / (x1 - x0)[:, np.newaxis]
+            values = slope * (x - x0)[:, np.newaxis] + fp[j]
+
+        # exact matches and points outside the source data use the source values (as np.interp does)
+        exact = x == x0
+        values[exact] = fp[j[exact]]
+        values[x <= xp[0]] = fp[0]
+        values[x >= xp[-1]] = fp[-1]
+
+        # mask the points that fall in gaps in the source data
+        if max_gap is not None:
+            gap = (x1 - x0 > pd.Timedelta(max_gap).total_seconds()) & (x > xp[0]) & (x < xp[-1]) & ~exact
+            values[gap] = np.nan
+
+    return pd.DataFrame(values, columns=list(columns.values()))
+
+
+def _group_blocks(values, starts, counts):
+    """
+    Gather the grouped values into blocks holding all the groups of the same
+    size, with the groups along the first axis, so the group statistics can be
+    computed along the second axis in one pass for those groups and all the
+    columns. The blocks together hold just one copy of the values, rather than
+    padding every group out to the size of the largest one.
+
+    :param values: array of values, with the time along the first axis and
+        sorted by group
+    :param starts: index of the first value in each group
+    :param counts: number of values in each group
+    :return: iterator over the group indices and the block of values for each
+        group size
+    """
+    for size in np.unique(counts):
+        idx = np.flatnonzero(counts == size)
+        yield idx, values[starts[idx, np.newaxis] + np.arange(size)]
+
+
+def _group_median(block):
+    """
+    Median (ignoring NaNs) of the values in each group. The groups are sorted
+    (NaNs sort to the end), and the median is picked from the middle of the
+    valid values.
+
+    :param block: array of groups of the same size (see _group_blocks)
+    :return median: array of the group medians
+    """
+    block.sort(axis=1)
+    valid = np.sum(~np.isnan(block), axis=1)
+    lower = np.expand_dims(np.maximum((valid - 1) // 2, 0), 1)
+    upper = np.expand_dims(np.maximum(valid // 2, 0), 1)
+    median = (np.take_along_axis(block, lower, axis=1) + np.take_along_axis(block, upper, axis=1)) / 2
+    return median[:, 0]
+
+
+def _group_mean(block):
+    """
+    Mean (ignoring NaNs) of the values in each group, averaged along the
+    groups the same way xarray would, so the results match to the last bit.
+
+    :param block: array of groups of the same size (see _group_blocks)
+    :return mean: array of the group means
+    """
+    if bottleneck is not None:
+        return bottleneck.nanmean(block, axis=1)
+
+    return np.nansum(block, axis=1) / np.sum(~np.isnan(block), axis=1)
+
+
+def burst_average(ds, period='900s', stat='median', int_vars=None, shift=None, var_stats=None, keep_empty=False):
+    """
+    Average the data in a dataset into regular time bins (e.g. the 15-minute
+    burst medians used for most of the moored instruments). By default the
+    time is shifted by half the period before binning so the bins are centered
+    on the time stamps that label them (a 15-minute bin labeled 12:00 covers
+    11:52:30 to 12:07:30). Only bins with data are returned, unless
+    keep_empty is set.
+
+    The bins are found with searchsorted on the (sorted) time array, and the
+    statistics are computed with numpy for each variable across all bins of
+    the same size at once (including 2D variables such as spectra), ignoring
+    NaNs. As with xarray, the statistics of integer variables are returned as
+    floats (except for first and last), unless the variables are listed in
+    int_vars. Non-numeric variables are dropped unless their statistic is
+    first or last. Variables without a time dimension are kept as is, as are
+    the attributes.
+
+    :param ds: xarray dataset (or data array) with a time dimension
+    :param period: length of the bins as a pandas time delta string
+    :param stat: statistic to use for the bins: median, mean, min, max, first
+        or last
+    :param int_vars: list of variables to explicitly return as 32-bit integers
+    :param shift: time shift applied before binning, as a pandas time delta
+        string (defaults to half of the period)
+    :param var_stats: dictionary of variable names and the statistic to use
+        for those variables instead of stat
+    :param keep_empty: return all the bins between the first and last, filling
+        empty bins with NaNs (or FILL_INT for integers)
+    :return avg: the binned dataset (or data array)
+    """
+    if isinstance(ds, xr.DataArray):
+        avg = burst_average(ds.to_dataset(), period, stat, int_vars, shift, var_stats, keep_empty)
+        return avg[ds.name]
+
+    int_vars = int_vars or []
+    var_stats = var_stats or {}
+    period = pd.Timedelta(period).value
+    shift = period // 2 if shift is None else pd.Timedelta(shift).value
+
+    # make sure the data is in time order, and then find the bins with searchsorted on the shifted times
+    if not ds.indexes['time'].is_monotonic_increasing:
+        ds = ds.isel(time=np.argsort(ds['time'].values, kind='stable'))
+
+    times = ds['time'].values.astype('datetime64[ns]').astype(np.int64) + shift
+    if not len(times):
+        return ds
+
+    labels = np.unique(times // period) * period
+    starts = np.searchsorted(times, labels)
+    counts = np.diff(np.append(starts, len(times)))
+    ngroups = len(starts)
+
+    data_vars = {}
+    for name, var in ds.data_vars.items():
+        if 'time' not in var.dims:
+            data_vars[name] = var
+            continue
+
+        how = var_stats.get(name, stat)
+        numeric = np.issubdtype(var.dtype, np.number) or var.dtype == bool
+        if not numeric and how not in ['first', 'last']:
+            continue    # matches xarray, which drops non-numeric variables from the averages
+
+        # put time on the first axis for the grouping
+        axis = var.dims.index('time')
+        values = np.moveaxis(var.values, axis, 0)
+        if how == 'first':
+            binned = values[starts]
+        elif how == 'last':
+            binned = values[starts + counts - 1]
+        else:
+            work = values if np.issubdtype(values.dtype, np.floating) else values.astype(np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if how in ['median', 'mean']:
+                    reduce = _group_median if how == 'median' else _group_mean
+                    binned = np.empty((ngroups,) + work.shape[1:], dtype=work.dtype)
+                    for idx, block in _group_blocks(work, starts, counts):
+                        binned[idx] = reduce(block)
+                elif how == 'min':
+                    binned = np.fmin.reduceat(work, starts, axis=0)
+                elif how == 'max':
+                    binned = np.fmax.reduceat(work, starts, axis=0)
+                else:
+                    raise ValueError('Unknown burst averaging statistic: {}'.format(how))
+
+            # return the requested variables as 32-bit integers
+            if name in int_vars:
+                binned = binned.astype(np.intc)
+
+        data_vars[name] = (var.dims, np.moveaxis(binned, 0, axis), var.attrs)
+
+    coords = {k: v for k, v in ds.coords.items() if 'time' not in v.dims}
+    coords['time'] = labels.astype('datetime64[ns]')
+    avg = xr.Dataset(data_vars, coords=coords, attrs=ds.attrs)
+    avg['time'].attrs = ds['time'].attrs
+
+    if keep_empty and ngroups:
+        # fill out the full set of regular bins, using the integer fill value where NaNs cannot be used
+        grid = np.arange(labels[0], labels[-1] + period, period).astype('datetime64[ns]')
+        fill = {k: FILL_INT for k, v in avg.data_vars.items() if np.issubdtype(v.dtype, np.integer)}
+        avg = avg.reindex(time=grid, fill_value=fill or np.nan)
+
+    return avg
+
+
+@timed('update_dataset')
+def update_dataset(ds, platform, deployment, lat, lon, depth, attrs, low_memory=False):
     """
     Updates a data set with global and variable level metadata attributes and
     sets appropriate dimensions and coordinate axes based on the CF Metadata
     Standard, version 1.7, for a single time series at a nominal fixed spatial
     location.
 
+    By default, the float64 and int64 variables are converted to float32 and
+    int32 in memory. With low_memory set, the data variables are never copied:
+    the station coordinates are added as views of the existing arrays and the
+    conversions are set as encodings, applied when the data set is written.
+    The file on disk is the same, but the data set returned keeps the original
+    data types. Recommended for the larger 2D data sets (e.g. OPTAA, NUTNR,
+    ADCP and ZPLSC), where the converted copies roughly double the peak memory.
+
     :param ds: Data set to update
     :param platform: Platform name
     :param deployment: Deployment name
@@ -290,6 +919,8 @@ def update_dataset(ds, platform, deployment, lat, lon, depth, attrs):
         minimum and maximum extent of the depth range for the instrument in
         this data set
     :param attrs: Global and variable level attributes for the data set
+    :param low_memory: Set the data type conversions as encodings applied at
+        write time, rather than converting the data in memory
     :return ds: The updated data set
     """
     # convert the depth array to named variables
@@ -310,15 +941,20 @@ def update_dataset(ds, platform, deployment, lat, lon, depth, attrs):
         'z': ('station', [deploy_depth])
     })
 
-    # merge the geospatial coordinates into the data set
-    ds = ds.merge(geo_coords)
+    # merge the geospatial coordinates into the data set, or just add them if we are avoiding the copies
+    if low_memory:
+        ds = ds.assign(geo_coords.variables)
+    else:
+        ds = ds.merge(geo_coords)
 
     # Convert time from nanoseconds to seconds since 1970
     ds['time'] = dt64_epoch(ds.time)
 
-    # update the global attributes with deployment specific details
-    attrs['global'] = dict_update(attrs['global'], {
-        'comment': 'Mooring ID: {}-{}'.format(platform.upper(), re.sub('\D', '', deployment)),
+    # copy the global attributes and update them with the deployment specific details, leaving the source
+    # attribute dictionaries untouched for the next call
+    global_attrs = dict(attrs['global'])
+    global_attrs.update({
+        'comment': 'Mooring ID: {}-{}'.format(platform.upper(), re.sub(r'\D', '', deployment)),
         'date_created': datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:00Z"),
         'geospatial_lat_max': lat,
         'geospatial_lat_min': lat,
@@ -331,12 +967,13 @@ def update_dataset(ds, platform, deployment, lat, lon, depth, attrs):
     })
 
     # assign the updated attributes to the global metadata and the individual variables
-    ds.attrs = attrs['global']
+    ds.attrs = global_attrs
     for v in ds.variables:
-        if v not in ['time', 'lat', 'lon', 'z', 'station_name', 'wavelength_number', 'wavelengths']:
-            ds[v].attrs = dict_update(attrs[v], {'coordinates': 'time lon lat z'})
+        if v not in ['time', 'lat', 'lon', 'z', 'station_name', 'wavelength_number', 'wavelengths', 'wavelength',
+                     'frequency']:
+            ds[v].attrs = dict(attrs[v], coordinates='time lon lat z')
         else:
-            ds[v].attrs = attrs[v]
+            ds[v].attrs = dict(attrs[v])
 
     # set the encoding for the time and sensor time (if available) variables to ensure proper CF compliance
     # and representation of the times in the NetCDF file (otherwise, xarray will chose its own defaults)
@@ -359,14 +996,467 @@ def update_dataset(ds, platform, deployment, lat, lon, depth, attrs):
     for v in ds.variables:
         if v not in ['time', 'sensor_time']:
             if ds[v].dtype == np.int64:
-                ds[v] = ds[v].astype(np.int32)
+                if low_memory:
+                    ds[v].encoding['dtype'] = 'int32'
+                else:
+                    ds[v] = ds[v].astype(np.int32)
             if ds[v].dtype is np.dtype('float64'):
-                ds[v] = ds[v].astype('float32')
+                if low_memory:
+                    ds[v].encoding['dtype'] = 'float32'
+                else:
+                    ds[v] = ds[v].astype('float32')
 
     # return the data set for further work
     return ds
 
 
+def update_profiles(frames, profiles, platform, deployment, lat, lon, attrs, zvar='profiler_depth'):
+    """
+    Combine the data from a set of profiles into a single data set following
+    the NetCDF Climate and Forecast (CF) Metadata Conventions for an indexed
+    ragged array of profiles (featureType=profile), so a deployment of
+    profiler data can be saved in a single file rather than one file per
+    profile. The records from all the profiles are stacked along the obs
+    dimension, with the profile_index variable pointing each record to its
+    profile, and the profile (instance) variables set along the profile
+    dimension. The attributes and data types are set the same way as in
+    update_dataset.
+
+    :param frames: list of data frames, indexed by time, with the records from
+        each profile. Columns missing from some of the profiles are filled
+        with NaNs.
+    :param profiles: data frame with the profile variables (e.g. profile_id),
+        one row per profile in the same order as the frames
+    :param platform: Platform name
+    :param deployment: Deployment name
+    :param lat: Deployment latitude in decimal degrees North
+    :param lon: Deployment longitude in decimal degrees East
+    :param attrs: Attribute dictionary for the data set, which must include
+        the attributes for the profile_index variable
+    :param zvar: Name of the variable with the depth of each record
+    :return ds: The combined data set
+    """
+    nprofiles = len(frames)
+    sizes = [len(df) for df in frames]
+    obs = pd.concat(frames, sort=False).reset_index()
+
+    # the per-record variables, pointing each record back to its profile
+    ds = xr.Dataset({c: ('obs', obs[c].values) for c in obs.columns})
+    ds['profile_index'] = ('obs', np.repeat(np.arange(nprofiles, dtype=np.int32), sizes))
+
+    # the per-profile variables, including the deployment location
+    for c in profiles.columns:
+        ds[c] = ('profile', profiles[c].values)
+    ds['deploy_id'] = ('profile', np.repeat(deployment, nprofiles).astype(str))
+    ds['lat'] = ('profile', np.repeat(lat, nprofiles))
+    ds['lon'] = ('profile', np.repeat(lon, nprofiles))
+    ds = ds.set_coords(['time', 'lat', 'lon'])
+    ds['time'] = ('obs', dt64_epoch(ds.time))
+
+    # copy the global attributes and update them with the deployment specific details (see update_dataset)
+    global_attrs = dict(attrs['global'])
+    global_attrs.update({
+        'comment': 'Mooring ID: {}-{}'.format(platform.upper(), re.sub(r'\D', '', deployment)),
+        'date_created': datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:00Z"),
+        'featureType': 'profile',
+        'cdm_data_type': 'Profile',
+        'cdm_profile_variables': ', '.join(list(profiles.columns) + ['deploy_id']),
+        'geospatial_lat_max': lat,
+        'geospatial_lat_min': lat,
+        'geospatial_lon_max': lon,
+        'geospatial_lon_min': lon,
+        'geospatial_vertical_max': float(np.nanmax(ds[zvar])) if ds[zvar].size else np.nan,
+        'geospatial_vertical_min': float(np.nanmin(ds[zvar])) if ds[zvar].size else np.nan,
+        'geospatial_vertical_positive': 'down',
+        'geospatial_vertical_units': 'm'
+    })
+    ds.attrs = global_attrs
+
+    # assign the variable attributes, linking the records to their profile and location
+    for v in ds.variables:
+        if ds[v].dims == ('obs',) and v not in ['time', 'profile_index', zvar]:
+            ds[v].attrs = dict(attrs[v], coordinates='time lon lat {}'.format(zvar))
+        else:
+            ds[v].attrs = dict(attrs[v])
+    ds['profile_index'].attrs['instance_dimension'] = 'profile'
+
+    ds['time'].encoding = dict({
+        '_FillValue': None,
+        'units': 'seconds since 1970-01-01T00:00:00.000Z',
+        'calendar': 'standard',
+        'dtype': 'float64'
+    })
+
+    # convert all float64 values to float32 and all int64 values to int32 (see update_dataset)
+    for v in ds.variables:
+        if v not in ['time', 'lat', 'lon']:
+            if ds[v].dtype == np.int64:
+                ds[v] = ds[v].astype(np.int32)
+            if ds[v].dtype == np.float64:
+                ds[v] = ds[v].astype(np.float32)
+
+    return ds
+
+
+def partition_file(outfile, ds, writer):
+    """
+    Determine the name of the file, or files, a processed data set will be
+    written to. Daily data files are named with a date stamp (e.g.
+    20240202.superv.nc) followed by the instrument name. For the deployment
+    writer, the date stamp is replaced with the deployment ID (e.g.
+    D00017.superv.nc). For the monthly writer, the data set is split by month
+    and the date stamp is replaced with the year and month (e.g.
+    202402.superv.nc).
+
+    :param outfile: daily output file name with the full, absolute path
+    :param ds: processed data set (output from update_dataset)
+    :param writer: writer type, either deployment or monthly
+    :return partitions: list of output file name and data set tuples
+    """
+    out_path, out_file = os.path.split(outfile)
+    x = re.match(r'([\d]{8}|[\d]{8}_[\d]{6})[._](.*)', out_file)
+    suffix = x.group(2) if x else out_file
+
+    if writer == 'deployment':
+        deploy_id = 'deployment'
+        if 'deploy_id' in ds.variables:
+            deploy_id = str(ds['deploy_id'].values.ravel()[0])
+        return [(os.path.join(out_path, '{}.{}'.format(deploy_id, suffix)), ds)]
+
+    if writer == 'monthly':
+        months = pd.to_datetime(ds['time'].values, unit='s').strftime('%Y%m').values
+        partitions = []
+        for month in np.unique(months):
+            partitions.append((os.path.join(out_path, '{}.{}'.format(month, suffix)),
+                               ds.isel(time=(months == month))))
+        return partitions
+
+    raise InputError('writer', 'Unknown writer type {}, must be daily, deployment or monthly'.format(writer))
+
+
+def write_netcdf(ds, target, engine='h5netcdf', unlimited_dims=None, group=None, mode='w'):
+    """
+    Write a processed data set to a NetCDF file with the default CF encodings.
+    Variables with a data type conversion set as an encoding (see the
+    low_memory option of update_dataset) are written one at a time, so only a
+    single converted copy of the data is held in memory rather than one for
+    every variable in the data set.
+
+    :param ds: processed data set (output from update_dataset)
+    :param target: NetCDF file name with the full, absolute path
+    :param engine: NetCDF engine used to write the file
+    :param unlimited_dims: list of dimensions to set as unlimited
+    :param group: optional NetCDF group to write the data set to, so several
+        data sets can be saved in the same file
+    :param mode: write (w, default) a new file, or add (a) the data set to an
+        existing file (used with the group option)
+    :return: None
+    """
+    # keep the data type conversions set on the variables, the writer replaces them with the encodings passed to it
+    encoding = {}
+    for v, enc in ENCODING.items():
+        if v in ds.variables:
+            encoding[v] = dict(enc, dtype=ds[v].encoding['dtype']) if 'dtype' in ds[v].encoding else dict(enc)
+
+    # split the data variables into runs written together, with each variable needing a conversion on its own
+    groups = [[]]
+    for v in ds.data_vars:
+        if v not in encoding and np.dtype(ds[v].encoding.get('dtype', ds[v].dtype)) != ds[v].dtype:
+            groups.extend([[v], []])
+        else:
+            groups[-1].append(v)
+
+    # the first write creates the file with the coordinates and global attributes, and the rest are added to it
+    first = ds.drop_vars([v for v in ds.data_vars if v not in groups[0]])
+    first.to_netcdf(target, mode=mode, format='NETCDF4', engine=engine, group=group,
+                    encoding={v: enc for v, enc in encoding.items() if v in first.variables},
+                    unlimited_dims=unlimited_dims)
+    for names in groups[1:]:
+        if not names:
+            continue
+        subset = ds[names]
+        subset = subset.drop_vars(list(subset.coords))
+        subset.attrs = {}
+        subset.to_netcdf(target, mode='a', format='NETCDF4', engine=engine, group=group,
+                         encoding={v: encoding[v] for v in names if v in encoding})
+
+
+@contextmanager
+def file_lock(target):
+    """
+    Hold an exclusive lock on a deployment or monthly file, or a Zarr store,
+    while it is updated, so processors running in parallel and writing to the
+    same target take turns rather than losing each other's records. The lock is
+    held on a companion lock file (target + '.lock'), which is left in place
+    for the next writer. Without fcntl (i.e. on Windows), writes to the same
+    target need to be serialized by the caller.
+
+    :param target: file or store name with the full, absolute path
+    :return: None
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(target + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def extend_netcdf(ds, target):
+    """
+    Add the records in a processed data set to the end of an existing NetCDF
+    file with an unlimited time dimension (e.g. created by append_dataset),
+    writing just the new records in place rather than reading and rewriting
+    the whole file. Only possible if the new records follow the last record in
+    the file and the data set has the same time dimensioned variables, with
+    the same dimensions, as the file, otherwise the file is left untouched.
+
+    :param ds: processed data set (output from update_dataset)
+    :param target: NetCDF file name with the full, absolute path
+    :return: True if the records were added to the file, False if not
+    """
+    names = [v for v in ds.variables if 'time' in ds[v].dims]
+    for v in names:
+        # date/time and scaled values need the CF encodings applied by xarray, leave those to append_dataset
+        if ds[v].dtype.kind in 'mM' or 'scale_factor' in ds[v].encoding or 'add_offset' in ds[v].encoding:
+            return False
+
+    with netCDF4.Dataset(target, 'a') as nc:
+        if 'time' not in nc.dimensions or not nc.dimensions['time'].isunlimited():
+            return False
+        if set(names) != {v for v in nc.variables if 'time' in nc[v].dimensions}:
+            return False
+        for v in names:
+            if nc[v].dimensions != ds[v].dims:
+                return False
+            if any(len(nc.dimensions[d]) != ds.sizes[d] for d in ds[v].dims if d != 'time'):
+                return False
+
+        n0 = len(nc.dimensions['time'])
+        if n0 and ds['time'].values.min() <= nc['time'][n0 - 1]:
+            return False
+
+        n1 = n0 + ds.sizes['time']
+        for v in names:
+            index = tuple(slice(n0, n1) if d == 'time' else slice(None) for d in ds[v].dims)
+            values = ds[v].values
+            if nc[v].dtype is str:
+                values = values.astype(object)
+            nc[v][index] = values
+
+    return True
+
+
+def append_dataset(ds, target, engine='h5netcdf'):
+    """
+    Append a processed data set to a deployment or monthly NetCDF file along
+    an unlimited time dimension. If the file already contains records within
+    the time span of the new data (e.g. the day was reprocessed), those records
+    are replaced. The combined data set is written to a uniquely named
+    temporary file and then renamed, so the target file is never left partially
+    written. New data following on from the last record in the file is instead
+    added to the end of the file in place (see extend_netcdf), avoiding the cost
+    of reading and rewriting the existing records, so only reprocessed or out
+    of order days pay for a full rewrite. Writers take turns on the file (see
+    file_lock), so processors running in parallel do not lose each other's
+    records.
+
+    :param ds: processed data set (output from update_dataset)
+    :param target: deployment or monthly file name with the full, absolute path
+    :param engine: NetCDF engine used to read and write the file
+    :return: None
+    """
+    with file_lock(target):
+        if os.path.isfile(target) and extend_netcdf(ds, target):
+            # the new records follow on from the existing ones and were added to the end of the file
+            return
+
+        if os.path.isfile(target):
+            # load the existing records, leaving the values as they were written to disk
+            with xr.open_dataset(target, engine=engine, decode_times=False, mask_and_scale=False,
+                                 decode_coords=False) as nc:
+                old = nc.load()
+
+            # remove any records overlapping the time span of the new data
+            tmin = ds['time'].values.min()
+            tmax = ds['time'].values.max()
+            keep = (old['time'].values < tmin) | (old['time'].values > tmax)
+            old = old.isel(time=keep)
+
+            # combine the new and old records, keeping the metadata from the new data set
+            if old['time'].size > 0:
+                attrs = ds.attrs
+                ds = xr.concat([ds, old], dim='time', data_vars='minimal', coords='minimal', compat='override',
+                               combine_attrs='override')
+                ds = ds.sortby('time')
+                ds.attrs = attrs
+
+        # write to a temporary file in the same directory and then rename to the target
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(target) + '.', suffix='.tmp', dir=os.path.dirname(target))
+        os.close(fd)
+        try:
+            write_netcdf(ds, tmp, engine=engine, unlimited_dims=['time'])
+            os.chmod(tmp, os.stat(target).st_mode if os.path.isfile(target) else 0o644)
+            os.replace(tmp, target)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+
+def zarr_encoding(ds):
+    """
+    Set the Zarr chunk sizes for the variables in a processed data set. Chunks
+    span the full extent of the non-time dimensions (e.g. the wavelengths of an
+    OPTAA or NUTNR spectra, or the depth bins of an ADCP or ZPLSC profile) and
+    are sized along the time dimension to hold roughly ZARR_CHUNK_SIZE values.
+    Partial reads of a time range or a single variable then only need to load a
+    few chunks from the store.
+
+    :param ds: processed data set (output from update_dataset)
+    :return encoding: Zarr encodings for the data set variables
+    """
+    encoding = {}
+    for v in ds.variables:
+        if 'time' not in ds[v].dims:
+            continue
+        other = int(np.prod([ds.sizes[d] for d in ds[v].dims if d != 'time']))
+        ntime = int(np.clip(ZARR_CHUNK_SIZE // max(other, 1), 1, ZARR_CHUNK_SIZE))
+        encoding[v] = {'chunks': tuple(ntime if d == 'time' else ds.sizes[d] for d in ds[v].dims)}
+
+    # add the default CF encodings for the coordinate variables
+    for v in ENCODING:
+        if v in ds.variables:
+            encoding[v] = dict_update(encoding.get(v, {}), ENCODING[v])
+
+    # keep the data type conversions set on the variables (see update_dataset)
+    for v in ds.variables:
+        if v in encoding and 'dtype' in ds[v].encoding:
+            encoding[v]['dtype'] = ds[v].encoding['dtype']
+
+    return encoding
+
+
+def zarr_fill(ds):
+    """
+    Move the _FillValue attributes set by update_dataset into the variable
+    encodings. The Zarr writer stores the fill value with the array metadata,
+    and refuses to write into an existing store (appending or writing a region)
+    when the fill value is also given as an attribute.
+
+    :param ds: processed data set (output from update_dataset)
+    :return ds: shallow copy of the data set with the fill values as encodings
+    """
+    ds = ds.copy(deep=False)
+    for v in ds.variables:
+        if '_FillValue' in ds[v].attrs:
+            attrs = dict(ds[v].attrs)
+            ds[v].encoding = dict_update(ds[v].encoding, {'_FillValue': attrs.pop('_FillValue')})
+            ds[v].attrs = attrs
+
+    return ds
+
+
+def append_zarr(ds, target):
+    """
+    Append a processed data set to a per-deployment Zarr store along the time
+    dimension. New data following the end of the store is appended. Data
+    replacing an existing block of records with the same time stamps (e.g. a
+    reprocessed day) is written into that region of the store. Any other overlap
+    falls back to merging with the existing records and rewriting the store to
+    a temporary directory, which is then swapped in for the old store. Writers
+    take turns on the store (see file_lock), as neighbouring days can share
+    the same chunks.
+
+    :param ds: processed data set (output from update_dataset)
+    :param target: Zarr store (directory) name with the full, absolute path
+    :return: None
+    """
+    ds = zarr_fill(ds)
+    with file_lock(target):
+        if not os.path.isdir(target):
+            ds.to_zarr(target, mode='w-', encoding=zarr_encoding(ds))
+            return
+
+        with xr.open_zarr(target, decode_times=False) as zs:
+            times = zs['time'].values
+
+        t = ds['time'].values
+        if t.min() > times.max():
+            # new records follow the existing ones, append to the end of the store
+            ds.to_zarr(target, mode='a', append_dim='time')
+            return
+
+        i0 = np.searchsorted(times, t[0])
+        i1 = i0 + t.size
+        if i1 <= times.size and np.array_equal(times[i0:i1], t):
+            # new records replace an existing block of records, write to that region of the store
+            region = ds.drop_vars([v for v in ds.variables if 'time' not in ds[v].dims])
+            region.to_zarr(target, mode='r+', region={'time': slice(int(i0), int(i1))})
+            return
+
+        # otherwise, merge with the existing records and rewrite the store
+        with xr.open_zarr(target, decode_times=False, mask_and_scale=False, decode_coords=False) as zs:
+            old = zs.load()
+
+        keep = (old['time'].values < t.min()) | (old['time'].values > t.max())
+        old = old.isel(time=keep)
+        attrs = ds.attrs
+        ds = xr.concat([ds, old], dim='time', data_vars='minimal', coords='minimal', compat='override',
+                       combine_attrs='override')
+        ds = ds.sortby('time')
+        ds.attrs = attrs
+        for v in ds.variables:
+            # reset the encodings from the existing store, keeping the data type conversions and fill values
+            ds[v].encoding = {k: ds[v].encoding[k] for k in ['dtype', '_FillValue'] if k in ds[v].encoding}
+            ds[v].attrs = {k: a for k, a in ds[v].attrs.items() if k != '_FillValue'}
+
+        # write the new store next to the old one, then swap the two and remove the old store
+        parent, name = os.path.split(target)
+        tmp = tempfile.mkdtemp(prefix=name + '.', suffix='.tmp', dir=parent)
+        ds.to_zarr(tmp, mode='w', encoding=zarr_encoding(ds))
+        os.chmod(tmp, os.stat(target).st_mode)
+        trash = tempfile.mkdtemp(prefix=name + '.', suffix='.old', dir=parent)
+        os.rename(target, trash)
+        os.rename(tmp, target)
+        shutil.rmtree(trash)
+
+
+@timed('write')
+def write_dataset(ds, outfile, writer='daily', engine='h5netcdf'):
+    """
+    Save a processed data set to disk. By default, the data set is written to
+    the daily output file. Alternatively, the data set can be appended to a
+    single file per deployment or a set of monthly files (see append_dataset),
+    reducing the number of files ERDDAP needs to track and the metadata
+    duplicated across those files, or to a per-deployment Zarr store (see
+    append_zarr, requires the optional zarr package) for reprocessing and
+    analysis.
+
+    :param ds: processed data set (output from update_dataset)
+    :param outfile: daily output file name with the full, absolute path
+    :param writer: writer type, either daily (default), deployment, monthly
+        or zarr
+    :param engine: NetCDF engine used to write the file
+    :return: None
+    """
+    if writer in [None, 'daily']:
+        write_netcdf(ds, outfile, engine=engine)
+        return
+
+    if writer == 'zarr':
+        target, subset = partition_file(outfile, ds, 'deployment')[0]
+        append_zarr(subset, os.path.splitext(target)[0] + '.zarr')
+        return
+
+    for target, subset in partition_file(outfile, ds, writer):
+        append_dataset(subset, target, engine=engine)
+
+
+@timed('load_json')
 def json_sub2df(infile, sub):
     """
     Read in a JSON formatted data file, pull out the subarray and return the results as a panda dataframe.
@@ -399,23 +1489,59 @@ def reset_long(df):
     return df
 
 
-def split_column(df, colname, n=None, singular=None, names=None):
+def split_column(df, colname, n=None, singular=None, names=None, as_array=False):
     """
     Convert col = [[a, b, c], [d, e, f]]
     into
     col1 = [a, d]
     col2 = [b, e]
     col3 = [c, f]
+
+    The nested column is stacked once into a 2D array and the new columns
+    are assigned from its slices. Alternatively, the 2D array itself can be
+    returned (e.g. to use as a spectra or profile variable in a data set).
+    Rows of different lengths are trimmed or padded with NaNs to n values (or
+    to the longest row if n is not set).
+
+    :param df: data frame with the nested column
+    :param colname: name of the nested column, removed from the data frame
+    :param n: number of values to split out of each row (default is all)
+    :param singular: base name for the new columns (default is colname)
+    :param names: list of names for the new columns, overrides n and singular
+    :param as_array: return the first n values of each row as a 2D array,
+        rather than adding the new columns to the data frame
+    :return df: the updated data frame, or the 2D array if as_array is set
     """
+    if names is not None:
+        n = len(names)
+
+    # stack the nested lists once, rather than iterating over the column for every value
+    rows = df.pop(colname).tolist()
+    lengths = np.fromiter(map(len, rows), dtype=int, count=len(rows))
+    if lengths.size and np.any(lengths != lengths[0]):
+        # ragged rows, copy each row into a block padded with NaNs
+        block = np.full((len(rows), n or lengths.max()), np.nan)
+        for i, row in enumerate(rows):
+            row = row[:block.shape[1]]
+            block[i, :len(row)] = row
+    else:
+        block = np.array(rows)
+    if block.size == 0:
+        block = np.empty((len(block), n or 0))
+    if n is not None:
+        block = block[:, :n]
+
+    if as_array:
+        return block
+
     if names is None:
         if singular is None:
             singular = colname
-        names = ['{}{}'.format(singular, i+1) for i in range(n)]
-    else:
-        n = len(names)
-    for i, name in zip(range(n), names):
-        df[name] = [v[i] for v in df[colname]]
-    df.pop(colname)
+        names = ['{}{}'.format(singular, i+1) for i in range(block.shape[1])]
+
+    for i, name in enumerate(names):
+        df[name] = block[:, i]
+
     return df
 
 
@@ -435,6 +1561,52 @@ def dict_update(source, overrides):
     return source
 
 
+def freeze_attrs(attrs):
+    """
+    Recursively convert a nested attribute dictionary into read-only mappings,
+    so the compiled attributes cannot be modified by the processors.
+    """
+    return MappingProxyType({k: freeze_attrs(v) if isinstance(v, Mapping) else v for k, v in attrs.items()})
+
+
+def merge_attrs(*sources):
+    """
+    Merge the global and variable level attribute dictionaries (e.g. the
+    instrument specific attributes with the CO_LOCATED and SHARED attributes),
+    with later sources taking precedence over earlier ones (the same rules as
+    dict_update). Unlike dict_update, none of the sources are modified. The
+    merged attributes are compiled once per combination of sources and returned
+    as a read-only mapping, making repeated calls from batch or long-running
+    processes cheap and safe.
+
+    :param sources: attribute dictionaries to merge, in order of precedence
+    :return attrs: read-only, merged attribute mapping
+    """
+    key = tuple(id(s) for s in sources)
+    if key not in _MERGED_ATTRS:
+        merged = {}
+        for source in sources:
+            _merge_into(merged, source)
+        # keep a reference to the sources so their ids cannot be reused while cached
+        _MERGED_ATTRS[key] = (sources, freeze_attrs(merged))
+
+    return _MERGED_ATTRS[key][1]
+
+
+def _merge_into(target, overrides):
+    """
+    Merge the overrides into the target dictionary, creating new nested
+    dictionaries rather than modifying those in the overrides.
+    """
+    for key, value in overrides.items():
+        if isinstance(value, Mapping) and value:
+            nested = target.get(key)
+            target[key] = _merge_into(dict(nested) if isinstance(nested, Mapping) else {}, value)
+        else:
+            target[key] = value
+    return target
+
+
 def dt64_epoch(dt64):
     """
     Convert a panda or xarray date/time value represented as a datetime64 object (nanoseconds since 1970) to a float,
@@ -462,6 +1634,18 @@ def epoch_time(time_string):
     return epts
 
 
+def sami_epoch(record_time):
+    """
+    Convert the SAMI (PHSEN and PCO2W) record times, counted in seconds since
+    1904-01-01 (the classic Mac OS epoch), to seconds since 1970-01-01.
+
+    :param record_time: array of SAMI record times
+    :return epts: record times as seconds since 1970-01-01
+    """
+    epts = np.asarray(record_time).astype(np.uint32) - SAMI_EPOCH
+    return epts
+
+
 def inputs(args=None):
     """
     Sets the main input arguments for the processor. At the least, the input and output files need to be specified,
@@ -469,7 +1653,11 @@ def inputs(args=None):
     the factory calibration data (either a stored serialized object, or a link (either file path for factory provided
     data file(s) or a URL to OOI CI maintained CSV files). File names should always include path names. Finally a
     simple integer switch is provided for cases where the processor needs to function differently depending on some
-    set of basic conditions.
+    set of basic conditions, and the writer option selects how the processed data is saved (see write_dataset).
+    The workers option sets the number of processes used by processors that work through a directory of files.
+    The profile option (or the CGSN_PROFILE environment variable) records the time and memory used by the different
+    processing stages (see StageProfiler), and the profile_out option (or the CGSN_PROFILE_OUT environment variable)
+    runs the processor under cProfile, saving a pstats file for the input file (see start_cprofile).
     """
     if args is None:
         args = sys.argv[1:]
@@ -503,6 +1691,31 @@ def inputs(args=None):
     parser.add_argument("-df", "--devfile", dest="devfile", type=str, required=False)
     parser.add_argument("-u", "--csvurl", dest="csvurl", type=str, required=False)
     parser.add_argument("-s", "--switch", dest="switch", type=str, required=False)
+    parser.add_argument("-nw", "--workers", dest="workers", type=int, required=False, default=1,
+                        help="Number of worker processes used by the processors that handle a directory of files")
+    parser.add_argument("-w", "--writer", dest="writer", type=str, required=False, default='daily',
+                        choices=['daily', 'deployment', 'monthly', 'zarr'],
+                        help="Write the daily output file (default), or append to a deployment or monthly file, "
+                             "or to a deployment Zarr store")
+    parser.add_argument("-pf", "--profile", dest="profile", type=str, required=False, nargs='?', const=PROFILE_FILE,
+                        help="Append per-stage timing and memory use to a JSON-lines file (default {})".format(
+                            PROFILE_FILE))
+    parser.add_argument("-po", "--profile-out", dest="profile_out", type=str, required=False,
+                        help="Run the processor under cProfile, saving a pstats file per input file to this directory")
 
     # parse the input arguments and create a parser object
-    return parser.parse_args(args)
+    args = parser.parse_args(args)
+
+    # start profiling the processor if requested
+    processor = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    profile = args.profile or os.environ.get(PROFILE_ENV)
+    if profile:
+        if profile.lower() in ['1', 'true', 'yes']:
+            profile = PROFILE_FILE
+        PROFILER.start(os.path.abspath(profile), processor, os.path.abspath(args.infile))
+
+    profile_out = args.profile_out or os.environ.get(PROFILE_OUT_ENV)
+    if profile_out:
+        start_cprofile(os.path.abspath(profile_out), processor, args.infile)
+
+    return args
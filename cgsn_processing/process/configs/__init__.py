@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.process.configs
+@file cgsn_processing/process/configs/__init__.py
+@author Christopher Wingard
+@brief Registry of the attribute dictionaries, loaded from their configuration modules on first use
+"""
+import importlib
+
+# map of the attribute dictionary names to the configuration modules that define them
+REGISTRY = {
+    'ADCP': 'attr_adcp', 'PD0': 'attr_adcp', 'PD8': 'attr_adcp', 'PD12': 'attr_adcp', 'DERIVED': 'attr_adcp',
+    'ADCPU': 'attr_adcpu',
+    'PCO2W': 'attr_pco2w',
+    'CPHOX': 'attr_cphox',
+    'SHARED': 'attr_common', 'CO_LOCATED': 'attr_common',
+    'CSPP': 'attr_cspp', 'CSPP_CTDPF': 'attr_cspp', 'CSPP_DOSTA': 'attr_cspp', 'CSPP_FLORT': 'attr_cspp',
+    'CSPP_NUTNR': 'attr_cspp', 'CSPP_OPTAA': 'attr_cspp', 'CSPP_PARAD': 'attr_cspp', 'CSPP_SPKIR': 'attr_cspp',
+    'CSPP_VELPT': 'attr_cspp', 'CSPP_WINCH': 'attr_cspp',
+    'CTDBP': 'attr_ctdbp',
+    'CTDMO': 'attr_ctdmo',
+    'DOSTA': 'attr_dosta',
+    'FDCHP': 'attr_fdchp',
+    'FLORT': 'attr_flort',
+    'GPS': 'attr_gps',
+    'HYDGN': 'attr_hydgn',
+    'HDR': 'attr_ifcb', 'ADC': 'attr_ifcb',
+    'LISST': 'attr_lisst',
+    'METBK': 'attr_metbk',
+    'MMP': 'attr_mmp_coastal', 'MMP_ADATA': 'attr_mmp_coastal', 'MMP_CDATA': 'attr_mmp_coastal',
+    'MMP_EDATA': 'attr_mmp_coastal',
+    'PRAWLER': 'attr_mmp_prawler', 'PRAWLER_NO_FLORT': 'attr_mmp_prawler', 'PRAWLER_SCI': 'attr_mmp_prawler',
+    'MOPAK': 'attr_mopak',
+    'MPEA': 'attr_mpea',
+    'NUTNR': 'attr_nutnr',
+    'OPTAA': 'attr_optaa',
+    'PCO2A': 'attr_pco2a',
+    'PHSEN': 'attr_phsen',
+    'PRESF': 'attr_presf',
+    'PRTSZ': 'attr_prtsz',
+    'PSC': 'attr_psc',
+    'RBRQ3': 'attr_rbrpresf',
+    'CPM': 'attr_sbd', 'STC': 'attr_sbd',
+    'SPKIR': 'attr_spkir',
+    'SUPERV': 'attr_superv',
+    'SWND': 'attr_swnd',
+    'FB250': 'attr_syslog_fb250',
+    'IRID': 'attr_syslog_irid',
+    'RDA': 'attr_syslog_rda',
+    'VEL3D': 'attr_vel3d',
+    'VELPT': 'attr_velpt',
+    'VEMCO': 'attr_vemco',
+    'WAVSS': 'attr_wavss',
+    'XEOS': 'attr_xeos',
+    'ZPLSC': 'attr_zplsc',
+}
+
+
+def load_attrs(name):
+    """
+    Return one of the attribute dictionaries, importing the configuration
+    module that defines it only when it is first requested. Processors that
+    select between several attribute sets at run time use this to avoid
+    loading the ones they do not need.
+
+    :param name: Name of the attribute dictionary (e.g. 'CTDBP' or 'SUPERV')
+    :return attrs: The attribute dictionary
+    """
+    if name not in REGISTRY:
+        raise KeyError('No attribute configuration is registered for {}'.format(name))
+
+    module = importlib.import_module('{}.{}'.format(__name__, REGISTRY[name]))
+    return getattr(module, name)
+
+
+def __getattr__(name):
+    # allow `from cgsn_processing.process.configs import CTDBP` without importing every configuration module
+    if name in REGISTRY:
+        return load_attrs(name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
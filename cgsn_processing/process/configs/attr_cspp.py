@@ -7,7 +7,7 @@
 @brief Attributes for the CSPP dataset variables
 """
 import numpy as np
-from cgsn_processing.process.common import dict_update
+from cgsn_processing.process.common import merge_attrs
 from cgsn_processing.process.configs.attr_ctdbp import CTDBP
 from cgsn_processing.process.configs.attr_dosta import DOSTA
 from cgsn_processing.process.configs.attr_flort import FLORT
@@ -25,6 +25,26 @@ CSPP = {
         'comment': ('Profiler ID. Includes the profiler number and a date and time string to help distinguish '
                     'individual profiles.'),
         'cf_role': 'profile_id'
+    },
+    'depth': {
+        'long_name': 'Depth',
+        'standard_name': 'depth',
+        'units': 'm',
+        'comment': 'Depth of the profiler calculated from the CTD pressure record.',
+        'positive': 'down'
+    }
+}
+
+# the sensors without a co-located CTD (PARAD, SPKIR and VELPT) record the profiler CTD pressure with their data
+ctd_pressure = {
+    'ctd_pressure': {
+        'long_name': 'Sea Water Pressure',
+        'standard_name': 'sea_water_pressure_due_to_sea_water',
+        'units': 'dbar',
+        'comment': ('Sea Water Pressure refers to the pressure exerted on a sensor in situ by the weight of the '
+                    'column of seawater above it. Measurements are from the profiler CTD, recorded by the uCSPP '
+                    'with the sensor data.'),
+        'data_product_identifier': 'PRESWAT_L1'
     }
 }
 
@@ -36,7 +56,7 @@ ctdpf = {
                     'Profilers (uCSPP).')
     }
 }
-CSPP_CTDPF = dict_update(CTDBP, ctdpf)
+CSPP_CTDPF = merge_attrs(CTDBP, ctdpf)
 
 dosta = {
     'global': {
@@ -45,7 +65,7 @@ dosta = {
                     'Coastal Surface Piercing Profilers (uCSPP).')
     }
 }
-CSPP_DOSTA = dict_update(DOSTA, dosta)
+CSPP_DOSTA = merge_attrs(DOSTA, dosta)
 
 flort = {
     'global': {
@@ -54,7 +74,7 @@ flort = {
                     'Coastal Surface Piercing Profilers (uCSPP).')
     }
 }
-CSPP_FLORT = dict_update(FLORT, flort)
+CSPP_FLORT = merge_attrs(FLORT, flort)
 
 nutnr = {
     'global': {
@@ -63,7 +83,7 @@ nutnr = {
                     'Piercing Profilers (uCSPP).')
     }
 }
-CSPP_NUTNR = dict_update(NUTNR, nutnr)
+CSPP_NUTNR = merge_attrs(NUTNR, nutnr)
 
 optaa = {
     'global': {
@@ -72,7 +92,7 @@ optaa = {
                     'Piercing Profilers (uCSPP).')
     }
 }
-CSPP_OPTAA = dict_update(OPTAA, optaa)
+CSPP_OPTAA = merge_attrs(OPTAA, optaa)
 
 CSPP_PARAD = {
     'global': {
@@ -97,6 +117,7 @@ CSPP_PARAD = {
         'ancillary_variables': 'raw_par_measurement'
     }
 }
+CSPP_PARAD = merge_attrs(CSPP_PARAD, ctd_pressure)
 
 spkir = {
     'global': {
@@ -105,7 +126,7 @@ spkir = {
                     'uncabled Coastal Surface Piercing Profilers (uCSPP).')
     }
 }
-CSPP_SPKIR = dict_update(SPKIR, spkir)
+CSPP_SPKIR = merge_attrs(SPKIR, spkir, ctd_pressure)
 
 velpt = {
     'global': {
@@ -138,7 +159,7 @@ velpt = {
         'ancillary_variables': 'error_code status_code'
     }
 }
-CSPP_VELPT = dict_update(VELPT, velpt)
+CSPP_VELPT = merge_attrs(VELPT, velpt, ctd_pressure)
 
 CSPP_WINCH = {
     'global': {
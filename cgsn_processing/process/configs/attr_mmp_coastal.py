@@ -29,6 +29,33 @@ MMP = {
         'standard_name': 'depth',
         'units': 'm',
         'comment': 'Depth of the profiler calculated from the CTD pressure record.',
+        'positive': 'down'
+    },
+    # profile variables used in the deployment files, which combine all the profiles into a ragged array
+    'profile_index': {
+        'long_name': 'Profile Index',
+        'comment': 'Index of the profile (along the profile dimension) each record belongs to.',
+        # 'units': ''    # deliberately left blank, no units for this value
+    },
+    'ramp_status': {
+        'long_name': 'Ramp Status',
+        'comment': 'Ramp exit status code reported by the MMP software at the start of the profile.',
+        # 'units': ''    # deliberately left blank, no units for this value
+    },
+    'profile_status': {
+        'long_name': 'Profile Status',
+        'comment': 'Profile exit status code reported by the MMP software at the end of the profile.',
+        # 'units': ''    # deliberately left blank, no units for this value
+    },
+    'start_depth': {
+        'long_name': 'Profile Start Depth',
+        'units': 'm',
+        'comment': 'Depth of the profiler at the start of the profile, as reported by the MMP software.'
+    },
+    'end_depth': {
+        'long_name': 'Profile End Depth',
+        'units': 'm',
+        'comment': 'Depth of the profiler at the end of the profile, as reported by the MMP software.'
     }
 }
 
@@ -54,17 +81,6 @@ MMP_ADATA = {
         'comment': 'Measured roll of the Aquadopp II.',
         'units': 'degrees'
     },
-    'beams': {
-        'long_name': 'Beam Mapping',
-        'comment': ('An array of 5 values defining which physical beam (1 thru 4) is assigned to the 1st through the '
-                    '3rd data sets (the 5th beam and the 4th and 5th data sets are not used). The Aquadopp II assigns '
-                    'physical beams 1, 2 and 4 during an upcast to the 1st, 2nd and 3rd data sets, respectively. '
-                    'During a downcast, physical beams 2, 3, and 4 are assigned to the 1st thru 3rd data sets. The '
-                    'velocity and amplitude parameters are named to correspond to the 1st, 2nd, and 3rd data sets. '
-                    'With the mapping provided by this parameter, the user can determine which physical beam is '
-                    'assigned to each data set.'),
-        # 'units': '',    deliberately left blank, no units for this value
-    },
     'beam_0_velocity': {
         'long_name': 'Velocity Data Set 1',
         'comment': ('The first velocity data set, mapped to a physical beam based on the data set description. Values'
@@ -112,7 +128,7 @@ MMP_ADATA = {
                     'during ascent/descent has not been removed.'),
         'data_product_identifier': 'VELPTMN-VLE_L1',
         'units': 'm s-1',
-        'ancillary_variables': 'beams beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
+        'ancillary_variables': 'beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
     },
     'relative_velocity_north': {
         'long_name': 'Northward Sea Water Velocity',
@@ -122,7 +138,7 @@ MMP_ADATA = {
                     'during ascent/descent has not been removed.'),
         'data_product_identifier': 'VELPTMN-VLN_L1',
         'units': 'm s-1',
-        'ancillary_variables': 'beams beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
+        'ancillary_variables': 'beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
     },
     'relative_velocity_vertical': {
         'long_name': 'Upward Sea Water Velocity',
@@ -131,7 +147,7 @@ MMP_ADATA = {
                     'absolute velocity, as the movement of the profiler during ascent/descent has not been removed.'),
         'data_product_identifier': 'VELPTMN-VLU_L1',
         'units': 'm s-1',
-        'ancillary_variables': 'beams beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
+        'ancillary_variables': 'beam_0_velocity beam_1_velocity beam_2_velocity heading pitch roll'
     }
 }
 
@@ -26,6 +26,13 @@ PRAWLER = {
         'long_name': 'Deployment ID',
         'comment': 'Mooring deployment id'
     },    
+    'profile_id': {
+        'long_name': 'Profile ID',
+        # 'units': '',    deliberately left blank, no units for this value
+        'comment': ('Sequential number of the profile within the Prawler data file, counting the ascents and '
+                    'descents separately. Profiles are split where the profiler turns around or after a gap in '
+                    'the records. Combined with the time, used to subset the data by profile.')
+    },
     'time': {
         'long_name': 'Time',
         'standard_name': 'time',
@@ -159,6 +166,13 @@ PRAWLER_NO_FLORT = {
         'long_name': 'Deployment ID',
         'comment': 'Mooring deployment id'
     },    
+    'profile_id': {
+        'long_name': 'Profile ID',
+        # 'units': '',    deliberately left blank, no units for this value
+        'comment': ('Sequential number of the profile within the Prawler data file, counting the ascents and '
+                    'descents separately. Profiles are split where the profiler turns around or after a gap in '
+                    'the records. Combined with the time, used to subset the data by profile.')
+    },
     'time': {
         'long_name': 'Time',
         'standard_name': 'time',
@@ -6,7 +6,7 @@
 @author Joe Futrelle and Christopher Wingard
 @brief Attributes for the PRESF variables
 """
-from cgsn_processing.process.common import dict_update
+from cgsn_processing.process.common import dict_update, merge_attrs
 from cgsn_processing.process.configs.attr_superv import SUPERV
 
 common = {
@@ -142,7 +142,7 @@ cpm = {
                     'to be made.')
     }
 }
-attrs = dict_update(SUPERV['cpm'], SUPERV['common'])
+attrs = merge_attrs(SUPERV['cpm'], SUPERV['common'])
 cpm = dict_update(cpm, common)
 CPM = dict_update(cpm, attrs)
 
@@ -154,6 +154,6 @@ stc = {
                     'data are transmitted at a user-defined interval in text files attached to an email message.'),
     }
 }
-attrs = dict_update(SUPERV['stc'], SUPERV['common'])
+attrs = merge_attrs(SUPERV['stc'], SUPERV['common'])
 stc = dict_update(stc, common)
 STC = dict_update(stc, attrs)
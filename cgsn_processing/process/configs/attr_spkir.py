@@ -104,6 +104,32 @@ SPKIR = {
         'comment': ('A data integrity sensor that maintains a count of each frame transmitted. The count increments '
                     'by one for each frame transmitted from 0 to 255, at which point it rolls back to zero again.'),
     },
+    # raw and derived values saved along a wavelength dimension, rather than per wavelength (optional)
+    'wavelength': {
+        'long_name': 'Wavelength',
+        'standard_name': 'radiation_wavelength',
+        'units': 'nm',
+        'comment': 'Center wavelength of each of the 7 channels of the OCR-507 sensor.'
+    },
+    'raw_irradiance': {
+        'long_name': 'Raw Downwelling Irradiance',
+        'comment': ('Raw downwelling spectral irradiance measured by the Sea-Bird Electronics (formerly Satlantic) '
+                    'OCR-507 sensor at each of the 7 wavelengths.'),
+        'units': 'count',
+        'data_product_identifier': 'SPECTIR_L0',
+    },
+    'downwelling_irradiance': {
+        'long_name': 'Downwelling Spectral Irradiance',
+        'standard_name': 'downwelling_photon_spherical_irradiance_per_unit_wavelength_in_sea_water',
+        'units': 'uW cm-2 nm-1',
+        'comment': ('Downwelling spectral irradiance measured at 7 wavelengths by the Sea-Bird Electronics OCR-507 '
+                    'Multispectral Radiometer. Spectral irradiance is a critical measurement for defining important '
+                    'ocean processes, such as the radiant heating rate, and sets the energy available to drive a '
+                    'range of biological and chemical processes in the ocean.'),
+        'data_product_identifier': 'SPECTIR_L1',
+        '_FillValue': np.nan,
+        'ancillary_variables': 'raw_irradiance'
+    },
     # dataset attributes --> derived values
     'downwelling_irradiance_412': {
         'long_name': 'Downwelling Spectral Irradiance at 412 nm',
@@ -113,5 +113,17 @@ ZPLSC = {
         'units': 'count',
         'comment': 'Raw acoustic backscatter measurements for channel 4, reported in counts.',
         '_FillValue': FILL_INT
+    },
+    # used when the profiles are saved as a single (time, frequency, bin_depth) variable
+    'frequency': {
+        'long_name': 'Frequency',
+        'units': 'kHz',
+        'comment': 'Frequency of the transducers assigned to channels 1 through 4.'
+    },
+    'profiles': {
+        'long_name': 'Raw Echo Intensity',
+        'units': 'count',
+        'comment': 'Raw acoustic backscatter measurements for each of the frequency channels, reported in counts.',
+        '_FillValue': FILL_INT
     }
 }
@@ -7,41 +7,58 @@
 @brief Find the most applicable calibration file for an instrument
 """
 import datetime
-import netrc
 import pandas as pd
 import re
-import requests
 import warnings
 
 from calendar import timegm
+from functools import lru_cache
 from pytz import timezone
 
+from cgsn_processing.process.common import timed
+
 # set the base URL for the OOI asset management listing of calibration files and a regex for the CSV files
 GIT = 'https://api.github.com/repos'
 CSV = re.compile(r'.*\.csv')
 
-# load the GitHub API read-only access token
-headers = None  # default token
-try:
-    nrc = netrc.netrc()
-    auth = nrc.authenticators('api.github.com')
-    if auth is None:
-        warnings.warn('No entry found for the GitHub API token in the users .netrc file, consider adding to improve '
-                      'access to calibration coefficients')
-    else:
-        headers = {'Authentication': 'token ' + auth[2]}
-except FileNotFoundError as e:
-    warnings.warn('No .netrc file found in the users home directory. Consider creating and adding a GitHub API '
-                  'token to improve access to calibration coefficients')
+
+@lru_cache(maxsize=None)
+def github_headers():
+    """
+    Load the GitHub API read-only access token from the users .netrc file.
+    Deferred until the first request to GitHub so processors that never look
+    up a calibration (or exit early on an empty file) skip the cost.
+
+    :return headers: Request headers with the access token, or None
+    """
+    import netrc
+
+    headers = None  # default token
+    try:
+        nrc = netrc.netrc()
+        auth = nrc.authenticators('api.github.com')
+        if auth is None:
+            warnings.warn('No entry found for the GitHub API token in the users .netrc file, consider adding to '
+                          'improve access to calibration coefficients')
+        else:
+            headers = {'Authentication': 'token ' + auth[2]}
+    except FileNotFoundError:
+        warnings.warn('No .netrc file found in the users home directory. Consider creating and adding a GitHub API '
+                      'token to improve access to calibration coefficients')
+
+    return headers
 
 
 def list_directories(url, tag=''):
+    import requests  # deferred, requests adds a noticeable amount to the start-up time of every processor
+
     tree_url = 'https://api.github.com/repos/oceanobservatories/asset-management/git/trees/master?recursive=true'
-    trees = requests.get(tree_url, headers=headers).json()
+    trees = requests.get(tree_url, headers=github_headers()).json()
     urls = ['{}/{}'.format(url, item['path']) for item in trees['tree'] if tag in item['path']]
     return urls
 
 
+@timed('calibration')
 def find_calibration(inst_class, inst_serial, sampling_date):
     # find the links for the instrument class we are after
     links = list_directories('{}/oceanobservatories/asset-management/contents'.format(GIT), inst_class)
@@ -6,10 +6,13 @@
 @author Christopher Wingard
 @brief Create an ERDDAP dataset snippet by reading a NetCDF CF-1.6 DSG featureType=TimeSeries file
 """
+import glob
+import json
 import numpy as np
 import netCDF4
 import os
 
+from concurrent.futures import ProcessPoolExecutor
 from jinja2 import Environment, FileSystemLoader
 from cgsn_processing.process.common import InputError, inputs
 
@@ -41,12 +44,134 @@ DMAP = {
     'string8': 'String'
     }
 
+# maximum number of values read into memory at once when calculating the variable statistics
+CHUNK_SIZE = 2 ** 20
 
-def variable_info(nc, dmap=None):
+# name of the file, saved in the dataset directory, used to cache the per-file variable statistics
+STATS_CACHE = '.variable_stats.json'
+
+
+def variable_stats(var, chunk_size=CHUNK_SIZE):
+    """
+    Calculate the minimum and maximum of a NetCDF variable in a single pass,
+    reading the data in chunks along the longest dimension of the variable
+    to bound the memory used for the large 2D variables (e.g. ADCP and OPTAA).
+
+    :param var: NetCDF4 variable
+    :param chunk_size: maximum number of values to read at once
+    :return vmin, vmax: minimum and maximum values (None if all values are
+        masked or NaN)
+    """
+    vmin = vmax = None
+    if var.size == 0:
+        return vmin, vmax
+
+    if var.ndim == 0:
+        chunks = [()]
+    else:
+        axis = int(np.argmax(var.shape))
+        nrows = max(1, chunk_size // (var.size // var.shape[axis]))
+        chunks = []
+        for i in range(0, var.shape[axis], nrows):
+            index = [slice(None)] * var.ndim
+            index[axis] = slice(i, i + nrows)
+            chunks.append(tuple(index))
+
+    for index in chunks:
+        data = np.ma.compressed(var[index])
+        if data.dtype.kind == 'f':
+            data = data[~np.isnan(data)]
+        if data.size == 0:
+            continue
+        cmin = data.min().item()
+        cmax = data.max().item()
+        vmin = cmin if vmin is None else min(vmin, cmin)
+        vmax = cmax if vmax is None else max(vmax, cmax)
+
+    return vmin, vmax
+
+
+def file_stats(ncfile, dmap=None):
+    """
+    Calculate the minimum and maximum values for every non-string variable in
+    a NetCDF file.
+
+    :param ncfile: NetCDF file name with the full, absolute path
+    :param dmap: dictionary mapping the NetCDF data types to ERDDAP types
+    :return stats: dictionary of [minimum, maximum] values keyed on the
+        variable name
+    """
+    if dmap is None:
+        dmap = DMAP
+
+    stats = {}
+    with netCDF4.Dataset(ncfile) as nc:
+        for var in nc.variables:
+            if dmap.get(nc[var].datatype.name, 'String') != 'String':
+                stats[var] = list(variable_stats(nc[var]))
+
+    return stats
+
+
+def dataset_stats(inpath, workers=None):
+    """
+    Calculate the minimum and maximum values for every variable across all of
+    the NetCDF files in a dataset directory. Files are processed in parallel
+    and the per-file results are cached in the dataset directory, keyed on the
+    file modification time, so only new or updated files are read on later
+    calls.
+
+    :param inpath: dataset directory
+    :param workers: number of worker processes (defaults to the number of CPUs)
+    :return stats: dictionary of [minimum, maximum] values keyed on the
+        variable name
+    """
+    cache_file = os.path.join(inpath, STATS_CACHE)
+    cache = {}
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+
+    # determine which files need to be (re)read
+    ncfiles = sorted(glob.glob(os.path.join(inpath, '*.nc')))
+    mtimes = {os.path.basename(f): os.path.getmtime(f) for f in ncfiles}
+    update = [f for f in ncfiles if os.path.basename(f) not in cache or
+              cache[os.path.basename(f)]['mtime'] != mtimes[os.path.basename(f)]]
+
+    if update:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for ncfile, stats in zip(update, executor.map(file_stats, update)):
+                cache[os.path.basename(ncfile)] = {'mtime': mtimes[os.path.basename(ncfile)], 'stats': stats}
+
+    # drop any files that have since been removed and save the updated cache
+    cache = {k: v for k, v in cache.items() if k in mtimes}
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f)
+
+    # combine the per-file statistics
+    stats = {}
+    for entry in cache.values():
+        for var, (vmin, vmax) in entry['stats'].items():
+            smin, smax = stats.get(var, [None, None])
+            if vmin is not None:
+                smin = vmin if smin is None else min(smin, vmin)
+            if vmax is not None:
+                smax = vmax if smax is None else max(smax, vmax)
+            stats[var] = [smin, smax]
+
+    return stats
+
+
+def variable_info(nc, dmap=None, stats=None):
     """
     Assign the sourceName, destinationName, ioos_category, dataType, colorBarMinimum and colorBarMaximum to the
-    <dataVariable> tag in the dataset.xml based on attributes in the NetCDF4 file for each variable.
+    <dataVariable> tag in the dataset.xml based on attributes in the NetCDF4 file for each variable. The colorBar
+    limits are set from the precomputed statistics (see dataset_stats), if provided, otherwise they are calculated
+    from the NetCDF4 file.
     """
+    if dmap is None:
+        dmap = DMAP
+
     dvars = {}
     for var in list(nc.variables):
         # begin by setting the defaults for all variables.
@@ -65,13 +190,13 @@ def variable_info(nc, dmap=None):
             'colorBarMaximum': None
             }
         # calculate the colorBar limits
-        if erddap_type is not 'String':
-            dvars[var]['colorBarMinimum'] = nc[var][:].min()
-            dvars[var]['colorBarMaximum'] = nc[var][:].max()
-        if np.ma.is_masked(dvars[var]['colorBarMaximum']):
-            dvars[var]['colorBarMaximum'] = None
-        if np.ma.is_masked(dvars[var]['colorBarMinimum']):
-            dvars[var]['colorBarMinimum'] = None
+        if erddap_type != 'String':
+            if stats is not None and var in stats:
+                vmin, vmax = stats[var]
+            else:
+                vmin, vmax = variable_stats(nc[var])
+            dvars[var]['colorBarMinimum'] = vmin
+            dvars[var]['colorBarMaximum'] = vmax
 
     # reset the destinationName, ioos_category, dataType and colorBar limits for the coordinate variables
     tvar = nc.get_variables_by_attributes(standard_name='time')[0]
@@ -116,7 +241,8 @@ def variable_info(nc, dmap=None):
 def main(argv=None):
     """
     Load a NetCDF file to use as a template for creating the dataset.xml file, set the dataset ID and create the
-    dataset based on the timeSeries.xml template.
+    dataset based on the timeSeries.xml template. If the switch is set to "all", the colorBar limits are calculated
+    from all of the NetCDF files in the dataset directory rather than just the template file.
     """
     # load the input arguments, pulling in the paths and file names of the input and output files as well as the
     # dataset ID.
@@ -129,7 +255,10 @@ def main(argv=None):
     nc = netCDF4.Dataset(os.path.join(inpath, infile))
     cdm_timeseries_variables = 'latitude, longitude, crs, platform'
     keywords = ','.join(list(nc.variables))
-    dvars = variable_info(nc, dmap=DMAP)
+    stats = None
+    if args.switch == 'all':
+        stats = dataset_stats(inpath)
+    dvars = variable_info(nc, dmap=DMAP, stats=stats)
     if 'timeSeries' in nc.featureType:
         template = ENV.get_template('timeSeries.xml')
         ds_xml = template.render(datasetID=datasetID,
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.process.merge_profiles
+@file cgsn_processing/process/merge_profiles.py
+@author Christopher Wingard
+@brief Merge the cProfile statistics saved by the processors across many input files
+"""
+import argparse
+import glob
+import os
+import pstats
+import sys
+
+# sort orders accepted by pstats that are useful for finding the hot spots
+SORT_KEYS = ['cumulative', 'tottime', 'ncalls', 'pcalls', 'filename', 'name']
+
+
+def find_profiles(paths, processor=None):
+    """
+    Find the pstats files written by the processors (see common.start_cprofile).
+
+    :param paths: list of pstats files, directories (all *.prof files are
+        used) or glob patterns
+    :param processor: only use the files for this processor (e.g. proc_optaa)
+    :return files: sorted list of the pstats files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '*.prof')))
+        else:
+            files.extend(glob.glob(path))
+
+    if processor:
+        files = [f for f in files if os.path.basename(f).startswith(processor + '.')]
+
+    return sorted(set(files))
+
+
+def merge_profiles(files, outfile=None):
+    """
+    Combine the statistics from many pstats files, so the hot spots can be
+    found across a deployment (or a whole array) rather than a single file.
+
+    :param files: list of pstats files
+    :param outfile: optional file name to save the merged statistics to (can be
+        used with the same tools as the individual files)
+    :return stats: the merged pstats.Stats object, or None if there are no
+        files
+    """
+    if not files:
+        return None
+
+    stats = pstats.Stats(files[0])
+    for fname in files[1:]:
+        stats.add(fname)
+
+    if outfile:
+        stats.dump_stats(outfile)
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge the cProfile statistics saved by the processors')
+    parser.add_argument('paths', nargs='+',
+                        help='pstats files, directories of them, or glob patterns')
+    parser.add_argument('-m', '--processor', dest='processor', type=str, required=False,
+                        help='Only merge the files for this processor (e.g. proc_optaa)')
+    parser.add_argument('-o', '--outfile', dest='outfile', type=str, required=False,
+                        help='Save the merged statistics to a pstats file')
+    parser.add_argument('-s', '--sort', dest='sort', type=str, default='cumulative', choices=SORT_KEYS,
+                        help='Sort order for the report')
+    parser.add_argument('-n', '--top', dest='top', type=int, default=30,
+                        help='Number of functions to list in the report')
+    args = parser.parse_args(argv)
+
+    files = find_profiles(args.paths, args.processor)
+    stats = merge_profiles(files, args.outfile)
+    if stats is None:
+        print('No profiling statistics were found')
+        return 1
+
+    print('Merged the statistics from {} file(s)'.format(len(files)))
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
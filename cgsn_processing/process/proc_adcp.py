@@ -11,9 +11,9 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import ENCODING, inputs, dict_update, epoch_time, json2obj, \
-    json_obj2df, colocated_ctd, update_dataset
-from cgsn_processing.process.configs.attr_adcp import ADCP, PD0, PD8, DERIVED
+from cgsn_processing.process.common import write_dataset, inputs, merge_attrs, epoch_time, json2obj, \
+    json_obj2df, colocated_ctd, update_dataset, interp_colocated
+from cgsn_processing.process.configs import load_attrs
 from cgsn_processing.process.configs.attr_common import SHARED
 
 from pyseas.data.generic_functions import magnetic_declination
@@ -79,16 +79,11 @@ def proc_adcp(infile, platform, deployment, lat, lon, depth, **kwargs):
     if ctd_name:
         ctd = colocated_ctd(infile, ctd_name)
 
-    if not ctd.empty:
-        # test to see if the CTD covers our time of interest for this ADCP file
-        td = pd.Timedelta('1h')
-        coverage = ctd['time'].min() - td <= df['time'].min() and ctd['time'].max() + td >= df['time'].max()
-
-        # reset initial estimate of deployment depth based on if we have full coverage
-        if coverage:
-            dbar = np.interp(data['time'], ctd['time'], ctd.pressure)
-            depth_m = -1 * z_from_p(dbar, lat)
-            depth_flag = True   # full time-based array of depth values
+    # reset initial estimate of deployment depth if the CTD covers our time of interest for this ADCP file
+    block = interp_colocated(time, ctd, ['pressure'])
+    if block is not None:
+        depth_m = -1 * z_from_p(block['pressure'].values, lat)
+        depth_flag = True   # full time-based array of depth values
 
     # determine the magnetic declination for later use in correcting the eastward and northward velocity components
     theta = magnetic_declination(lat, lon, time)
@@ -218,7 +213,7 @@ def proc_adcp(infile, platform, deployment, lat, lon, depth, **kwargs):
 
         # combine it all into one data set
         adcp = xr.merge([glbl, fx, bd, vbl, rtc, vel, cor, echo, back, per])
-        adcp_attrs = PD0    # use the PD0 attributes
+        adcp_attrs = load_attrs('PD0')    # use the PD0 attributes
 
     elif adcp_type.lower() == 'pd8':
         # load the subset of variable header data included with a PD8 dataset
@@ -284,7 +279,7 @@ def proc_adcp(infile, platform, deployment, lat, lon, depth, **kwargs):
 
         # combine it all into one data set
         adcp = xr.merge([glbl, vbl, bd, vel, echo, back])
-        adcp_attrs = PD8    # use the PD8 attributes
+        adcp_attrs = load_attrs('PD8')    # use the PD8 attributes
     else:
         # Unknown ADCP type, exiting function
         return None
@@ -293,11 +288,9 @@ def proc_adcp(infile, platform, deployment, lat, lon, depth, **kwargs):
     vmax = adcp.bin_depth.max().values
     vmin = adcp.bin_depth.min().values
 
-    # add to the global attributes for the ADCP
-    attrs = dict_update(ADCP, adcp_attrs)   # merge default and PD0 attribute dictionaries into a single dictionary
-    attrs = dict_update(attrs, DERIVED)     # add the derived attributes
-    attrs = dict_update(attrs, SHARED)      # add the shared attributes
-    adcp = update_dataset(adcp, platform, deployment, lat, lon, [depth, vmin, vmax], attrs)
+    # add to the global attributes for the ADCP (default, PD0/PD8, derived and shared attributes)
+    attrs = merge_attrs(load_attrs('ADCP'), adcp_attrs, load_attrs('DERIVED'), SHARED)
+    adcp = update_dataset(adcp, platform, deployment, lat, lon, [depth, vmin, vmax], attrs, low_memory=True)
     adcp.attrs['processing_level'] = 'processed'
 
     # return the final processed dataset
@@ -323,7 +316,7 @@ def main(argv=None):
     adcp = proc_adcp(infile, platform, deployment, lat, lon, depth, adcp_type=adcp_type, ctd_name=ctd_name,
                      bin_size=bin_size, blanking_distance=blanking_distance)
     if adcp:
-        adcp.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(adcp, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
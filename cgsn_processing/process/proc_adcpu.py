@@ -11,7 +11,7 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import ENCODING, inputs, dict_update, json2obj, update_dataset
+from cgsn_processing.process.common import write_dataset, inputs, merge_attrs, json2obj, update_dataset
 from cgsn_processing.process.configs.attr_adcpu import ADCPU
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -141,8 +141,8 @@ def proc_adcpu(infile, platform, deployment, lat, lon, depth):
     adcpu = xr.merge([glbl_ds, cell_ds, cfg_ds, sen_ds, cur_ds])
 
     # Add in attributes
-    attrs = dict_update(ADCPU, SHARED)
-    adcpu = update_dataset(adcpu, platform, deployment, lat, lon, [depth, 0.0, depth], attrs)
+    attrs = merge_attrs(ADCPU, SHARED)
+    adcpu = update_dataset(adcpu, platform, deployment, lat, lon, [depth, 0.0, depth], attrs, low_memory=True)
     adcpu.attrs['processing_level'] = 'processed'
 
     return adcpu
@@ -162,7 +162,7 @@ def main(argv=None):
     # process the ADCP data and save the results to disk
     adcpu = proc_adcpu(infile, platform, deployment, lat, lon, depth)
     if adcpu:
-        adcpu.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(adcpu, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
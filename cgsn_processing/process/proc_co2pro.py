@@ -11,7 +11,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import ENCODING, inputs, json2df, dict_update, update_dataset
+from cgsn_processing.process.common import write_dataset, inputs, json2df, merge_attrs, update_dataset
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.configs.attr_co2pro import PCO2W
 
@@ -47,7 +47,7 @@ def proc_co2pro(infile, platform, deployment, lat, lon, depth):
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     co2['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(co2.time)).astype(str))
-    attrs = dict_update(PCO2W, SHARED)  # add the shared the attributes
+    attrs = merge_attrs(PCO2W, SHARED)  # add the shared the attributes
     co2 = update_dataset(co2, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     return co2
 
@@ -72,7 +72,7 @@ def main(argv=None):
     # process the CTDBP data and save the results to disk
     co2 = proc_co2pro(infile, platform, deployment, lat, lon, depth)
     if co2:
-        co2.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(co2, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
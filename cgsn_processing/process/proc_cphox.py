@@ -15,7 +15,7 @@ import xarray as xr
 from calendar import timegm
 from gsw import SA_from_SP, pt0_from_t, CT_from_pt, sigma0, z_from_p
 
-from cgsn_processing.process.common import ENCODING, inputs, json2df, dict_update, update_dataset
+from cgsn_processing.process.common import write_dataset, inputs, json2df, merge_attrs, update_dataset
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.configs.attr_cphox import CPHOX
 
@@ -223,7 +223,7 @@ def proc_cphox(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     cphox['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(cphox.time)).astype(str))
-    attrs = dict_update(CPHOX, SHARED)  # add the shared the attributes
+    attrs = merge_attrs(CPHOX, SHARED)  # add the shared the attributes
     cphox = update_dataset(cphox, platform, deployment, lat, lon, darray, attrs)
     return cphox
 
@@ -252,7 +252,7 @@ def main(argv=None):
     # process the SeapHOx data and save the results to disk
     cphox = proc_cphox(infile, platform, deployment, lat, lon, depth, estimated=estimated)
     if cphox:
-        cphox.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(cphox, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.process.proc_cspp
+@file cgsn_processing/process/proc_cspp.py
+@author Christopher Wingard
+@brief Processes all the uCSPP sensor data files from a deployment, profile by profile
+"""
+import functools
+import glob
+import os
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from cgsn_processing.process.common import inputs, json2df, write_dataset, write_netcdf, cspp_profile_id
+from cgsn_processing.process.proc_cspp_ctdpf import proc_cspp_ctdpf
+from cgsn_processing.process.proc_cspp_dosta import proc_cspp_dosta
+from cgsn_processing.process.proc_cspp_flort import proc_cspp_flort
+from cgsn_processing.process.proc_cspp_nutnr import proc_cspp_nutnr
+from cgsn_processing.process.proc_cspp_optaa import proc_cspp_optaa
+from cgsn_processing.process.proc_cspp_parad import proc_cspp_parad
+from cgsn_processing.process.proc_cspp_spkir import proc_cspp_spkir
+from cgsn_processing.process.proc_cspp_velpt import proc_cspp_velpt
+from cgsn_processing.process.proc_cspp_wc_hmr import proc_cspp_wc_hmr
+from cgsn_processing.process.proc_cspp_wc_sbe import proc_cspp_wc_sbe
+from cgsn_processing.process.proc_cspp_wc_wm import proc_cspp_wc_wm
+
+# the uCSPP sensors, with the parsed and processed data sub-directory, the file name suffixes (in order of preference,
+# the full resolution PPB files before the decimated PPD files) and the processor for each. the CTDPF is listed first,
+# as its data is used by the sensors in CO_LOCATED.
+SENSORS = OrderedDict([
+    ('ctdpf', ('ctdpf', ['_PPB_CTD', '_PPD_CTD'], proc_cspp_ctdpf)),
+    ('dosta', ('dosta', ['_PPB_OPT', '_PPD_OPT'], proc_cspp_dosta)),
+    ('flort', ('flort', ['_PPB_TRIP', '_PPD_TRIP'], proc_cspp_flort)),
+    ('parad', ('parad', ['_PPB_PARS', '_PPD_PARS'], proc_cspp_parad)),
+    ('spkir', ('spkir', ['_PPB_OCR', '_PPD_OCR'], proc_cspp_spkir)),
+    ('velpt', ('velpt', ['_PPB_ADCP', '_PPD_ADCP'], proc_cspp_velpt)),
+    ('nutnr', ('nutnr', ['_SNA_SNA'], proc_cspp_nutnr)),
+    ('optaa', ('optaa', ['_ACS_ACS'], proc_cspp_optaa)),
+    ('wc_hmr', ('winch', ['_WC_HMR'], proc_cspp_wc_hmr)),
+    ('wc_sbe', ('winch', ['_WC_SBE'], proc_cspp_wc_sbe)),
+    ('wc_wm', ('winch', ['_WC_WM'], proc_cspp_wc_wm)),
+])
+
+# sensors using the co-located CTDPF data from the same profile
+CO_LOCATED = ['dosta', 'flort', 'nutnr', 'optaa']
+
+
+def find_profiles(indir):
+    """
+    Find the parsed uCSPP data files for all the sensors in a deployment and
+    group them by the profile they were recorded during (see cspp_profile_id).
+
+    :param indir: parsed data directory for the deployment, with a
+        sub-directory for each sensor (see SENSORS)
+    :return profiles: ordered dictionary of the profiles, each with the file
+        name prefix shared by the profile's files and a dictionary of the
+        parsed data file for each sensor (preferring the PPB files, see SENSORS)
+    """
+    profiles = {}
+    for sensor, (subdir, suffixes, _) in SENSORS.items():
+        for suffix in suffixes:
+            for infile in glob.glob(os.path.join(indir, subdir, 'ucspp_*{}.json'.format(suffix))):
+                profile_id = cspp_profile_id(infile)
+                prefix = os.path.basename(infile)[:-len(suffix + '.json')]
+                # keep the first file found, so a decimated (PPD) file never replaces a full resolution (PPB) one
+                profiles.setdefault(profile_id, {'prefix': prefix, 'files': {}})['files'].setdefault(sensor, infile)
+
+    # sort the profiles by ID, and the sensor files into the order they are processed in
+    profiles = OrderedDict(sorted(profiles.items()))
+    for profile in profiles.values():
+        profile['files'] = OrderedDict((s, profile['files'][s]) for s in SENSORS if s in profile['files'])
+
+    return profiles
+
+
+def process_profile(files, platform, deployment, lat, lon, depth, **kwargs):
+    """
+    Process the data files recorded by the sensors during a single profile.
+    The CTDPF data is loaded once and shared with the processors for the
+    sensors that use it (see CO_LOCATED), rather than each of them loading it
+    again.
+
+    :param files: dictionary of the parsed data file for each sensor
+    :param platform: Site name where the CSPP is deployed
+    :param deployment: name of the deployment for the input data files.
+    :param lat: latitude of the CSPP deployment.
+    :param lon: longitude of the CSPP deployment.
+    :param depth: site depth where the CSPP is deployed
+    **flr_serial: serial number of the FLORT
+    **par_serial: serial number of the PARAD
+    **suna_serial: serial number of the SUNA (NUTNR)
+
+    :return results: list of the sensor name, parsed data file and processed
+        data set for each of the sensors with data
+    """
+    # load the CTDPF data once for the profile, if needed
+    ctd = None
+    if 'ctdpf' in files:
+        ctd = json2df(files['ctdpf'])
+
+    # the keyword arguments used by each of the sensor processors
+    options = {
+        'ctdpf': {'ctd': ctd},
+        'dosta': {'ctd': ctd},
+        'flort': {'ctd': ctd, 'serial_number': kwargs.get('flr_serial')},
+        'nutnr': {'ctd': ctd, 'suna_serial': kwargs.get('suna_serial')},
+        'optaa': {'ctd': ctd},
+        'parad': {'par_serial': kwargs.get('par_serial')}
+    }
+
+    results = []
+    for sensor, infile in files.items():
+        processor = SENSORS[sensor][2]
+        ds = processor(infile, platform, deployment, lat, lon, depth, **options.get(sensor, {}))
+        if ds is not None:
+            results.append((sensor, infile, ds))
+
+    return results
+
+
+def _save_profile(prefix, results, outdir, bundle, writer):
+    """
+    Save the processed data from a profile, either to the sensor files or as a
+    bundle, returning the list of files written.
+    """
+    if not results:
+        return []
+
+    if bundle:
+        # one file per profile, with a group for each sensor
+        outfile = os.path.join(outdir, prefix + '.nc')
+        os.makedirs(outdir, exist_ok=True)
+        for i, (sensor, _, ds) in enumerate(results):
+            write_netcdf(ds, outfile, group=sensor, mode='a' if i else 'w')
+        return [outfile]
+
+    outfiles = []
+    for sensor, infile, ds in results:
+        name = os.path.basename(infile)[:-5]
+        if writer != 'daily':
+            # drop the profile number, so the profiles are combined in the deployment or monthly files
+            name = 'ucspp' + name[len(prefix):]
+
+        outfile = os.path.join(outdir, SENSORS[sensor][0], name + '.nc')
+        if writer == 'daily' and os.path.isfile(outfile):
+            continue  # the CTDPF data was only reprocessed for the co-located sensors
+
+        os.makedirs(os.path.dirname(outfile), exist_ok=True)
+        write_dataset(ds, outfile, writer=writer)
+        outfiles.append(outfile)
+
+    return outfiles
+
+
+def _process_profile(item, platform, deployment, lat, lon, depth, outdir, bundle, writer, kwargs):
+    """
+    Process a single profile for proc_cspp, run in the worker processes. The
+    files used only by this profile (the daily sensor files or the bundle) are
+    written here, by the workers, while the data appended to the deployment or
+    monthly files is returned to be saved by the main process, one profile at
+    a time.
+    """
+    prefix, files = item
+    results = process_profile(files, platform, deployment, lat, lon, depth, **kwargs)
+    if bundle or writer == 'daily':
+        return prefix, [], _save_profile(prefix, results, outdir, bundle, writer)
+
+    return prefix, results, []
+
+
+def proc_cspp(indir, outdir, platform, deployment, lat, lon, depth, **kwargs):
+    """
+    Processes all the uCSPP sensor data files from a deployment, grouping the
+    files by profile so the CTDPF data is loaded once per profile and shared
+    by the sensors that use it (see process_profile). The profiles are spread
+    across a pool of worker processes, which also write the per-profile
+    files. The first profile with data from each sensor is processed before
+    the rest, so the calibration coefficients are found and saved to the
+    sensor directories once (see the individual processors) rather than by
+    each of the workers.
+
+    By default, the processed data from each sensor is saved to a file per
+    profile in the sensor sub-directories of the output directory, the same
+    as processing the files one at a time (see process_ucspp.sh). Profiles
+    already processed are skipped. Alternatively, the data from all the
+    sensors can be saved as a bundle, in a single file per profile with a
+    NetCDF group for each of the sensors. With the deployment or monthly
+    writers, the profiles are appended to a file per sensor by this process.
+
+    :param indir: parsed data directory for the deployment, with a
+        sub-directory for each sensor
+    :param outdir: processed data directory for the deployment
+    :param platform: Site name where the CSPP is deployed
+    :param deployment: name of the deployment for the input data files.
+    :param lat: latitude of the CSPP deployment.
+    :param lon: longitude of the CSPP deployment.
+    :param depth: site depth where the CSPP is deployed
+    **flr_serial: serial number of the FLORT
+    **par_serial: serial number of the PARAD
+    **suna_serial: serial number of the SUNA (NUTNR)
+    **bundle: save the data from all the sensors in a single file per profile
+    **writer: writer used for the sensor files (see write_dataset)
+    **workers: number of worker processes used to process the profiles
+        (default is 1, processing the profiles in this process)
+
+    :return outfiles: list of the files written
+    """
+    bundle = kwargs.pop('bundle', False)
+    writer = kwargs.pop('writer', 'daily')
+    workers = kwargs.pop('workers', None) or 1
+
+    # find the profiles, skipping the ones already processed
+    profiles = find_profiles(indir)
+    todo = OrderedDict()
+    for profile_id, profile in profiles.items():
+        if bundle:
+            outfile = os.path.join(outdir, profile['prefix'] + '.nc')
+            if not os.path.isfile(outfile):
+                todo[profile_id] = profile['files']
+            continue
+
+        files = OrderedDict()
+        for sensor, infile in profile['files'].items():
+            outfile = os.path.join(outdir, SENSORS[sensor][0], os.path.basename(infile)[:-5] + '.nc')
+            if writer != 'daily' or not os.path.isfile(outfile):
+                files[sensor] = infile
+
+        # the CTDPF data is always loaded if one of the sensors using it still needs to be processed
+        if 'ctdpf' in profile['files'] and any(s in files for s in CO_LOCATED):
+            files['ctdpf'] = profile['files']['ctdpf']
+            files.move_to_end('ctdpf', last=False)
+        if files:
+            todo[profile_id] = files
+
+    # set aside the first profile with data from each sensor, to find the calibration coefficients
+    first = []
+    for sensor in SENSORS:
+        profile_id = next((p for p, files in todo.items() if sensor in files), None)
+        if profile_id is not None and profile_id not in first:
+            first.append(profile_id)
+    rest = [(profiles[p]['prefix'], files) for p, files in todo.items() if p not in first]
+    first = [(profiles[p]['prefix'], todo[p]) for p in sorted(first)]
+
+    # process the profiles, in parallel if requested, saving the data returned for the shared files as it comes back
+    process = functools.partial(_process_profile, platform=platform, deployment=deployment, lat=lat, lon=lon,
+                                depth=depth, outdir=outdir, bundle=bundle, writer=writer, kwargs=kwargs)
+    outfiles = []
+    for item in first:
+        prefix, results, written = process(item)
+        outfiles.extend(written + _save_profile(prefix, results, outdir, bundle, writer))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for prefix, results, written in executor.map(process, rest):
+                outfiles.extend(written + _save_profile(prefix, results, outdir, bundle, writer))
+    else:
+        for item in rest:
+            prefix, results, written = process(item)
+            outfiles.extend(written + _save_profile(prefix, results, outdir, bundle, writer))
+
+    return outfiles
+
+
+def main(argv=None):
+    # load the input arguments
+    args = inputs(argv)
+    indir = os.path.abspath(args.infile)
+    outdir = os.path.abspath(args.outfile)
+    platform = args.platform
+    deployment = args.deployment
+    lat = args.latitude
+    lon = args.longitude
+    depth = args.depth
+
+    # instrument serial numbers (FLORT, PARAD and SUNA), the calibrations for the others are found from their data
+    flr_serial = args.flr_serial
+    par_serial = args.par_serial
+    suna_serial = args.serial
+
+    # process all the profiles in the deployment and save the results to disk
+    bundle = args.switch == 'bundle'
+    proc_cspp(indir, outdir, platform, deployment, lat, lon, depth, flr_serial=flr_serial, par_serial=par_serial,
+              suna_serial=suna_serial, bundle=bundle, writer=args.writer, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
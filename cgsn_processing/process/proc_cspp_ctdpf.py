@@ -9,17 +9,16 @@
 """
 import numpy as np
 import os
-import re
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_CTDPF
 from cgsn_processing.process.configs.attr_common import SHARED
 
 from gsw import z_from_p, SP_from_C, CT_from_t, SA_from_SP, rho
 
 
-def proc_cspp_ctdpf(infile, platform, deployment, lat, lon, depth):
+def proc_cspp_ctdpf(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     Main CTDPF processing function. Loads the JSON formatted parsed data and
     creates a NetCDF dataset with the processed data, adding salinity and 
@@ -31,11 +30,14 @@ def proc_cspp_ctdpf(infile, platform, deployment, lat, lon, depth):
     :param lat: latitude of the CSPP deployment.
     :param lon: longitude of the CSPP deployment.
     :param depth: site depth where the CSPP is deployed
+    **ctd: Data frame with the parsed CTDPF data, if already loaded (e.g. by
+        proc_cspp), used instead of loading the data from the input file
 
     :return ctdpf: xarray dataset with the processed CTDPF data
     """
-    # load the json data file and return a panda dataframe
-    df = json2df(infile)
+    # load the json data file and return a panda dataframe (copying the data if already loaded, as it is updated below)
+    df = kwargs.get('ctd')
+    df = json2df(infile) if df is None else df.copy()
     if df.empty:
         # there was no data in this file, ending early
         return None
@@ -60,16 +62,13 @@ def proc_cspp_ctdpf(infile, platform, deployment, lat, lon, depth):
     ctdpf = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     ctdpf['deploy_id'] = xr.Variable('time', np.tile(deployment, len(ctdpf.time)).astype(str))
     ctdpf['profile_id'] = xr.Variable('time', np.tile(profile_id, len(ctdpf.time)).astype(str))
 
-    attrs = dict_update(CSPP_CTDPF, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_CTDPF, CSPP, SHARED)  # add the shared CSPP and common attributes
     ctdpf = update_dataset(ctdpf, platform, deployment, lat, lon, depth_range, attrs)
     ctdpf.attrs['processing_level'] = 'processed'
 
@@ -90,7 +89,7 @@ def main(argv=None):
     # process the CTDPF data and save the results to disk
     ctdpf = proc_cspp_ctdpf(infile, platform, deployment, lat, lon, depth)
     if ctdpf:
-        ctdpf.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(ctdpf, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -12,10 +12,10 @@ import re
 import pandas as pd
 import xarray as xr
 
-from datetime import timedelta
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, \
+    interp_colocated, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_DOSTA
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -43,11 +43,15 @@ def proc_cspp_dosta(infile, platform, deployment, lat, lon, depth, **kwargs):
         data will be used to apply salinity and density corrections to the
         data. Otherwise, the salinity corrected oxygen concentration is
         filled with NaN's
+    **ctd: Data frame with the parsed CTDPF data from the same profile, if
+        already loaded (e.g. by proc_cspp), used instead of loading the
+        CTD data from the ctd_name directory
 
     :return dosta: xarray dataset with the processed DOSTA data
     """
     # process the variable length keyword arguments
     ctd_name = kwargs.get('ctd_name')
+    ctd = kwargs.get('ctd')
 
     # load the json data file as a dataframe for further processing
     df = json2df(infile)
@@ -104,30 +108,21 @@ def proc_cspp_dosta(infile, platform, deployment, lat, lon, depth, **kwargs):
         df['svu_oxygen_concentration'] = svu
 
     # check for data from a co-located CTD and test to see if it covers our time range of interest.
-    ctd = pd.DataFrame()
-    if ctd_name:
-        ctd_file = re.sub('_OPT', '_CTD', os.path.basename(infile))
-        ctd_dir = re.sub('dosta', 'ctdpf', os.path.dirname(infile))
+    if ctd is None:
+        ctd = pd.DataFrame()
+        if ctd_name:
+            ctd_file = re.sub('_OPT', '_CTD', os.path.basename(infile))
+            ctd_dir = re.sub('dosta', 'ctdpf', os.path.dirname(infile))
 
-        if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
-            ctd = json2df(os.path.join(ctd_dir, ctd_file))
+            if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
+                ctd = json2df(os.path.join(ctd_dir, ctd_file))
 
     if proc_flag and not ctd.empty:
-        # set the CTD and DOSTA time to the same units of seconds since 1970-01-01
-        ctd_time = ctd.time.values.astype(float) / 10.0 ** 9
-        do_time = df.time.values.astype(float) / 10.0 ** 9
-
-        # test to see if the CTD covers our time of interest for this DOSTA file
-        td = timedelta(minutes=5)
-        coverage = ctd['time'].min() - td <= df['time'].min() and ctd['time'].max() + td >= df['time'].max()
-
-        # interpolate the CTD data if we have full coverage
-        if coverage:
-            temperature = np.interp(do_time, ctd_time, ctd.temperature)
-            df['ctd_temperature'] = temperature
-
-            salinity = np.interp(do_time, ctd_time, ctd.salinity)
-            df['ctd_salinity'] = salinity
+        # interpolate the CTD data if it covers our time of interest for this DOSTA file (within 5 minutes)
+        block = interp_colocated(df['time'], ctd, {'temperature': 'ctd_temperature', 'salinity': 'ctd_salinity'},
+                                 margin='5min')
+        if block is not None:
+            df[block.columns] = block.to_numpy()
 
             # calculate the pressure and salinity corrected oxygen concentration
             df['oxygen_concentration_corrected'] = do2_salinity_correction(df['svu_oxygen_concentration'].values,
@@ -139,16 +134,13 @@ def proc_cspp_dosta(infile, platform, deployment, lat, lon, depth, **kwargs):
     dosta = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     dosta['deploy_id'] = xr.Variable('time', np.tile(deployment, len(dosta.time)).astype(str))
     dosta['profile_id'] = xr.Variable('time', np.tile(profile_id, len(dosta.time)).astype(str))
 
-    attrs = dict_update(CSPP_DOSTA, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_DOSTA, CSPP, SHARED)  # add the shared CSPP and common attributes
     dosta = update_dataset(dosta, platform, deployment, lat, lon, depth_range, attrs)
     if proc_flag:
         dosta.attrs['processing_level'] = 'processed'
@@ -173,7 +165,7 @@ def main(argv=None):
     # process the DOSTA data and save the results to disk
     dosta = proc_cspp_dosta(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name)
     if dosta:
-        dosta.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(dosta, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -14,7 +14,8 @@ import xarray as xr
 
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, \
+    interp_colocated, CTD_COLUMNS, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_FLORT
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -43,11 +44,15 @@ def proc_cspp_flort(infile, platform, deployment, lat, lon, depth, **kwargs):
         data will be used to apply temperature and salinity corrections to
         the optical backscatter data. Otherwise, the optical backscatter
         data is filled with NaN's
+    **ctd: Data frame with the parsed CTDPF data from the same profile, if
+        already loaded (e.g. by proc_cspp), used instead of loading the
+        CTD data from the ctd_name directory
 
     :return flort: xarray dataset with the processed FLORT data
     """
     # process the variable length keyword arguments
     ctd_name = kwargs.get('ctd_name')
+    ctd = kwargs.get('ctd')
     serial_number = kwargs.get('serial_number')
 
     # load the json data file as a dataframe for further processing
@@ -100,47 +105,39 @@ def proc_cspp_flort(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # check for data from a co-located CTD and test to see if it covers our time range of interest.
     depth_range = [depth, 0.0, depth]  # default values for the global attributes
-    ctd = pd.DataFrame()
-    if ctd_name:
-        ctd_file = re.sub('_TRIP', '_CTD', os.path.basename(infile))
-        ctd_dir = re.sub('nutnr', 'ctdpf', os.path.dirname(infile))
+    if ctd is None:
+        ctd = pd.DataFrame()
+        if ctd_name:
+            ctd_file = re.sub('_TRIP', '_CTD', os.path.basename(infile))
+            ctd_dir = re.sub('nutnr', 'ctdpf', os.path.dirname(infile))
 
-        if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
-            ctd = json2df(os.path.join(ctd_dir, ctd_file))
+            if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
+                ctd = json2df(os.path.join(ctd_dir, ctd_file))
 
-    if not ctd.empty:
-        # interpolate the CTD data into the profile
-        pressure = np.interp(df['time'], ctd['time'], ctd['pressure'])
-        df['ctd_pressure'] = pressure
-
-        temperature = np.interp(df['time'], ctd['time'], ctd['temperature'])
-        df['ctd_temperature'] = temperature
-
-        salinity = np.interp(df['time'], ctd['time'], ctd['salinity'])
-        df['ctd_salinity'] = salinity
+    # interpolate the CTD data into the profile
+    block = interp_colocated(df['time'], ctd, CTD_COLUMNS, margin=None)
+    if block is not None:
+        df[block.columns] = block.to_numpy()
 
         # calculate the depth range for the NetCDF global attributes: deployment depth and the profile min/max range
         df['depth'] = -1 * z_from_p(df['ctd_pressure'], lat)
         depth_range = [depth, df['depth'].min(), df['depth'].max()]
 
         # calculate the optical backscatter using the CTD temperature and salinity data
-        df['bback'] = flo_bback_total(df['beta_700'], temperature, salinity, dev.coeffs['scatter_angle'],
-                                      dev.coeffs['wavelength'], dev.coeffs['chi_factor'])
+        df['bback'] = flo_bback_total(df['beta_700'], df['ctd_temperature'].values, df['ctd_salinity'].values,
+                                      dev.coeffs['scatter_angle'], dev.coeffs['wavelength'], dev.coeffs['chi_factor'])
 
     # create an xarray data set from the data frame
     flort = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     flort['deploy_id'] = xr.Variable('time', np.tile(deployment, len(flort.time)).astype(str))
     flort['profile_id'] = xr.Variable('time', np.tile(profile_id, len(flort.time)).astype(str))
 
-    attrs = dict_update(CSPP_FLORT, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_FLORT, CSPP, SHARED)  # add the shared CSPP and common attributes
     flort = update_dataset(flort, platform, deployment, lat, lon, depth_range, attrs)
     if proc_flag:
         flort.attrs['processing_level'] = 'processed'
@@ -166,7 +163,7 @@ def main(argv=None):
     # process the FLORT data and save the results to disk
     flort = proc_cspp_flort(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name, serial_number=serial)
     if flort:
-        flort.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(flort, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -12,13 +12,13 @@ import re
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, dt64_epoch
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, dt64_epoch, \
+    interp_colocated, CTD_COLUMNS, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_NUTNR
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
-from cgsn_processing.process.proc_nutnr import Calibrations
+from cgsn_processing.process.proc_nutnr import Calibrations, batch_corrected_nitrate
 
-from pyseas.data.nit_functions import ts_corrected_nitrate
 from gsw import z_from_p
 
 
@@ -43,12 +43,16 @@ def proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
         data will be used to apply salinity and density corrections to the
         data. Otherwise, the salinity corrected oxygen concentration is
         filled with NaN's
+    **ctd: Data frame with the parsed CTDPF data from the same profile, if
+        already loaded (e.g. by proc_cspp), used instead of loading the
+        CTD data from the ctd_name directory
 
     :return nutnr: xarray dataset with the processed DOSTA data
     """
     # process the variable length keyword arguments
     serial_number = kwargs.get('suna_serial')
     ctd_name = kwargs.get('ctd_name')
+    ctd = kwargs.get('ctd')
 
     # load the json data file as a dictionary object for further processing
     data = json2df(infile)
@@ -121,24 +125,19 @@ def proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     # default wavelength array if we are missing calibration coefficients
     wavelengths = np.linspace(start=190, stop=395, num=256)
 
-    ctd = pd.DataFrame()
-    if ctd_name:
-        ctd_file = re.sub('SNA_SNA', 'PPB_CTD', os.path.basename(infile))
-        ctd_dir = re.sub('nutnr', 'ctdpf', os.path.dirname(infile))
+    if ctd is None:
+        ctd = pd.DataFrame()
+        if ctd_name:
+            ctd_file = re.sub('SNA_SNA', 'PPB_CTD', os.path.basename(infile))
+            ctd_dir = re.sub('nutnr', 'ctdpf', os.path.dirname(infile))
 
-        if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
-            ctd = json2df(os.path.join(ctd_dir, ctd_file))
+            if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
+                ctd = json2df(os.path.join(ctd_dir, ctd_file))
 
-    if not ctd.empty:
-        # interpolate the CTD data into the profile
-        pressure = np.interp(data['time'], ctd['time'], ctd['pressure'])
-        df['ctd_pressure'] = pressure
-
-        temperature = np.interp(data['time'], ctd['time'], ctd['temperature'])
-        df['ctd_temperature'] = temperature
-
-        salinity = np.interp(data['time'], ctd['time'], ctd['salinity'])
-        df['ctd_salinity'] = salinity
+    # interpolate the CTD data into the profile
+    block = interp_colocated(data['time'], ctd, CTD_COLUMNS, margin=None)
+    if block is not None:
+        df[block.columns] = block.to_numpy()
 
     if proc_flag and not ctd.empty:
         # create the wavelengths array
@@ -146,10 +145,10 @@ def proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
 
         # Calculate the corrected nitrate concentration (uM) accounting for temperature and salinity and the pure
         # water calibration values.
-        df['corrected_nitrate'] = ts_corrected_nitrate(dev.coeffs['cal_temp'], wavelengths, dev.coeffs['eno3'],
-                                                       dev.coeffs['eswa'], dev.coeffs['di'], df['seawater_dark'],
-                                                       df['ctd_temperature'], df['ctd_salinity'], channels,
-                                                       df['measurement_type'])
+        df['corrected_nitrate'] = batch_corrected_nitrate(dev.coeffs['cal_temp'], wavelengths, dev.coeffs['eno3'],
+                                                          dev.coeffs['eswa'], dev.coeffs['di'], df['seawater_dark'],
+                                                          df['ctd_temperature'], df['ctd_salinity'], channels,
+                                                          df['measurement_type'])
 
         df['corrected_nitrogen_in_nitrate'] = df['corrected_nitrate'] / 1000 * 14.0067
 
@@ -169,9 +168,7 @@ def proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     nutnr = xr.merge([ds, ch])
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     nutnr['deploy_id'] = xr.Variable('time', np.tile(deployment, len(nutnr.time)).astype(str))
@@ -181,9 +178,8 @@ def proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     nutnr['depth'] = -1 * z_from_p(nutnr['ctd_pressure'], lat)
     depth_range = [depth, nutnr['depth'].min().values, df['depth'].max().values]
 
-    attrs = dict_update(CSPP_NUTNR, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
-    nutnr = update_dataset(nutnr, platform, deployment, lat, lon, depth_range, attrs)
+    attrs = merge_attrs(CSPP_NUTNR, CSPP, SHARED)  # add the shared CSPP and common attributes
+    nutnr = update_dataset(nutnr, platform, deployment, lat, lon, depth_range, attrs, low_memory=True)
     if proc_flag:
         nutnr.attrs['processing_level'] = 'processed'
     else:
@@ -208,7 +204,7 @@ def main(argv=None):
     # process the NUTNR data and save the results to disk
     nutnr = proc_cspp_nutnr(infile, platform, deployment, lat, lon, depth, suna_serial=serial, ctd_name=ctd_name)
     if nutnr:
-        nutnr.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(nutnr, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
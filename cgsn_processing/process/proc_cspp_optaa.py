@@ -14,7 +14,8 @@ import xarray as xr
 
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, json2obj, update_dataset, ENCODING, FILL_INT, dict_update
+from cgsn_processing.process.common import inputs, json2df, json2obj, update_dataset, write_dataset, FILL_INT, \
+    merge_attrs, interp_colocated, CTD_COLUMNS, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_OPTAA
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -43,11 +44,15 @@ def proc_cspp_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
         data will be used to apply salinity and density corrections to the
         data. Otherwise, the salinity corrected oxygen concentration is
         filled with NaN's
+    **ctd: Data frame with the parsed CTDPF data from the same profile, if
+        already loaded (e.g. by proc_cspp), used instead of loading the
+        CTD data from the ctd_name directory
 
     :return optaa: xarray dataset with the processed CSPP OPTAA data
     """
     # process the variable length keyword arguments
     ctd_name = kwargs.get('ctd_name')
+    ctd = kwargs.get('ctd')
 
     # load the instrument calibration data
     coeff_file = os.path.join(os.path.dirname(infile), 'optaa.cal_coeffs.json')
@@ -116,24 +121,19 @@ def proc_cspp_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
     df['external_temp'] = opt_external_temp(df['external_temp_raw'])
 
     # check for data from a co-located CTD and test to see if it covers our time range of interest.
-    ctd = pd.DataFrame()
-    if ctd_name:
-        ctd_file = re.sub('ACS_ACS', 'PPB_CTD', os.path.basename(infile))
-        ctd_dir = re.sub('optaa', 'ctdpf', os.path.dirname(infile))
+    if ctd is None:
+        ctd = pd.DataFrame()
+        if ctd_name:
+            ctd_file = re.sub('ACS_ACS', 'PPB_CTD', os.path.basename(infile))
+            ctd_dir = re.sub('optaa', 'ctdpf', os.path.dirname(infile))
 
-        if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
-            ctd = json2df(os.path.join(ctd_dir, ctd_file))
+            if os.path.isfile(os.path.join(ctd_dir, ctd_file)):
+                ctd = json2df(os.path.join(ctd_dir, ctd_file))
 
-    if not ctd.empty:
-        # interpolate the CTD data into the profile
-        pressure = np.interp(optaa_time, ctd['time'], ctd['pressure'])
-        df['ctd_pressure'] = pressure
-
-        temperature = np.interp(optaa_time, ctd['time'], ctd['temperature'])
-        df['ctd_temperature'] = temperature
-
-        salinity = np.interp(optaa_time, ctd['time'], ctd['salinity'])
-        df['ctd_salinity'] = salinity
+    # interpolate the CTD data into the profile (the OPTAA times are in epoch seconds, the CTD times are datetimes)
+    block = interp_colocated(optaa_time, ctd, CTD_COLUMNS, margin=None)
+    if block is not None:
+        df[block.columns] = block.to_numpy()
 
     # convert the 1D data frame to an xarray dataset
     ds = xr.Dataset.from_dataframe(df)
@@ -201,9 +201,7 @@ def proc_cspp_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
         optaa.attrs['processing_level'] = 'processed'
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     optaa['deploy_id'] = xr.Variable('time', np.tile(deployment, len(optaa.time)).astype(str))
@@ -213,9 +211,8 @@ def proc_cspp_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
     optaa['depth'] = -1 * z_from_p(optaa['ctd_pressure'], lat)
     depth_range = [depth, optaa['depth'].min().values, optaa['depth'].max().values]
 
-    attrs = dict_update(CSPP_OPTAA, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
-    optaa = update_dataset(optaa, platform, deployment, lat, lon, depth_range, attrs)
+    attrs = merge_attrs(CSPP_OPTAA, CSPP, SHARED)  # add the shared CSPP and common attributes
+    optaa = update_dataset(optaa, platform, deployment, lat, lon, depth_range, attrs, low_memory=True)
     optaa['wavelength_number'].attrs['actual_wavelengths'] = data['num_wavelengths'][0]
     if proc_flag:
         optaa.attrs['processing_level'] = 'processed'
@@ -246,7 +243,7 @@ def main(argv=None):
     # process the OPTAA data and save the results to disk
     optaa = proc_cspp_optaa(infile, platform, deployment, lat, lon, depth)
     if optaa:
-        optaa.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(optaa, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
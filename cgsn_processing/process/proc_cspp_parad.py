@@ -8,13 +8,13 @@
 """
 import numpy as np
 import os
-import re
 import pandas as pd
 import xarray as xr
 
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, Coefficients
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, Coefficients, \
+    cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_PARAD
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -128,16 +128,13 @@ def proc_cspp_parad(infile, platform, deployment, lat, lon, depth, **kwargs):
     parad = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     parad['deploy_id'] = xr.Variable('time', np.tile(deployment, len(parad.time)).astype(str))
     parad['profile_id'] = xr.Variable('time', np.tile(profile_id, len(parad.time)).astype(str))
 
-    attrs = dict_update(CSPP_PARAD, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_PARAD, CSPP, SHARED)  # add the shared CSPP and common attributes
     parad = update_dataset(parad, platform, deployment, lat, lon, depth_range, attrs)
     if proc_flag:
         parad.attrs['processing_level'] = 'processed'
@@ -162,7 +159,7 @@ def main(argv=None):
     # process the PARAD data and save the results to disk
     parad = proc_cspp_parad(infile, platform, deployment, lat, lon, depth, par_serial=serial)
     if parad:
-        parad.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(parad, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -9,21 +9,23 @@
 import numpy as np
 import os
 import pandas as pd
-import re
 import xarray as xr
 
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_SPKIR
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
-from cgsn_processing.process.proc_spkir import Calibrations
+from cgsn_processing.process.proc_spkir import Calibrations, ocr507_irradiance, add_irradiance
 
-from pyseas.data.opt_functions import opt_ocr507_irradiance
+# data types for the parsed uCSPP SPKIR data (see json2df)
+SCHEMA = {
+    'arrays': {'raw_channels': 'uint32'}
+}
 
 
-def proc_cspp_spkir(infile, platform, deployment, lat, lon, depth):
+def proc_cspp_spkir(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     Main SPKIR processing function. Loads the JSON formatted parsed data and
     applies appropriate calibration coefficients to convert the raw, parsed
@@ -38,11 +40,17 @@ def proc_cspp_spkir(infile, platform, deployment, lat, lon, depth):
     :param lat: latitude of the CSPP deployment.
     :param lon: longitude of the CSPP deployment.
     :param depth: site depth where the CSPP is deployed
+    **kwargs switch: Optional flag, set to 'wavelength' to save the irradiance
+        measurements as 2D (time, wavelength) variables rather than one
+        variable per wavelength (see proc_spkir.add_irradiance)
 
     :return spkir: xarray dataset with the processed SPKIR data
     """
+    # process the variable length keyword arguments
+    wavelength = kwargs.get('switch') == 'wavelength'
+
     # load the json data file as a dataframe for further processing
-    data = json2df(infile)
+    data, arrays = json2df(infile, SCHEMA)
     if data.empty:
         # json data file was empty, exiting
         return None
@@ -75,42 +83,19 @@ def proc_cspp_spkir(infile, platform, deployment, lat, lon, depth):
     df['time'] = pd.to_datetime(spkir_time, unit='s')
     df.set_index('time', drop=True, inplace=True)
 
-    # pop the raw_channels array out of the dataframe, will add them back in as individual, named variables
-    channels = np.array(np.vstack(data.pop('raw_channels')), dtype='uint32')
+    # the raw_channels array was loaded separately as a 2D array, will add it back in after the 1D data
+    channels = arrays['raw_channels']
 
     # set up and load the 1D parsed data into the data frame
     for v in data.columns:
         if v not in ['time']:
             df[v] = np.atleast_1d(data[v])
 
-    # convert raw voltages and the instrument temperature to engineering units
-    df['input_voltage'].apply(lambda x: x * 0.03)
-    df['analog_rail_voltage'].apply(lambda x: x * 0.03)
-    df['internal_temperature'].apply(lambda x: -50 + x * 0.5)
-
-    # add the raw, downwelling spectral irradiance measurements to the dataframe per wavelength
-    df['raw_irradiance_412'] = channels[:, 0]
-    df['raw_irradiance_444'] = channels[:, 1]
-    df['raw_irradiance_490'] = channels[:, 2]
-    df['raw_irradiance_510'] = channels[:, 3]
-    df['raw_irradiance_555'] = channels[:, 4]
-    df['raw_irradiance_620'] = channels[:, 5]
-    df['raw_irradiance_683'] = channels[:, 6]
-
     # Convert raw spectral irradiance values from count to uW cm-2 nm-1
     if proc_flag:
-        ed = opt_ocr507_irradiance(channels, dev.coeffs['offset'], dev.coeffs['scale'], dev.coeffs['immersion_factor'])
+        ed = ocr507_irradiance(channels, dev.coeffs)
     else:
-        ed = channels.astype(float) * np.nan
-
-    # add the converted downwelling spectral irradiance measurements to the dataframe per wavelength
-    df['downwelling_irradiance_412'] = ed[:, 0]
-    df['downwelling_irradiance_444'] = ed[:, 1]
-    df['downwelling_irradiance_490'] = ed[:, 2]
-    df['downwelling_irradiance_510'] = ed[:, 3]
-    df['downwelling_irradiance_555'] = ed[:, 4]
-    df['downwelling_irradiance_620'] = ed[:, 5]
-    df['downwelling_irradiance_683'] = ed[:, 6]
+        ed = np.full(channels.shape, np.nan)
 
     # rename the depth to ctd_pressure and then calculate the depth range for the NetCDF global attributes:
     # deployment depth and the profile min/max range
@@ -118,20 +103,18 @@ def proc_cspp_spkir(infile, platform, deployment, lat, lon, depth):
     df['depth'] = -1 * z_from_p(df['ctd_pressure'], lat)
     depth_range = [depth, df['depth'].min(), df['depth'].max()]
 
-    # convert the now 1D dataframe into an xarray data set
+    # convert the 1D dataframe into an xarray data set and add the raw and converted irradiance measurements
     spkir = xr.Dataset.from_dataframe(df)
+    spkir = add_irradiance(spkir, channels, ed, wavelength)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     spkir['deploy_id'] = xr.Variable('time', np.tile(deployment, len(spkir.time)).astype(str))
     spkir['profile_id'] = xr.Variable('time', np.tile(profile_id, len(spkir.time)).astype(str))
 
-    attrs = dict_update(CSPP_SPKIR, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_SPKIR, CSPP, SHARED)  # add the shared CSPP and common attributes
     spkir = update_dataset(spkir, platform, deployment, lat, lon, depth_range, attrs)
     if proc_flag:
         spkir.attrs['processing_level'] = 'processed'
@@ -151,11 +134,12 @@ def main(argv=None):
     lat = args.latitude
     lon = args.longitude
     depth = args.depth
+    switch = args.switch  # set to 'wavelength' to save the irradiance measurements along a wavelength dimension
 
     # process the SPKIR data and save the results to disk
-    spkir = proc_cspp_spkir(infile, platform, deployment, lat, lon, depth)
+    spkir = proc_cspp_spkir(infile, platform, deployment, lat, lon, depth, switch=switch)
     if spkir:
-        spkir.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(spkir, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
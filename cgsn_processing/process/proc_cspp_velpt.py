@@ -8,12 +8,11 @@
 """
 import numpy as np
 import os
-import re
 import xarray as xr
 
 from gsw import z_from_p
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_VELPT
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -62,16 +61,13 @@ def proc_cspp_velpt(infile, platform, deployment, lat, lon, depth):
     velpt = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub(r'\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # add the deployment and profile IDs to the dataset
     velpt['deploy_id'] = xr.Variable('time', np.tile(deployment, len(velpt.time)).astype(str))
     velpt['profile_id'] = xr.Variable('time', np.tile(profile_id, len(velpt.time)).astype(str))
 
-    attrs = dict_update(CSPP_VELPT, CSPP)  # add the shared CSPP attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared common attributes
+    attrs = merge_attrs(CSPP_VELPT, CSPP, SHARED)  # add the shared CSPP and common attributes
     velpt = update_dataset(velpt, platform, deployment, lat, lon, depth_range, attrs)
     velpt.attrs['processing_level'] = 'processed'
 
@@ -92,7 +88,7 @@ def main(argv=None):
     # process the VELPT data and save the results to disk
     velpt = proc_cspp_velpt(infile, platform, deployment, lat, lon, depth)
     if velpt:
-        velpt.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(velpt, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
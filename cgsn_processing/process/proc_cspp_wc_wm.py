@@ -8,10 +8,9 @@
 """
 import numpy as np
 import os
-import re
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, cspp_profile_id
 from cgsn_processing.process.configs.attr_cspp import CSPP, CSPP_WINCH
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -44,15 +43,12 @@ def proc_cspp_wc_wm(infile, platform, deployment, lat, lon, depth):
     wc_wm = xr.Dataset.from_dataframe(df)
 
     # pull out the profile ID from the filename
-    _, fname = os.path.split(infile)
-    profile_id = re.sub('\D+', '', fname)
-    profile_id = "{}.{}.{}".format(profile_id[0], profile_id[1:4], profile_id[4:])
+    profile_id = cspp_profile_id(infile)
 
     # finalize the dataset and assign attributes
     wc_wm['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(wc_wm.time)).astype(str))
     wc_wm['profile_id'] = xr.Variable(('time',), np.repeat(profile_id, len(wc_wm.time)).astype(str))
-    attrs = dict_update(CSPP_WINCH, CSPP)  # create the CSPP Winch Controller attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared attributes
+    attrs = merge_attrs(CSPP_WINCH, CSPP, SHARED)  # CSPP Winch Controller and shared attributes
     wc_wm = update_dataset(wc_wm, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     wc_wm.attrs['processing_level'] = 'parsed'
 
@@ -73,7 +69,7 @@ def main(argv=None):
     # process the uCSPP Winch Controller winch motor status data and save the results to disk
     wc_wm = proc_cspp_wc_wm(infile, platform, deployment, lat, lon, depth)
     if wc_wm:
-        wc_wm.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(wc_wm, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -12,7 +12,7 @@ import xarray as xr
 
 from gsw import SP_from_C, SA_from_SP, CT_from_t, rho, z_from_p
 
-from cgsn_processing.process.common import ENCODING, inputs, epoch_time, json2df, update_dataset, dict_update
+from cgsn_processing.process.common import write_dataset, inputs, epoch_time, json2df, update_dataset, merge_attrs
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_ctdbp import CTDBP
 from cgsn_processing.process.configs.attr_common import SHARED
@@ -126,7 +126,7 @@ def proc_ctdbp(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     ctd['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(ctd.time)).astype(str))
-    attrs = dict_update(CTDBP, SHARED)  # add the shared the attributes
+    attrs = merge_attrs(CTDBP, SHARED)  # add the shared the attributes
     ctd = update_dataset(ctd, platform, deployment, lat, lon, depth, attrs)
     if proc_flag:
         ctd.attrs['processing_level'] = 'processed'
@@ -158,7 +158,7 @@ def main(argv=None):
     # process the CTDBP data and save the results to disk
     ctdbp = proc_ctdbp(infile, platform, deployment, lat, lon, depth, ctd_type=ctd_type, flr_serial=flr_serial)
     if ctdbp:
-        ctdbp.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(ctdbp, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
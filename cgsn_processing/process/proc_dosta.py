@@ -13,10 +13,8 @@ import os
 import pandas as pd
 import xarray as xr
 
-from datetime import timedelta
-
 from cgsn_processing.process.common import Coefficients, inputs, json2df, colocated_ctd, update_dataset, \
-    ENCODING, dict_update
+    write_dataset, merge_attrs, burst_average, interp_colocated, CTD_COLUMNS
 from cgsn_processing.process.configs.attr_dosta import DOSTA
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -151,27 +149,18 @@ def proc_dosta(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd = colocated_ctd(infile, ctd_name)
 
     if proc_flag and not ctd.empty:
-        # test to see if the CTD covers our time of interest for this DOSTA file
-        td = timedelta(hours=1)
-        coverage = ctd['time'].min() <= dosta['time'].min() and ctd['time'].max() + td >= dosta['time'].max()
-
-        # interpolate the CTD data if we have full coverage
-        if coverage:
-            if ctd_name in ['metbk', 'metbk1', 'metbk2']:
-                pressure = depth
-                temperature = np.interp(dosta['time'], ctd['time'], ctd.sea_surface_temperature)
-                salinity = SP_from_C(ctd.sea_surface_conductivity.values * 10.0, ctd.sea_surface_temperature.values,
-                                     depth)
-                salinity = np.interp(dosta['time'], ctd['time'], salinity)
-            else:
-                pressure = np.interp(dosta['time'], ctd['time'], ctd.pressure)
-                temperature = np.interp(dosta['time'], ctd['time'], ctd.temperature)
-                salinity = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
-                salinity = np.interp(dosta['time'], ctd['time'], salinity)
-
-            dosta['ctd_pressure'] = pressure
-            dosta['ctd_temperature'] = temperature
-            dosta['ctd_salinity'] = salinity
+        if ctd_name in ['metbk', 'metbk1', 'metbk2']:
+            # use the METBK sea surface temperature and conductivity, with the pressure set to the DOSTA depth
+            ctd = ctd.rename(columns={'sea_surface_temperature': 'temperature',
+                                      'sea_surface_conductivity': 'conductivity'})
+            ctd['pressure'] = depth
+
+        ctd['salinity'] = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
+
+        # interpolate the CTD data if it covers our time of interest for this DOSTA file
+        block = interp_colocated(dosta['time'], ctd, CTD_COLUMNS)
+        if block is not None:
+            dosta[block.columns] = block.to_numpy()
 
             # calculate the pressure and salinity corrected oxygen concentration
             dosta['oxygen_concentration_corrected'] = do2_salinity_correction(dosta['svu_oxygen_concentration'].values,
@@ -184,23 +173,13 @@ def proc_dosta(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # apply burst averaging if selected
     if burst:
-        # resample to a 15-minute interval and shift the clock to center the averaging window
-        dosta['time'] = dosta.time + pd.Timedelta('450s')
-        dosta = dosta.resample(time='900s').median(dim='time', keep_attrs=True)
-
-        # resampling will fill in missing time steps with NaNs. Use the serial_number variable
-        # as a proxy variable to find cases where data is filled with a NaN, and delete those records.
-        dosta = dosta.where(~np.isnan(dosta.serial_number), drop=True)
-
-        # reset original integer values
+        # resample to a 15-minute interval, resetting the original integer values as 32-bit integers
         int_arrays = ['product_number', 'serial_number']
-        for k in dosta.variables:
-            if k in int_arrays:
-                dosta[k] = dosta[k].astype(np.intc)  # explicitly setting as a 32-bit integer
+        dosta = burst_average(dosta, '900s', 'median', int_arrays)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     dosta['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(dosta.time)).astype(str))
-    attrs = dict_update(DOSTA, SHARED)  # add the shared attributes
+    attrs = merge_attrs(DOSTA, SHARED)  # add the shared attributes
     dosta = update_dataset(dosta, platform, deployment, lat, lon, depth, attrs)
     if proc_flag:
         dosta.attrs['processing_level'] = 'processed'
@@ -226,7 +205,7 @@ def main(argv=None):
     # process the CTDBP data and save the results to disk
     dosta = proc_dosta(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name, burst=burst)
     if dosta:
-        dosta.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(dosta, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_fdchp import FDCHP
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -45,7 +45,7 @@ def proc_fdchp(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     fdchp['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(fdchp.time)).astype(str))
-    attrs = dict_update(FDCHP, SHARED)
+    attrs = merge_attrs(FDCHP, SHARED)
     fdchp = update_dataset(fdchp, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     fdchp.attrs['processing_level'] = 'parsed'
 
@@ -65,7 +65,7 @@ def main(argv=None):
     # process the FDCHP data and save the results to disk
     fdchp = proc_fdchp(infile, platform, deployment, lat, lon, depth)
     if fdchp:
-        fdchp.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(fdchp, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -14,7 +14,7 @@ import xarray as xr
 from gsw import SP_from_C, z_from_p
 
 from cgsn_processing.process.common import Coefficients, inputs, json2df, colocated_ctd, update_dataset, \
-    ENCODING, dict_update
+    write_dataset, merge_attrs, burst_average, interp_colocated, CTD_COLUMNS
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_flort import FLORT
 from cgsn_processing.process.configs.attr_common import SHARED
@@ -219,33 +219,26 @@ def proc_flort(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd = colocated_ctd(infile, ctd_name)
 
     if not ctd.empty:
-        # test to see if the CTD covers our time of interest for this DOSTA file
-        td = pd.Timedelta('1h')
-        coverage = ctd['time'].min() - td <= df['time'].min() and ctd['time'].max() + td >= df['time'].max()
-
-        # interpolate the CTD data if we have full coverage
-        if coverage:
-            if ctd_name in ['metbk', 'metbk1', 'metbk2']:
-                pressure = np.ones_like(ctd.time) * depth  # set the pressure to the depth of the FLORT
-                temperature = np.interp(df['time'], ctd['time'], ctd.sea_surface_temperature)
-                salinity = SP_from_C(ctd.sea_surface_conductivity.values * 10.0,
-                                     ctd.sea_surface_temperature.values, depth)
-                salinity = np.interp(df['time'], ctd['time'], salinity)
-            else:
-                pressure = np.interp(df['time'], ctd['time'], ctd.pressure)
-                temperature = np.interp(df['time'], ctd['time'], ctd.temperature)
-                salinity = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
-                salinity = np.interp(df['time'], ctd['time'], salinity)
+        if ctd_name in ['metbk', 'metbk1', 'metbk2']:
+            # use the METBK sea surface temperature and conductivity, with the pressure set to the depth of the FLORT
+            ctd = ctd.rename(columns={'sea_surface_temperature': 'temperature',
+                                      'sea_surface_conductivity': 'conductivity'})
+            ctd['pressure'] = depth
+
+        ctd['salinity'] = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
 
-            df['ctd_pressure'] = pressure
-            df['ctd_temperature'] = temperature
-            df['ctd_salinity'] = salinity
+        # interpolate the CTD data if it covers our time of interest for this FLORT file
+        block = interp_colocated(df['time'], ctd, CTD_COLUMNS)
+        if block is not None:
+            df[block.columns] = block.to_numpy()
+            temperature = block['ctd_temperature'].values
+            salinity = block['ctd_salinity'].values
 
             # re-calculate the depth range for the metadata
-            z = -1 * z_from_p(pressure, lat)
-            depth_range = [depth, z.min(), z.max()]
+            z = -1 * z_from_p(block['ctd_pressure'].values, lat)
+            depth_range = [depth, np.nanmin(z), np.nanmax(z)]
 
-            # calculate the pressure and salinity corrected oxygen concentration
+            # calculate the total optical backscatter using the co-located temperature and salinity
             if flort_flag:
                 df['total_optical_backscatter'] = flo_bback_total(df['beta_700'], temperature, salinity,
                                                                   dev_flort.coeffs['scatter_angle'],
@@ -257,24 +250,14 @@ def proc_flort(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # apply burst averaging if selected
     if burst:
-        # resample to a 15-minute interval and shift the clock to center the averaging window
-        flort['time'] = flort.time + pd.Timedelta('450s')
-        flort = flort.resample(time='900s').median(dim='time', keep_attrs=True)
-
-        # resampling will fill in missing time steps with NaNs. Use the raw_internal_temp variable
-        # as a proxy variable to find cases where data is filled with a NaN, and delete those records.
-        flort = flort.where(~np.isnan(flort.raw_internal_temp), drop=True)
-
-        # reset original integer values
+        # resample to a 15-minute interval, resetting the original integer values as 32-bit integers
         int_arrays = ['measurement_wavelength_beta', 'raw_backscatter', 'measurement_wavelength_chl',
                       'raw_chlorophyll', 'measurement_wavelength_cdom', 'raw_cdom', 'raw_internal_temp']
-        for k in flort.variables:
-            if k in int_arrays:
-                flort[k] = flort[k].astype(np.intc)  # explicitly setting as a 32-bit integer
+        flort = burst_average(flort, '900s', 'median', int_arrays)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     flort['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(flort.time)).astype(str))
-    attrs = dict_update(FLORT, SHARED)
+    attrs = merge_attrs(FLORT, SHARED)
     flort = update_dataset(flort, platform, deployment, lat, lon, depth_range, attrs)
     if flort_flag or turbd_flag:
         flort.attrs['processing_level'] = 'processed'
@@ -302,7 +285,7 @@ def main(argv=None):
     flort = proc_flort(infile, platform, deployment, lat, lon, depth, serial_number=serial_number, ctd_name=ctd_name,
                        burst=burst, switch=switch)
     if flort:
-        flort.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(flort, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
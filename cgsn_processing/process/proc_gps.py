@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_gps import GPS
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -51,7 +51,7 @@ def proc_gps(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     gps['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(gps.time)).astype(str))
-    attrs = dict_update(GPS, SHARED)
+    attrs = merge_attrs(GPS, SHARED)
     gps = update_dataset(gps, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     gps.attrs['processing_level'] = 'parsed'
 
@@ -72,7 +72,7 @@ def main(argv=None):
     # process the GPS data and save the results to disk
     gps = proc_gps(infile, platform, deployment, lat, lon, depth)
     if gps:
-        gps.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(gps, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_hydgn import HYDGN
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -45,7 +45,7 @@ def proc_hydgn(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     hydgn['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(hydgn.time)).astype(str))
-    attrs = dict_update(HYDGN, SHARED)  # add the shared attributes
+    attrs = merge_attrs(HYDGN, SHARED)  # add the shared attributes
     hydgn = update_dataset(hydgn, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     hydgn.attrs['processing_level'] = 'parsed'
 
@@ -66,7 +66,7 @@ def main(argv=None):
     # process the hydrogen data and save the results to disk
     hydgn = proc_hydgn(infile, platform, deployment, lat, lon, depth)
     if hydgn:
-        hydgn.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(hydgn, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -13,7 +13,7 @@ import xarray as xr
 
 from datetime import datetime, timezone
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, dict_update, ENCODING
+from cgsn_processing.process.common import inputs, json2df, update_dataset, merge_attrs, write_dataset
 from cgsn_processing.process.configs.attr_ifcb import HDR, ADC
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -60,10 +60,10 @@ def proc_ifcb(infile, platform, deployment, lat, lon, depth, **kwargs):
         df = df.rename(columns={'trigger#': 'triggerNumber'})
 
         # set the attributes for the ADC data
-        attrs = dict_update(ADC, SHARED)
+        attrs = merge_attrs(ADC, SHARED)
     else:
         # set the attributes for the HDR data
-        attrs = dict_update(HDR, SHARED)
+        attrs = merge_attrs(HDR, SHARED)
 
     # create an xarray data set from the data frame
     df = xr.Dataset.from_dataframe(df)
@@ -90,7 +90,7 @@ def main(argv=None):
     # process the IFCB data and save the results to disk
     df = proc_ifcb(infile, platform, deployment, lat, lon, depth, file_type=file_type)
     if df:
-        df.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(df, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
@@ -11,7 +11,7 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import Coefficients, ENCODING, inputs, dict_update, json2obj, update_dataset
+from cgsn_processing.process.common import Coefficients, write_dataset, inputs, merge_attrs, json2obj, update_dataset
 from cgsn_processing.process.configs.attr_adcp import ADCP, PD12, DERIVED
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -168,10 +168,8 @@ def proc_imm_adcp(infile, platform, deployment, lat, lon, depth, **kwargs):
     vmin = adcp.bin_depth.min().values
 
     # add the attributes for the ADCP
-    attrs = dict_update(ADCP, PD12)         # merge the default ADCP and PD12-specific attributes
-    attrs = dict_update(attrs, DERIVED)     # add the derived attributes
-    attrs = dict_update(attrs, SHARED)      # add the shared attributes
-    adcp = update_dataset(adcp, platform, deployment, lat, lon, [depth, vmin, vmax], attrs)
+    attrs = merge_attrs(ADCP, PD12, DERIVED, SHARED)  # default, PD12-specific, derived and shared attributes
+    adcp = update_dataset(adcp, platform, deployment, lat, lon, [depth, vmin, vmax], attrs, low_memory=True)
     adcp.attrs['processing_level'] = 'processed'    # set the processing level
     return adcp
 
@@ -193,7 +191,7 @@ def main(argv=None):
 
     # save the file
     if adcp:
-        adcp.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(adcp, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -13,7 +13,7 @@ import xarray as xr
 
 from gsw import SP_from_C, SA_from_SP, CT_from_t, rho
 
-from cgsn_processing.process.common import ENCODING, inputs, dict_update, epoch_time, join_df, \
+from cgsn_processing.process.common import write_dataset, inputs, merge_attrs, epoch_time, join_df, \
     json2obj, json_obj2df, update_dataset
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_ctdbp import CTDBP
@@ -191,7 +191,7 @@ def proc_imm_ctdbp(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd.attrs['processing_level'] = 'parsed'
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
-    attrs = dict_update(CTDBP, SHARED)  # add the shared attributes
+    attrs = merge_attrs(CTDBP, SHARED)  # add the shared attributes
     ctd = update_dataset(ctd, platform, deployment, lat, lon, [depth, depth, depth], attrs)
 
     return ctd
@@ -215,7 +215,7 @@ def main(argv=None):
                            oxy_serial=oxy_serial, flr_serial=flr_serial)
 
     if ctdbp:
-        ctdbp.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(ctdbp, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
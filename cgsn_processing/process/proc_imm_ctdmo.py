@@ -12,7 +12,7 @@ import warnings
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import ENCODING, inputs, dict_update, epoch_time, join_df, \
+from cgsn_processing.process.common import write_dataset, inputs, merge_attrs, epoch_time, join_df, \
     json2obj, json_obj2df, update_dataset
 from cgsn_processing.process.configs.attr_ctdmo import CTDMO
 from cgsn_processing.process.configs.attr_common import SHARED
@@ -81,7 +81,7 @@ def proc_imm_ctdmo(infile, platform, deployment, lat, lon, depth, **kwargs):
     ctdmo = xr.Dataset.from_dataframe(joined)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
-    attrs = dict_update(CTDMO, SHARED)  # add the shared attributes
+    attrs = merge_attrs(CTDMO, SHARED)  # add the shared attributes
     ctdmo = update_dataset(ctdmo, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     ctdmo.attrs['processing_level'] = 'processed'
     return ctdmo
@@ -103,7 +103,7 @@ def main(argv=None):
 
     # save the data
     if ctdmo:
-        ctd.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(ctdmo, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -11,10 +11,15 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, epoch_time
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, epoch_time
 from cgsn_processing.process.configs.attr_lisst import LISST
 from cgsn_processing.process.configs.attr_common import SHARED
 
+# data types for the parsed LISST data (see json2df)
+SCHEMA = {
+    'arrays': {'lisst_volume_concentration': 'float64'}
+}
+
 
 def proc_lisst(infile, platform, deployment, lat, lon, depth):
     """
@@ -32,7 +37,7 @@ def proc_lisst(infile, platform, deployment, lat, lon, depth):
     """
 
     # load the json data file and return a panda dataframe
-    df = json2df(infile)
+    df, arrays = json2df(infile, SCHEMA)
     if df.empty:
         # there was no data in this file, ending early
         return None
@@ -44,8 +49,8 @@ def proc_lisst(infile, platform, deployment, lat, lon, depth):
     # clean up the dataframe, getting rid of the time string variables we no longer need
     df.drop(columns=['date_time_string'], inplace=True)
 
-    # pop the 2d particle size data array out of the dataframe for manipulation
-    particle_concentration = np.array(np.vstack(df.pop('lisst_volume_concentration')))
+    # the 2d particle size data array was loaded separately for manipulation
+    particle_concentration = arrays['lisst_volume_concentration']
 
     # Create a list of the lower sizes, to use as a column
     lower_particle_size = [1.00, 1.48, 1.74, 2.05, 2.42, 2.86, 3.38, 3.98, 4.70, 5.55, 6.55, 7.72, 9.12, 10.8, 12.7,
@@ -67,7 +72,7 @@ def proc_lisst(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     lisst['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(lisst.time)).astype(str))
-    attrs = dict_update(LISST, SHARED)  # add the shared attributes
+    attrs = merge_attrs(LISST, SHARED)  # add the shared attributes
     lisst = update_dataset(lisst, platform, deployment, lat, lon, [depth, depth_min, depth_max], attrs)
     lisst.attrs['processing_level'] = 'parsed'
 
@@ -88,7 +93,7 @@ def main(argv=None):
     # process the LISST data and save the results to disk
     lisst = proc_lisst(infile, platform, deployment, lat, lon, depth)
     if lisst:
-        lisst.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(lisst, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
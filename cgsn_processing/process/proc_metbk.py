@@ -12,7 +12,7 @@ import xarray as xr
 
 from gsw import SP_from_C, SA_from_SP, CT_from_t, rho
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_metbk import METBK
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -56,7 +56,7 @@ def proc_metbk(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     metbk['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(metbk.time)).astype(str))
-    attrs = dict_update(METBK, SHARED)  # add the shared attributes
+    attrs = merge_attrs(METBK, SHARED)  # add the shared attributes
     metbk = update_dataset(metbk, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     metbk.attrs['processing_level'] = 'processed'
 
@@ -76,7 +76,7 @@ def main(argv=None):
     # process the METBK data and save the results to disk
     metbk = proc_metbk(infile, platform, deployment, lat, lon, depth)
     if metbk:
-        metbk.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(metbk, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -6,15 +6,18 @@
 @author Joe Futrelle and Christopher Wingard
 @brief Creates a NetCDF dataset for the MMP from JSON formatted source data
 """
+import functools
+import glob
 import numpy as np
 import os
 import pandas as pd
 import xarray as xr
 
+from concurrent.futures import ProcessPoolExecutor
 from gsw import z_from_p, SP_from_C, SA_from_SP, CT_from_t, rho
 
 from cgsn_processing.process.common import inputs, json2obj, json_obj2df, Coefficients, update_dataset, \
-    ENCODING, dict_update, FILL_INT
+    update_profiles, write_netcdf, merge_attrs, epoch_seconds, split_column, FILL_INT
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_mmp_coastal import MMP, MMP_ADATA, MMP_CDATA, MMP_EDATA
 from cgsn_processing.process.configs.attr_common import SHARED
@@ -108,107 +111,150 @@ class ParCalibrations(Coefficients):
         self.coeffs = coeffs
 
 
-def proc_mmp_coastal(infile, platform, deployment, lat, lon, depth, **kwargs):
-    """
-    Processing function for a Coastal MMP with CTDPF, DOFST, FLORT, PARAD,
-    and VEL3D sensors attached. Loads the JSON formatted parsed data file and
-    extracts and processes the three different file types covering the five
-    instruments ("A" = VEL3D, "C" = CTDPF and DOFST, and "E" = FLORT and
-    PARAD). Appropriate calibration coefficients, to convert the raw data
-    into engineering units, are applied. If no calibration coefficients are
-    available, filled variables are returned and the dataset processing level
-    attributes are set to "parsed". Otherwise, the dataset processing level is
-    set to "partial" or "processed" depending on whether all the needed data is
-    available to convert the raw data.
+# calibration coefficient files, instrument classes (used to find the calibrations) and classes for each of the
+# attached sensors with calibrations
+SENSORS = {
+    'flort': ('flort.cal_coeffs.json', 'FLORT', FlrCalibrations),
+    'parad': ('parad.cal_coeffs.json', 'PARAD', ParCalibrations),
+    'dofst': ('dofst.cal_coeffs.json', 'DOFST', OxyCalibrations),
+}
 
-    :param infile: JSON formatted parsed data file
-    :param platform: Name of the mooring the instrument is mounted on.
-    :param deployment: Name of the deployment for the input data file.
-    :param lat: Latitude of the mooring deployment.
-    :param lon: Longitude of the mooring deployment.
-    :param depth: Depth of the platform the instrument is mounted on.
 
+def load_calibrations(cal_dir, start_time, **kwargs):
+    """
+    Load the calibration coefficients for the FLORT, PARAD and DOFST sensors
+    attached to the MMP. The calibrations do not change during a deployment,
+    so they are loaded once and used for all the profiles. The serialized
+    coefficients in the calibration directory are always used if they exist,
+    otherwise the calibrations are looked up (once) from the CSV files hosted
+    by the OOI CI team and saved to the directory for the next call.
+
+    :param cal_dir: directory with the serialized calibration coefficients
+    :param start_time: start time of the data (seconds since 1970-01-01),
+        used to find the applicable calibrations
     **kwargs flr_serial: The serial number of the attached FLORT (optional input)
     **kwargs oxy_serial: The serial number of the attached DOFST (optional input)
     **kwargs par_serial: The serial number of the attached PARAD (optional input)
 
-    :return edata: An xarray dataset with the processed "E" file data, which
-        includes the MMP engineering, FLORT and PARAD data
-    :return cdata: An xarray dataset with the processed "C" file data, which
-        includes the CTDPF and DOFST data
-    :return adata: An xarray dataset with the processed "A" file data, which
-        consists of the VEL3D data
+    :return cals: dictionary with the calibrations for each sensor, set to
+        None if no calibration coefficients are available
     """
-    # process the variable length keyword arguments
-    flr_serial = kwargs.get('flr_serial')
-    oxy_serial = kwargs.get('oxy_serial')
-    par_serial = kwargs.get('par_serial')
+    serials = {'flort': kwargs.get('flr_serial'), 'parad': kwargs.get('par_serial'),
+               'dofst': kwargs.get('oxy_serial')}
+    cals = {}
+    for sensor, (coeff_name, inst_class, cal_class) in SENSORS.items():
+        coeff_file = os.path.join(cal_dir, coeff_name)
+        cal = cal_class(coeff_file)  # initialize calibration class
+        if os.path.isfile(coeff_file):
+            # we always want to use this file if it exists
+            cal.load_coeffs()
+        elif serials[sensor]:
+            # load from the CI hosted CSV files
+            csv_url = find_calibration(inst_class, serials[sensor], start_time)
+            if csv_url:
+                cal.read_csv(csv_url)
+                cal.save_coeffs()
+            else:
+                cal = None
+        else:
+            cal = None
 
-    # load the data file as a json formatted object for further processing
-    data = json2obj(infile)
-    if not data:
-        # json data file was empty, exiting
-        return None, None, None
+        cals[sensor] = cal
 
+    return cals
+
+
+def align_records(edata, cdata, adata):
+    """
+    Add the CTD depth, temperature and salinity to the "E" records, and the
+    CTD depth to the "A" records. The time axes are converted once, and each
+    of the CTD variables is interpolated onto the record times of both data
+    sets in a single call. If there is no CTD data, the "A" records use the
+    depth calculated from the profiler pressure record instead.
+
+    :param edata: data frame with the "E" data, updated in place
+    :param cdata: data frame with the "C" data (may be empty)
+    :param adata: data frame with the "A" data (may be empty), updated in place
+    :return: None
+    """
+    if cdata.empty:
+        if not adata.empty:
+            adata['profiler_depth'] = np.interp(epoch_seconds(adata.index), epoch_seconds(edata.index),
+                                                edata['profiler_depth'].values)
+        return
+
+    # interpolate onto the combined E and A record times, and then split the results between the two
+    nrec = len(edata)
+    times = np.concatenate([epoch_seconds(edata.index), epoch_seconds(adata.index)])
+    ctime = epoch_seconds(cdata.index)
+    for name, column in [('profiler_depth', 'profiler_depth'), ('ctd_temperature', 'temperature'),
+                         ('ctd_salinity', 'salinity')]:
+        values = np.interp(times, ctime, cdata[column].values)
+        edata[name] = values[:nrec]
+        if name == 'profiler_depth' and not adata.empty:
+            adata[name] = values[nrec:]
+
+
+def beam_mapping(beams):
+    """
+    Reorder the VEL3D-K beam mapping so it works with the transform function,
+    dropping the number of beams (the first value) and adding a fill value
+    for the 5th beam (which does not actually exist).
+
+    :param beams: 2D array of the beam mapping reported for each record
+    :return mapping: reordered beam mapping
+    """
+    mapping = np.full((beams.shape[0], 5), FILL_INT, dtype=beams.dtype)
+    mapping[:, :4] = beams[:, 1:5]
+    return mapping
+
+
+def process_profile(data, lat, lon, cals):
+    """
+    Process the three different data types from a single MMP profile ("A" =
+    VEL3D, "C" = CTDPF and DOFST, and "E" = FLORT and PARAD), applying the
+    calibration coefficients (if available) to convert the raw data into
+    engineering units.
+
+    :param data: JSON formatted parsed data object for the profile
+    :param lat: Latitude of the mooring deployment.
+    :param lon: Longitude of the mooring deployment.
+    :param cals: Dictionary with the calibrations for the attached sensors
+        (see load_calibrations)
+
+    :return profile: dictionary with the profile status information
+    :return edata: data frame with the processed "E" file data
+    :return cdata: data frame with the processed "C" file data (empty if there
+        is no CTD data in the profile)
+    :return adata: data frame with the processed "A" file data (empty if there
+        is no VEL3D data in the profile)
+    """
     # extract the profiler data from the json object based on the data type
     edata = json_obj2df(data, 'edata')
     cdata = json_obj2df(data, 'cdata')
     adata = json_obj2df(data, 'adata')
-
-    # pull out some of the profile status information
-    profile_id = data['profile']['profile_id']
-    ramp_status = data['profile']['ramp_status']
-    profile_status = data['profile']['profile_status']
-    start_depth = data['profile']['start_depth']
-    end_depth = data['profile']['end_depth']
-
-    # redefine the site depth to a list including the min/max depth of the profile
-    if start_depth > end_depth:
-        depth_range = [depth, end_depth, start_depth]
-    else:
-        depth_range = [depth, start_depth, end_depth]
+    profile = dict(data['profile'])
+    flr, par, oxy = cals['flort'], cals['parad'], cals['dofst']
 
     # --- process the data from each source: EDATA --- #
     # drop the date_time_string
     edata.drop(columns=['date_time_string'], inplace=True)
 
     # rename some raw parameters for consistency with other datasets
-    data.rename(columns={'raw_chl': 'raw_chlorophyll', 'raw_scatter': 'raw_backscatter'},
-                inplace=True)
+    edata.rename(columns={'raw_chl': 'raw_chlorophyll', 'raw_scatter': 'raw_backscatter'}, inplace=True)
 
     # calculate the depth from the pressure record (convert 0.00 pressure fills to NaN)
-    edata['pressure'] = [m if m > 1 else np.nan for m in edata['pressure']]
+    pressure = edata['pressure'].values
+    edata['pressure'] = np.where(pressure > 1, pressure, np.nan)
     edata['profiler_depth'] = -1 * z_from_p(edata['pressure'], lat)  # will replace with CTD depth if available
 
     # create empty variables for the processed FLORT and PAR data (will fill in with processed data if available)
-    empty_data = np.atleast_1d(edata['time']).astype(np.int32) * np.nan
-    edata['estimated_chlorophyll'] = empty_data
-    edata['fluorometric_cdom'] = empty_data
-    edata['beta_700'] = empty_data
-    edata['irradiance'] = empty_data
-    edata['ctd_temperature'] = empty_data
-    edata['ctd_salinity'] = empty_data
-    edata['bback'] = empty_data
-    proc_flort = False
-    proc_parad = False
-
-    # now grab the calibration coefficients for the FLORT (if they exist)
-    coeff_file = os.path.join(os.path.dirname(infile), 'flort.cal_coeffs.json')
-    flr = FlrCalibrations(coeff_file)  # initialize calibration class
-    if os.path.isfile(coeff_file):
-        # we always want to use this file if it exists
-        flr.load_coeffs()
-        proc_flort = True
-    else:
-        # load from the CI hosted CSV files
-        csv_url = find_calibration('FLORT', flr_serial, (edata.time.values.astype('int64') * 10 ** -9)[0])
-        if csv_url:
-            flr.read_csv(csv_url)
-            flr.save_coeffs()
-            proc_flort = True
+    for v in ['estimated_chlorophyll', 'fluorometric_cdom', 'beta_700', 'par', 'ctd_temperature', 'ctd_salinity',
+              'total_optical_backscatter']:
+        edata[v] = np.nan
 
     # if calibration coefficients are available, process the FLORT data (scale and offset)
-    if proc_flort:
+    if flr:
         edata['estimated_chlorophyll'] = flo_scale_and_offset(edata['raw_chlorophyll'], flr.coeffs['dark_chla'],
                                                               flr.coeffs['scale_chla'])
         edata['fluorometric_cdom'] = flo_scale_and_offset(edata['raw_cdom'], flr.coeffs['dark_cdom'],
@@ -216,36 +262,9 @@ def proc_mmp_coastal(infile, platform, deployment, lat, lon, depth, **kwargs):
         edata['beta_700'] = flo_scale_and_offset(edata['raw_backscatter'], flr.coeffs['dark_beta'],
                                                  flr.coeffs['scale_beta'])
 
-    # now grab the calibration coefficients for the PARAD (if they exist)
-    coeff_file = os.path.join(os.path.dirname(infile), 'parad.cal_coeffs.json')
-    par = ParCalibrations(coeff_file)  # initialize calibration class
-    if os.path.isfile(coeff_file):
-        # we always want to use this file if it exists
-        par.load_coeffs()
-        proc_parad = True
-    else:
-        # load from the CI hosted CSV files
-        csv_url = find_calibration('PARAD', par_serial, (edata.time.values.astype('int64') * 10 ** -9)[0])
-        if csv_url:
-            par.read_csv(csv_url)
-            par.save_coeffs()
-            proc_parad = True
-
-    if proc_parad:
+    if par:
         edata['par'] = opt_par_biospherical_wfp(edata['raw_par'], par.coeffs['dark_offset'], par.coeffs['scale_wet'])
 
-    edata['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(edata.time)).astype(str))
-    edata['profile_id'] = xr.Variable(('time',), np.repeat(profile_id, len(edata.time)).astype(str))
-    attrs = dict_update(MMP, MMP_EDATA)  # combine the common and dataframe specific attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared the attributes
-    edata = update_dataset(edata, platform, deployment, lat, lon, depth_range, attrs)
-    if (proc_flort and not proc_parad) or (proc_parad and not proc_flort):
-        edata.attrs['processing_level'] = 'partial'
-    elif proc_flort and proc_parad:
-        edata.attrs['processing_level'] = 'processed'
-    else:
-        edata.attrs['processing_level'] = 'parsed'
-
     # --- process the data from each source: CDATA --- #
     if not cdata.empty:
         # calculate the depth from the CTD pressure record (more accurate than the profiler pressure record)
@@ -259,67 +278,33 @@ def proc_mmp_coastal(infile, platform, deployment, lat, lon, depth, **kwargs):
         ct = CT_from_t(sa, cdata['temperature'].values, cdata['pressure'].values)  # conservative temperature
         cdata['density'] = rho(sa, ct, cdata['pressure'])  # density
 
-        # add the CTD data to the edata record and then calculate the total optical backscatter coefficient
-        edata['profiler_depth'] = np.interp(edata['time'], cdata['time'], cdata['profiler_depth'])
-        degc = np.interp(edata['time'], cdata['time'], cdata['temperature'])
-        edata['ctd_temperature'] = degc
-        psu = np.interp(edata['time'], cdata['time'], cdata['salinity'])
-        edata['ctd_salinity'] = psu
-        edata['total_optical_backscatter'] = flo_bback_total(edata['beta_700'], degc, psu, flr.coeffs['scatter_angle'],
+    # add the CTD depth, temperature and salinity to the edata and adata records (profiler depth only if there is no
+    # CTD data), and then calculate the total optical backscatter coefficient
+    align_records(edata, cdata, adata)
+    if flr and not cdata.empty:
+        edata['total_optical_backscatter'] = flo_bback_total(edata['beta_700'], edata['ctd_temperature'],
+                                                             edata['ctd_salinity'], flr.coeffs['scatter_angle'],
                                                              flr.coeffs['wavelength'], flr.coeffs['chi_factor'])
 
+    if not cdata.empty:
         # create empty variables for the processed oxygen data (will fill in with processed data if available)
-        empty_data = np.atleast_1d(cdata['time']).astype(np.int32) * np.nan
-        cdata['oxygen_concentration'] = empty_data
-        cdata['oxygen_concentration_corrected'] = empty_data
-        proc_dofst = False
-
-        # now grab the calibration coefficients for the DOFST (if they exist)
-        coeff_file = os.path.join(os.path.dirname(infile), 'dofst.cal_coeffs.json')
-        oxy = OxyCalibrations(coeff_file)  # initialize calibration class
-        if os.path.isfile(coeff_file):
-            # we always want to use this file if it exists
-            oxy.load_coeffs()
-            proc_dofst = True
-        else:
-            # load from the CI hosted CSV files
-            csv_url = find_calibration('DOFST', oxy_serial, (edata.time.values.astype('int64') * 10 ** -9)[0])
-            if csv_url:
-                oxy.read_csv(csv_url)
-                oxy.save_coeffs()
-                proc_dofst = True
-
-        if proc_dofst:
+        cdata['oxygen_concentration'] = np.nan
+        cdata['oxygen_concentration_corrected'] = np.nan
+        if oxy:
             doxy, doxy_corr = do2_raw_to_doxy(cdata['raw_oxygen'], oxy.coeffs['offset'], oxy.coeffs['slope'],
                                               oxy.coeffs['A'], oxy.coeffs['B'], oxy.coeffs['C'], oxy.coeffs['E'],
                                               cdata['pressure'], cdata['temperature'], cdata['salinity'], lat, lon)
             cdata['oxygen_concentration'] = doxy
             cdata['oxygen_concentration_corrected'] = doxy_corr
 
-        cdata['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(cdata.time)).astype(str))
-        cdata['profile_id'] = xr.Variable(('time',), np.repeat(profile_id, len(cdata.time)).astype(str))
-        attrs = dict_update(MMP, MMP_CDATA)  # combine the common and dataframe specific attributes
-        attrs = dict_update(attrs, SHARED)  # add the shared the attributes
-        cdata = update_dataset(cdata, platform, deployment, lat, lon, depth_range, attrs)
-        if proc_dofst:
-            cdata.attrs['processing_level'] = 'processed'
-        else:
-            cdata.attrs['processing_level'] = 'parsed'
-    else:
-        cdata = None
-
     # --- process the data from each source: ADATA --- #
     if not adata.empty:
-        # create a depth record from the CTD data
-        adata['profiler_depth'] = np.interp(adata['time'], cdata['time'], cdata['profiler_depth'])
-
         # drop the date_time_string
         adata.drop(columns=['date_time_string'], inplace=True)
 
-        # reorder the beams list array, so it works with the transform function (drop the number of beams and add
-        # a fill-value for the 5th beam (which does not actually exist)
-        beams = np.atleast_2d(adata['beams'])
-        beams = np.insert(np.delete(beams, 0, 1), 4, FILL_INT, 1)
+        # reorder the beams list array, so it works with the transform function. the beam mapping follows from the
+        # direction of the profile, and is not kept in the processed data.
+        beams = beam_mapping(split_column(adata, 'beams', as_array=True))
 
         # convert the raw, beam velocity measurements to enu velocities, corrected for magnetic declination, in m/s
         enu = vel3dk_transform(adata['beam_0_velocity'], adata['beam_1_velocity'], adata['beam_2_velocity'],
@@ -328,26 +313,189 @@ def proc_mmp_coastal(infile, platform, deployment, lat, lon, depth, **kwargs):
         # separate out the components from the Earth coordinate transformed data matrix.
         u = np.array(enu[0, :])[0]
         v = np.array(enu[1, :])[0]
-        adata['vertical_relative_velocity'] = np.array(enu[2, :])[0]
+        adata['relative_velocity_vertical'] = np.array(enu[2, :])[0]
 
         # correct for magnetic declination
-        theta = magnetic_declination(lat, lon, adata['time'], adata['profiler_depth'])
+        theta = magnetic_declination(lat, lon, adata.index, adata['profiler_depth'])
         u_cor, v_cor = magnetic_correction(theta, u, v)
 
         # add the corrected velocities to the dataframe
-        adata['eastward_relative_velocity'] = u_cor
-        adata['northward_relative_velocity'] = v_cor
-
-        adata['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(adata.time)).astype(str))
-        adata['profile_id'] = xr.Variable(('time',), np.repeat(profile_id, len(adata.time)).astype(str))
-        attrs = dict_update(MMP, MMP_ADATA)  # combine the common and dataframe specific attributes
-        attrs = dict_update(attrs, SHARED)  # add the shared the attributes
-        adata = update_dataset(adata, platform, deployment, lat, lon, depth_range, attrs)
-        adata.attrs['processing_level'] = 'processed'
+        adata['relative_velocity_east'] = u_cor
+        adata['relative_velocity_north'] = v_cor
+
+    return profile, edata, cdata, adata
+
+
+def processing_levels(cals):
+    """
+    Set the processing level attributes of the "E", "C" and "A" data sets
+    based on the calibrations available for the attached sensors.
+
+    :param cals: Dictionary with the calibrations for the attached sensors
+    :return levels: processing level for each data set
+    """
+    if cals['flort'] and cals['parad']:
+        elevel = 'processed'
+    elif cals['flort'] or cals['parad']:
+        elevel = 'partial'
     else:
-        adata = None
+        elevel = 'parsed'
 
-    return edata, cdata, adata
+    return {'edata': elevel, 'cdata': 'processed' if cals['dofst'] else 'parsed', 'adata': 'processed'}
+
+
+def proc_mmp_coastal(infile, platform, deployment, lat, lon, depth, **kwargs):
+    """
+    Processing function for a Coastal MMP with CTDPF, DOFST, FLORT, PARAD,
+    and VEL3D sensors attached. Loads the JSON formatted parsed data file and
+    extracts and processes the three different file types covering the five
+    instruments ("A" = VEL3D, "C" = CTDPF and DOFST, and "E" = FLORT and
+    PARAD). Appropriate calibration coefficients, to convert the raw data
+    into engineering units, are applied. If no calibration coefficients are
+    available, filled variables are returned and the dataset processing level
+    attributes are set to "parsed". Otherwise, the dataset processing level is
+    set to "partial" or "processed" depending on whether all the needed data is
+    available to convert the raw data.
+
+    :param infile: JSON formatted parsed data file
+    :param platform: Name of the mooring the instrument is mounted on.
+    :param deployment: Name of the deployment for the input data file.
+    :param lat: Latitude of the mooring deployment.
+    :param lon: Longitude of the mooring deployment.
+    :param depth: Depth of the platform the instrument is mounted on.
+
+    **kwargs flr_serial: The serial number of the attached FLORT (optional input)
+    **kwargs oxy_serial: The serial number of the attached DOFST (optional input)
+    **kwargs par_serial: The serial number of the attached PARAD (optional input)
+    **kwargs cals: Calibrations already loaded for the attached sensors (see
+        load_calibrations), used instead of loading them for this file
+
+    :return edata: An xarray dataset with the processed "E" file data, which
+        includes the MMP engineering, FLORT and PARAD data
+    :return cdata: An xarray dataset with the processed "C" file data, which
+        includes the CTDPF and DOFST data
+    :return adata: An xarray dataset with the processed "A" file data, which
+        consists of the VEL3D data
+    """
+    # load the data file as a json formatted object for further processing
+    data = json2obj(infile)
+    if not data:
+        # json data file was empty, exiting
+        return None, None, None
+
+    # load the calibrations, unless they have been passed in
+    cals = kwargs.get('cals')
+    if cals is None:
+        cals = load_calibrations(os.path.dirname(infile), data['edata']['time'][0], **kwargs)
+
+    profile, edata, cdata, adata = process_profile(data, lat, lon, cals)
+    levels = processing_levels(cals)
+
+    # redefine the site depth to a list including the min/max depth of the profile
+    start_depth = profile['start_depth']
+    end_depth = profile['end_depth']
+    if start_depth > end_depth:
+        depth_range = [depth, end_depth, start_depth]
+    else:
+        depth_range = [depth, start_depth, end_depth]
+
+    # convert the data frames to xarray data sets and update the metadata for export to NetCDF
+    datasets = []
+    for name, df, attrs in [('edata', edata, MMP_EDATA), ('cdata', cdata, MMP_CDATA), ('adata', adata, MMP_ADATA)]:
+        if df.empty:
+            datasets.append(None)
+            continue
+
+        ds = df.to_xarray()
+        ds['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(ds.time)).astype(str))
+        ds['profile_id'] = xr.Variable(('time',), np.repeat(profile['profile_id'], len(ds.time)).astype(str))
+        attrs = merge_attrs(MMP, attrs, SHARED)  # common, dataframe specific and shared attributes
+        ds = update_dataset(ds, platform, deployment, lat, lon, depth_range, attrs)
+        ds.attrs['processing_level'] = levels[name]
+        datasets.append(ds)
+
+    return tuple(datasets)
+
+
+def _process_file(infile, lat, lon, cals):
+    """
+    Load and process a single profile file for proc_mmp_coastal_batch, run in
+    the worker processes.
+    """
+    data = json2obj(infile)
+    if not data:
+        return None
+
+    return process_profile(data, lat, lon, cals)
+
+
+def proc_mmp_coastal_batch(indir, platform, deployment, lat, lon, depth, **kwargs):
+    """
+    Batch processing function for a deployment of Coastal MMP profiles.
+    Processes all the JSON formatted parsed profile files in a directory (see
+    proc_mmp_coastal), loading the calibration coefficients once for the whole
+    deployment, and combines the profiles into single "E", "C" and "A" data
+    sets saved as CF indexed ragged arrays of profiles (featureType=profile,
+    see update_profiles), rather than three files per profile.
+
+    :param indir: Directory with the JSON formatted parsed profile files (and
+        the calibration coefficients)
+    :param platform: Name of the mooring the instrument is mounted on.
+    :param deployment: Name of the deployment for the input data files.
+    :param lat: Latitude of the mooring deployment.
+    :param lon: Longitude of the mooring deployment.
+    :param depth: Depth of the platform the instrument is mounted on.
+
+    **kwargs flr_serial: The serial number of the attached FLORT (optional input)
+    **kwargs oxy_serial: The serial number of the attached DOFST (optional input)
+    **kwargs par_serial: The serial number of the attached PARAD (optional input)
+    **kwargs workers: Number of worker processes used to process the profiles
+        (default is 1, processing the profiles in this process)
+
+    :return edata: An xarray dataset with the processed "E" data from all the profiles
+    :return cdata: An xarray dataset with the processed "C" data from all the profiles
+    :return adata: An xarray dataset with the processed "A" data from all the profiles
+    """
+    workers = kwargs.get('workers') or 1
+
+    # find all the profile files, skipping the calibration coefficients saved in the same directory
+    infiles = sorted(f for f in glob.glob(os.path.join(indir, '*.json')) if not f.endswith('coeffs.json'))
+    if not infiles:
+        return None, None, None
+
+    # load the calibrations once, using the first profile to find the applicable calibrations
+    data = json2obj(infiles[0])
+    cals = load_calibrations(indir, data['edata']['time'][0], **kwargs)
+
+    # process the profiles, in parallel if requested
+    process = functools.partial(_process_file, lat=lat, lon=lon, cals=cals)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process, infiles, chunksize=16))
+    else:
+        results = [process(f) for f in infiles]
+
+    results = sorted([r for r in results if r is not None], key=lambda r: r[0]['profile_id'])
+    if not results:
+        return None, None, None
+
+    # combine the profiles into the ragged array data sets, skipping the profiles without data of a given type
+    levels = processing_levels(cals)
+    datasets = []
+    for i, (name, attrs) in enumerate([('edata', MMP_EDATA), ('cdata', MMP_CDATA), ('adata', MMP_ADATA)]):
+        profiles = [r for r in results if not r[i + 1].empty]
+        if not profiles:
+            datasets.append(None)
+            continue
+
+        frames = [r[i + 1] for r in profiles]
+        info = pd.DataFrame([r[0] for r in profiles])
+        attrs = merge_attrs(MMP, attrs, SHARED)  # common, dataframe specific and shared attributes
+        ds = update_profiles(frames, info, platform, deployment, lat, lon, attrs)
+        ds.attrs['processing_level'] = levels[name]
+        datasets.append(ds)
+
+    return tuple(datasets)
 
 
 def main(argv=None):
@@ -366,25 +514,20 @@ def main(argv=None):
     par_serial = args.par_serial
     oxy_serial = args.oxy_serial
 
-    # process the CTDBP data and save the results to disk
-    edata, cdata, adata = proc_mmp_coastal(infile, platform, deployment, lat, lon, depth,
-                                           flr_serial=flr_serial, par_serial=par_serial, oxy_serial=oxy_serial)
+    # process the MMP data, either a single profile or a directory with all the profiles from a deployment
+    if os.path.isdir(infile):
+        edata, cdata, adata = proc_mmp_coastal_batch(infile, platform, deployment, lat, lon, depth,
+                                                     flr_serial=flr_serial, par_serial=par_serial,
+                                                     oxy_serial=oxy_serial, workers=args.workers)
+    else:
+        edata, cdata, adata = proc_mmp_coastal(infile, platform, deployment, lat, lon, depth,
+                                               flr_serial=flr_serial, par_serial=par_serial, oxy_serial=oxy_serial)
 
+    # save the results to disk, one file for each of the data types
     base = os.path.splitext(outfile)[0]
-    if edata:
-        efile = outfile
-        os.rename(efile, base + '_edata.nc')
-        edata.to_netcdf(efile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
-
-    if cdata:
-        cfile = outfile
-        os.rename(cfile, base + '_edata.nc')
-        cdata.to_netcdf(cfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
-
-    if adata:
-        afile = outfile
-        os.rename(afile, base + '_edata.nc')
-        adata.to_netcdf(afile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+    for name, ds in [('edata', edata), ('cdata', cdata), ('adata', adata)]:
+        if ds is not None:
+            write_netcdf(ds, '{}_{}.nc'.format(base, name))
 
 
 if __name__ == '__main__':
@@ -9,17 +9,28 @@
 import numpy as np
 import os
 import json
-import pandas as pd
 import xarray as xr
+
 from pathlib import Path
 from gsw import SP_from_C, z_from_p
 from pyseas.data.flo_functions import flo_scale_and_offset, flo_bback_total
 
-from cgsn_processing.process.common import ENCODING, inputs, epoch_time, json2df, update_dataset
+from cgsn_processing.process.common import write_dataset, write_netcdf, append_dataset, extend_netcdf, inputs, \
+    json_obj2df, update_dataset, merge_attrs
 from cgsn_processing.process.finding_calibrations import find_calibration
-from cgsn_processing.process.configs.attr_mmp_prawler import PRAWLER, PRAWLER_NO_FLORT, PRAWLER_SCI
+from cgsn_processing.process.configs.attr_common import SHARED
+from cgsn_processing.process.configs.attr_mmp_prawler import PRAWLER, PRAWLER_NO_FLORT
 from cgsn_processing.process.proc_flort import Calibrations
 
+# Minimum change in pressure (dbar) after a turn in the direction of travel marking the start of a new profile, and
+# the minimum gap (seconds) between records that starts a new profile regardless of the direction of travel
+PROFILE_TURN = 1.0
+PROFILE_GAP = 600
+
+# Maximum number of records processed and written at a time, profiles are kept whole within a chunk
+CHUNK_SIZE = 2 ** 16
+
+
 def read_json(infile):
     """
     Reads a json file into a dictionary, which gets returned.
@@ -37,18 +48,120 @@ def read_json(infile):
         with open(infile) as jf:
             try:
                 json_data = json.load(jf)
-            except JSONDecodeError:
+            except json.JSONDecodeError:
                 print("Invalid JSON syntax in {0} found".format(infile))
                 return None
 
     return json_data
-            
 
-def proc_mmp_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial):
+
+def load_calibrations(coeff_file, serial, start_time):
+    """
+    Load the FLORT calibration coefficients used for all of the profiles in a
+    Prawler data file, either from the coefficients file if it exists, or from
+    the CI hosted CSV files (saving them to the coefficients file for the next
+    data file).
+
+    :param coeff_file: FLORT calibration coefficients file
+    :param serial: FLORT serial number, used to find the CSV file
+    :param start_time: time of the first record, used to find the CSV file
+    :return dev: FLORT calibration coefficients, or None if a source for
+        them could not be found
+    """
+    dev = Calibrations(coeff_file)  # initialize calibration class
+    if os.path.isfile(coeff_file):
+        # we always want to use this file if it exists
+        dev.load_coeffs()
+        return dev
+
+    # load from the CI hosted CSV files
+    csv_url = find_calibration('FLORT', serial, start_time)
+    if csv_url:
+        dev.read_csv(csv_url)
+        dev.save_coeffs()
+        return dev
+
+    return None
+
+
+def profile_starts(pressure, time, turn=PROFILE_TURN, gap=PROFILE_GAP):
+    """
+    Find the first record of each profile in a Prawler data file. A new
+    profile starts after the profiler turns around (the pressure record
+    reverses direction by more than the turn threshold, with the record at the
+    turning point ending the previous profile), or after a gap in the records.
+
+    :param pressure: pressure record (dbar)
+    :param time: time of each record in seconds since 1970-01-01
+    :param turn: minimum change in pressure (dbar) after a turn to start a new
+        profile, smaller reversals are treated as noise
+    :param gap: minimum gap between records (seconds) to start a new profile
+    :return starts: index of the first record in each profile
+    """
+    breaks = set((np.flatnonzero(np.diff(time) > gap) + 1).tolist())
+    pressure = pressure.tolist()
+    starts = [0]
+    direction = 0           # 1 descending, -1 ascending, 0 not yet known
+    extreme = None          # index of the deepest (or shallowest) record so far in the current profile
+    for i, p in enumerate(pressure):
+        if breaks and i in breaks:
+            starts.append(i)
+            direction, extreme = 0, None
+        if p != p:
+            # skip the missing (NaN) pressure records
+            continue
+        if extreme is None:
+            extreme = i
+            continue
+
+        change = p - pressure[extreme]
+        if direction == 0:
+            # wait for the profiler to move far enough to set the direction of travel
+            if abs(change) > turn:
+                direction, extreme = (1 if change > 0 else -1), i
+        elif change * direction > 0:
+            extreme = i
+        elif abs(change) > turn:
+            # the profiler has turned around, starting a new profile after the turning point
+            starts.append(extreme + 1)
+            direction, extreme = -direction, i
+
+    return np.array(starts, dtype=int)
+
+
+def profile_chunks(starts, nrecords, chunk_size=CHUNK_SIZE):
+    """
+    Group the profiles into chunks of up to chunk_size records, keeping the
+    profiles whole (a single profile longer than the chunk size is a chunk on
+    its own). With a chunk size of 1, each profile is returned separately.
+
+    :param starts: index of the first record in each profile
+    :param nrecords: total number of records
+    :param chunk_size: maximum number of records in a chunk
+    :return chunks: list of the first and last (exclusive) record, and the
+        first and last (exclusive) profile, of each chunk
+    """
+    stops = np.append(starts[1:], nrecords)
+    chunks = []
+    first = 0
+    for i in range(1, len(starts) + 1):
+        if i == len(starts) or stops[i] - starts[first] > chunk_size:
+            chunks.append((starts[first], stops[i - 1], first, i))
+            first = i
+
+    return chunks
+
+
+def iter_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial, chunk_size=CHUNK_SIZE):
     """
     Processing function for the McLane Prawler MMP sensor. Loads the JSON
-    formatted parsed data and applies appropriate calibration coefficients to
-    convert the raw parsed data into engineering units. 
+    formatted parsed data, splits the science data into profiles (see
+    profile_starts) and applies appropriate calibration coefficients to
+    convert the raw parsed data into engineering units, working through the
+    profiles in chunks so the processed data only ever needs to be held in
+    memory for a single chunk, regardless of the size of the data file. The
+    parsed data is converted to numpy arrays as it is loaded, releasing the
+    JSON lists, and the calibration coefficients are loaded once per file.
 
     :param infile: JSON formatted parsed data file
     :param platform: Name of the mooring the instrument is mounted on.
@@ -56,92 +169,156 @@ def proc_mmp_prawler(infile, platform, deployment, lat, lon, depth, coeff_file,
     :param lat: Latitude of the mooring deployment.
     :param lon: Longitude of the mooring deployment.
     :param depth: Depth of the platform the instrument is mounted on.
-
-    :return prawler: An xarray dataset with the processed Prawler data
+    :param coeff_file: FLORT calibration coefficients file
+    :param serial: FLORT serial number
+    :param chunk_size: maximum number of records processed at a time (see
+        profile_chunks)
+    :return prawler: generator of xarray datasets with the processed Prawler
+        data, one per chunk of profiles
     """
-
     # load the json from file. If valid, make a dataframe from the
     # science profile data within the json dictionary
-    
     prawler_json = read_json(infile)
     if prawler_json is None:
         print("Processing of Prawler MMP file {0} aborted".format(infile))
-        return None
-    
-    # replace epoch_time with time
-    prawler_json['scidata'][ 'time'] = prawler_json['scidata'].pop( 'epoch_time')
+        return
 
-    # create a Pandas dataframe from the science profiles within the prawler data
-
-    prawler_df = pd.DataFrame( prawler_json["scidata"] )
+    # replace epoch_time with time, and create a Pandas dataframe from the science profiles within the prawler data
+    scidata = prawler_json.pop('scidata')
+    scidata['time'] = scidata.pop('epoch_time')
+    prawler_df = json_obj2df({'scidata': scidata}, 'scidata')
+    del scidata
     if prawler_df.empty:
         print("No science profiles found in file {0}".format(infile))
-        
-    # rename the epoch time column to time
-
-    prawler_df['time'] = pd.to_datetime(prawler_df['time'], unit='s')
-    prawler_df.index = prawler_df['time']
+        return
 
-    # add the deployment id, used to subset data sets
-    prawler_df['deploy_id'] = deployment
-
-    attrs = PRAWLER
+    # add back some of the useful prawler summary data fields as attributes
+    prawler_id = prawler_json['summarydata']['ID'][0]
+    serial_no = prawler_json['summarydata']['serial_number'][0]
+    del prawler_json
 
     # Do not try to compute calculated fields if no fluorometer exists
-    if 'flu_chl_count' in prawler_json['scidata'].keys():
-
+    dev = None
+    attrs = merge_attrs(SHARED, PRAWLER)
+    time = prawler_df.index.values.astype('int64') * 10 ** -9
+    if 'flu_chl_count' in prawler_df.columns:
         # If the prawler has a fluorometer, it should have a corresponding calibration coefficients file
         if coeff_file is not None:
-            calib_prefix = "FLORT"
-            dev = Calibrations(coeff_file)  # initialize calibration class
-            if os.path.isfile(coeff_file):
-                # we always want to use this file if it exists
-                dev.load_coeffs()
-            else:
-            # load from the CI hosted CSV files
-                csv_url = find_calibration(calib_prefix, serial, (prawler_df.time.values.astype('int64') * 10 ** -9)[0])
-                if csv_url:
-                    dev.read_csv(csv_url)
-                    dev.save_coeffs()
-                else:
-                    print('A source for the FLORT calibration coefficients for {} could not be found'.format(infile))
-                    return None
-
-            prawler_df['estimated_chlorophyll'] = flo_scale_and_offset( 
-                prawler_df['flu_chl_count'], dev.coeffs['dark_chla'], dev.coeffs['scale_chla'])
-            
-            prawler_df['fluorometric_cdom'] = flo_scale_and_offset(
-                prawler_df['flu_cdom_count'], dev.coeffs['dark_cdom'], dev.coeffs['scale_cdom'])
-            
-            prawler_df['beta_700'] = flo_scale_and_offset(
-                prawler_df['flu_beta_count'], dev.coeffs['dark_beta'], dev.coeffs['scale_beta'])
-            
+            dev = load_calibrations(coeff_file, serial, time[0])
+            if dev is None:
+                print('A source for the FLORT calibration coefficients for {} could not be found'.format(infile))
+                return
+    else:
+        attrs = merge_attrs(SHARED, PRAWLER_NO_FLORT)
+
+    # number the profiles, used to subset the data by profile
+    starts = profile_starts(prawler_df['pressure'].values, time)
+    prawler_df['profile_id'] = np.repeat(np.arange(1, starts.size + 1, dtype=np.int32),
+                                         np.diff(np.append(starts, len(prawler_df))))
+
+    for i0, i1, _, _ in profile_chunks(starts, len(prawler_df), chunk_size):
+        df = prawler_df.iloc[i0:i1].copy()
+
+        # add the deployment id, used to subset data sets
+        df['deploy_id'] = deployment
+
+        if dev is not None:
+            df['estimated_chlorophyll'] = flo_scale_and_offset(
+                df['flu_chl_count'], dev.coeffs['dark_chla'], dev.coeffs['scale_chla'])
+
+            df['fluorometric_cdom'] = flo_scale_and_offset(
+                df['flu_cdom_count'], dev.coeffs['dark_cdom'], dev.coeffs['scale_cdom'])
+
+            df['beta_700'] = flo_scale_and_offset(
+                df['flu_beta_count'], dev.coeffs['dark_beta'], dev.coeffs['scale_beta'])
+
             # calculate the practical salinity of the seawater from the temperature, conductivity and
             # pressure measurements
-            prawler_df['salinity'] = SP_from_C( prawler_df['conductivity'].values * 10.0, 
-                                            prawler_df['temperature'].values, 
-                                            prawler_df['pressure'].values)
-
-            prawler_df['bback'] = flo_bback_total( prawler_df['beta_700'], 
-                                                prawler_df['temperature'], 
-                                                prawler_df['salinity'], 124., 700., 1.076)
-            
-    else:
-        attrs = PRAWLER_NO_FLORT
+            df['salinity'] = SP_from_C(df['conductivity'].values * 10.0, df['temperature'].values,
+                                       df['pressure'].values)
 
-    # calculate depth from pressure
-    prawler_df['depth'] = z_from_p( prawler_df['pressure'], lat)  # keep for compat w/ early data ingests
+            df['bback'] = flo_bback_total(df['beta_700'], df['temperature'], df['salinity'], 124., 700., 1.076)
 
-    # Translate to xarray, add in attributes
-    prawler_xr = xr.Dataset.from_dataframe( prawler_df )
-    prawler_xr = update_dataset(prawler_xr, platform, deployment, lat, lon, [depth, depth, depth], attrs)
-    prawler_xr.attrs['processing_level'] = 'processed'
+        # calculate depth from pressure
+        df['depth'] = z_from_p(df['pressure'], lat)  # keep for compat w/ early data ingests
 
-    # add back some of the useful prawler summary data fields as attributes
-    prawler_xr.attrs['prawler_id'] = prawler_json['summarydata']['ID'][0]
-    prawler_xr.attrs['serial_no'] = prawler_json['summarydata']['serial_number'][0]
+        # Translate to xarray, add in attributes
+        prawler_xr = xr.Dataset.from_dataframe(df)
+        prawler_xr = update_dataset(prawler_xr, platform, deployment, lat, lon, [depth, depth, depth], attrs)
+        prawler_xr.attrs['processing_level'] = 'processed'
+        prawler_xr.attrs['prawler_id'] = prawler_id
+        prawler_xr.attrs['serial_no'] = serial_no
+
+        yield prawler_xr
+
+
+def proc_mmp_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial):
+    """
+    Processing function for the McLane Prawler MMP sensor, returning all of
+    the profiles in the data file as a single data set (see iter_prawler).
+    Use ingest_prawler to write large data files to disk chunk by chunk.
+
+    :param infile: JSON formatted parsed data file
+    :param platform: Name of the mooring the instrument is mounted on.
+    :param deployment: Name of the deployment for the input data file.
+    :param lat: Latitude of the mooring deployment.
+    :param lon: Longitude of the mooring deployment.
+    :param depth: Depth of the platform the instrument is mounted on.
+    :param coeff_file: FLORT calibration coefficients file
+    :param serial: FLORT serial number
+
+    :return prawler: An xarray dataset with the processed Prawler data
+    """
+    chunks = list(iter_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial))
+    if not chunks:
+        return None
+    if len(chunks) == 1:
+        return chunks[0]
+
+    return xr.concat(chunks, dim='time', data_vars='minimal', coords='minimal', compat='override',
+                     combine_attrs='override')
+
+
+def ingest_prawler(infile, outfile, platform, deployment, lat, lon, depth, coeff_file, serial, writer='daily',
+                   engine='h5netcdf', chunk_size=CHUNK_SIZE):
+    """
+    Process a Prawler MMP data file chunk by chunk (see iter_prawler),
+    appending each chunk to the output file as it is processed rather than
+    collecting the whole file in memory first. The daily output file is
+    created with the first chunk, with an unlimited time dimension, and the
+    records from the remaining chunks are added to the end of it (see
+    extend_netcdf). The other writers append each chunk in turn (see
+    write_dataset).
+
+    :param infile: JSON formatted parsed data file
+    :param outfile: daily output file name with the full, absolute path
+    :param platform: Name of the mooring the instrument is mounted on.
+    :param deployment: Name of the deployment for the input data file.
+    :param lat: Latitude of the mooring deployment.
+    :param lon: Longitude of the mooring deployment.
+    :param depth: Depth of the platform the instrument is mounted on.
+    :param coeff_file: FLORT calibration coefficients file
+    :param serial: FLORT serial number
+    :param writer: writer type, either daily (default), deployment, monthly
+        or zarr
+    :param engine: NetCDF engine used to write the file. The default h5netcdf
+        engine sets reasonable chunk sizes along the unlimited time dimension,
+        which the netcdf4 engine leaves at a single record.
+    :param chunk_size: maximum number of records processed at a time
+    :return nrecords: number of records written
+    """
+    nrecords = 0
+    for prawler in iter_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial, chunk_size):
+        if writer not in [None, 'daily']:
+            write_dataset(prawler, outfile, writer=writer, engine=engine)
+        elif nrecords == 0:
+            write_netcdf(prawler, outfile, engine=engine, unlimited_dims=['time'])
+        elif not extend_netcdf(prawler, outfile):
+            # the chunks should always follow on from each other, but fall back to merging the records if not
+            append_dataset(prawler, outfile, engine=engine)
+        nrecords += prawler['time'].size
 
-    return prawler_xr
+    return nrecords
 
 
 def main(argv=None):
@@ -163,10 +340,8 @@ def main(argv=None):
     coeff_file = args.coeff_file
     serial = args.serial
 
-    # process the science profile data and save the results to disk
-    prawler = proc_mmp_prawler(infile, platform, deployment, lat, lon, depth, coeff_file, serial)
-    if prawler:
-        prawler.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+    # process the science profile data and save the results to disk, a chunk of profiles at a time
+    ingest_prawler(infile, outfile, platform, deployment, lat, lon, depth, coeff_file, serial, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_mopak import MOPAK
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -42,7 +42,7 @@ def proc_mopak(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     mopak['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(mopak.time)).astype(str))
-    attrs = dict_update(MOPAK, SHARED)  # add the shared attributes
+    attrs = merge_attrs(MOPAK, SHARED)  # add the shared attributes
     mopak = update_dataset(mopak, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     mopak.attrs['processing_level'] = 'parsed'
 
@@ -63,7 +63,7 @@ def main(argv=None):
     # process the 3-D accelerometer data and save the results to disk
     mopak = proc_mopak(infile, platform, deployment, lat, lon, depth)
     if mopak:
-        mopak.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(mopak, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
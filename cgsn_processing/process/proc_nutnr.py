@@ -13,17 +13,94 @@ import pandas as pd
 import re
 import xarray as xr
 
-from datetime import timedelta
-
-from cgsn_processing.process.common import Coefficients, inputs, json2df, colocated_ctd, dict_update, \
-    update_dataset, dt64_epoch, ENCODING, FILL_INT
+from cgsn_processing.process.common import Coefficients, inputs, json2df, colocated_ctd, merge_attrs, \
+    update_dataset, dt64_epoch, write_dataset, FILL_INT, burst_average, interp_colocated, CTD_COLUMNS
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_nutnr import NUTNR
 from cgsn_processing.process.configs.attr_common import SHARED
 
-from pyseas.data.nit_functions import ts_corrected_nitrate
 from gsw import SP_from_C, p_from_z, z_from_p
 
+# data types for the parsed NUTNR data (see json2df)
+SCHEMA = {
+    'arrays': {'channel_measurements': 'int32'}
+}
+
+
+# coefficients for the temperature dependence of the seawater absorption spectrum (Sakamoto et al., 2009)
+TCSS_A = 1.1500276
+TCSS_B = 0.02840
+TCSS_C = -0.3101349
+TCSS_D = 0.001222
+
+# frame types of the dark frames recorded by the SUNA (full ASCII or binary) and the ISUS (full or concentration)
+DARK_FRAMES = ['SDF', 'SDB', 'NDF', 'NDC']
+
+
+def batch_corrected_nitrate(cal_temp, wl, eno3, eswa, di, dark_value, ctd_t, ctd_sp, data_in, frame_type,
+                            wllower=217, wlupper=240):
+    """
+    Temperature and salinity corrected nitrate concentration (OOI data product
+    NITRTSC) calculated for all of the spectra at once. Follows the same steps
+    as pyseas.data.nit_functions.ts_corrected_nitrate (and takes the same
+    inputs), which fits each spectrum in turn. Since the wavelength window and
+    the calibration spectra are fixed within a file, the pseudo-inverse of the
+    least-squares design matrix (the nitrate extinction coefficients, a
+    constant and the wavelengths) is computed once, the temperature corrected
+    seawater absorption is applied to all the spectra with broadcasting, and
+    the nitrate coefficients for every spectrum come from a single matrix
+    multiply.
+
+    :param cal_temp: temperature of the pure water calibration (degC)
+    :param wl: wavelengths of the spectrometer channels (nm)
+    :param eno3: nitrate extinction coefficients for each wavelength
+    :param eswa: seawater extinction coefficients for each wavelength
+    :param di: pure water reference spectrum (counts)
+    :param dark_value: dark current for each spectrum (counts)
+    :param ctd_t: in-situ temperature for each spectrum (degC)
+    :param ctd_sp: in-situ practical salinity for each spectrum
+    :param data_in: spectra (time x channels, counts)
+    :param frame_type: frame type for each spectrum, dark frames (see DARK_FRAMES) are set to NaN
+    :param wllower: lower limit of the wavelength window used in the fit (nm)
+    :param wlupper: upper limit of the wavelength window used in the fit (nm)
+    :return no3: corrected nitrate concentration (uM)
+    """
+    # the calibration arrays are the same for every spectrum in the file
+    wl = np.atleast_2d(np.asarray(wl, dtype=float))[0]
+    eno3 = np.atleast_2d(np.asarray(eno3, dtype=float))[0]
+    eswa = np.atleast_2d(np.asarray(eswa, dtype=float))[0]
+    di = np.atleast_2d(np.asarray(di, dtype=float))[0]
+    cal_temp = np.atleast_1d(np.asarray(cal_temp, dtype=float))[0]
+
+    # subset the wavelengths used in the fit, and the pseudo-inverse of the design matrix for those wavelengths (only
+    # the first row, the nitrate concentration, is needed)
+    use = (wl >= wllower) & (wl <= wlupper)
+    wl = wl[use]
+    design = np.column_stack([eno3[use], np.ones(wl.size), wl])
+    no3_weights = np.linalg.pinv(design)[0]
+
+    # absorbance of the dark corrected spectra
+    dark_value = np.asarray(dark_value, dtype=float)[:, np.newaxis]
+    spectra = np.asarray(data_in, dtype=float)[:, use] - dark_value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        absorbance = np.log10(di[use] / spectra)
+
+    # seawater absorbance at the in-situ temperature and salinity
+    t = np.asarray(ctd_t, dtype=float)[:, np.newaxis]
+    sp = np.asarray(ctd_sp, dtype=float)[:, np.newaxis]
+    f_insitu = (TCSS_A + TCSS_B * t) * np.exp((TCSS_C + TCSS_D * t) * (wl - 210.0))
+    f_cal = (TCSS_A + TCSS_B * cal_temp) * np.exp((TCSS_C + TCSS_D * cal_temp) * (wl - 210.0))
+    absorbance -= eswa[use] * f_insitu / f_cal * sp
+
+    # fit all the spectra at once, and remove the dark frames
+    no3 = absorbance @ no3_weights
+    frame_type = np.asarray(frame_type)
+    if frame_type.dtype.kind == 'S':
+        frame_type = np.char.decode(frame_type, 'ascii')
+    dark = np.isin(np.char.strip(frame_type.astype(str)), DARK_FRAMES)
+    no3[dark] = np.nan
+    return no3
+
 
 class Calibrations(Coefficients):
     def __init__(self, coeff_file, csv_url=None):
@@ -107,7 +184,7 @@ def proc_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     burst = kwargs.get('burst')
 
     # load the json data file as a dictionary object for further processing
-    data = json2df(infile)
+    data, arrays = json2df(infile, SCHEMA)
     if data.empty:
         # json data file was empty, exiting
         return None
@@ -138,8 +215,9 @@ def proc_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     data['sensor_time'] = dt64_epoch(ds + td)
 
     # determine the instrument type and drop all dark frame measurements.
-    data = data[(data['measurement_type'] == 'NLC') | (data['measurement_type'] == 'NLF')
-                | (data['measurement_type'] == 'SLF')]
+    frames = ((data['measurement_type'] == 'NLC') | (data['measurement_type'] == 'NLF')
+              | (data['measurement_type'] == 'SLF')).values
+    data = data[frames]
     data = data.reset_index(drop=True)
     measurement_type = data['measurement_type'][0]
     instrument_type = None
@@ -171,9 +249,9 @@ def proc_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
     df['time'] = pd.to_datetime(nutnr_time, unit='s')
     df.set_index('time', drop=True, inplace=True)
 
-    # pop the raw channels array out of data (we will put it back in later)
+    # select the raw channels for the light frames from the 2D array loaded separately (we will put it back in later)
     if instrument_type in ['isus', 'suna']:
-        channels = np.array(np.vstack(data.pop('channel_measurements')))
+        channels = arrays['channel_measurements'][frames]
     else:
         empty_data = dev.coeffs['wl'].astype(int) * 0
         channels = np.tile(empty_data, (len(nutnr_time), 1))
@@ -217,45 +295,36 @@ def proc_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd = colocated_ctd(infile, ctd_name)
 
     if not ctd.empty:
-        # test to see if the CTD covers our time period for this nutnr file
-        td = timedelta(hours=1)
-        coverage = ctd.time.min() <= min(nutnr_time) and ctd.time.max() + td >= max(nutnr_time)
-
-        # reset initial estimates of in-situ temperature and salinity if we have full coverage
-        if coverage:
-            # The Global moorings may use the data from the METBK-CT for the NUTNR mounted on the buoy subsurface plate.
-            # We'll rename the data columns from the METBK to match other CTDs and process accordingly.
-            if re.match('metbk', ctd_name):
-                # rename temperature and salinity
-                ctd = ctd.rename(columns={
-                    'sea_surface_temperature': 'temperature',
-                    'sea_surface_conductivity': 'conductivity'
-                })
-                # set the pressure (dbar) from the approximate depth (m) below the water line.
-                ctd['pressure'] = p_from_z(-1.25, lat)
-
-            pressure = np.interp(nutnr_time, ctd.time, ctd.pressure)
-            df['ctd_pressure'] = pressure
-            depth[0] = z_from_p(np.mean(pressure), lat) * -1
-            depth[1] = z_from_p(pressure.min(), lat) * -1
-            depth[2] = z_from_p(pressure.max(), lat) * -1
-
-            temperature = np.interp(nutnr_time, ctd.time, ctd.temperature)
-            df['ctd_temperature'] = temperature
-
-            salinity = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
-            salinity = np.interp(nutnr_time, ctd.time, salinity)
-            df['ctd_salinity'] = salinity
+        # The Global moorings may use the data from the METBK-CT for the NUTNR mounted on the buoy subsurface plate.
+        # We'll rename the data columns from the METBK to match other CTDs and process accordingly.
+        if re.match('metbk', ctd_name):
+            # rename temperature and salinity
+            ctd = ctd.rename(columns={
+                'sea_surface_temperature': 'temperature',
+                'sea_surface_conductivity': 'conductivity'
+            })
+            # set the pressure (dbar) from the approximate depth (m) below the water line.
+            ctd['pressure'] = p_from_z(-1.25, lat)
+
+        # reset initial estimates of in-situ temperature and salinity if the CTD covers our time period
+        ctd['salinity'] = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
+        block = interp_colocated(nutnr_time, ctd, CTD_COLUMNS)
+        if block is not None:
+            df[block.columns] = block.to_numpy()
+            pressure = block['ctd_pressure'].values
+            depth[0] = z_from_p(np.nanmean(pressure), lat) * -1
+            depth[1] = z_from_p(np.nanmin(pressure), lat) * -1
+            depth[2] = z_from_p(np.nanmax(pressure), lat) * -1
 
     # Calculate the corrected nitrate concentration (uM) accounting for temperature and salinity and the pure
     # water calibration values. Use the corrected nitrate Molar concentration to estimate the nitrogen mass
     # concentration.
     if instrument_type != 'condensed' and proc_flag:
-        df['corrected_nitrate'] = ts_corrected_nitrate(dev.coeffs['cal_temp'], dev.coeffs['wl'], dev.coeffs['eno3'],
-                                                       dev.coeffs['eswa'], dev.coeffs['di'], df['seawater_dark'],
-                                                       df['ctd_temperature'], df['ctd_salinity'], channels,
-                                                       df['measurement_type'], dev.coeffs['wllower'],
-                                                       dev.coeffs['wlupper'])
+        df['corrected_nitrate'] = batch_corrected_nitrate(dev.coeffs['cal_temp'], dev.coeffs['wl'],
+                                                          dev.coeffs['eno3'], dev.coeffs['eswa'], dev.coeffs['di'],
+                                                          df['seawater_dark'], df['ctd_temperature'],
+                                                          df['ctd_salinity'], channels, df['measurement_type'],
+                                                          dev.coeffs['wllower'], dev.coeffs['wlupper'])
         df['corrected_nitrogen_in_nitrate'] = df['corrected_nitrate'] / 1000 * 14.0067
 
     # now that we no longer need it, get rid of the measurement type
@@ -276,25 +345,15 @@ def proc_nutnr(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # apply a median average to the burst (if desired)
     if burst:
-        # resample to a 15-minute interval
-        nutnr['time'] = nutnr.time + pd.Timedelta('450s')
-        nutnr = nutnr.resample(time='900s').median(dim='time', keep_attrs=True)
-
-        # resampling will fill in missing time steps with NaNs. Use the serial_number variable
-        # as a proxy variable to find cases where data is filled with a NaN, and delete those records.
-        nutnr = nutnr.where(~np.isnan(nutnr.serial_number), drop=True)
-
-        # reset original integer values
+        # resample to a 15-minute interval, resetting the original integer values
         int_arrays = ['serial_number', 'channel_measurements', 'lamp_on_time', 'spectral_average', 'seawater_dark',
                       'integration_factor', 'main_current']
-        for var in nutnr.variables:
-            if var in int_arrays:
-                nutnr[var] = nutnr[var].astype(int)
+        nutnr = burst_average(nutnr, '900s', 'median', int_arrays)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     nutnr['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(nutnr.time)).astype(str))
-    attrs = dict_update(NUTNR, SHARED)
-    nutnr = update_dataset(nutnr, platform, deployment, lat, lon, depth, attrs)
+    attrs = merge_attrs(NUTNR, SHARED)
+    nutnr = update_dataset(nutnr, platform, deployment, lat, lon, depth, attrs, low_memory=True)
     if proc_flag:
         nutnr.attrs['processing_level'] = 'processed'
     else:
@@ -319,7 +378,7 @@ def main(argv=None):
     # process the NUTNR data and save the results to disk
     nutnr = proc_nutnr(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name, burst=burst)
     if nutnr:
-        nutnr.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(nutnr, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
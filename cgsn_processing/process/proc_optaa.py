@@ -12,11 +12,10 @@ import numpy as np
 import os
 import pandas as pd
 import re
-import requests
 import xarray as xr
 
 from cgsn_processing.process.common import Coefficients, inputs, json2obj, colocated_ctd, \
-    update_dataset, ENCODING, FILL_INT, dict_update
+    update_dataset, write_dataset, FILL_INT, merge_attrs, burst_average, interp_colocated, CTD_COLUMNS
 from cgsn_processing.process.configs.attr_optaa import OPTAA
 from cgsn_processing.process.configs.attr_common import SHARED, CO_LOCATED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -99,6 +98,8 @@ class Calibrations(Coefficients):
         puts some constraints on this process. If someone has a cleaner method,
         I'm all in favor...
         """
+        import requests  # only needed when the coefficients are pulled from GitHub
+
         # create the device file dictionary and assign values
         coeffs = {}
         
@@ -429,16 +430,11 @@ def proc_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd = colocated_ctd(infile, ctd_name)
 
     if not ctd.empty:
-        # test to see if the CTD covers our time of interest for this optaa file
-        td = pd.Timedelta('1h')
-        coverage = ctd['time'].min() - td <= df['time'].min() and ctd['time'].max() + td >= df['time'].max()
-
-        # reset initial estimates of in-situ temperature and salinity if we have full coverage
-        if coverage:
-            df['ctd_pressure'] = np.interp(df['time'], ctd['time'], ctd.pressure)
-            df['ctd_temperature'] = np.interp(df['time'], ctd['time'], ctd.temperature)
-            salinity = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
-            df['ctd_salinity'] = np.interp(df['time'], ctd['time'], salinity)
+        # reset initial estimates of in-situ temperature and salinity if the CTD covers our time of interest
+        ctd['salinity'] = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
+        block = interp_colocated(df['time'], ctd, CTD_COLUMNS)
+        if block is not None:
+            df[block.columns] = block.to_numpy()
 
     # convert the 1D data frame to an xarray dataset
     ds = xr.Dataset.from_dataframe(df)
@@ -512,26 +508,15 @@ def proc_optaa(infile, platform, deployment, lat, lon, depth, **kwargs):
         # the status of the sensor itself (bio-fouling tracking).
         optaa = calculate_ratios(optaa, dev.coeffs)
 
-    # resample to a 15-minute interval (shifting the time to the middle of the interval)
-    optaa['time'] = optaa.time + pd.Timedelta('450s')
-    optaa = optaa.resample(time='900s').median(dim='time', keep_attrs=True)
-
-    # resampling will fill in missing time steps with NaNs. Use the serial_number variable
-    # as a proxy variable to find cases where data is filled with a NaN, and delete those records.
-    optaa = optaa.where(~np.isnan(optaa.serial_number), drop=True)
-
-    # reset original integer arrays back to int32
+    # median average the bursts into 15-minute intervals, resetting the original integer arrays as int32
     int_arrays = ['serial_number', 'elapsed_run_time', 'internal_temp_raw', 'external_temp_raw',
                   'a_signal_raw', 'a_reference_raw', 'c_signal_raw', 'c_reference_raw']
-    for k in optaa.variables:
-        if k in int_arrays:
-            optaa[k] = optaa[k].astype(np.intc)  # explicitly setting as a 32-bit integer
+    optaa = burst_average(optaa, '900s', 'median', int_arrays)
 
     # update the data set with the appropriate attributes
     optaa['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(optaa.time)).astype(str))
-    attrs = dict_update(OPTAA, CO_LOCATED)  # add the co-located CTD attributes
-    attrs = dict_update(attrs, SHARED)  # add the shared attributes
-    optaa = update_dataset(optaa, platform, deployment, lat, lon, depth_range, attrs)
+    attrs = merge_attrs(OPTAA, CO_LOCATED, SHARED)  # add the co-located CTD and shared attributes
+    optaa = update_dataset(optaa, platform, deployment, lat, lon, depth_range, attrs, low_memory=True)
     optaa['wavelength_number'].attrs['actual_wavelengths'] = np.intc(num_wavelengths)
     if proc_flag:
         optaa.attrs['processing_level'] = 'processed'
@@ -564,7 +549,7 @@ def main(argv=None):
     # process the OPTAA data and save the results to disk
     optaa = proc_optaa(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name, burst=burst)
     if optaa:
-        optaa.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(optaa, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -11,7 +11,8 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, colocated_ctd
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, colocated_ctd, \
+    burst_average, interp_colocated
 from cgsn_processing.process.configs.attr_metbk import METBK
 from cgsn_processing.process.configs.attr_pco2a import PCO2A
 from cgsn_processing.process.configs.attr_common import SHARED
@@ -91,18 +92,17 @@ def proc_pco2a(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # clean up the PCO2A dataset and assign attributes
     pco2a['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(pco2a.time)).astype(str))
-    attrs = dict_update(PCO2A, SHARED)  # add the shared attributes
+    attrs = merge_attrs(PCO2A, SHARED)  # add the shared attributes
     pco2a = update_dataset(pco2a, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     pco2a.attrs['processing_level'] = 'processed'
 
-    # resample the air and water datasets to hourly averages
-    air['time'] = air.time.dt.round('1h')  # round the time to the nearest hour
-    air = air.resample(time='1h').median(dim='time', keep_attrs=True)
+    # resample the air and water datasets to hourly averages (centered on the hour), keeping the empty hours so short
+    # gaps can be filled
+    air = burst_average(air, '1h', 'median', keep_empty=True)
     air = air.interpolate_na(dim='time', max_gap='3h')  # interpolate any gaps less than 3 hours in the data
     air = air.where(~np.isnan(air), drop=True)  # drop any remaining NaNs
 
-    water['time'] = water.time.dt.round('1h')  # round the time to the nearest hour
-    water = water.resample(time='1h').median(dim='time', keep_attrs=True)
+    water = burst_average(water, '1h', 'median', keep_empty=True)
     water = water.interpolate_na(dim='time', max_gap='3h')  # interpolate any gaps less than 3 hours in the data
     water = water.where(~np.isnan(water), drop=True)  # drop any remaining NaNs
 
@@ -123,40 +123,31 @@ def proc_pco2a(infile, platform, deployment, lat, lon, depth, **kwargs):
         metbk = colocated_ctd(infile, metbk_name)
 
     if not metbk.empty:
-        metbk = xr.Dataset.from_dataframe(metbk)
-
-        # test to see if the metbk covers our time of interest for this PCO2A file
-        td = timedelta(hours=1)
-        coverage = (metbk['time'].min() <= flux['time'].min() and metbk['time'].max() + td >= flux['time'].max())
-
-        # interpolate the CTD data if we have full coverage
-        if coverage:
-            # resample the metbk data to 10 minute median averages and calculate the 10 m wind speed and
-            # sea surface salinity
-            metbk = metbk.resample(time='10Min').median(dim='time', keep_attrs=True)
-            u10 = wind_10m(metbk['northward_wind_velocity'], metbk['eastward_wind_velocity'])
-            psu = SP_from_C(metbk['sea_surface_conductivity'] * 10, metbk['sea_surface_temperature'], 0)
-
-            # interpolate the 10 m wind speed to the flux time stamps as well as the other metbk variables
-            u10 = np.interp(flux['time'], metbk['time'], u10)
-            psu = np.interp(flux['time'], metbk['time'], psu)
-            sst = np.interp(flux['time'], metbk['time'], metbk['sea_surface_temperature'])
-            air_temp = np.interp(flux['time'], metbk['time'], metbk['air_temperature'])
-
+        # resample the metbk data to 10 minute median averages and calculate the 10 m wind speed and
+        # sea surface salinity
+        metbk = burst_average(xr.Dataset.from_dataframe(metbk), '10Min', 'median', shift='0s')
+        metbk = metbk.to_dataframe().reset_index()
+        metbk['u10'] = wind_10m(metbk['northward_wind_velocity'], metbk['eastward_wind_velocity'])
+        metbk['sea_surface_salinity'] = SP_from_C(metbk['sea_surface_conductivity'] * 10,
+                                                  metbk['sea_surface_temperature'], 0)
+
+        # interpolate the 10 m wind speed and the other metbk variables to the flux time stamps if the metbk covers
+        # our time of interest for this PCO2A file
+        block = interp_colocated(flux['time'], metbk, ['u10', 'sea_surface_salinity', 'sea_surface_temperature',
+                                                       'air_temperature'])
+        if block is not None:
             # assign the metbk variables to the flux dataset
-            flux['u10'] = xr.DataArray(u10, coords=[flux.time], dims=['time'])
-            flux['sea_surface_salinity'] = xr.DataArray(psu, coords=[flux.time], dims=['time'])
-            flux['sea_surface_temperature'] = xr.DataArray(sst, coords=[flux.time], dims=['time'])
-            flux['air_temperature'] = xr.DataArray(air_temp, coords=[flux.time], dims=['time'])
+            for name in block.columns:
+                flux[name] = xr.DataArray(block[name].to_numpy(), coords=[flux.time], dims=['time'])
 
             # calculate the pCO2 flux (in umol/m^2/s) using the 10 m wind speed, sea surface temperature, and salinity
-            flux['co2_flux'] = co2_co2flux(flux['seawater_co2_ppressure'], flux['atmospheric_co2_ppressure'], u10,
-                                           sst, psu) * 1e6
+            flux['co2_flux'] = co2_co2flux(flux['seawater_co2_ppressure'], flux['atmospheric_co2_ppressure'],
+                                           block['u10'].to_numpy(), block['sea_surface_temperature'].to_numpy(),
+                                           block['sea_surface_salinity'].to_numpy()) * 1e6
 
     # add the attributes to the flux dataset
     flux['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(flux.time)).astype(str))
-    attrs = dict_update(PCO2A, METBK)  # add the METBK attributes
-    attrs = dict_update(attrs, SHARED)  # add the COMMON attributes
+    attrs = merge_attrs(PCO2A, METBK, SHARED)  # add the METBK and shared attributes
     flux = update_dataset(flux, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     flux.attrs['processing_level'] = 'processed'
 
@@ -178,8 +169,8 @@ def main(argv=None):
     pco2a, flux = proc_pco2a(infile, platform, deployment, lat, lon, depth)
     if pco2a:
         flux_file = outfile.replace('_pco2a_', '_pco2_flux_')
-        pco2a.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
-        flux.to_netcdf(flux_file, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(pco2a, outfile, writer=args.writer)
+        write_dataset(flux, flux_file, writer=args.writer)
 
 
 if __name__ == '__main__':
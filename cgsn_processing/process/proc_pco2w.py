@@ -13,11 +13,8 @@ import pandas as pd
 import warnings
 import xarray as xr
 
-from datetime import datetime, timedelta
-from pytz import timezone
-
-from cgsn_processing.process.common import Coefficients, NumpyEncoder, ENCODING, inputs, dict_update, json2df, \
-    update_dataset
+from cgsn_processing.process.common import Coefficients, write_dataset, inputs, merge_attrs, json2df, \
+    update_dataset, sami_epoch, file_lock
 from cgsn_processing.process.configs.attr_pco2w import PCO2W
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
@@ -26,45 +23,6 @@ from pyseas.data.co2_functions import co2_blank, co2_thermistor, co2_pco2wat
 from pyseas.data.ph_functions import ph_battery
 
 
-class Blanks(object):
-    """
-    JSON object used to store the PCO2W absorbance blanks used in the
-    calculations of the pCO2 of seawater from a Sunburst Sensors, SAMI-pCO2
-    """
-    def __init__(self, blnkfile, k434, k620):
-        # initialize the information needed to define the file and pure water blanks
-        self.blnkfile = blnkfile
-        self.k434 = k434
-        self.k620 = k620
-
-    def load_blanks(self):
-        # load the blanks
-        with open(self.blnkfile, 'r') as f:
-            blanks = json.load(f)
-
-        # assign the blanks
-        self.k434 = blanks['k434']
-        self.k620 = blanks['k620']
-
-    def save_blanks(self):
-        # create the blanks dictionary
-        blanks = {
-            'k434': self.k434,
-            'k620': self.k620
-        }
-
-        # save the blanks to a JSON file (remove the file, if it exists, before writing the new data)
-        try:
-            os.remove(self.blnkfile)
-        except OSError:
-            pass
-
-        # now write the blanks to the file
-        with open(self.blnkfile, 'w') as f:
-            jdata = json.dumps(blanks, cls=NumpyEncoder)
-            f.write(jdata)
-
-            
 class Calibrations(Coefficients):
     def __init__(self, coeff_file, csv_url=None):
         """
@@ -108,6 +66,86 @@ class Calibrations(Coefficients):
         self.coeffs = coeffs
 
 
+class Blanks(Coefficients):
+    def __init__(self, blank_file):
+        """
+        A time indexed history of the pure water blanks (k434 and k620)
+        measured by the SAMI-pCO2 over the course of a deployment, saved to a
+        JSON file alongside the parsed data. The blanks are kept separate from
+        the calibration coefficients, so they are recorded even when the
+        calibrations are not yet available, and each file can start from the
+        last blank measured before its first record (e.g. when reprocessing an
+        earlier file from the deployment).
+        """
+        # assign the inputs
+        Coefficients.__init__(self, blank_file)
+        self.coeffs = {'time': np.array([]), 'k434': np.array([]), 'k620': np.array([])}
+
+    def load_blanks(self):
+        """
+        Load the history of pure water blanks, if the file exists. Files
+        written by earlier versions of this processor hold a single set of
+        blanks without a time, which is treated as preceding all the records.
+        """
+        with file_lock(self.coeff_file):
+            if not os.path.isfile(self.coeff_file):
+                return
+            self.load_coeffs()
+
+        for k in ['time', 'k434', 'k620']:
+            self.coeffs[k] = np.atleast_1d(np.asarray(self.coeffs.get(k, 0.0), dtype=float))
+
+    def blank_before(self, time):
+        """
+        Returns the most recent pure water blanks measured before a time.
+
+        :param time: record time in seconds since 1970-01-01
+        :return k434, k620: blanks measured before the time, NaN if there are none
+        """
+        idx = np.searchsorted(self.coeffs['time'], time) - 1
+        if idx < 0:
+            return np.nan, np.nan
+
+        return self.coeffs['k434'][idx], self.coeffs['k620'][idx]
+
+    def save_blanks(self, time, k434, k620):
+        """
+        Add the pure water blanks from a file to the history, replacing any
+        blanks previously recorded with the same times, and save the history.
+        The file is reloaded and updated under a lock, as the files from a
+        deployment may be processed in parallel.
+
+        :param time: times of the blank measurements in seconds since 1970-01-01
+        :param k434: k434 blanks
+        :param k620: k620 blanks
+        """
+        with file_lock(self.coeff_file):
+            if os.path.isfile(self.coeff_file):
+                self.load_coeffs()
+            old = {k: np.atleast_1d(np.asarray(self.coeffs.get(k, 0.0), dtype=float)) for k in ['time', 'k434', 'k620']}
+            keep = ~np.isin(old['time'], time)
+            blanks = {k: np.concatenate([old[k][keep], np.asarray(v, dtype=float)])
+                      for k, v in zip(['time', 'k434', 'k620'], [time, k434, k620])}
+            order = np.argsort(blanks['time'], kind='stable')
+            self.coeffs = {k: v[order] for k, v in blanks.items()}
+            self.save_coeffs()
+
+
+def latest_blank(record_type):
+    """
+    Finds the index of the most recent pure water blank measurement (record
+    type 5) for every record, so the blanks can be carried forward to the
+    seawater measurements that follow them. Records preceding the first blank
+    are set to -1.
+
+    :param record_type: array of SAMI record types
+    :return idx: index of the most recent blank measurement for each record
+    """
+    record_type = np.asarray(record_type)
+    idx = np.where(record_type == 5, np.arange(record_type.size), -1)
+    return np.maximum.accumulate(idx) if idx.size else idx
+
+
 def proc_pco2w(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     Processing function for the Sunburst Sensors SAMI-pCO2 sensor. Loads the
@@ -156,17 +194,9 @@ def proc_pco2w(infile, platform, deployment, lat, lon, depth, **kwargs):
         else:
             warnings.warn('Required calibrations coefficients could not be found.')
 
-    # initialize the pCO2 blanks class
-    blank_file = os.path.join(os.path.dirname(infile), 'pco2w.blank_coeffs.json')
-    blanks = Blanks(blank_file, np.nan, np.nan)
-
-    # check for the source of pCO2 blanks and load accordingly
-    if os.path.isfile(blank_file):
-        # we always want to use this file if it exists
-        blanks.load_blanks()
-    else:
-        # Create one using NaN's for the default blanks
-        blanks.save_blanks()
+    # load the pure water blanks recorded for this deployment
+    blanks = Blanks(os.path.join(os.path.dirname(infile), 'pco2w.blank_coeffs.json'))
+    blanks.load_blanks()
 
     # convert the raw battery voltage and thermistor values from counts to V and degC, respectively
     data.rename(columns={'voltage_raw': 'raw_battery_voltage',
@@ -182,52 +212,37 @@ def proc_pco2w(infile, platform, deployment, lat, lon, depth, **kwargs):
     # calculated against. the PCO2W uses the OSX date format of seconds since 1904-01-01. here we convert to seconds
     # since 1970-01-01. also, compare the instrument clock to the GPS based DCL time stamp (if present, does not apply
     # if this is an IMM hosted instrument).
-    rct = data['record_time'].astype(np.uint32).values * 1.0    # convert to a float
-    mac = datetime.strptime("01-01-1904", "%m-%d-%Y")
-    ept = datetime.strptime("01-01-1970", "%m-%d-%Y")
-    record_time = []
-    offset = []
-    for i in range(len(data['time'])):
-        rec = mac + timedelta(seconds=rct[i])
-        rec.replace(tzinfo=timezone('UTC'))
-        record_time.append((rec - ept).total_seconds())
-        if 'process_date_time' in data.columns:
-            offset.append((rec - data['time'][i]).total_seconds() - 300)    # with correction for processing time
-
-    data['record_time'] = record_time   # replace the instrument time stamp
-    if offset:
-        data['time_offset'] = offset    # add the estimated instrument clock offset
-
-    # calculate pCO2
-    pco2 = []
-    k434 = []
-    k620 = []
-
-    for i in range(len(data)):
-        if data['record_type'][i] == 4:
-            # this is a light measurement, calculate the pCO2 concentration
-            if not proc_flag or (np.isnan(blanks.k434) and np.isnan(blanks.k620)):
-                # We don't have a blank to use in the calculation, or the calibration coefficients are missing
-                pco2.append(np.nan)
-            else:
-                p = co2_pco2wat(data['ratio_434'][i], data['ratio_620'][i], data['thermistor_temperature'][i],
-                                cal.coeffs['calt'], cal.coeffs['cala'], cal.coeffs['calb'], cal.coeffs['calc'],
-                                blanks.k434, blanks.k620)
-                pco2.append(p.item())
-
-            # record the blanks used
-            k434.append(blanks.k434)
-            k620.append(blanks.k620)
-
-        if data['record_type'][i] == 5:
-            # this is a pure water blank measurement, update and save the new blanks
-            blanks.k434 = co2_blank(data['ratio_434'][i])
-            blanks.k620 = co2_blank(data['ratio_620'][i])
-            blanks.save_blanks()
-
-            pco2.append(np.nan)
-            k434.append(blanks.k434)
-            k620.append(blanks.k620)
+    data['record_time'] = sami_epoch(data['record_time'])
+    if 'process_date_time' in data.columns:
+        # add the estimated instrument clock offset, with correction for processing time
+        data['time_offset'] = data['record_time'] - data['time'].values.astype('int64') * 10 ** -9 - 300
+
+    # calculate the blanks from the pure water blank measurements (record type 5) and carry them forward to the
+    # seawater measurements (record type 4) that follow, starting with the last blanks measured before this file
+    record_type = data['record_type'].values
+    blank = record_type == 5
+    k434 = np.full(len(data), np.nan)
+    k620 = np.full(len(data), np.nan)
+    k434[blank] = co2_blank(data['ratio_434'].values[blank])
+    k620[blank] = co2_blank(data['ratio_620'].values[blank])
+
+    # record the blanks from this file for the other files from this deployment
+    if blank.any():
+        blanks.save_blanks(data['record_time'].values[blank], k434[blank], k620[blank])
+
+    idx = latest_blank(record_type)
+    start434, start620 = blanks.blank_before(data['record_time'].values.min())
+    k434 = np.where(idx >= 0, k434[idx], start434)
+    k620 = np.where(idx >= 0, k620[idx], start620)
+
+    # calculate pCO2 for all the seawater measurements with a blank to use in the calculation
+    pco2 = np.full(len(data), np.nan)
+    if proc_flag:
+        light = (record_type == 4) & ~(np.isnan(k434) & np.isnan(k620))
+        pco2[light] = co2_pco2wat(data['ratio_434'].values[light], data['ratio_620'].values[light],
+                                  data['thermistor_temperature'].values[light], cal.coeffs['calt'],
+                                  cal.coeffs['cala'], cal.coeffs['calb'], cal.coeffs['calc'],
+                                  k434[light], k620[light])
 
     # add the resulting data to the data frame and convert to an xarray data set
     data['pCO2'] = pco2
@@ -237,7 +252,7 @@ def proc_pco2w(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # update the metadata and set up the data for export to NetCDF
     pco2w['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(pco2w.time)).astype(str))
-    attrs = dict_update(PCO2W, SHARED)  # merge shared and PCO2W attribute dictionaries into a single dictionary
+    attrs = merge_attrs(PCO2W, SHARED)  # merge shared and PCO2W attribute dictionaries into a single dictionary
     pco2w = update_dataset(pco2w, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     if proc_flag:
         pco2w.attrs['processing_level'] = 'processed'
@@ -262,7 +277,7 @@ def main(argv=None):
     # process the PCO2W data and save the results to disk
     pco2w = proc_pco2w(infile, platform, deployment, lat, lon, depth, serial_number=serial_number)
     if pco2w:
-        pco2w.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(pco2w, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
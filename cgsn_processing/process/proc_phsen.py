@@ -13,18 +13,27 @@ import os
 import pandas as pd
 import xarray as xr
 
-from datetime import datetime, timedelta
-from pytz import timezone
+from numpy.lib.stride_tricks import sliding_window_view
 
-from cgsn_processing.process.common import ENCODING, Coefficients, colocated_ctd, inputs, json2df, \
-    dict_update, update_dataset
+from cgsn_processing.process.common import write_dataset, Coefficients, colocated_ctd, inputs, json2df, \
+    merge_attrs, update_dataset, interp_colocated, sami_epoch, CTD_COLUMNS, FILL_INT
 from cgsn_processing.process.configs.attr_phsen import PHSEN
 from cgsn_processing.process.configs.attr_common import SHARED
 from cgsn_processing.process.finding_calibrations import find_calibration
 
-from pyseas.data.ph_functions import ph_battery, ph_thermistor, ph_calc_phwater
+from pyseas.data.ph_functions import ph_battery, ph_thermistor
 from gsw import SP_from_C
 
+# data types for the parsed PHSEN data (see json2df)
+SCHEMA = {
+    'arrays': {'reference_measurements': 'int32', 'light_measurements': 'int32'}
+}
+
+# number of points in the window of seawater measurements used in the final pH fit, and the number of the first points
+# in each record skipped in the search for the most linear window
+PH_WINDOW = 8
+PH_SKIP = 5
+
 
 class Calibrations(Coefficients):
     def __init__(self, coeff_file, csv_url=None):
@@ -73,6 +82,116 @@ class Calibrations(Coefficients):
         self.coeffs = coeffs
 
 
+def phsen_arrays(refnc, light):
+    """
+    Split the raw reference (DI water blank) and light measurements for all of
+    the records into the named 2D (time x measurements) variables saved in the
+    data files. The 4 sets of 4 blank measurements are padded with a fill value
+    to the same shape as the 23 sets of 4 light measurements. The measurements
+    are reshaped rather than copied, and the blanks are written directly into
+    a single, preallocated integer array.
+
+    :param refnc: reference measurements (time x 16, counts)
+    :param light: light measurements (time x 92, counts)
+    :return arrays: dictionary of the named blank and light measurement arrays
+    """
+    nrec = refnc.shape[0]
+
+    # 4 sets of 4 DI water measurements (blanks), padded with a fill value to the shape of the light measurements
+    blanks = np.full((4, nrec, 23), FILL_INT, dtype=np.int32)
+    blanks[:, :, :4] = np.reshape(refnc, (nrec, 4, 4)).transpose(2, 0, 1)
+
+    # 23 sets of 4 seawater measurements
+    light = np.reshape(light, (nrec, 23, 4)).astype(np.int32, copy=False)
+
+    return {
+        'blank_refrnc_434': blanks[0],      # DI blank reference, 434 nm
+        'blank_signal_434': blanks[1],      # DI blank signal, 434 nm
+        'blank_refrnc_578': blanks[2],      # DI blank reference, 578 nm
+        'blank_signal_578': blanks[3],      # DI blank signal, 578 nm
+        'reference_434': light[:, :, 0],    # reference signal, 434 nm
+        'signal_434': light[:, :, 1],       # signal intensity, 434 nm (PH434SI_L0)
+        'reference_578': light[:, :, 2],    # reference signal, 578 nm
+        'signal_578': light[:, :, 3],       # signal intensity, 578 nm (PH578SI_L0)
+    }
+
+
+def batch_phwater(refnc, light, therm, psal, ea434, eb434, ea578, eb578, ind_slp, ind_off):
+    """
+    Indicator corrected pH of seawater (OOI data product PHWATER) calculated
+    for all of the records at once. Follows the same steps as
+    pyseas.data.ph_functions.ph_calc_phwater (and takes the same inputs),
+    which works through the records in turn: the blank corrected absorbances
+    and their ratios, the point pH and indicator concentration of each of the
+    23 seawater measurements, the search for the most linear window of
+    PH_WINDOW points (by the correlation coefficient, skipping the first
+    PH_SKIP points), and the fit of the pH against the indicator concentration
+    in that window, extrapolated to zero indicator. Here each step is an array
+    operation over all the records and measurements, with the windows taken as
+    strided views rather than copied one record at a time.
+
+    :param refnc: reference measurements (time x 16, counts)
+    :param light: light measurements (time x 92, counts)
+    :param therm: average thermistor temperature for each record (degC)
+    :param psal: practical salinity for each record
+    :param ea434: acid extinction coefficient at 434 nm
+    :param eb434: base extinction coefficient at 434 nm
+    :param ea578: acid extinction coefficient at 578 nm
+    :param eb578: base extinction coefficient at 578 nm
+    :param ind_slp: indicator impurity correction, slope
+    :param ind_off: indicator impurity correction, offset
+    :return ph: indicator corrected pH of seawater
+    """
+    refnc = np.asarray(refnc, dtype=float)
+    nrec = refnc.shape[0]
+    refnc = np.reshape(refnc, (nrec, 4, 4))
+    light = np.reshape(np.asarray(light, dtype=float), (nrec, 23, 4))
+    t = np.reshape(np.asarray(therm, dtype=float), (nrec, 1))
+    psal = np.reshape(np.asarray(psal, dtype=float), (nrec, 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # blank corrected absorbances, with the blanks averaged over the 4 sets of DI water measurements
+        blank434 = np.mean(refnc[:, :, 1] / refnc[:, :, 0], axis=1, keepdims=True)
+        blank578 = np.mean(refnc[:, :, 3] / refnc[:, :, 2], axis=1, keepdims=True)
+        abs434 = -np.log10(light[:, :, 1] / light[:, :, 0]) + np.log10(blank434)
+        abs578 = -np.log10(light[:, :, 3] / light[:, :, 2]) + np.log10(blank578)
+        ratio = abs578 / abs434
+
+        # dissociation constant (Clayton and Byrne, 1993) and temperature corrected molar absorptivities
+        pka = (1245.69 / (t + 273.15)) + 3.8275 + (0.0021 * (35.0 - psal))
+        a434 = ea434 - (26.0 * (t - 24.788))
+        a578 = ea578 + (t - 24.788)
+        b434 = eb434 + (12.0 * (t - 24.788))
+        b578 = eb578 - (71.0 * (t - 24.788))
+
+        # point pH and indicator concentration for each of the seawater measurements
+        v1 = ratio - a578 / a434
+        v2 = b578 / a434 - ratio * b434 / a434
+        point_ph = pka + np.log10(v1 / v2)
+        denom = a434 * b578 - b434 * a578
+        indicator = (abs434 * b578 - abs578 * b434) / denom + (abs578 * a434 - abs434 * a578) / denom
+
+        # find the most linear window of points in each record, from the correlation coefficient of the point pH
+        # against the measurement number
+        y = sliding_window_view(point_ph[:, PH_SKIP:], PH_WINDOW, axis=1)
+        x = sliding_window_view(np.arange(1.0, 24.0 - PH_SKIP), PH_WINDOW)
+        ssxy = np.sum(x * y, axis=2) - np.sum(x, axis=1) * np.sum(y, axis=2) / PH_WINDOW
+        ssx = np.sum(x ** 2, axis=1) - np.sum(x, axis=1) ** 2 / PH_WINDOW
+        ssy = np.sum(y ** 2, axis=2) - np.sum(y, axis=2) ** 2 / PH_WINDOW
+        best = np.argmax(ssxy ** 2 / (ssx * ssy), axis=1)
+
+        # fit the point pH against the indicator concentration in the best window, extrapolating to zero indicator
+        rows = np.arange(nrec)
+        ph = y[rows, best]
+        ind = sliding_window_view(indicator[:, PH_SKIP:], PH_WINDOW, axis=1)[rows, best]
+        sxx = np.sum(ind ** 2, axis=1) - np.sum(ind, axis=1) ** 2 / PH_WINDOW
+        sxy = np.sum(ind * ph, axis=1) - np.sum(ind, axis=1) * np.sum(ph, axis=1) / PH_WINDOW
+        ph = np.mean(ph, axis=1) - sxy / sxx * np.mean(ind, axis=1)
+
+    # pH corrections for the indicator impurity
+    return ph * ind_slp + ind_off
+
+
 def proc_phsen(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     Processing function for the Sunburst Sensors SAMI-pH sensor. Loads the JSON
@@ -100,7 +219,7 @@ def proc_phsen(infile, platform, deployment, lat, lon, depth, **kwargs):
     serial_number = kwargs.get('serial_number')
 
     # load the json data file as a panda data frame for further processing
-    df = json2df(infile)
+    df, arrays = json2df(infile, SCHEMA)
     if df.empty:
         # json data file was empty, exiting
         return None
@@ -147,20 +266,11 @@ def proc_phsen(infile, platform, deployment, lat, lon, depth, **kwargs):
     # reset the data type and units for the sensor time to make sure the value is correctly represented and can be
     # calculated against. the PHSEN uses the OSX date format of seconds since 1904-01-01. here we convert to seconds
     # since 1970-01-01.
-    rct = df['sensor_time'].astype(np.uint32).values * 1.0    # convert to a float
-    mac = datetime.strptime("01-01-1904", "%m-%d-%Y")
-    ept = datetime.strptime("01-01-1970", "%m-%d-%Y")
-    sensor_time = []
-    for i in range(len(df['time'])):
-        rec = mac + timedelta(seconds=rct[i])
-        rec.replace(tzinfo=timezone('UTC'))
-        sensor_time.append((rec - ept).total_seconds())
-
-    df['sensor_time'] = sensor_time   # replace the instrument time stamp
+    df['sensor_time'] = sami_epoch(df['sensor_time'])   # replace the instrument time stamp
 
-    # extract the reference and light measurement arrays from the data frame
-    refnc = np.array(np.vstack(df.pop('reference_measurements').values), dtype='int32')
-    light = np.array(np.vstack(df.pop('light_measurements').values), dtype='int32')
+    # the reference and light measurement arrays were loaded separately from the data frame
+    refnc = arrays['reference_measurements']
+    light = arrays['light_measurements']
 
     # create an average temperature value to be used in calculating the pH
     therm = df[['thermistor_temperature_start', 'thermistor_temperature_end']].astype(float).mean(axis=1).values
@@ -178,57 +288,24 @@ def proc_phsen(infile, platform, deployment, lat, lon, depth, **kwargs):
         ctd = colocated_ctd(infile, ctd_name)
 
     if not ctd.empty:
-        # set the CTD and pH time to the same units of seconds since 1970-01-01
-        ctd_time = ctd.time.values.astype(float) / 10.0 ** 9
-        ph_time = df.time.values.astype(float) / 10.0 ** 9
-
-        # test to see if the CTD covers our time of interest for this pH file
-        td = timedelta(hours=1).total_seconds()
-        coverage = ctd_time.min() <= ph_time.min() and ctd_time.max() + td >= ph_time.max()
-
-        # reset initial estimate of in-situ salinity if we have full coverage
-        if coverage:
-            df['ctd_pressure'] = np.interp(df['time'], ctd['time'], ctd.pressure)
-            df['ctd_temperature'] = np.interp(df['time'], ctd['time'], ctd.temperature)
-            salinity = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
-            df['ctd_salinity'] = np.interp(df['time'], ctd['time'], salinity)
+        # reset initial estimate of in-situ salinity if the CTD covers our time of interest
+        ctd['salinity'] = SP_from_C(ctd.conductivity.values * 10.0, ctd.temperature.values, ctd.pressure.values)
+        block = interp_colocated(df['time'], ctd, CTD_COLUMNS)
+        if block is not None:
+            block['ctd_salinity'] = block['ctd_salinity'].fillna(34.0)  # keep the default in any gaps in the CTD data
+            df[block.columns] = block.to_numpy()
 
     # add the salinity to the data set and calculate the pH
     if proc_flag:
-        df['pH'] = ph_calc_phwater(refnc, light, therm, df['ctd_salinity'], cal.coeffs['ea434'], cal.coeffs['eb434'],
-                                   cal.coeffs['ea578'], cal.coeffs['eb578'], cal.coeffs['ind_slp'],
-                                   cal.coeffs['ind_off'])
+        df['pH'] = batch_phwater(refnc, light, therm, df['ctd_salinity'], cal.coeffs['ea434'], cal.coeffs['eb434'],
+                                 cal.coeffs['ea578'], cal.coeffs['eb578'], cal.coeffs['ind_slp'], cal.coeffs['ind_off'])
     else:
         df['pH'] = np.ones(nrec) * np.nan
 
     # now we need to reset the light and reference arrays to named variables that will be more meaningful and useful in
-    # the final data files
-    refnc = np.atleast_3d(refnc)
-    refnc = np.reshape(refnc, (nrec, 4, 4))   # 4 sets of 4 DI water measurements (blanks)
-    fill = np.ones((nrec, 19)) * -9999999     # fill value to pad the reference measurements to same shape as light
-    blank_refrnc_434 = np.concatenate((refnc[:, :, 0], fill), axis=1)  # DI blank reference, 434 nm
-    blank_signal_434 = np.concatenate((refnc[:, :, 1], fill), axis=1)  # DI blank signal, 434 nm
-    blank_refrnc_578 = np.concatenate((refnc[:, :, 2], fill), axis=1)  # DI blank reference, 578 nm
-    blank_signal_578 = np.concatenate((refnc[:, :, 3], fill), axis=1)  # DI blank signal, 578 nm
-
-    light = np.atleast_3d(light)
-    light = np.reshape(light, (nrec, 23, 4))  # 4 sets of 23 seawater measurements
-    reference_434 = light[:, :, 0]            # reference signal, 434 nm
-    signal_434 = light[:, :, 1]               # signal intensity, 434 nm (PH434SI_L0)
-    reference_578 = light[:, :, 2]            # reference signal, 578 nm
-    signal_578 = light[:, :, 3]               # signal intensity, 578 nm (PH578SI_L0)
-
-    # create a data set with the raw reference and light measurements
-    raw = xr.Dataset({
-        'blank_refrnc_434': (['time', 'measurements'], blank_refrnc_434.astype('int32')),
-        'blank_signal_434': (['time', 'measurements'], blank_signal_434.astype('int32')),
-        'blank_refrnc_578': (['time', 'measurements'], blank_refrnc_578.astype('int32')),
-        'blank_signal_578': (['time', 'measurements'], blank_signal_578.astype('int32')),
-        'reference_434': (['time', 'measurements'], reference_434.astype('int32')),
-        'signal_434': (['time', 'measurements'], signal_434.astype('int32')),
-        'reference_578': (['time', 'measurements'], reference_578.astype('int32')),
-        'signal_578': (['time', 'measurements'], signal_578.astype('int32'))
-    }, coords={'time': df['time'], 'measurements': np.arange(0, 23).astype('int32')})
+    # the final data files, and create a data set with the raw reference and light measurements
+    raw = xr.Dataset({k: (['time', 'measurements'], v) for k, v in phsen_arrays(refnc, light).items()},
+                     coords={'time': df['time'], 'measurements': np.arange(0, 23).astype('int32')})
 
     # merge the data sets together
     ds = xr.Dataset.from_dataframe(df)
@@ -236,7 +313,7 @@ def proc_phsen(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # create the final data set with full attributes
     phsen['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(phsen.time)).astype(str))
-    attrs = dict_update(PHSEN, SHARED)  # merge global and PHSEN attribute dictionaries into a single dictionary
+    attrs = merge_attrs(PHSEN, SHARED)  # merge global and PHSEN attribute dictionaries into a single dictionary
     phsen = update_dataset(phsen, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     if proc_flag:
         phsen.attrs['processing_level'] = 'processed'
@@ -262,7 +339,7 @@ def main(argv=None):
     # process the PHSEN data and save the results to disk
     phsen = proc_phsen(infile, platform, deployment, lat, lon, depth, ctd_name=ctd_name, serial_number=serial_number)
     if phsen:
-        phsen.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(phsen, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, epoch_time
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, epoch_time
 from cgsn_processing.process.configs.attr_presf import PRESF
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -48,7 +48,7 @@ def proc_presf(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     presf['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(presf.time)).astype(str))
-    attrs = dict_update(PRESF, SHARED)  # add the shared attributes
+    attrs = merge_attrs(PRESF, SHARED)  # add the shared attributes
     presf = update_dataset(presf, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     presf.attrs['processing_level'] = 'parsed'
 
@@ -69,7 +69,7 @@ def main(argv=None):
     # process the Sea-Bird 26Plus data and save the results to disk
     presf = proc_presf(infile, platform, deployment, lat, lon, depth)
     if presf:
-        presf.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(presf, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -11,9 +11,14 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, epoch_time
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, epoch_time
 from cgsn_processing.process.configs.attr_prtsz import PRTSZ
 
+# data types for the parsed PRTSZ data (see json2df)
+SCHEMA = {
+    'arrays': {'volume_concentration': 'float64'}
+}
+
 
 def proc_prtsz(infile, platform, deployment, lat, lon, depth):
     """
@@ -31,7 +36,7 @@ def proc_prtsz(infile, platform, deployment, lat, lon, depth):
     """
 
     # load the json data file and return a panda dataframe
-    df = json2df(infile)
+    df, arrays = json2df(infile, SCHEMA)
     if df.empty:
         # there was no data in this file, ending early
         return None
@@ -46,8 +51,8 @@ def proc_prtsz(infile, platform, deployment, lat, lon, depth):
     # dropping the pressure variable, as it has no units and does not provide any useful information
     df.drop(columns=['pressure'], inplace=True)
 
-    # pop the 2d particle size data array out of the dataframe for manipulation
-    particle_concentration = np.array(np.vstack(df.pop('volume_concentration')))
+    # the 2d particle size data array was loaded separately for manipulation
+    particle_concentration = arrays['volume_concentration']
 
     # Create a list of the lower sizes, to use as a column
     lower_particle_size = [1.00, 1.48, 1.74, 2.05, 2.42, 2.86, 3.38, 3.98, 4.70, 5.55, 6.55, 7.72, 9.12, 10.8, 12.7,
@@ -89,7 +94,7 @@ def main(argv=None):
     # process the PRTSZ data and save the results to disk
     prtsz = proc_prtsz(infile, platform, deployment, lat, lon, depth)
     if prtsz:
-        prtsz.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(prtsz, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
@@ -10,9 +10,8 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
-from cgsn_processing.process.configs.attr_mpea import MPEA
-from cgsn_processing.process.configs.attr_psc import PSC
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
+from cgsn_processing.process.configs import load_attrs
 from cgsn_processing.process.configs.attr_common import SHARED
 
 
@@ -62,7 +61,7 @@ def proc_pwrsys(infile, platform, deployment, lat, lon, depth, **kwargs):
         df.drop(columns=fuel_cell, inplace=True)
 
         # set up the attributes dictionary
-        attrs = dict_update(PSC, SHARED)
+        attrs = merge_attrs(load_attrs('PSC'), SHARED)
 
     if pwrsys_type == 'mpea':
         # While originally intended to provide power for AUV docks, that functionality of the CVT was never used. There
@@ -76,7 +75,7 @@ def proc_pwrsys(infile, platform, deployment, lat, lon, depth, **kwargs):
         df.drop(columns=cv_channels, inplace=True)
 
         # set up the attributes dictionary
-        attrs = dict_update(MPEA, SHARED)
+        attrs = merge_attrs(load_attrs('MPEA'), SHARED)
 
     # convert the different hex strings (already converted to an integer in the parser) used for flags
     # to unsigned integers
@@ -110,7 +109,7 @@ def main(argv=None):
     # process the mooring power system data and save the results to disk
     pwrsys = proc_pwrsys(infile, platform, deployment, lat, lon, depth, pwrsys_type=pwrsys_type)
     if pwrsys:
-        pwrsys.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(pwrsys, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
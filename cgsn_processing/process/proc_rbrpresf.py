@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import ENCODING, inputs, json2df, dict_update, update_dataset
+from cgsn_processing.process.common import write_dataset, inputs, json2df, merge_attrs, update_dataset
 from cgsn_processing.process.configs.attr_rbrpresf import RBRQ3
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -42,7 +42,7 @@ def proc_rbrpresf(infile, platform, deployment, lat, lon, depth):
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     rbrq3['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(rbrq3.time)).astype(str))
-    attrs = dict_update(RBRQ3, SHARED)  # add the shared attributes
+    attrs = merge_attrs(RBRQ3, SHARED)  # add the shared attributes
     rbrq3 = update_dataset(rbrq3, platform, deployment, lat, lon, [depth, depth, depth], RBRQ3)
     rbrq3.attrs['processing_level'] = 'processed'
     return rbrq3
@@ -68,7 +68,7 @@ def main(argv=None):
     # process the RBR Q3 (PRESF) data and save the results to disk
     rbrq3 = proc_rbrpresf(infile, platform, deployment, lat, lon, depth)
     if rbrq3:
-        rbrq3.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(rbrq3, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
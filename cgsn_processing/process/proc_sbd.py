@@ -11,8 +11,8 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
-from cgsn_processing.process.configs.attr_sbd import CPM, STC
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
+from cgsn_processing.process.configs import load_attrs
 from cgsn_processing.process.configs.attr_common import SHARED
 
 
@@ -64,9 +64,9 @@ def proc_sbd(infile, platform, deployment, lat, lon, depth, **kwargs):
     # clean up the dataset and assign attributes
     sbd['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(sbd.time)).astype(str))
     if superv_type == 'cpm':
-        attrs = dict_update(CPM, SHARED)
+        attrs = merge_attrs(load_attrs('CPM'), SHARED)
     else:
-        attrs = dict_update(STC, SHARED)
+        attrs = merge_attrs(load_attrs('STC'), SHARED)
     sbd = update_dataset(sbd, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     sbd.attrs['processing_level'] = 'parsed'
 
@@ -88,7 +88,7 @@ def main(argv=None):
     # process the supervisor data and save the results to disk
     sbd = proc_sbd(infile, platform, deployment, lat, lon, depth, superv_type=superv_type)
     if sbd:
-        sbd.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(sbd, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -13,12 +13,19 @@ import pandas as pd
 import xarray as xr
 
 from cgsn_processing.process.common import Coefficients, inputs, json2df, update_dataset, \
-    ENCODING, dict_update
+    write_dataset, merge_attrs, burst_average
 from cgsn_processing.process.finding_calibrations import find_calibration
 from cgsn_processing.process.configs.attr_spkir import SPKIR
 from cgsn_processing.process.configs.attr_common import SHARED
 
-from pyseas.data.opt_functions import opt_ocr507_irradiance
+# data types for the parsed SPKIR data (see json2df)
+SCHEMA = {
+    'columns': {'frame_counter': 'int32', 'sample_delay': 'int32', 'serial_number': 'int32'},
+    'arrays': {'raw_channels': 'uint32'}
+}
+
+# center wavelengths (nm) of the seven OCR-507 channels, in the order they are reported
+WAVELENGTHS = np.array([412, 444, 490, 510, 555, 620, 683], dtype=np.int32)
 
 
 class Calibrations(Coefficients):
@@ -59,6 +66,58 @@ class Calibrations(Coefficients):
         self.coeffs = coeffs
 
 
+def ocr507_irradiance(channels, coeffs):
+    """
+    Convert the raw OCR-507 counts to downwelling spectral irradiance (uW cm-2
+    nm-1) for all seven channels at once, broadcasting the per-channel
+    calibration coefficients across the (time, channel) array of counts:
+
+        Ed = (counts - a0) * a1 * Im
+
+    where a0 is the offset, a1 the scale and Im the immersion factor. This is
+    the same calculation as the OOI SPECTIR L1 data product (see
+    opt_ocr507_irradiance in pyseas).
+
+    :param channels: 2D array (time, channel) of the raw counts
+    :param coeffs: calibration coefficients, with the offset, scale and
+        immersion_factor for each channel
+    :return ed: 2D array (time, channel) of the downwelling spectral irradiance
+    """
+    offset = np.asarray(coeffs['offset'], dtype=np.float64)
+    scale = np.asarray(coeffs['scale'], dtype=np.float64)
+    immersion = np.asarray(coeffs['immersion_factor'], dtype=np.float64)
+    return (channels - offset) * scale * immersion
+
+
+def add_irradiance(ds, channels, ed, wavelength=False):
+    """
+    Add the raw and converted downwelling spectral irradiance measurements to
+    the data set. By default, each channel is saved as a separate variable
+    named for its wavelength (e.g. raw_irradiance_412 and
+    downwelling_irradiance_412). With wavelength set, the channels are saved
+    as two 2D (time, wavelength) variables instead, raw_irradiance and
+    downwelling_irradiance, with the wavelengths as a coordinate.
+
+    :param ds: data set with the 1D SPKIR data
+    :param channels: 2D array (time, channel) of the raw counts
+    :param ed: 2D array (time, channel) of the downwelling spectral irradiance
+    :param wavelength: save the channels along a wavelength dimension
+    :return ds: data set with the irradiance measurements added
+    """
+    if wavelength:
+        ds = ds.assign_coords(wavelength=WAVELENGTHS)
+        ds['raw_irradiance'] = (('time', 'wavelength'), channels)
+        ds['downwelling_irradiance'] = (('time', 'wavelength'), ed)
+        return ds
+
+    for i, wl in enumerate(WAVELENGTHS):
+        ds['raw_irradiance_{}'.format(wl)] = ('time', channels[:, i])
+    for i, wl in enumerate(WAVELENGTHS):
+        ds['downwelling_irradiance_{}'.format(wl)] = ('time', ed[:, i])
+
+    return ds
+
+
 def proc_spkir(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     Main SPKIR processing function. Loads the JSON formatted, parsed data and
@@ -77,14 +136,18 @@ def proc_spkir(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     **kwargs burst: Boolean flag to indicate whether to apply burst averaging
             to the data. Default is to not apply burst averaging.
+    **kwargs switch: Optional flag, set to 'wavelength' to save the
+            irradiance measurements as 2D (time, wavelength) variables rather
+            than one variable per wavelength (see add_irradiance)
 
     :return spkir: An xarray dataset with the processed spkir data
     """
     # process the variable length keyword arguments
     burst = kwargs.get('burst')
+    wavelength = kwargs.get('switch') == 'wavelength'
 
     # load the json data file as a dictionary object for further processing
-    data = json2df(infile)
+    data, arrays = json2df(infile, SCHEMA)
     if data.empty:
         # json data file was empty, exiting
         return None
@@ -118,65 +181,33 @@ def proc_spkir(infile, platform, deployment, lat, lon, depth, **kwargs):
     df['time'] = pd.to_datetime(spkir_time, unit='s')
     df.set_index('time', drop=True, inplace=True)
 
-    # pop the raw_channels array out of the dataframe (will put it back in later)
-    channels = np.array(np.vstack(data.pop('raw_channels')), dtype='uint32')
+    # the raw_channels array was loaded separately as a 2D array (will put it back in later)
+    channels = arrays['raw_channels']
 
     # set up and load the 1D parsed data into the data frame
     for v in data.columns:
         if v not in ['time']:
             df[v] = np.atleast_1d(data[v])
 
-    # convert raw voltages and the instrument temperature to engineering units
-    df['input_voltage'].apply(lambda x: x * 0.03)
-    df['analog_rail_voltage'].apply(lambda x: x * 0.03)
-    df['internal_temperature'].apply(lambda x: -50 + x * 0.5)
-    
-    # add the raw downwelling spectral irradiance measurements to the dataframe per wavelength
-    df['raw_irradiance_412'] = channels[:, 0]
-    df['raw_irradiance_444'] = channels[:, 1]
-    df['raw_irradiance_490'] = channels[:, 2]
-    df['raw_irradiance_510'] = channels[:, 3]
-    df['raw_irradiance_555'] = channels[:, 4]
-    df['raw_irradiance_620'] = channels[:, 5]
-    df['raw_irradiance_683'] = channels[:, 6]
-
     # Convert raw spectral irradiance values from count to uW cm-2 nm-1
     if proc_flag:
-        ed = opt_ocr507_irradiance(channels, dev.coeffs['offset'], dev.coeffs['scale'], dev.coeffs['immersion_factor'])
+        ed = ocr507_irradiance(channels, dev.coeffs)
     else:
-        ed = channels.astype(float) * np.nan
-
-    # add the converted downwelling spectral irradiance measurements to the dataframe per wavelength
-    df['downwelling_irradiance_412'] = ed[:, 0]
-    df['downwelling_irradiance_444'] = ed[:, 1]
-    df['downwelling_irradiance_490'] = ed[:, 2]
-    df['downwelling_irradiance_510'] = ed[:, 3]
-    df['downwelling_irradiance_555'] = ed[:, 4]
-    df['downwelling_irradiance_620'] = ed[:, 5]
-    df['downwelling_irradiance_683'] = ed[:, 6]
-
-    # convert the now 1D dataframe into an xarray data set
+        ed = np.full(channels.shape, np.nan)
+
+    # convert the 1D dataframe into an xarray data set and add the raw and converted irradiance measurements
     spkir = xr.Dataset.from_dataframe(df)
+    spkir = add_irradiance(spkir, channels, ed, wavelength)
 
     # apply a median average to the burst (if desired)
     if burst:
-        # resample to a 15-minute interval and shift the clock to center the averaging window
-        spkir['time'] = spkir.time + pd.Timedelta('450s')
-        spkir = spkir.resample(time='900s').median(dim='time', keep_attrs=True)
-
-        # resampling will fill in missing time steps with NaNs. Use the serial_number variable
-        # as a proxy variable to find cases where data is filled with a NaN, and delete those records.
-        spkir = spkir.where(~np.isnan(spkir.serial_number), drop=True)
-
-        # reset original integer values
+        # resample to a 15-minute interval, resetting the original integer values
         int_arrays = ['frame_counter', 'sample_delay', 'serial_number']
-        for var in spkir.variables:
-            if var in int_arrays:
-                spkir[var] = spkir[var].astype(int)
+        spkir = burst_average(spkir, '900s', 'median', int_arrays)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     spkir['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(spkir.time)).astype(str))
-    attrs = dict_update(SPKIR, SHARED)
+    attrs = merge_attrs(SPKIR, SHARED)
     spkir = update_dataset(spkir, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     if proc_flag:
         spkir.attrs['processing_level'] = 'processed'
@@ -197,11 +228,12 @@ def main(argv=None):
     lon = args.longitude
     depth = args.depth
     burst = args.burst
+    switch = args.switch  # set to 'wavelength' to save the irradiance measurements along a wavelength dimension
 
     # process the SPKIR data and save the results to disk
-    spkir = proc_spkir(infile, platform, deployment, lat, lon, depth, burst=burst)
+    spkir = proc_spkir(infile, platform, deployment, lat, lon, depth, burst=burst, switch=switch)
     if spkir:
-        spkir.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(spkir, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
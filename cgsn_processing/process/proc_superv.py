@@ -11,8 +11,8 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
-from cgsn_processing.process.configs.attr_superv import SUPERV
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
+from cgsn_processing.process.configs import load_attrs
 from cgsn_processing.process.configs.attr_common import SHARED
 
 
@@ -64,8 +64,8 @@ def proc_superv(infile, platform, deployment, lat, lon, depth, **kwargs):
 
     # clean up the dataset and assign attributes
     superv['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(superv.time)).astype(str))
-    attrs = dict_update(SUPERV[superv_type], SUPERV['common'])
-    attrs = dict_update(attrs, SHARED)
+    superv_attrs = load_attrs('SUPERV')  # only loaded once we know there is data to process
+    attrs = merge_attrs(superv_attrs[superv_type], superv_attrs['common'], SHARED)
     superv = update_dataset(superv, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     superv.attrs['processing_level'] = 'parsed'
 
@@ -87,7 +87,7 @@ def main(argv=None):
     # process the supervisor data and save the results to disk
     superv = proc_superv(infile, platform, deployment, lat, lon, depth, superv_type=superv_type)
     if superv:
-        superv.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(superv, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
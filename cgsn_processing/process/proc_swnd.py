@@ -10,7 +10,8 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, dict_update, ENCODING
+from cgsn_processing.process.common import inputs, json2df, update_dataset, merge_attrs, write_dataset, \
+    burst_average
 from cgsn_processing.process.configs.attr_swnd import SWND
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -20,35 +21,42 @@ DEG2RAD = 0.0174533  # convert to radians (deg * (2 * pi / 360))
 RAD2DEG = 57.29578   # convert to degrees (rad * (360 / 2 * pi))
 
 
-def wind_binning(tbin):
+def wind_binning(swnd, period='1Min', vector_average=True):
     """
-    Function to bin the 5-second wind data into 1-minute averages. The wind
-    components are then re-calculated using the average wind speed and vector
-    averaged wind direction.
-
-    :param tbin: grouped pandas dataframe with ~1-minute of 5-second wind data
-    :return avg: dataframe with the averaged wind data
+    Function to bin the 5-second wind data into 1-minute averages (centered
+    on the minute), with the minimum and maximum wind speeds and the last
+    heading and relative wind direction in each bin. All the bins are computed
+    at once (see burst_average), and every minute between the first and last
+    is returned, with NaNs for the minutes without data. If vector_average is
+    set, the wind direction is replaced with the one derived from the vector
+    averaged wind components, and the wind components are re-calculated using
+    the average wind speed and that direction.
+
+    :param swnd: xarray dataset with the 5-second wind data
+    :param period: length of the bins as a pandas time delta string
+    :param vector_average: use the vector averaged wind direction
+    :return avg: dataset with the averaged wind data
     """
-    # calculate the 1-minute simple averages for the bin
-    avg = tbin.mean(dim='time')
-
-    # add the min and max wind speeds for the bin
-    avg['wind_speed_min'] = tbin['wind_speed'].min(dim='time')
-    avg['wind_speed_max'] = tbin['wind_speed'].max(dim='time')
+    # calculate the simple averages for the bins, using the last value for the heading and relative wind direction
+    last = {'heading': 'last', 'relative_direction': 'last'}
+    avg = burst_average(swnd, period, 'mean', var_stats=last, keep_empty=True)
 
-    # replace the averaged heading and relative wind directions with the last valid value
-    avg['heading'] = tbin['heading'][-1]
-    avg['relative_direction'] = tbin['relative_direction'][-1]
+    # add the min and max wind speeds for the bins
+    speed = swnd[['wind_speed']]
+    avg['wind_speed_min'] = burst_average(speed, period, 'min', keep_empty=True)['wind_speed']
+    avg['wind_speed_max'] = burst_average(speed, period, 'max', keep_empty=True)['wind_speed']
+    if not vector_average:
+        return avg
 
     # use the scalar-averaged wind speed and the wind direction calculated from vector averages to re-calculate the
     # eastward and northward wind components per directions provided by the NDBC (https://www.ndbc.noaa.gov/wndav.shtml)
-    wind_direction = np.arctan2(avg['eastward_wind_asimet'], avg['northward_wind_asimet'])  # reported in radians
+    wind_direction = np.arctan2(avg['eastward_wind_asimet'].values, avg['northward_wind_asimet'].values)  # radians
     wind_direction = np.where(wind_direction < 0, wind_direction + PI2, wind_direction)  # 0 to 360 degrees, in radians
     avg['eastward_wind_ndbc'] = avg['wind_speed'] * np.sin(wind_direction)
     avg['northward_wind_ndbc'] = avg['wind_speed'] * np.cos(wind_direction)
 
     # replace the averaged wind direction with one derived from the vector averages (converting radians to degrees)
-    avg['wind_direction'] = wind_direction * RAD2DEG  # convert to degrees (rad * (360 / 2 * pi))
+    avg['wind_direction'] = ('time', wind_direction * RAD2DEG)  # convert to degrees (rad * (360 / 2 * pi))
 
     return avg
 
@@ -132,15 +140,12 @@ def proc_swnd(infile, platform, deployment, lat, lon, depth):
     # create an xarray data set from the data frame
     swnd = xr.Dataset.from_dataframe(swnd)
 
-    # shift the time so subsequent resampling bins center the data in the middle of the 1-minute bin
-    swnd['time'] = swnd.time + np.timedelta64(30, 's')
-
-    # resample the data to 1-minute bins using the wind_binning function defined above
-    swnd = swnd.resample(time='1Min', label='left', skipna=True).map(wind_binning)
+    # bin the data into 1-minute averages centered on the minute using the wind_binning function defined above
+    swnd = wind_binning(swnd)
 
     # assign/create needed dimensions, geo coordinates and update the metadata attributes for the data set
     swnd['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(swnd.time)).astype(str))
-    attrs = dict_update(SWND, SHARED)
+    attrs = merge_attrs(SWND, SHARED)
     swnd = update_dataset(swnd, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     return swnd
 
@@ -159,7 +164,7 @@ def main(argv=None):
     # process the CTDBP data and save the results to disk
     swnd = proc_swnd(infile, platform, deployment, lat, lon, depth)
     if swnd:
-        swnd.to_netcdf(outfile, mode='w', format='NETCDF4', engine='netcdf4', encoding=ENCODING)
+        write_dataset(swnd, outfile, writer=args.writer, engine='netcdf4')
 
 
 if __name__ == '__main__':
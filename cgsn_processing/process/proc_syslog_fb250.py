@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_syslog_fb250 import FB250 
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -50,7 +50,7 @@ def proc_fbb(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     fbb['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(fbb.time)).astype(str))
-    attrs = dict_update(FB250, SHARED)
+    attrs = merge_attrs(FB250, SHARED)
     fbb = update_dataset(fbb, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     fbb.attrs['processing_level'] = 'parsed'
 
@@ -71,7 +71,7 @@ def main(argv=None):
     # process the FB250 data and save the results to disk
     fbb = proc_fbb(infile, platform, deployment, lat, lon, depth)
     if fbb:
-        fbb.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(fbb, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
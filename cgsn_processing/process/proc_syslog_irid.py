@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_syslog_irid import IRID 
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -45,7 +45,7 @@ def proc_irid(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     irid['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(irid.time)).astype(str))
-    attrs = dict_update(IRID, SHARED)
+    attrs = merge_attrs(IRID, SHARED)
     irid = update_dataset(irid, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     irid.attrs['processing_level'] = 'parsed'
 
@@ -66,7 +66,7 @@ def main(argv=None):
     # process the FB250 data and save the results to disk
     irid = proc_irid(infile, platform, deployment, lat, lon, depth)
     if irid:
-        irid.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(irid, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_syslog_rda import RDA
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -48,7 +48,7 @@ def proc_rda(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     rda['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(rda.time)).astype(str))
-    attrs = dict_update(RDA, SHARED)
+    attrs = merge_attrs(RDA, SHARED)
     rda = update_dataset(rda, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     rda.attrs['processing_level'] = 'parsed'
 
@@ -69,7 +69,7 @@ def main(argv=None):
     # process the FB250 data and save the results to disk
     rda = proc_rda(infile, platform, deployment, lat, lon, depth)
     if rda:
-        rda.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(rda, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -13,8 +13,8 @@ import xarray as xr
 from gsw import z_from_p
 from pyseas.data.generic_functions import magnetic_declination, magnetic_correction
 
-from cgsn_processing.process.common import ENCODING, FILL_INT, inputs, json2obj, json_obj2df, dt64_epoch, \
-    update_dataset, dict_update
+from cgsn_processing.process.common import write_dataset, FILL_INT, inputs, json2obj, json_obj2df, dt64_epoch, \
+    update_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_vel3d import VEL3D
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -118,7 +118,7 @@ def proc_vel3d(infile, platform, deployment, lat, lon, depth):
 
     # update the data set with appropriate metadata
     vel3d['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(vel3d.time)).astype(str))
-    attrs = dict_update(VEL3D, SHARED)  # add the shared attributes
+    attrs = merge_attrs(VEL3D, SHARED)  # add the shared attributes
     vel3d = update_dataset(vel3d, platform, deployment, lat, lon, depth_array, attrs)
     vel3d.attrs['processing_level'] = 'processed'
 
@@ -139,7 +139,7 @@ def main(argv=None):
     # process the VEL3D data and save the results to disk
     vel3d = proc_vel3d(infile, platform, deployment, lat, lon, depth)
     if vel3d:
-        vel3d.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(vel3d, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
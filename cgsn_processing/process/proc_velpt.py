@@ -10,7 +10,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json_sub2df, update_dataset, dict_update, ENCODING
+from cgsn_processing.process.common import inputs, json_sub2df, update_dataset, merge_attrs, write_dataset
 from cgsn_processing.process.configs.attr_velpt import VELPT
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -55,7 +55,7 @@ def proc_velpt(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     velpt['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(velpt.time)).astype(str))
-    attrs = dict_update(VELPT, SHARED)
+    attrs = merge_attrs(VELPT, SHARED)
     velpt = update_dataset(velpt, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     velpt.attrs['processing_level'] = 'processed'
 
@@ -75,7 +75,7 @@ def main(argv=None):
     # process the VELPT data and save the results to disk
     velpt = proc_velpt(infile, platform, deployment, lat, lon, depth)
     if velpt:
-        velpt.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(velpt, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -13,14 +13,45 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 import pandas as pd
+import sqlite3
 import sys
 import xarray as xr
 
+from concurrent.futures import ProcessPoolExecutor
 from matplotlib.ticker import MultipleLocator, FormatStrFormatter
 
 from cgsn_processing.process.common import ENCODING, json2obj, json_obj2df, update_dataset
 from cgsn_processing.process.configs.attr_vemco import VEMCO
 
+# tag detection variables saved to the CSV files and the detection store
+TAG_COLUMNS = ['serial_number', 'sequence', 'code_space', 'tag_id', 'sensor_data']
+
+# SQLite database saved with the CSV files in each site's parsed data directory, holding the tag detections from all
+# the processed files and the number of unique tags detected per day (see update_store and plot_vemco)
+STORE_NAME = 'vemco_detections.db'
+STORE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sources (
+        source TEXT PRIMARY KEY,
+        mtime REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS detections (
+        source TEXT NOT NULL,
+        time REAL NOT NULL,
+        day TEXT NOT NULL,
+        serial_number TEXT,
+        sequence INTEGER,
+        code_space TEXT,
+        tag_id INTEGER,
+        sensor_data REAL
+    );
+    CREATE INDEX IF NOT EXISTS detections_source ON detections (source);
+    CREATE INDEX IF NOT EXISTS detections_day ON detections (day, tag_id);
+    CREATE TABLE IF NOT EXISTS daily_counts (
+        day TEXT PRIMARY KEY,
+        unique_tags INTEGER NOT NULL
+    );
+"""
+
 
 def proc_vemco(infile, platform, deployment, lat, lon, depth):
     """
@@ -70,49 +101,222 @@ def proc_vemco(infile, platform, deployment, lat, lon, depth):
     return status, tags
 
 
-def plot_vemco(site_dirs, save_dirs, png_dir):
+def open_store(store):
+    """
+    Open (creating it if needed) the SQLite tag detection store for a site.
+    Transactions are managed explicitly (see update_store), and connections
+    wait for other processes writing to the store rather than failing.
+
+    :param store: detection store file name with the full, absolute path
+    :return con: connection to the store
+    """
+    con = sqlite3.connect(store, timeout=60, isolation_level=None)
+    con.executescript(STORE_SCHEMA)
+    return con
+
+
+def update_store(store, source, df, mtime=None):
+    """
+    Add the tag detections from a processed file to the detection store,
+    replacing any detections previously added from the same file (e.g. if it
+    was reprocessed), and update the number of unique tags detected on each
+    of the days covered by the old and new detections. Only those days are
+    recounted, so the cost of an update depends on the size of the file
+    rather than the size of the store.
+
+    :param store: detection store file name with the full, absolute path
+    :param source: name of the file the detections came from (the tags CSV
+        file), used to replace the detections if the file is reprocessed
+    :param df: data frame with the tag detections, with the time (in seconds
+        since 1970-01-01) either as the index or a column
+    :param mtime: modification time of the source file, used to skip files
+        already in the store (see sync_store), defaults to the current time
+    :return: None
+    """
+    _update_sources(store, [(source, df, mtime)])
+
+
+def _update_sources(store, sources, removed=()):
+    """
+    Replace the detections from a set of source files in the detection store,
+    remove the detections from the files that no longer exist, and recount the
+    unique tags on the affected days, in a single transaction (see
+    update_store).
+    """
+    # combine the detections from all the files, so they are converted and inserted together
+    frames = []
+    for source, df, _ in sources:
+        df = df.reset_index() if 'time' not in df.columns else df
+        if not df.empty:
+            df = df.reindex(columns=['time'] + TAG_COLUMNS)
+            df.insert(0, 'source', source)
+            frames.append(df)
+
+    rows = pd.DataFrame(columns=['source', 'time'] + TAG_COLUMNS)
+    if frames:
+        rows = pd.concat(frames, ignore_index=True)
+    rows['time'] = rows['time'].astype(float)
+    rows.insert(2, 'day', pd.to_datetime(rows['time'], unit='s').dt.strftime('%Y-%m-%d'))
+
+    con = open_store(store)
+    try:
+        con.execute('BEGIN IMMEDIATE')
+        con.execute('CREATE TEMP TABLE IF NOT EXISTS changed (source TEXT PRIMARY KEY)')
+        con.execute('CREATE TEMP TABLE IF NOT EXISTS affected (day TEXT PRIMARY KEY)')
+        con.execute('DELETE FROM changed')
+        con.execute('DELETE FROM affected')
+        con.executemany('INSERT OR IGNORE INTO changed VALUES (?)',
+                        [(source,) for source, _, _ in sources] + [(source,) for source in removed])
+
+        # the days with detections from these files, before and after the update, need to be recounted
+        con.execute('INSERT OR IGNORE INTO affected SELECT DISTINCT day FROM detections '
+                    'WHERE source IN (SELECT source FROM changed)')
+        con.executemany('INSERT OR IGNORE INTO affected VALUES (?)', [(day,) for day in rows['day'].unique()])
+
+        # replace the detections from these files
+        con.execute('DELETE FROM detections WHERE source IN (SELECT source FROM changed)')
+        con.executemany('INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+        now = pd.Timestamp.now().timestamp()
+        con.executemany('INSERT OR REPLACE INTO sources VALUES (?, ?)',
+                        [(source, mtime if mtime is not None else now) for source, _, mtime in sources])
+        con.executemany('DELETE FROM sources WHERE source = ?', [(source,) for source in removed])
+
+        # recount the unique tags detected on the affected days
+        con.execute('DELETE FROM daily_counts WHERE day IN (SELECT day FROM affected)')
+        con.execute('INSERT INTO daily_counts SELECT day, COUNT(DISTINCT tag_id) FROM detections '
+                    'WHERE day IN (SELECT day FROM affected) GROUP BY day')
+        con.execute('COMMIT')
+    except Exception:
+        con.execute('ROLLBACK')
+        raise
+    finally:
+        con.close()
+
+
+def sync_store(site_dir):
+    """
+    Bring the detection store for a site up to date with the tag detection
+    CSV files in the site's parsed data directory, adding the files that are
+    not yet in the store, or have changed since they were added, and removing
+    the detections from files that have since been deleted or renamed. Files
+    added by proc_vemco as they are processed are skipped, so normally only
+    the file names are checked. The first call for a site (or after the store
+    is removed) builds the store from all the CSV files.
+
+    :param site_dir: parsed data directory for the site
+    :return store: detection store file name
+    """
+    store = os.path.join(site_dir, STORE_NAME)
+    con = open_store(store)
+    try:
+        known = dict(con.execute('SELECT source, mtime FROM sources').fetchall())
+    finally:
+        con.close()
+
+    sources = []
+    present = set()
+    for csv_file in sorted(glob.glob(os.path.join(site_dir, '*_tags.csv'))):
+        source = os.path.basename(csv_file)
+        present.add(source)
+        mtime = os.path.getmtime(csv_file)
+        if source not in known or known[source] < mtime:
+            sources.append((source, pd.read_csv(csv_file), mtime))
+
+    # files in the store that are no longer in the directory (deleted or renamed)
+    removed = sorted(set(known) - present)
+    if sources or removed:
+        _update_sources(store, sources, removed)
+
+    return store
+
+
+def daily_counts(store):
+    """
+    Read the number of unique tags detected per day from a detection store.
+
+    :param store: detection store file name with the full, absolute path
+    :return counts: number of unique tags detected, indexed by day
+    """
+    con = open_store(store)
+    try:
+        counts = pd.read_sql_query('SELECT day, unique_tags FROM daily_counts ORDER BY day', con)
+    finally:
+        con.close()
+
+    return pd.Series(counts['unique_tags'].values, index=pd.DatetimeIndex(counts['day']), name='tag_id')
+
+
+def export_store(store, csv_file):
+    """
+    Save all the tag detections in a detection store to a single CSV file,
+    sorted by time, for the PIs. The file is only rewritten if the store has
+    been updated since the file was last saved.
+
+    :param store: detection store file name with the full, absolute path
+    :param csv_file: CSV file name with the full, absolute path
+    :return: None
+    """
+    if os.path.isfile(csv_file) and os.path.getmtime(csv_file) >= os.path.getmtime(store):
+        return
+
+    con = open_store(store)
+    try:
+        df = pd.read_sql_query('SELECT time, {} FROM detections ORDER BY time'.format(', '.join(TAG_COLUMNS)), con)
+    finally:
+        con.close()
+
+    df['time'] = pd.to_datetime(df.time, unit='s')
+    df = df.set_index('time')
+    df.to_csv(csv_file, mode='w', date_format='%Y-%m-%dT%H:%M:%SZ')
+
+
+def plot_vemco(site_dirs, save_dirs, png_dir, workers=1):
     """
-    Function to plot the VEMCO data for the OOI Endurance array. The function
-    reads in the parsed data from the CSV files, concatenates them into a single
-    dataframe, and then saves the concatenated dataframe to a CSV file in the
-    raw data directory. The function then plots the data combining all the sites
-    into a single plot.
+    Function to plot the VEMCO data for the OOI Endurance array. The tag
+    detections for each site are kept in a detection store in the site's
+    parsed data directory, updated by proc_vemco as each file is processed.
+    The function brings the stores up to date with any CSV files not yet
+    added to them (building them from all the CSV files the first time, see
+    sync_store), saves the detections from each site to a single CSV file in
+    the raw data directory, and then plots the daily number of unique tags
+    detected, combining all the sites into a single plot.
 
     :param site_dirs: List of directories containing the parsed data for each site
     :param save_dirs: List of directories to save the concatenated data for each site
     :param png_dir: Directory to save the plot
+    :param workers: Number of processes used to update the site detection
+        stores in parallel
     :return: None
     """
     # set the base directories for the raw and parsed data
     raw_dir = os.path.abspath('/home/ooiuser/DS')
     parsed_dir = os.path.abspath('/home/ooiuser/data/parsed')
-    data = {}
-    for idx, site in enumerate(site_dirs):
-        # create a list of all the CSV files (aka tag detections) for that site
-        csv_files = glob.glob(os.path.join(parsed_dir, site, '*_tags.csv'))
 
-        # read in the CSV files and concatenate them into a single dataframe
-        df = pd.concat([pd.read_csv(f) for f in csv_files], ignore_index=True)
-        df['time'] = pd.to_datetime(df.time, unit='s')
-        df = df.set_index('time')
-        df = df.sort_index()
+    # bring the detection stores for each site up to date, reading any new CSV files in parallel across the sites
+    paths = [os.path.join(parsed_dir, site) for site in site_dirs]
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            stores = list(executor.map(sync_store, paths))
+    else:
+        stores = [sync_store(path) for path in paths]
 
-        # save the concatenated dataframe to a CSV file in the raw data directory
+    data = {}
+    for idx, site in enumerate(site_dirs):
+        # save the detections to a CSV file in the raw data directory
         platform = site.split('/')[0]
-        df.to_csv(os.path.join(raw_dir, save_dirs[idx], platform + '_vemco_fish_tags.csv'), mode='w',
-                  date_format='%Y-%m-%dT%H:%M:%SZ')
+        export_store(stores[idx], os.path.join(raw_dir, save_dirs[idx], platform + '_vemco_fish_tags.csv'))
 
-        # add the data to the dictionary
-        data[platform] = df
+        # add the number of unique tag IDs observed per day to the dictionary
+        data[platform] = daily_counts(stores[idx])
 
     # plot the data combining all the sites into a single plot
     fig, ax = plt.subplots(2, 1, figsize=(11, 8.5), sharex=True)
     colors = ['RoyalBlue', 'Orange', 'LimeGreen']
     bottom = None
     idx = 0
-    for platform, df in data.items():
-        # group the data into unique tag IDs observed per day and reindex to fill in any missing days
-        detections = df.groupby(df.index.date).tag_id.nunique()
+    for platform, detections in data.items():
+        # reindex the unique tag IDs observed per day to fill in any missing days
         detections = detections.reindex(pd.date_range('2024-10-01', pd.Timestamp.now(), freq='D'), fill_value=0)
 
         # plot a running total of the number of unique tags observed over the entire deployment
@@ -194,6 +398,8 @@ def inputs(args=None):
                              help='List of directories to save the concatenated data')
     parser_plot.add_argument('-p', '--png_dir', dest='png_dir', type=str, required=True,
                              help='Directory to save the resulting plot')
+    parser_plot.add_argument('-nw', '--workers', dest='workers', type=int, required=False, default=1,
+                             help='Number of processes used to update the site detection stores')
     parser_plot.set_defaults(func=plot_vemco)
 
     # parse the input arguments and create a parser object to return
@@ -211,7 +417,7 @@ def main(argv=None):
     args = inputs(argv)
     if args.func.__name__ == 'plot_vemco':
         # plot the VEMCO data for the OOI Endurance array
-        plot_vemco(args.site_dirs, args.save_dirs, args.png_dir)
+        plot_vemco(args.site_dirs, args.save_dirs, args.png_dir, workers=args.workers)
     elif args.func.__name__ == 'proc_vemco':
         # process the VEMCO data using the input arguments
         infile = os.path.abspath(args.infile)
@@ -236,9 +442,13 @@ def main(argv=None):
             tags = tags.squeeze(dim='station', drop=True)  # remove the station dimension
             tags = tags.reset_coords()
             df = tags.to_dataframe()  # convert the xarray dataset to a pandas dataframe
-            columns = ['serial_number', 'sequence', 'code_space', 'tag_id', 'sensor_data']
+            columns = TAG_COLUMNS
             csvfile = infile.replace('.json', '_tags.csv')  # save the CSV file in the same directory as the JSON file
             df.to_csv(csvfile, mode='w', columns=columns)   # save the CSV file
+
+            # add the detections to the site detection store, used to create the plots
+            store = os.path.join(os.path.dirname(csvfile), STORE_NAME)
+            update_store(store, os.path.basename(csvfile), df, os.path.getmtime(csvfile))
     else:
         print('No valid function selected. Exiting.')
         sys.exit(1)
@@ -11,7 +11,7 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, epoch_time
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, epoch_time
 from cgsn_processing.process.configs.attr_wavss import WAVSS
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -52,7 +52,7 @@ def proc_wavss(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     wavss['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(wavss.time)).astype(str))
-    attrs = dict_update(WAVSS, SHARED)
+    attrs = merge_attrs(WAVSS, SHARED)
     wavss = update_dataset(wavss, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     wavss.attrs['processing_level'] = 'parsed'
 
@@ -73,7 +73,7 @@ def main(argv=None):
     # process the WAVSS data and save the results to disk
     wavss = proc_wavss(infile, platform, deployment, lat, lon, depth)
     if wavss:
-        wavss.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(wavss, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
@@ -11,7 +11,7 @@ import numpy as np
 import os
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs
 from cgsn_processing.process.configs.attr_sbd import XEOS
 from cgsn_processing.process.configs.attr_common import SHARED
 
@@ -52,7 +52,7 @@ def proc_xeos(infile, platform, deployment, lat, lon, depth):
 
     # clean up the dataset and assign attributes
     xeos['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(xeos.time)).astype(str))
-    attrs = dict_update(XEOS, SHARED)
+    attrs = merge_attrs(XEOS, SHARED)
     xeos = update_dataset(xeos, platform, deployment, lat, lon, [depth, depth, depth], attrs)
     xeos.attrs['processing_level'] = 'parsed'
 
@@ -73,7 +73,7 @@ def main(argv=None):
     # process the Xeos SBD data and save the results to disk
     xeos = proc_xeos(infile, platform, deployment, lat, lon, depth)
     if xeos:
-        xeos.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(xeos, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
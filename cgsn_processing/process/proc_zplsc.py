@@ -11,11 +11,19 @@ import os
 import pandas as pd
 import xarray as xr
 
-from cgsn_processing.process.common import inputs, json2df, update_dataset, ENCODING, dict_update, epoch_time, \
-    FILL_INT
+from cgsn_processing.process.common import inputs, json2df, update_dataset, write_dataset, merge_attrs, \
+    epoch_seconds, FILL_INT
 from cgsn_processing.process.configs.attr_zplsc import ZPLSC
 from cgsn_processing.process.configs.attr_common import SHARED
 
+# data types for the parsed ZPLSC data (see json2df)
+SCHEMA = {
+    'columns': {'serial_number': 'int32', 'phase': 'int32', 'burst_number': 'int32'},
+    'arrays': {'profiles_freq1': 'int32', 'profiles_freq2': 'int32', 'profiles_freq3': 'int32',
+               'profiles_freq4': 'int32', 'minimum_values': 'int32', 'number_bins': 'int32', 'frequencies': 'int32',
+               'tilts': 'float64'}
+}
+
 
 def sample_drift(df):
     """
@@ -30,22 +38,46 @@ def sample_drift(df):
         should have sampled
     """
     schedule = np.array([5, 20, 35, 50])
-    minutes = np.atleast_2d([x.minute for x in df['time']]).T
-    offsets = np.abs(minutes - schedule)
-    idx = np.argmin(offsets, 1)
-    drift = []
-    for i, t in enumerate(df['time']):
-        scheduled = pd.Timestamp(t.year, t.month, t.day, t.hour, schedule[idx[i]], 0)
-        drift.append(scheduled.to_datetime64().astype(float) / 10 ** 9 - df['burst_time'][i])
+    minutes = df['time'].values.astype('datetime64[m]')
+    hours = minutes.astype('datetime64[h]')
+
+    # find the closest scheduled minute of the hour for each burst
+    offsets = np.abs((minutes - hours).astype(int)[:, np.newaxis] - schedule)
+    scheduled = epoch_seconds(hours) + schedule[np.argmin(offsets, 1)] * 60.0
+    drift = scheduled - df['burst_time'].values
 
     return drift
 
 
+def stack_profiles(arrays, nbins):
+    """
+    Combine the condensed profiles from the four frequency channels into a
+    single (time, channel, bin) array, adding the minimum values back into
+    the raw echo intensities. Profiles shorter than the longest one are padded
+    with FILL_INT, so they can share a common bin_depth axis. The profiles are
+    kept as 32-bit integers, as the 16-bit counts can span the full range of a
+    16-bit integer, leaving no room for a fill value.
+
+    :param arrays: 2D arrays loaded from the parsed data (see SCHEMA)
+    :param nbins: number of bins in the output profiles
+    :return profiles: array of the raw echo intensities
+    """
+    minimum_values = arrays['minimum_values']
+    profiles = np.full((minimum_values.shape[0], 4, nbins), FILL_INT, dtype=np.int32)
+    for i in range(4):
+        channel = arrays['profiles_freq{}'.format(i + 1)]
+        np.add(channel, minimum_values[:, i:i + 1], out=profiles[:, i, :channel.shape[1]])
+
+    return profiles
+
+
 def proc_zplsc(infile, platform, deployment, lat, lon, depth, **kwargs):
     """
     ASL AZFP bioacoustic sensor raw condensed pings processing function. Loads
     the JSON formatted parsed data and converts data into a NetCDF data file
-    using xarray.
+    using xarray. By default, the profiles from each frequency channel are
+    saved as separate 2D variables. Setting the switch to 'stacked' saves them
+    as a single (time, frequency, bin_depth) variable instead.
 
     :param infile: JSON formatted parsed data file
     :param platform: Name of the mooring the instrument is mounted on.
@@ -53,40 +85,39 @@ def proc_zplsc(infile, platform, deployment, lat, lon, depth, **kwargs):
     :param lat: Latitude of the mooring deployment.
     :param lon: Longitude of the mooring deployment.
     :param depth: Depth of the platform the instrument is mounted on.
+    **kwargs bin_size: Size of the range bins in meters
+    **kwargs switch: Optional flag, set to 'stacked' to save the profiles as a
+        single (time, frequency, bin_depth) variable
 
     :return zplsc: xarray dataset with the raw condensed pings data
     """
     # process the variable length keyword arguments
     bin_size = kwargs.get('bin_size')
+    stacked = kwargs.get('switch') == 'stacked'
 
     # load the json data file and return a panda dataframe
-    df = json2df(infile)
+    df, arrays = json2df(infile, SCHEMA)
     if df.empty:
         # there was no data in this file, ending early
         return None
 
     # compare the instrument clock (from the transmission_date_string) to the GPS based DCL time stamp
-    df['transmission_time'] = [epoch_time(x) for x in df['transmission_date_string']]
-    df['clock_offset'] = (df['time'].values.astype(float) / 10 ** 9) - df['transmission_time']
+    transmission = pd.to_datetime(df['transmission_date_string'], utc=True).dt.tz_convert(None)
+    df['transmission_time'] = epoch_seconds(transmission)
+    df['clock_offset'] = epoch_seconds(df['time']) - df['transmission_time']
 
     # determine the offset and drift in the sampling time (should run at 5, 20, 35 and 50 minutes each hour)
-    df['burst_time'] = [(pd.to_datetime(x, format='%y%m%d%H%M%S%f')).to_datetime64().astype(float) / 10 ** 9
-                        for x in df['burst_date_string']]
+    df['burst_time'] = epoch_seconds(pd.to_datetime(df['burst_date_string'], format='%y%m%d%H%M%S%f'))
     df['sampling_offset'] = sample_drift(df)
 
     # clean up the dataframe, getting rid of the time string variables we no longer need
     df.drop(columns=['dcl_date_time_string', 'transmission_date_string', 'burst_date_string'], inplace=True)
 
-    # pop the 2D data arrays out of the dataframe (will put most of them back in later)
-    profiles_channel_1 = np.array(np.vstack(df.pop('profiles_freq1')))
-    profiles_channel_2 = np.array(np.vstack(df.pop('profiles_freq2')))
-    profiles_channel_3 = np.array(np.vstack(df.pop('profiles_freq3')))
-    profiles_channel_4 = np.array(np.vstack(df.pop('profiles_freq4')))
-    minimum_values = np.array(np.vstack(df.pop('minimum_values')))
-    number_bins = np.array(np.vstack(df.pop('number_bins')))
-    frequencies = np.array(np.vstack(df.pop('frequencies')))
+    # the 2D data arrays were loaded separately from the dataframe (will put most of them back in later). the tilts
+    # array is discarded, as the unit is at 90 degrees and the sensor can only measure to +-45 degrees
+    number_bins = arrays['number_bins']
+    frequencies = arrays['frequencies']
     _ = df.pop('phase')  # discard phase number, we only use the one.
-    _ = df.pop('tilts')  # discard tilts array as unit is at 90 degrees and the sensor can only measure to +-45 degrees
 
     # break the frequencies array apart
     df['channel_1_freq'] = frequencies[:, 0]
@@ -97,41 +128,31 @@ def proc_zplsc(infile, platform, deployment, lat, lon, depth, **kwargs):
     # convert the 1D variables to a xarray data set
     ds = xr.Dataset.from_dataframe(df)
 
-    # add the minimum values back into the raw echo intensities
-    profiles_channel_1 = profiles_channel_1 + np.atleast_2d(minimum_values[:, 0]).T
-    profiles_channel_2 = profiles_channel_2 + np.atleast_2d(minimum_values[:, 1]).T
-    profiles_channel_3 = profiles_channel_3 + np.atleast_2d(minimum_values[:, 2]).T
-    profiles_channel_4 = profiles_channel_4 + np.atleast_2d(minimum_values[:, 3]).T
-
     # create an approximate depth axis for the dataset based on the bin size, the maximum number of bins, and the
     # mounting angle of the transducers.
     nbins = max(number_bins[0, :])
     bins = np.arange(nbins)
     bin_depth = depth - 1.0 - ((bins * bin_size) * np.cos(np.radians(15.0)) + (bin_size / 2.0))
-
-    # pad the profiles with a fill value, if needed, so we can use a common bin_depth axis
-    pad = nbins - number_bins[0, 0]
-    if pad > 0:
-        fill_int = (np.ones(pad) * FILL_INT).astype(int)
-        profiles_channel_1 = np.concatenate([profiles_channel_1, np.tile(fill_int, (len(df.time), 1))], axis=1)
-        profiles_channel_2 = np.concatenate([profiles_channel_2, np.tile(fill_int, (len(df.time), 1))], axis=1)
-        profiles_channel_3 = np.concatenate([profiles_channel_3, np.tile(fill_int, (len(df.time), 1))], axis=1)
-        profiles_channel_4 = np.concatenate([profiles_channel_4, np.tile(fill_int, (len(df.time), 1))], axis=1)
-
-    bursts = xr.Dataset({
-        'profiles_channel_1': (['time', 'bin_depth'], profiles_channel_1),
-        'profiles_channel_2': (['time', 'bin_depth'], profiles_channel_2),
-        'profiles_channel_3': (['time', 'bin_depth'], profiles_channel_3),
-        'profiles_channel_4': (['time', 'bin_depth'], profiles_channel_4),
-    }, coords={'time': (['time'], pd.to_datetime(df.time, unit='s')), 'bin_depth': bin_depth})
+    coords = {'time': (['time'], pd.to_datetime(df.time, unit='s')), 'bin_depth': bin_depth}
+
+    # add the minimum values back into the raw echo intensities, padding the profiles with a fill value (if needed)
+    profiles = stack_profiles(arrays, nbins)
+    if stacked:
+        coords['frequency'] = frequencies[0, :]
+        bursts = xr.Dataset({'profiles': (['time', 'frequency', 'bin_depth'], profiles)}, coords=coords)
+    else:
+        bursts = xr.Dataset({
+            'profiles_channel_{}'.format(i + 1): (['time', 'bin_depth'], profiles[:, i, :]) for i in range(4)
+        }, coords=coords)
 
     # create a xarray data set from the 1D and 2D data
     zplsc = xr.merge([ds, bursts])
 
     # clean up the dataset and assign attributes
     zplsc['deploy_id'] = xr.Variable(('time',), np.repeat(deployment, len(zplsc.time)).astype(str))
-    attrs = dict_update(ZPLSC, SHARED)  # add the shared attributes
-    zplsc = update_dataset(zplsc, platform, deployment, lat, lon, [depth, bin_depth.min(), bin_depth.max()], attrs)
+    attrs = merge_attrs(ZPLSC, SHARED)  # add the shared attributes
+    zplsc = update_dataset(zplsc, platform, deployment, lat, lon, [depth, bin_depth.min(), bin_depth.max()], attrs,
+                           low_memory=True)
     zplsc.attrs['processing_level'] = 'parsed'
 
     return zplsc
@@ -148,11 +169,12 @@ def main(argv=None):
     lon = args.longitude
     depth = args.depth
     bin_size = args.bin_size
+    switch = args.switch  # set to 'stacked' to save the profiles as a single 3D variable
 
     # process the ASL AZFP data and save the results to disk
-    zplsc = proc_zplsc(infile, platform, deployment, lat, lon, depth, bin_size=bin_size)
+    zplsc = proc_zplsc(infile, platform, deployment, lat, lon, depth, bin_size=bin_size, switch=switch)
     if zplsc:
-        zplsc.to_netcdf(outfile, mode='w', format='NETCDF4', engine='h5netcdf', encoding=ENCODING)
+        write_dataset(zplsc, outfile, writer=args.writer)
 
 
 if __name__ == '__main__':
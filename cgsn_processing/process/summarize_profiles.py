@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.process.summarize_profiles
+@file cgsn_processing/process/summarize_profiles.py
+@author Christopher Wingard
+@brief Summarize the per-stage processor profiling records collected across a deployment run
+"""
+import argparse
+import glob
+import json
+import numpy as np
+import os
+import pandas as pd
+import sys
+
+# default percentiles reported for each processor and stage
+PERCENTILES = [50, 90, 99]
+
+
+def load_profiles(paths):
+    """
+    Load the JSON-lines profiling records written by the processors (see
+    common.StageProfiler) into a data frame with one row per processor, input
+    file and stage.
+
+    :param paths: list of JSON-lines files, directories (all *.jsonl files are
+        used) or glob patterns
+    :return df: data frame of the stage records
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.jsonl'))))
+        else:
+            files.extend(sorted(glob.glob(path)))
+
+    rows = []
+    for fname in files:
+        with open(fname) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                for name, stats in record['stages'].items():
+                    rows.append({
+                        'processor': record['processor'],
+                        'infile': record['infile'],
+                        'stage': name,
+                        'calls': stats['calls'],
+                        'wall': stats['wall'],
+                        'cpu': stats['cpu'],
+                        'rss_growth': stats['rss_growth'],
+                        'peak_rss': record['peak_rss'],
+                    })
+
+                # add the total for the file as a stage of its own
+                rows.append({
+                    'processor': record['processor'],
+                    'infile': record['infile'],
+                    'stage': 'total',
+                    'calls': 1,
+                    'wall': record['wall'],
+                    'cpu': record['cpu'],
+                    'rss_growth': None,
+                    'peak_rss': record['peak_rss'],
+                })
+
+    return pd.DataFrame(rows)
+
+
+def summarize(df, percentiles=None):
+    """
+    Summarize the profiling records by processor and stage, reporting the
+    number of files, the percentiles of the wall and CPU times, the share of
+    the total wall time and the largest peak memory use.
+
+    :param df: data frame of stage records (see load_profiles)
+    :param percentiles: list of percentiles to report (default 50, 90 and 99)
+    :return summary: data frame with one row per processor and stage
+    """
+    if percentiles is None:
+        percentiles = PERCENTILES
+
+    rows = []
+    for (processor, stage), group in df.groupby(['processor', 'stage'], sort=True):
+        row = {'processor': processor, 'stage': stage, 'files': group['infile'].nunique()}
+        wall = group['wall'].values
+        cpu = group['cpu'].values
+        for p in percentiles:
+            row['wall_p{}'.format(p)] = np.percentile(wall, p)
+        for p in percentiles:
+            row['cpu_p{}'.format(p)] = np.percentile(cpu, p)
+        row['wall_total'] = wall.sum()
+        row['peak_rss_mb'] = group['peak_rss'].max() / 2 ** 20 if group['peak_rss'].notna().any() else np.nan
+        rows.append(row)
+
+    summary = pd.DataFrame(rows)
+    if summary.empty:
+        return summary
+
+    # share of each processor's total wall time spent in each stage
+    totals = summary[summary['stage'] == 'total'].set_index('processor')['wall_total']
+    summary['share'] = summary['wall_total'] / summary['processor'].map(totals)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize the per-stage processor profiling records')
+    parser.add_argument('paths', nargs='+',
+                        help='JSON-lines profiling files, directories of them, or glob patterns')
+    parser.add_argument('-p', '--percentiles', dest='percentiles', nargs='+', type=float, default=PERCENTILES,
+                        help='Percentiles of the wall and CPU times to report')
+    parser.add_argument('-o', '--outfile', dest='outfile', type=str, required=False,
+                        help='Save the summary to a CSV file')
+    args = parser.parse_args(argv)
+
+    df = load_profiles(args.paths)
+    if df.empty:
+        print('No profiling records were found')
+        return 1
+
+    percentiles = [int(p) if float(p).is_integer() else p for p in args.percentiles]
+    summary = summarize(df, percentiles)
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.float_format', '{:.4f}'.format):
+        print(summary.to_string(index=False))
+
+    if args.outfile:
+        summary.to_csv(args.outfile, index=False)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
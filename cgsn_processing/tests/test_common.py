@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.tests.test_common
+@file cgsn_processing/tests/test_common.py
+@author Christopher Wingard
+@brief Unit tests for the shared processing utilities in the common module
+"""
+import json
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+import unittest
+import xarray as xr
+
+from cgsn_processing.process.common import FILL_INT, burst_average, interp_colocated, join_df, json2df, split_column
+
+
+class TestSplitColumn(unittest.TestCase):
+    '''
+    Split a nested column into separate columns or a 2D array, compared to
+    splitting the values one row at a time.
+    '''
+    def setUp(self):
+        self.rows = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [7.0, 8.0, 9.0]]
+        self.ragged = [[1.0, 2.0, 3.0, 4.0], [5.0, 6.0], [], [7.0, 8.0, 9.0]]
+
+    def test_split(self):
+        df = split_column(pd.DataFrame({'time': [0, 1, 2], 'raw': self.rows}), 'raw', 2, singular='channel')
+        self.assertEqual(list(df.columns), ['time', 'channel1', 'channel2'])
+        np.testing.assert_array_equal(df['channel2'], [2.0, 5.0, 8.0])
+
+        df = split_column(pd.DataFrame({'raw': self.rows}), 'raw', names=['a', 'b', 'c'])
+        np.testing.assert_array_equal(df[['a', 'b', 'c']].values, self.rows)
+
+        block = split_column(pd.DataFrame({'raw': self.rows}), 'raw', as_array=True)
+        np.testing.assert_array_equal(block, self.rows)
+
+    def test_ragged(self):
+        # rows longer than n are trimmed, shorter rows are padded with NaNs
+        df = split_column(pd.DataFrame({'raw': self.ragged}), 'raw', 3)
+        expected = [[1.0, 2.0, 3.0], [5.0, 6.0, np.nan], [np.nan] * 3, [7.0, 8.0, 9.0]]
+        np.testing.assert_array_equal(df[['raw1', 'raw2', 'raw3']].values, expected)
+
+        # without n, the rows are padded to the longest row
+        block = split_column(pd.DataFrame({'raw': self.ragged}), 'raw', as_array=True)
+        self.assertEqual(block.shape, (4, 4))
+        np.testing.assert_array_equal(block[1], [5.0, 6.0, np.nan, np.nan])
+
+    def test_empty(self):
+        block = split_column(pd.DataFrame({'raw': []}), 'raw', 3, as_array=True)
+        self.assertEqual(block.shape, (0, 3))
+
+
+class TestBurstAverage(unittest.TestCase):
+    '''
+    Burst average a data set with an empty bin, missing values, integer and
+    2D variables, compared to the xarray resampling (with the time shifted by
+    half the period to center the bins) used before.
+    '''
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        seconds = np.sort(rng.uniform(0, 6 * 3600, 500))
+        seconds = seconds[(seconds < 7200) | (seconds > 9000)]  # an empty 15-minute bin
+        n = seconds.size
+        x = rng.normal(10, 2, n)
+        x[rng.choice(n, 40, replace=False)] = np.nan
+        self.ds = xr.Dataset({
+            'x': ('time', x),
+            'counts': ('time', rng.integers(0, 2 ** 32, n, dtype=np.uint32)),
+            'spectra': (('time', 'wavelength'), rng.normal(0, 1, (n, 7)).astype(np.float32)),
+            'serial_number': ('time', np.full(n, 123, dtype=np.int64))
+        }, coords={'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(seconds, unit='s'),
+                   'wavelength': np.arange(7)})
+
+    def resampled(self, ds, how, period='900s'):
+        shifted = ds.assign_coords(time=ds['time'] + pd.Timedelta(period) / 2)
+        resampler = shifted.resample(time=period)
+        if how in ['first', 'last']:
+            return getattr(resampler, how)(skipna=False)
+        return getattr(resampler, how)()
+
+    def compare(self, avg, ref):
+        self.assertEqual(set(avg.data_vars), set(ref.data_vars))
+        np.testing.assert_array_equal(avg['time'].values, ref['time'].values)
+        for v in ref.data_vars:
+            self.assertEqual(avg[v].dims, ref[v].dims)
+            self.assertEqual(avg[v].dtype, ref[v].dtype, v)
+            np.testing.assert_allclose(avg[v].values, ref[v].values, rtol=1e-6, err_msg=v)
+
+    def test_statistics(self):
+        for how in ['median', 'mean', 'min', 'max', 'first', 'last']:
+            with self.subTest(how=how):
+                avg = burst_average(self.ds, '900s', how)
+                ref = self.resampled(self.ds, how)
+                ref = ref.sel(time=ref['serial_number'].notnull())  # drop the empty bins
+                if how in ['first', 'last']:
+                    # xarray converts the integers to floats for the empty bin, before it is dropped
+                    for v in ['counts', 'serial_number']:
+                        ref[v] = ref[v].astype(self.ds[v].dtype)
+                self.compare(avg, ref)
+
+    def test_keep_empty(self):
+        avg = burst_average(self.ds, '900s', 'mean', keep_empty=True)
+        self.compare(avg, self.resampled(self.ds, 'mean'))
+        self.assertTrue(np.all(np.isnan(avg['x'].sel(time='2024-01-01T02:15').values)))
+
+    def test_int_vars(self):
+        # only the listed variables are returned as integers, other integer medians stay as floats
+        avg = burst_average(self.ds, '900s', 'median', ['serial_number'])
+        self.assertEqual(avg['serial_number'].dtype, np.intc)
+        self.assertTrue(np.all(avg['serial_number'].values == 123))
+        self.assertEqual(avg['counts'].dtype, np.float64)
+        self.assertTrue(np.any(avg['counts'].values % 1 != 0))
+
+    def test_unsorted(self):
+        shuffled = self.ds.isel(time=np.random.default_rng(7).permutation(self.ds.sizes['time']))
+        xr.testing.assert_identical(burst_average(shuffled, '900s', 'median'),
+                                    burst_average(self.ds, '900s', 'median'))
+
+    def test_data_array(self):
+        avg = burst_average(self.ds['spectra'], '900s', 'median')
+        self.assertEqual(avg.dims, ('time', 'wavelength'))
+        self.assertEqual(avg.dtype, np.float32)
+
+
+class TestJoinDF(unittest.TestCase):
+    '''
+    Join the IMM CTD and status records on their times, compared to the pandas
+    joins where the two agree (unique times), and checking the handling of
+    duplicate times where they do not.
+    '''
+    def setUp(self):
+        self.ctd = pd.DataFrame({
+            'temperature': [10.0, 10.5, 11.0, 11.5],
+            'sample_number': np.array([1, 2, 3, 4], dtype=np.int32),
+            'deploy_id': ['D00001'] * 4
+        }, index=pd.DatetimeIndex(pd.to_datetime(['2024-01-01 00:00', '2024-01-01 00:15', '2024-01-01 00:30',
+                                                  '2024-01-01 00:45']), name='time'))
+
+    def status(self, times):
+        return pd.DataFrame({
+            'main_battery': np.linspace(12.0, 13.0, len(times)),
+            'status_code': np.arange(len(times), dtype=np.int32) + 100,
+            'status_text': ['status{}'.format(i) for i in range(len(times))]
+        }, index=pd.DatetimeIndex(pd.to_datetime(times), name='time'))
+
+    def test_outer(self):
+        # status records matching, between and after the CTD times, compared to a pandas join filled and recast
+        status = self.status(['2024-01-01 00:15', '2024-01-01 00:40', '2024-01-01 01:00'])
+        joined = join_df(self.ctd, status)
+        expected = self.ctd.join(status, how='outer')
+        for col in ['sample_number', 'status_code']:
+            expected[col] = expected[col].fillna(FILL_INT).astype(np.int32)
+        for col in ['deploy_id', 'status_text']:
+            expected[col] = expected[col].fillna('unknown').astype('|S')
+        pd.testing.assert_frame_equal(joined, expected)
+
+    def test_no_overlap(self):
+        # status records entirely before and after the CTD times are inserted as rows of their own
+        status = self.status(['2023-12-31 23:00', '2024-01-01 02:00'])
+        joined = join_df(self.ctd, status)
+        self.assertEqual(len(joined), 6)
+        self.assertTrue(joined.index.is_monotonic_increasing)
+        np.testing.assert_array_equal(joined['status_code'], [100] + [FILL_INT] * 4 + [101])
+        np.testing.assert_array_equal(joined['sample_number'], [FILL_INT, 1, 2, 3, 4, FILL_INT])
+        self.assertEqual(joined['deploy_id'].iloc[0], b'unknown')
+
+    def test_duplicates(self):
+        # duplicate primary times are kept once each, with the secondary record merged into the first of them
+        ctd = self.ctd.copy()
+        ctd.index = pd.DatetimeIndex(pd.to_datetime(['2024-01-01 00:00', '2024-01-01 00:15', '2024-01-01 00:15',
+                                                     '2024-01-01 00:30']), name='time')
+        joined = join_df(ctd, self.status(['2024-01-01 00:15']))
+        self.assertEqual(len(joined), 4)
+        np.testing.assert_array_equal(joined['sample_number'], [1, 2, 3, 4])
+        np.testing.assert_array_equal(joined['status_code'], [FILL_INT, 100, FILL_INT, FILL_INT])
+
+        # duplicate secondary times matching a primary record, the last one is used
+        joined = join_df(self.ctd, self.status(['2024-01-01 00:30', '2024-01-01 00:30']))
+        self.assertEqual(len(joined), 4)
+        np.testing.assert_array_equal(joined['status_code'], [FILL_INT, FILL_INT, 101, FILL_INT])
+
+        # duplicate secondary times without a primary record are each inserted
+        joined = join_df(self.ctd, self.status(['2024-01-01 00:40', '2024-01-01 00:40']))
+        self.assertEqual(len(joined), 6)
+        np.testing.assert_array_equal(joined['status_code'], [FILL_INT] * 3 + [100, 101, FILL_INT])
+
+    def test_asof(self):
+        status = self.status(['2023-12-31 23:00', '2024-01-01 00:15', '2024-01-01 00:20', '2024-01-01 02:00'])
+        joined = join_df(self.ctd, status, how='asof')
+        expected = pd.merge_asof(self.ctd, status, left_index=True, right_index=True)
+        pd.testing.assert_index_equal(joined.index, expected.index)
+        np.testing.assert_array_equal(joined['status_code'], expected['status_code'])
+        np.testing.assert_array_equal(joined['main_battery'], expected['main_battery'])
+
+    def test_overlapping_columns(self):
+        with self.assertRaises(ValueError):
+            join_df(self.ctd, self.ctd[['temperature']])
+
+
+class TestInterpColocated(unittest.TestCase):
+    '''
+    Interpolate co-located CTD data onto the instrument times, compared to
+    np.interp, with the points falling in gaps in the CTD data masked.
+    '''
+    def setUp(self):
+        # CTD samples every 10 minutes, with a 3 hour gap from 02:00 to 05:00
+        rng = np.random.default_rng(1)
+        minutes = np.concatenate([np.arange(0, 121, 10), np.arange(300, 481, 10)])
+        self.ctd = pd.DataFrame({
+            'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutes, unit='min'),
+            'pressure': rng.normal(25.0, 0.1, minutes.size),
+            'temperature': rng.normal(12.0, 0.5, minutes.size),
+        })
+        # instrument samples every 15 minutes, starting and ending just outside the CTD data
+        self.times = pd.date_range('2023-12-31 23:45', '2024-01-01 08:15', freq='15min').values
+        self.seconds = self.times.astype('datetime64[ns]').astype(np.int64) / 1e9
+        self.xp = self.ctd['time'].values.astype('datetime64[ns]').astype(np.int64) / 1e9
+
+    def expected(self, column):
+        return np.interp(self.seconds, self.xp, self.ctd[column].values)
+
+    def test_no_gap_masking(self):
+        # without the gap masking, the results match np.interp (the interpolation used before)
+        block = interp_colocated(self.times, self.ctd, ['pressure', 'temperature'], max_gap=None)
+        self.assertEqual(list(block.columns), ['pressure', 'temperature'])
+        for column in ['pressure', 'temperature']:
+            np.testing.assert_allclose(block[column].values, self.expected(column), rtol=1e-12)
+
+    def test_gap(self):
+        # points inside the 3 hour gap are masked, the rest match np.interp (including the points at the edges)
+        block = interp_colocated(self.times, self.ctd, {'temperature': 'ctd_temperature'})
+        self.assertEqual(list(block.columns), ['ctd_temperature'])
+        minutes = (self.seconds - self.seconds[0]) / 60 - 15
+        inside = (minutes > 120) & (minutes < 300)
+        self.assertTrue(np.all(np.isnan(block['ctd_temperature'].values[inside])))
+        np.testing.assert_allclose(block['ctd_temperature'].values[~inside], self.expected('temperature')[~inside],
+                                   rtol=1e-12)
+
+        # a longer maximum gap interpolates across it
+        block = interp_colocated(self.times, self.ctd, ['temperature'], max_gap='4h')
+        np.testing.assert_allclose(block['temperature'].values, self.expected('temperature'), rtol=1e-12)
+
+    def test_unsorted(self):
+        shuffled = self.ctd.sample(frac=1, random_state=3)
+        shuffled.loc[shuffled.index[0], 'time'] = pd.NaT
+        expected = interp_colocated(self.times, self.ctd.drop(index=shuffled.index[0]), ['pressure'])
+        pd.testing.assert_frame_equal(interp_colocated(self.times, shuffled, ['pressure']), expected)
+
+    def test_coverage(self):
+        # the source data must cover the target times, give or take the margin
+        late = self.times + np.timedelta64(3, 'h')
+        self.assertIsNone(interp_colocated(late, self.ctd, ['pressure']))
+        self.assertIsNotNone(interp_colocated(late, self.ctd, ['pressure'], margin='4h'))
+        block = interp_colocated(late, self.ctd, ['pressure'], margin=None)
+        self.assertEqual(block['pressure'].values[-1], self.ctd['pressure'].values[-1])
+        self.assertIsNone(interp_colocated(self.times, self.ctd.iloc[:0], ['pressure']))
+
+
+
+class TestJson2DF(unittest.TestCase):
+    '''
+    Read a parsed JSON data file with and without a schema, the columns
+    should have the same types either way (with long integers set to int32)
+    apart from those set by the schema.
+    '''
+    def setUp(self):
+        self.data = {
+            'time': [1.7e9, 1.7e9 + 900, 1.7e9 + 1800],
+            'serial_number': [101, 101, 101],
+            'counts': [10, 20, 30],
+            'temperature': [10.5, 10.6, 10.7],
+            'status': ['ok', 'ok', 'bad'],
+            'raw_channels': [[1, 2], [3, 4], [5, 6]]
+        }
+        fd, self.infile = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.data, f)
+
+    def tearDown(self):
+        os.remove(self.infile)
+
+    def test_schema(self):
+        schema = {'columns': {'serial_number': 'str'}, 'arrays': {'raw_channels': 'uint32'}}
+        plain = json2df(self.infile)
+        df, arrays = json2df(self.infile, schema)
+        self.assertEqual(list(df.columns), ['time', 'serial_number', 'counts', 'temperature', 'status'])
+        self.assertEqual(df['serial_number'].tolist(), ['101'] * 3)
+        for col in ['time', 'counts', 'temperature', 'status']:
+            self.assertEqual(df[col].dtype, plain[col].dtype, col)
+            np.testing.assert_array_equal(df[col].values, plain[col].values, err_msg=col)
+        self.assertEqual(df['counts'].dtype, np.int32)
+        self.assertEqual(arrays['raw_channels'].dtype, np.uint32)
+        np.testing.assert_array_equal(arrays['raw_channels'], self.data['raw_channels'])
+
+
+if __name__ == '__main__':
+    unittest.main()
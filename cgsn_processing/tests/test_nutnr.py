@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.tests.test_nutnr
+@file cgsn_processing/tests/test_nutnr.py
+@author Christopher Wingard
+@brief Unit tests for the batched NUTNR temperature and salinity corrected nitrate fit
+"""
+import numpy as np
+import unittest
+
+from cgsn_processing.process.proc_nutnr import batch_corrected_nitrate, TCSS_A, TCSS_B, TCSS_C, TCSS_D
+
+try:
+    from pyseas.data.nit_functions import ts_corrected_nitrate
+except ImportError:
+    ts_corrected_nitrate = None
+
+
+def loop_corrected_nitrate(cal_temp, wl, eno3, eswa, di, dark_value, ctd_t, ctd_sp, data_in, frame_type,
+                           wllower=217, wlupper=240):
+    """
+    Per-spectrum temperature and salinity corrected nitrate fit, following the
+    OOI data product specification (as in pyseas.data.nit_functions).
+    """
+    no3 = np.ones(data_in.shape[0]) * np.nan
+    for i in range(data_in.shape[0]):
+        if frame_type[i][1] == 'D':
+            continue
+
+        use = np.logical_and(wllower <= wl, wl <= wlupper)
+        WL = wl[use]
+        ENO3 = eno3[use]
+        ESWA = eswa[use]
+        DI = np.array(di[use], dtype='float64')
+        SW = np.array(data_in[i, use], dtype='float64')
+
+        absorbance = np.log10(DI / (SW - dark_value[i]))
+        esw_in_situ = ESWA * ((TCSS_A + TCSS_B * ctd_t[i]) * np.exp((TCSS_C + TCSS_D * ctd_t[i]) * (WL - 210.0)) /
+                              ((TCSS_A + TCSS_B * cal_temp) * np.exp((TCSS_C + TCSS_D * cal_temp) * (WL - 210.0))))
+        acomp = np.array(absorbance - esw_in_situ * ctd_sp[i], ndmin=2).T
+        M = np.array([ENO3, np.ones(ENO3.shape[0]), WL], ndmin=2).T
+        no3[i] = np.dot(np.linalg.pinv(M), acomp)[0, 0]
+
+    return no3
+
+
+class TestBatchNitrate(unittest.TestCase):
+    '''
+    Compare the batched nitrate fit to the per-spectrum fit on a set of
+    synthetic SUNA spectra and pure water calibration coefficients, with
+    dark frames mixed in with the light frames.
+    '''
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 50
+        wl = np.linspace(189.5, 394.5, 256).round(2)
+        self.frame_type = np.where(np.arange(n) % 10 == 0, 'SDF', 'SLF')
+        spectra = rng.integers(20000, 30000, (n, wl.size))
+        spectra[self.frame_type == 'SDF'] = rng.integers(500, 700, ((self.frame_type == 'SDF').sum(), wl.size))
+        self.args = [
+            20.0,                                                               # cal_temp
+            wl,                                                                 # wl
+            np.clip(0.2 * np.exp(-(wl - 200.0) / 12.0), 0, None),               # eno3
+            np.clip(0.005 * np.exp(-(wl - 200.0) / 10.0), 0, None),             # eswa
+            rng.integers(24000, 30000, wl.size),                                # di
+            rng.integers(500, 700, n).astype(float),                            # dark_value
+            rng.normal(12.0, 1.0, n),                                           # ctd_t
+            rng.normal(33.5, 0.2, n),                                           # ctd_sp
+            spectra                                                             # data_in
+        ]
+
+    def test_loop(self):
+        expected = loop_corrected_nitrate(*self.args, self.frame_type)
+        no3 = batch_corrected_nitrate(*self.args, self.frame_type)
+        np.testing.assert_array_equal(np.isnan(no3), self.frame_type == 'SDF')
+        np.testing.assert_allclose(no3, expected, rtol=1e-10, atol=1e-10)
+
+    @unittest.skipIf(ts_corrected_nitrate is None, 'requires pyseas')
+    def test_pyseas(self):
+        expected = ts_corrected_nitrate(*self.args, self.frame_type)
+        no3 = batch_corrected_nitrate(*self.args, self.frame_type)
+        np.testing.assert_allclose(no3, expected, rtol=1e-10, atol=1e-10)
+
+    def test_dark_frames(self):
+        # SUNA binary and ISUS dark frames, as strings or byte strings
+        frame_type = np.array(['SDB', 'SLB', 'NDF', 'NLF', 'NDC', 'NLC'] + ['SLF'] * 44)
+        for types in [frame_type, frame_type.astype('|S'), frame_type.tolist()]:
+            no3 = batch_corrected_nitrate(*self.args, types)
+            np.testing.assert_array_equal(np.isnan(no3[:6]), [True, False, True, False, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.tests.test_phsen
+@file cgsn_processing/tests/test_phsen.py
+@author Christopher Wingard
+@brief Unit tests for the PHSEN record time conversion and the blank and light measurement arrays
+"""
+import numpy as np
+import unittest
+
+from datetime import datetime, timedelta
+
+from cgsn_processing.process.common import sami_epoch
+
+try:
+    from cgsn_processing.process.proc_phsen import phsen_arrays, batch_phwater
+except ImportError:
+    phsen_arrays = batch_phwater = None     # the PHSEN processor requires pyseas
+
+try:
+    from pyseas.data.ph_functions import ph_calc_phwater
+except ImportError:
+    ph_calc_phwater = None
+
+# calibration coefficients for the pH calculation (ea434, eb434, ea578, eb578, ind_slp, ind_off)
+COEFFS = [17533.0, 2229.0, 107.0, 38502.0, 0.9698, 0.2484]
+
+
+def loop_sensor_time(record_time):
+    """
+    The original record-by-record conversion of the SAMI record times.
+    """
+    rct = np.asarray(record_time).astype(np.uint32) * 1.0
+    mac = datetime.strptime("01-01-1904", "%m-%d-%Y")
+    ept = datetime.strptime("01-01-1970", "%m-%d-%Y")
+    sensor_time = []
+    for i in range(len(rct)):
+        rec = mac + timedelta(seconds=rct[i])
+        sensor_time.append((rec - ept).total_seconds())
+
+    return np.array(sensor_time)
+
+
+def loop_arrays(refnc, light):
+    """
+    The original split of the blank and light measurements, padding the blanks by concatenation.
+    """
+    nrec = refnc.shape[0]
+    refnc = np.reshape(np.atleast_3d(refnc), (nrec, 4, 4))
+    fill = np.ones((nrec, 19)) * -9999999
+    arrays = {}
+    for i, name in enumerate(['blank_refrnc_434', 'blank_signal_434', 'blank_refrnc_578', 'blank_signal_578']):
+        arrays[name] = np.concatenate((refnc[:, :, i], fill), axis=1).astype('int32')
+
+    light = np.reshape(np.atleast_3d(light), (nrec, 23, 4))
+    for i, name in enumerate(['reference_434', 'signal_434', 'reference_578', 'signal_578']):
+        arrays[name] = light[:, :, i].astype('int32')
+
+    return arrays
+
+
+def loop_phwater(refnc, light, therm, psal, ea434, eb434, ea578, eb578, ind_slp, ind_off):
+    """
+    Per-record indicator corrected pH of seawater, following the OOI data
+    product specification (as in pyseas.data.ph_functions).
+    """
+    nrec = refnc.shape[0]
+    ph = np.zeros(nrec)
+    for i in range(nrec):
+        ref = np.array(refnc[i], dtype=float)
+        blank434 = np.mean([ref[1] / ref[0], ref[5] / ref[4], ref[9] / ref[8], ref[13] / ref[12]])
+        blank578 = np.mean([ref[3] / ref[2], ref[7] / ref[6], ref[11] / ref[10], ref[15] / ref[14]])
+
+        new = np.reshape(np.array(light[i], dtype=float), (23, 4))
+        abs434 = -np.log10(new[:, 1] / new[:, 0]) + np.log10(blank434)
+        abs578 = -np.log10(new[:, 3] / new[:, 2]) + np.log10(blank578)
+        R = abs578 / abs434
+
+        pKa = (1245.69 / (therm[i] + 273.15)) + 3.8275 + (0.0021 * (35. - psal[i]))
+        Ea434 = ea434 - (26. * (therm[i] - 24.788))
+        Ea578 = ea578 + (therm[i] - 24.788)
+        Eb434 = eb434 + (12. * (therm[i] - 24.788))
+        Eb578 = eb578 - (71. * (therm[i] - 24.788))
+        e1 = Ea578 / Ea434
+        e2 = Eb578 / Ea434
+        e3 = Eb434 / Ea434
+
+        V1 = R - e1
+        V2 = e2 - R * e3
+        HI = (abs434 * Eb578 - abs578 * Eb434) / (Ea434 * Eb578 - Eb434 * Ea578)
+        I = (abs578 * Ea434 - abs434 * Ea578) / (Ea434 * Eb578 - Eb434 * Ea578)
+        IndConc = (HI + I)[5:]
+        pointph = (pKa + np.log10(V1 / V2))[5:]
+
+        # most linear set of 8 points, by the correlation coefficient
+        X = np.linspace(1, 18, 18)
+        r2 = np.zeros(11)
+        for j in range(11):
+            x = X[j:j + 8]
+            y = pointph[j:j + 8]
+            ssxy = np.sum(x * y) - np.sum(x) * np.sum(y) / 8
+            ssx = np.sum(x ** 2) - np.sum(x) ** 2 / 8
+            ssy = np.sum(y ** 2) - np.sum(y) ** 2 / 8
+            r2[j] = ssxy ** 2 / (ssx * ssy)
+        cutoff = np.argmax(r2)
+
+        IndConcS = IndConc[cutoff:cutoff + 8]
+        pointphS = pointph[cutoff:cutoff + 8]
+        sxx = np.sum(IndConcS ** 2) - (np.sum(IndConcS) ** 2) / 8
+        sxy = np.sum(IndConcS * pointphS) - (np.sum(IndConcS) * np.sum(pointphS)) / 8
+        ph[i] = np.mean(pointphS) - sxy / sxx * np.mean(IndConcS)
+
+    return ph * ind_slp + ind_off
+
+
+def synthetic_light(rng, nrec, ph, therm, psal):
+    """
+    Create the reference and light measurements for records with a known
+    seawater pH, using the indicator absorbance model (with a pulse of
+    indicator washing out over the 23 measurements) plus some noise.
+    """
+    ea434, eb434, ea578, eb578 = COEFFS[:4]
+    refnc = rng.integers(2400, 2600, (nrec, 16)).astype(float)
+    refnc[:, 1::2] = refnc[:, 0::2] * rng.normal(1.0, 0.002, (nrec, 8))
+
+    t = therm[:, np.newaxis]
+    pka = (1245.69 / (t + 273.15)) + 3.8275 + (0.0021 * (35.0 - psal[:, np.newaxis]))
+    base = 1.0 / (1.0 + 10 ** (pka - ph[:, np.newaxis]))
+    conc = 4e-5 * np.exp(-np.arange(23) / 6.0) * np.arange(1, 24) / 3.0     # indicator pulse
+    a434 = conc * ((ea434 - 26.0 * (t - 24.788)) * (1 - base) + (eb434 + 12.0 * (t - 24.788)) * base)
+    a578 = conc * ((ea578 + (t - 24.788)) * (1 - base) + (eb578 - 71.0 * (t - 24.788)) * base)
+
+    light = np.zeros((nrec, 23, 4))
+    light[:, :, 0] = rng.integers(2400, 2600, (nrec, 23))
+    light[:, :, 2] = rng.integers(2400, 2600, (nrec, 23))
+    light[:, :, 1] = np.round(light[:, :, 0] * 10 ** -a434)
+    light[:, :, 3] = np.round(light[:, :, 2] * 10 ** -a578)
+    return np.round(refnc).astype(np.int32), light.reshape(nrec, 92).astype(np.int32)
+
+
+class TestPhsenRecords(unittest.TestCase):
+    '''
+    Compare the record time conversion and the blank and light measurement
+    arrays to the original per-record versions on a small set of records.
+    '''
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.nrec = 12
+        # record times from 2014 to 2030 in the SAMI epoch (seconds since 1904-01-01)
+        self.record_time = rng.integers(3471292800, 4000000000, self.nrec).astype(np.int64)
+        # every measurement is unique, so any mix up of the blanks or the light measurements shows up
+        self.refnc = np.arange(self.nrec * 16).reshape(self.nrec, 16) + 1000
+        self.light = np.arange(self.nrec * 92).reshape(self.nrec, 92) + 2000
+
+    def test_sami_epoch(self):
+        np.testing.assert_array_equal(sami_epoch(self.record_time), loop_sensor_time(self.record_time))
+        np.testing.assert_array_equal(sami_epoch(self.record_time.tolist()), loop_sensor_time(self.record_time))
+
+    @unittest.skipIf(phsen_arrays is None, 'requires pyseas')
+    def test_arrays(self):
+        expected = loop_arrays(self.refnc, self.light)
+        arrays = phsen_arrays(self.refnc, self.light)
+        self.assertEqual(set(arrays), set(expected))
+        for name in expected:
+            self.assertEqual(arrays[name].dtype, np.int32, name)
+            np.testing.assert_array_equal(arrays[name], expected[name], err_msg=name)
+
+        # the blanks are interleaved by measurement set: reference 434, signal 434, reference 578, signal 578
+        np.testing.assert_array_equal(arrays['blank_signal_434'][0, :4], [1001, 1005, 1009, 1013])
+        np.testing.assert_array_equal(arrays['blank_refrnc_578'][0, 4:], np.full(19, -9999999))
+
+
+class TestPhWater(unittest.TestCase):
+    '''
+    Compare the batched pH calculation to the per-record calculation, and to
+    pyseas when it is installed, on synthetic records with a known pH.
+    '''
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.nrec = 40
+        self.ph = rng.uniform(7.6, 8.2, self.nrec)
+        self.therm = rng.uniform(8.0, 20.0, self.nrec)
+        self.psal = rng.uniform(31.0, 34.5, self.nrec)
+        self.refnc, self.light = synthetic_light(rng, self.nrec, self.ph, self.therm, self.psal)
+        self.args = [self.refnc, self.light, self.therm, self.psal] + COEFFS
+
+    @unittest.skipIf(batch_phwater is None, 'requires pyseas')
+    def test_loop(self):
+        expected = loop_phwater(*self.args)
+        ph = batch_phwater(*self.args)
+        np.testing.assert_allclose(ph, expected, rtol=0, atol=1e-10)
+
+        # the fit recovers the seawater pH the records were created with (before the impurity correction)
+        np.testing.assert_allclose((ph - COEFFS[5]) / COEFFS[4], self.ph, atol=0.02)
+
+    @unittest.skipIf(batch_phwater is None, 'requires pyseas')
+    def test_missing(self):
+        # a record with a missing temperature, and one with a zero blank reference, are returned as NaN
+        self.args[0] = self.refnc.copy()
+        self.args[0][7, 0] = 0
+        self.args[2] = self.therm.copy()
+        self.args[2][3] = np.nan
+        ph = batch_phwater(*self.args)
+        np.testing.assert_array_equal(np.flatnonzero(np.isnan(ph)), [3, 7])
+        np.testing.assert_allclose(ph, loop_phwater(*self.args), rtol=0, atol=1e-10)
+
+    @unittest.skipIf(batch_phwater is None or ph_calc_phwater is None, 'requires pyseas')
+    def test_pyseas(self):
+        expected = ph_calc_phwater(*self.args)
+        ph = batch_phwater(*self.args)
+        np.testing.assert_allclose(ph, expected, rtol=0, atol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
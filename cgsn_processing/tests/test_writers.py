@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@package cgsn_processing.tests.test_writers
+@file cgsn_processing/tests/test_writers.py
+@author Christopher Wingard
+@brief Unit tests for writing the processed data sets to the deployment and Zarr outputs
+"""
+import multiprocessing
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import tempfile
+import unittest
+import warnings
+import xarray as xr
+
+from cgsn_processing.process.common import merge_attrs, update_dataset, write_dataset
+from cgsn_processing.process.configs.attr_common import SHARED
+
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+ATTRS = merge_attrs(SHARED, {
+    'global': {'title': 'Writer Test Data'},
+    'temperature': {'long_name': 'Temperature', 'units': 'degree_Celsius', '_FillValue': np.nan},
+    'counts': {'long_name': 'Counts', 'units': 'counts'}
+})
+
+
+def daily(day, offset=0.0, n=96):
+    """
+    Create a processed data set with a day of 15 minute records, the values
+    set from the record times plus an offset to mark different versions of the
+    same day.
+    """
+    time = pd.date_range('2024-01-%02d' % day, periods=n, freq='15min')
+    ds = xr.Dataset({
+        'temperature': ('time', np.arange(n) / n + day + offset),
+        'counts': ('time', np.arange(n) + day * 1000),
+        'deploy_id': ('time', np.repeat('D00001', n))
+    }, coords={'time': time})
+    return update_dataset(ds, 'ce01issm', 'D00001', 44.66, -124.10, [7.0, 7.0, 7.0], ATTRS)
+
+
+def write_day(out, day):
+    write_dataset(daily(day), os.path.join(out, '202401%02d.ctdbp.nc' % day), writer='deployment')
+
+
+class TestWriters(unittest.TestCase):
+    '''
+    Write a sequence of daily data sets, including reprocessed days, to the
+    deployment and Zarr outputs and confirm the combined records are sorted,
+    unique and hold the latest version of each day.
+    '''
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+        warnings.simplefilter('ignore')
+
+    def tearDown(self):
+        shutil.rmtree(self.out)
+
+    def write(self, days, writer, offset=None):
+        for i, day in enumerate(days):
+            write_dataset(daily(day, offset=i if offset is None else offset),
+                          os.path.join(self.out, '202401%02d.ctdbp.nc' % day), writer=writer)
+
+    def check(self, ds, days, offsets):
+        time = ds['time'].values
+        self.assertEqual(time.size, len(days) * 96)
+        self.assertTrue(np.all(np.diff(time) > 0))
+        for day, offset in zip(days, offsets):
+            start = (pd.Timestamp('2024-01-%02d' % day) - pd.Timestamp('1970-01-01')).total_seconds()
+            m = (time >= start) & (time < start + 86400)
+            np.testing.assert_allclose(ds['temperature'].values.ravel()[m], np.arange(96) / 96 + day + offset,
+                                       rtol=1e-6)
+
+    def test_deployment_reprocessed(self):
+        # append, replace and insert days, the last write for each day wins
+        self.write([1, 2, 1, 4, 3, 2], 'deployment')
+        with xr.open_dataset(os.path.join(self.out, 'D00001.ctdbp.nc'), decode_times=False) as nc:
+            self.check(nc.load(), [1, 2, 3, 4], [2, 5, 4, 3])
+        self.assertEqual(sorted(os.listdir(self.out)), ['D00001.ctdbp.nc', 'D00001.ctdbp.nc.lock'])
+
+    def test_deployment_parallel(self):
+        # writers running in parallel on the same deployment file keep all of the records
+        with multiprocessing.get_context('spawn').Pool(4) as pool:
+            pool.starmap(write_day, [(self.out, day) for day in [3, 1, 4, 2, 6, 5, 8, 7]])
+        with xr.open_dataset(os.path.join(self.out, 'D00001.ctdbp.nc'), decode_times=False) as nc:
+            self.check(nc.load(), range(1, 9), [0] * 8)
+
+    @unittest.skipIf(zarr is None, 'requires the optional zarr package')
+    def test_zarr_same_day(self):
+        # write the same day twice, the second write replaces the records in place
+        self.write([1, 1], 'zarr')
+        with xr.open_zarr(os.path.join(self.out, 'D00001.ctdbp.zarr'), decode_times=False) as zs:
+            self.check(zs.load(), [1], [1])
+            self.assertTrue(np.isnan(zs['temperature'].encoding['_FillValue']))
+
+    @unittest.skipIf(zarr is None, 'requires the optional zarr package')
+    def test_zarr_reprocessed(self):
+        # append, replace and insert days, the last write for each day wins
+        self.write([1, 2, 1, 4, 3, 2], 'zarr')
+        with xr.open_zarr(os.path.join(self.out, 'D00001.ctdbp.zarr'), decode_times=False) as zs:
+            self.check(zs.load(), [1, 2, 3, 4], [2, 5, 4, 3])
+        self.assertEqual(sorted(os.listdir(self.out)), ['D00001.ctdbp.zarr', 'D00001.ctdbp.zarr.lock'])
+
+
+if __name__ == '__main__':
+    unittest.main()
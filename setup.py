@@ -30,7 +30,7 @@ setup(
     author='Christopher Wingard',
     author_email='chris.wingard@oregonstate.edu',
     license='MIT',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
         'beautifulsoup4',
         'numpy',
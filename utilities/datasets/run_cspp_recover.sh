@@ -27,9 +27,11 @@ cd $PARSE
 ./utilities/harvesters/master_harvester_ucspp.sh $PLATFORM $DEPLOY ACS
 ./utilities/harvesters/master_harvester_ucspp.sh $PLATFORM $DEPLOY WC
 
-# now convert the parsed data files to netCDF file for use in ERDDAP
+# now convert the parsed data files to netCDF file for use in ERDDAP, processing all the sensors profile by profile
+# (sharing the CTD data within each profile) across a pool of worker processes (set WORKERS to change the default)
+PARSED="/home/ooiuser/data/parsed/$PLATFORM/$DEPLOY"
+PROCESSED="/home/ooiuser/data/processed/$PLATFORM/$DEPLOY"
+WORKERS=${WORKERS:-4}
 cd $PROCESS
-./utilities/processors/process_ucspp.sh $PLATFORM $DEPLOY $LAT $LON $DEPTH PPB $FLORT $PARAD 0
-./utilities/processors/process_ucspp.sh $PLATFORM $DEPLOY $LAT $LON $DEPTH SNA 0 0 $NUTNR
-./utilities/processors/process_ucspp.sh $PLATFORM $DEPLOY $LAT $LON $DEPTH ACS 0 0 0
-./utilities/processors/process_ucspp.sh $PLATFORM $DEPLOY $LAT $LON $DEPTH WC 0 0 0
+python -m cgsn_processing.process.proc_cspp -i $PARSED -o $PROCESSED -p $PLATFORM -d $DEPLOY \
+    -lt $LAT -lg $LON -dp $DEPTH -fsn $FLORT -psn $PARAD -sn $NUTNR -nw $WORKERS